@@ -1,10 +1,24 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from typing import List, Annotated
+from fastapi import FastAPI, Body
 from fastapi.responses import JSONResponse
 from schema.user_input import UserInput
-from schema.prediction_response import PredictionResponse
-from model.predict import predict_output, model, MODEL_VERSION
+from schema.prediction_response import PredictionResponse, BatchPredictionResponse
+from model.batcher import batcher
+from model.features import batch_features
+from model.predict import predict_batch, load_in_background, model_loaded, model_ready, MODEL_VERSION, MODEL_STATS
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # the model loads and warms up in the background; /health answers 503 until it is ready
+    app.state.model_loader = load_in_background()
+    yield
+    await batcher.stop()
+
+app = FastAPI(lifespan=lifespan)
+
+# largest number of records accepted by /predict/batch in one request
+MAX_BATCH_RECORDS = 10000
 
 # human readable       
 @app.get('/')
@@ -14,14 +28,29 @@ def home():
 # machine readable
 @app.get('/health')
 def health_check():
-    return {
-        'status': 'OK',
+    ready = model_ready()
+    # 503 until the model is loaded and warmed up, so load balancers hold traffic back
+    return JSONResponse(status_code=200 if ready else 503, content={
+        'status': 'OK' if ready else 'UNAVAILABLE',
         'version': MODEL_VERSION,
-        'model_loaded': model is not None
-    }
+        'model_loaded': model_loaded(),
+        'ready': ready,
+        'artifact_bytes': MODEL_STATS['artifact_bytes'],
+        'engine': MODEL_STATS['engine'],
+        'load_seconds': MODEL_STATS['load_seconds'],
+        'warmup_seconds': MODEL_STATS['warmup_seconds'],
+        'trained_at': MODEL_STATS['trained_at'],
+        'rss_mb': MODEL_STATS['rss_mb'],
+        'error': MODEL_STATS['error']
+    })
+
+# batching metrics for /predict
+@app.get('/metrics')
+def metrics():
+    return {'predict_batching': batcher.metrics()}
 
 @app.post('/predict', response_model=PredictionResponse)
-def predict_premium(data: UserInput):
+async def predict_premium(data: UserInput):
 
     user_input = {
         'bmi': data.bmi,
@@ -34,10 +63,25 @@ def predict_premium(data: UserInput):
 
     try:
 
-        prediction = predict_output(user_input)
+        # queued with other concurrent requests and scored in one model call
+        prediction = await batcher.predict(user_input)
 
         return JSONResponse(status_code=200, content={'response': prediction})
     
     except Exception as e:
 
-        return JSONResponse(status_code=500, content=str(e))
\ No newline at end of file
+        return JSONResponse(status_code=500, content=str(e))
+
+@app.post('/predict/batch', response_model=BatchPredictionResponse)
+def predict_premium_batch(data: Annotated[List[UserInput], Body(min_length=1, max_length=MAX_BATCH_RECORDS)]):
+
+    try:
+
+        # features are derived column-wise and the model runs once for the whole batch
+        predictions = predict_batch(batch_features(data))
+
+        return JSONResponse(status_code=200, content={'response': predictions})
+
+    except Exception as e:
+
+        return JSONResponse(status_code=500, content=str(e))
@@ -0,0 +1,11 @@
+# gunicorn -c gunicorn.conf.py -w 4 app:app
+# Loads the model once in the master process, before the workers fork, so
+# they share the forest copy-on-write instead of each unpickling their own.
+
+worker_class = 'uvicorn.workers.UvicornWorker'
+preload_app = True
+
+
+def on_starting(server):
+    from model.predict import load_model
+    load_model()
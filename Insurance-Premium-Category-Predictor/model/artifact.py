@@ -0,0 +1,16 @@
+import os
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_PATH = os.path.join(BASE_DIR, 'data', 'insurance.csv')
+ARTIFACT_DIR = os.path.join(BASE_DIR, 'model', 'artifacts')
+
+# the artifact version served unless MODEL_VERSION is set in the environment
+MODEL_VERSION = os.environ.get('MODEL_VERSION', '1.0.0')
+
+CATEGORICAL_FEATURES = ['age_group', 'lifestyle_risk', 'occupation', 'city_tier']
+NUMERIC_FEATURES = ['bmi', 'income_lpa']
+FEATURES = CATEGORICAL_FEATURES + NUMERIC_FEATURES
+
+
+def artifact_path(version: str = MODEL_VERSION) -> str:
+    return os.path.join(ARTIFACT_DIR, f'insurance_premium_v{version}.joblib')
@@ -0,0 +1,148 @@
+"""
+Async micro-batching for single-record predictions
+
+Concurrent /predict requests are queued instead of each running the model on
+its own. A collector task takes the first queued request. If nothing else is
+queued it is scored straight away, so a lone request never waits. Otherwise
+it keeps collecting until PREDICT_MAX_BATCH requests are waiting or
+PREDICT_MAX_WAIT_MS has passed, runs one vectorized model call in a worker thread and hands each
+request its own result (a batch of one is scored straight from its dict). While a batch runs, new requests queue up for
+the next one, so batches grow with load and stay at one record when the
+service is idle.
+
+    PREDICT_MAX_BATCH=64      most requests scored by one model call
+    PREDICT_MAX_WAIT_MS=5     longest a batch waits for more requests to join
+                              (0 scores whatever is queued straight away)
+"""
+
+import asyncio
+import os
+import time
+from collections import Counter
+
+from model.predict import predict_records
+
+MAX_BATCH = int(os.environ.get('PREDICT_MAX_BATCH', 64))
+MAX_WAIT_MS = float(os.environ.get('PREDICT_MAX_WAIT_MS', 5))
+
+
+class MicroBatcher:
+
+    def __init__(self, max_batch: int = MAX_BATCH, max_wait_ms: float = MAX_WAIT_MS):
+        if max_batch < 1:
+            raise ValueError('max_batch must be at least 1')
+        self.max_batch = max_batch
+        self.max_wait = max(max_wait_ms, 0) / 1000
+        self._queue = None
+        self._task = None
+        self._loop = None
+        self._reset_metrics()
+
+    def _reset_metrics(self):
+        self.requests = 0
+        self.batches = 0
+        self.batch_sizes = Counter()
+        self.queue_wait_seconds = 0.0
+        self.inference_seconds = 0.0
+
+    def _ensure_started(self):
+        # started on first use so it runs on the event loop serving requests
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._collect())
+
+    async def predict(self, user_input: dict) -> dict:
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((user_input, future, time.perf_counter()))
+        return await future
+
+    async def _next_batch(self) -> list:
+        batch = [await self._queue.get()]
+        if self._queue.empty():
+            # nobody else is waiting: don't hold a lone request back for company
+            return batch
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _collect(self):
+        while True:
+            batch = await self._next_batch()
+            # requests cancelled while queued (client went away) are dropped
+            batch = [item for item in batch if not item[1].done()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            try:
+                results = await asyncio.to_thread(predict_records, [item[0] for item in batch])
+            except Exception as e:
+                results = [e] * len(batch)
+            finished = time.perf_counter()
+
+            self.requests += len(batch)
+            self.batches += 1
+            self.batch_sizes[len(batch)] += 1
+            self.queue_wait_seconds += sum(started - item[2] for item in batch)
+            self.inference_seconds += finished - started
+
+            for (_, future, _), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    async def stop(self):
+        if self._task is not None and self._loop is asyncio.get_running_loop():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def metrics(self) -> dict:
+        sizes = sorted(self.batch_sizes)
+
+        def percentile(q):
+            # walk the distinct sizes with cumulative counts instead of expanding every batch
+            if not sizes:
+                return None
+            rank = min(self.batches - 1, int(q * self.batches))
+            seen = 0
+            for size in sizes:
+                seen += self.batch_sizes[size]
+                if seen > rank:
+                    return size
+
+        return {
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait * 1000,
+            'requests': self.requests,
+            'batches': self.batches,
+            'mean_batch_size': round(self.requests / self.batches, 2) if self.batches else None,
+            'p50_batch_size': percentile(0.5),
+            'p99_batch_size': percentile(0.99),
+            'max_batch_size': sizes[-1] if sizes else None,
+            'mean_queue_wait_ms': round(self.queue_wait_seconds / self.requests * 1000, 3) if self.requests else None,
+            'inference_ms_per_prediction': round(self.inference_seconds / self.requests * 1000, 3) if self.requests else None,
+            'batch_size_counts': {str(size): count for size, count in sorted(self.batch_sizes.items())},
+        }
+
+
+batcher = MicroBatcher()
@@ -0,0 +1,215 @@
+"""
+Compiled inference for the trained pipeline
+
+scikit-learn spends most of a single-row predict_proba on input validation,
+DataFrame handling and ColumnTransformer plumbing, and walks each tree of
+the forest separately. compile_pipeline turns the fitted pipeline into a few
+plain NumPy arrays:
+
+- the one-hot encoders become {category: column} lookups and the
+  passthrough columns become column positions
+- every tree of the forest goes into one node table holding split
+  feature, threshold, left and right child, and the class probabilities of
+  leaves. Split nodes of all trees come first, then leaves, and leaves
+  point to themselves, so all trees can be walked together for max_depth
+  steps.
+
+A single record is scored by resolving every split at once (the next node
+of each split node is left where x[feature] <= threshold, else right). The
+trees then follow those pointers together with one take per level, using
+preallocated per-thread buffers. Batches walk a (rows, trees) node array
+the same way.
+
+Features are rounded to float32 before comparison, as scikit-learn's trees
+do, so the outputs match predict_proba to floating point summation order.
+The arrays are plain NumPy, so an artifact holding a CompiledPipeline and
+loaded with mmap_mode='r' shares them between workers.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder
+from sklearn.tree import DecisionTreeClassifier
+
+BATCH_CHUNK_ROWS = 4096
+
+
+def _encoders(preprocessor: ColumnTransformer, n_features: int):
+    # (column, {category: output position}) per one-hot input, (column, position) per passthrough
+    categorical, numeric = [], []
+    output_indices = preprocessor.output_indices_
+    for name, transformer, columns in preprocessor.transformers_:
+        if name == 'remainder' and transformer == 'drop':
+            continue
+        positions = range(output_indices[name].start, output_indices[name].stop)
+        columns = [columns] if isinstance(columns, str) else list(columns)
+        if transformer == 'drop' or not positions:
+            continue
+        if transformer == 'passthrough' or (isinstance(transformer, FunctionTransformer) and transformer.func is None):
+            numeric.extend(zip(columns, positions))
+        elif isinstance(transformer, OneHotEncoder):
+            if transformer.drop_idx_ is not None or transformer.handle_unknown != 'ignore' \
+                    or getattr(transformer, '_infrequent_enabled', False):
+                raise ValueError('Only OneHotEncoder(handle_unknown="ignore") without drop or infrequent categories can be compiled')
+            start = positions.start
+            for column, categories in zip(columns, transformer.categories_):
+                if any(pd.isna(c) for c in categories):
+                    raise ValueError(f'Column {column} has a missing-value category, which cannot be compiled')
+                categorical.append((column, {c.item() if hasattr(c, 'item') else c: start + i for i, c in enumerate(categories)}))
+                start += len(categories)
+        else:
+            raise ValueError(f'Cannot compile transformer {name}: {type(transformer).__name__}')
+    if len(numeric) + sum(len(mapping) for _, mapping in categorical) != n_features:
+        raise ValueError('Preprocessor output does not match the classifier input')
+    return categorical, numeric
+
+
+def _trees(classifier):
+    if isinstance(classifier, DecisionTreeClassifier):
+        return [classifier]
+    if isinstance(classifier, (RandomForestClassifier, ExtraTreesClassifier)):
+        return list(classifier.estimators_)
+    raise ValueError(f'Cannot compile classifier {type(classifier).__name__}')
+
+
+class CompiledPipeline:
+
+    def __init__(self, pipeline: Pipeline):
+        if not isinstance(pipeline, Pipeline) or len(pipeline.steps) != 2 \
+                or not isinstance(pipeline[0], ColumnTransformer):
+            raise ValueError('Expected Pipeline(ColumnTransformer, tree classifier)')
+        classifier = pipeline[-1]
+        if getattr(classifier, 'n_outputs_', 1) != 1:
+            raise ValueError('Only single-output classifiers can be compiled')
+
+        self.classes = np.asarray(classifier.classes_)
+        self.n_features = classifier.n_features_in_
+        self.categorical, self.numeric = _encoders(pipeline[0], self.n_features)
+
+        trees = _trees(classifier)
+        self.n_trees = len(trees)
+        self.max_depth = max(tree.tree_.max_depth for tree in trees)
+
+        # node tables over all trees; split nodes come first (positions
+        # 0..n_splits-1) so a single record only evaluates those
+        tables = [tree.tree_ for tree in trees]
+        is_split = [t.children_left != -1 for t in tables]
+        self.n_splits = int(sum(split.sum() for split in is_split))
+        n_nodes = sum(t.node_count for t in tables)
+        new_ids, split_start, leaf_start = [], 0, self.n_splits
+        for t, split in zip(tables, is_split):
+            # new position of each of the tree's nodes
+            ids = np.empty(t.node_count, dtype=np.intp)
+            ids[split] = np.arange(split_start, split_start + split.sum())
+            ids[~split] = np.arange(leaf_start, leaf_start + (~split).sum())
+            split_start += split.sum()
+            leaf_start += (~split).sum()
+            new_ids.append(ids)
+
+        self.feature = np.zeros(n_nodes, dtype=np.intp)
+        self.threshold = np.full(n_nodes, np.inf)
+        self.left = np.arange(n_nodes, dtype=np.intp)
+        self.right = np.arange(n_nodes, dtype=np.intp)
+        self.leaf_proba = np.zeros((n_nodes, len(self.classes)))
+        roots = []
+        for t, split, ids in zip(tables, is_split, new_ids):
+            roots.append(ids[0])
+            self.feature[ids[split]] = t.feature[split]
+            self.threshold[ids[split]] = t.threshold[split]
+            self.left[ids[split]] = ids[t.children_left[split]]
+            self.right[ids[split]] = ids[t.children_right[split]]
+            # same normalisation as DecisionTreeClassifier.predict_proba
+            proba = t.value[~split, 0, :len(self.classes)].astype(np.float64)
+            normalizer = proba.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            self.leaf_proba[ids[~split]] = proba / normalizer
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self._local = threading.local()
+
+    def __getstate__(self):
+        # buffers are per thread and per process
+        state = self.__dict__.copy()
+        del state['_local']
+        return state
+
+    def __setstate__(self, state):
+        # arrays memory-mapped by joblib become plain ndarray views of the map,
+        # which skips the np.memmap subclass overhead on every operation
+        self.__dict__.update({key: np.asarray(value) if isinstance(value, np.memmap) else value
+                              for key, value in state.items()})
+        self._local = threading.local()
+
+    def _buffers(self):
+        local = self._local
+        if not hasattr(local, 'x'):
+            n = self.n_splits
+            local.x = np.zeros(self.n_features, dtype=np.float64)
+            local.split = np.empty(n, dtype=np.float64)
+            local.goes_left = np.empty(n, dtype=bool)
+            # next node of every node for the current record; leaves keep pointing to themselves
+            local.next = np.arange(len(self.feature), dtype=np.intp)
+            local.next_split = local.next[:n]
+            local.tables = (self.feature[:n], self.threshold[:n], self.left[:n], self.right[:n])
+            local.node = np.empty(self.n_trees, dtype=np.intp)
+            local.spare = np.empty(self.n_trees, dtype=np.intp)
+        return local
+
+    def predict_proba_one(self, record: dict) -> np.ndarray:
+        """Class probabilities for one record ({column: value})"""
+        b = self._buffers()
+        x = b.x
+        x.fill(0.0)
+        for column, mapping in self.categorical:
+            position = mapping.get(record[column])
+            if position is not None:
+                x[position] = 1.0
+        for column, position in self.numeric:
+            x[position] = np.float32(record[column])
+
+        # resolve every split of every tree at once, then follow the pointers
+        feature, threshold, left, right = b.tables
+        x.take(feature, out=b.split)
+        np.less_equal(b.split, threshold, out=b.goes_left)
+        np.copyto(b.next_split, right)
+        np.copyto(b.next_split, left, where=b.goes_left)
+
+        node, spare = b.node, b.spare
+        node[:] = self.roots
+        for _ in range(self.max_depth):
+            b.next.take(node, out=spare)
+            node, spare = spare, node
+        return self.leaf_proba.take(node, axis=0).sum(axis=0) / self.n_trees
+
+    def _encode(self, features: pd.DataFrame) -> np.ndarray:
+        X = np.zeros((len(features), self.n_features), dtype=np.float32)
+        rows = np.arange(len(features))
+        for column, mapping in self.categorical:
+            codes = pd.Index(list(mapping)).get_indexer(features[column])
+            known = codes >= 0
+            X[rows[known], next(iter(mapping.values())) + codes[known]] = 1.0
+        for column, position in self.numeric:
+            X[:, position] = np.asarray(features[column], dtype=np.float64)
+        return X
+
+    def predict_proba(self, features: pd.DataFrame) -> np.ndarray:
+        """Class probabilities for every row of a DataFrame with the training columns"""
+        out = np.empty((len(features), len(self.classes)), dtype=np.float64)
+        for start in range(0, len(features), BATCH_CHUNK_ROWS):
+            X = self._encode(features.iloc[start:start + BATCH_CHUNK_ROWS]).astype(np.float64)
+            rows = np.arange(len(X))[:, None]
+            node = np.broadcast_to(self.roots, (len(X), self.n_trees))
+            for _ in range(self.max_depth):
+                goes_left = X[rows, self.feature[node]] <= self.threshold[node]
+                node = np.where(goes_left, self.left[node], self.right[node])
+            out[start:start + len(X)] = self.leaf_proba[node].sum(axis=1) / self.n_trees
+        return out
+
+
+def compile_pipeline(pipeline: Pipeline) -> CompiledPipeline:
+    """Compile a fitted Pipeline(ColumnTransformer, tree classifier); raises ValueError if unsupported"""
+    return CompiledPipeline(pipeline)
@@ -0,0 +1,239 @@
+"""
+Model loading and prediction
+
+The versioned artifact written by `python -m model.train` is loaded once per
+process with mmap_mode='r'. The API starts loading it on a background thread
+when the app starts (load_in_background), so /health can answer 503 while it
+loads. The artifact is stored uncompressed, so plain numpy arrays inside it
+are mapped from the file rather than read into private memory, and workers
+mapping the same file share those pages. That covers the compiled engine
+(model/compiled.py) that requests are scored with. scikit-learn copies tree
+nodes out of the map when the forest itself is unpickled, so the forest is
+only shared when it is loaded before workers fork (gunicorn.conf.py).
+Before the compiled engine is used it is checked against the forest on the
+warmup records. Warmup predictions run straight after loading, and the
+service only reports ready once they have succeeded.
+
+Run `python -m model.predict` to measure cold start and memory for one worker.
+"""
+
+import logging
+import os
+import resource
+import threading
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+
+from model.artifact import FEATURES, MODEL_VERSION, artifact_path
+from model.compiled import compile_pipeline
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_PATH = artifact_path(MODEL_VERSION)
+
+# 'compiled' scores with the NumPy evaluator from model/compiled.py, falling back
+# to scikit-learn if the pipeline cannot be compiled; 'sklearn' always uses scikit-learn
+MODEL_ENGINE = os.environ.get('MODEL_ENGINE', 'compiled')
+
+# largest difference from scikit-learn's probabilities the compiled engine may show at load
+PARITY_TOLERANCE = 1e-9
+
+# one representative record per category value, so warmup touches every
+# encoder branch and every tree the way real requests do
+WARMUP_RECORDS = [
+    {'bmi': 22.5, 'age_group': 'young', 'lifestyle_risk': 'low', 'city_tier': 1, 'income_lpa': 4.0, 'occupation': 'student'},
+    {'bmi': 28.0, 'age_group': 'adult', 'lifestyle_risk': 'medium', 'city_tier': 2, 'income_lpa': 15.0, 'occupation': 'private_job'},
+    {'bmi': 31.0, 'age_group': 'middle_aged', 'lifestyle_risk': 'high', 'city_tier': 3, 'income_lpa': 35.0, 'occupation': 'business_owner'},
+    {'bmi': 25.0, 'age_group': 'senior', 'lifestyle_risk': 'low', 'city_tier': 1, 'income_lpa': 8.0, 'occupation': 'retired'},
+    {'bmi': 26.0, 'age_group': 'adult', 'lifestyle_risk': 'medium', 'city_tier': 2, 'income_lpa': 2.0, 'occupation': 'unemployed'},
+    {'bmi': 24.0, 'age_group': 'adult', 'lifestyle_risk': 'low', 'city_tier': 3, 'income_lpa': 12.0, 'occupation': 'government_job'},
+    {'bmi': 29.0, 'age_group': 'young', 'lifestyle_risk': 'medium', 'city_tier': 1, 'income_lpa': 9.0, 'occupation': 'freelancer'},
+]
+
+_load_lock = threading.Lock()
+_artifact = None
+
+# set by load_model
+model = engine = None
+class_labels = []
+
+# filled in by load_model and reported by /health
+MODEL_STATS = {
+    'ready': False,
+    'artifact_path': ARTIFACT_PATH,
+    'artifact_bytes': None,
+    'engine': None,
+    'load_seconds': None,
+    'warmup_seconds': None,
+    'trained_at': None,
+    'rss_mb': None,
+    'error': None,
+}
+
+
+def _max_rss_mb() -> float:
+    # peak resident memory of this process (ru_maxrss is KiB on Linux)
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _frame(records: list) -> pd.DataFrame:
+    return pd.DataFrame.from_records(records, columns=FEATURES)
+
+
+def _compiled_engine(artifact: dict):
+    # the artifact's compiled engine (or one compiled now), if it matches scikit-learn
+    if MODEL_ENGINE != 'compiled':
+        return None
+    try:
+        engine = artifact.get('compiled') or compile_pipeline(artifact['pipeline'])
+    except ValueError as e:
+        logger.warning("Serving model %s with scikit-learn: %s", MODEL_VERSION, e)
+        return None
+
+    expected = artifact['pipeline'].predict_proba(_frame(WARMUP_RECORDS))
+    batch = engine.predict_proba(_frame(WARMUP_RECORDS))
+    single = np.array([engine.predict_proba_one(record) for record in WARMUP_RECORDS])
+    difference = max(np.abs(batch - expected).max(), np.abs(single - expected).max())
+    if difference > PARITY_TOLERANCE:
+        logger.error("Compiled model %s differs from scikit-learn by %g, serving with scikit-learn",
+                     MODEL_VERSION, difference)
+        return None
+    return engine
+
+
+def _warmup(pipeline, engine) -> float:
+    # single-record calls are the request path; the full batch covers every category
+    start = time.perf_counter()
+    for record in WARMUP_RECORDS:
+        _predict_proba(pipeline, engine, _frame([record]))
+        if engine is not None:
+            engine.predict_proba_one(record)
+    _predict_proba(pipeline, engine, _frame(WARMUP_RECORDS))
+    return time.perf_counter() - start
+
+
+def _predict_proba(pipeline, engine, features: pd.DataFrame) -> np.ndarray:
+    return (engine or pipeline).predict_proba(features)
+
+
+def load_model(path: str = ARTIFACT_PATH) -> dict:
+    """Load and warm the artifact once per process; later calls return the loaded one"""
+    global _artifact, model, engine, class_labels
+    if _artifact is not None:
+        return _artifact
+    with _load_lock:
+        if _artifact is not None:
+            return _artifact
+
+        start = time.perf_counter()
+        artifact = joblib.load(path, mmap_mode='r')
+        load_seconds = time.perf_counter() - start
+
+        if artifact['version'] != MODEL_VERSION:
+            raise ValueError(f"Artifact {path} holds model version {artifact['version']}, expected {MODEL_VERSION}")
+        if artifact['sklearn_version'] != sklearn.__version__:
+            logger.warning("Model %s was trained with scikit-learn %s, running %s",
+                           MODEL_VERSION, artifact['sklearn_version'], sklearn.__version__)
+
+        start = time.perf_counter()
+        artifact['engine'] = _compiled_engine(artifact)
+        warmup_seconds = _warmup(artifact['pipeline'], artifact['engine']) + time.perf_counter() - start
+
+        MODEL_STATS.update({
+            'artifact_bytes': os.path.getsize(path),
+            'load_seconds': round(load_seconds, 4),
+            'warmup_seconds': round(warmup_seconds, 4),
+            'engine': 'sklearn' if artifact['engine'] is None else 'compiled',
+            'trained_at': artifact['trained_at'],
+            'rss_mb': _max_rss_mb(),
+            'error': None,
+        })
+        _artifact = artifact
+        model, engine = artifact['pipeline'], artifact['engine']
+        class_labels = list(model.classes_)
+        MODEL_STATS['ready'] = True
+        logger.info("Loaded model %s from %s in %.3fs (warmup %.3fs, %s engine)",
+                    MODEL_VERSION, path, load_seconds, warmup_seconds, MODEL_STATS['engine'])
+        return artifact
+
+
+def _load_or_record_error():
+    try:
+        load_model()
+    except Exception as e:
+        # keep serving so /health can report why the model is missing
+        logger.exception("Could not load model artifact %s", ARTIFACT_PATH)
+        MODEL_STATS['error'] = str(e)
+
+
+def load_in_background() -> threading.Thread:
+    """Start loading and warming the model without blocking startup; /health is 503 until it is ready"""
+    thread = threading.Thread(target=_load_or_record_error, name='model-loader', daemon=True)
+    thread.start()
+    return thread
+
+
+def model_loaded() -> bool:
+    return model is not None
+
+
+def model_ready() -> bool:
+    return MODEL_STATS['ready']
+
+
+def _require_model():
+    if model is None:
+        raise RuntimeError(f"Model {MODEL_VERSION} is not loaded: {MODEL_STATS['error']}")
+
+
+def _responses(probabilities: np.ndarray) -> list:
+    # one response per row of class probabilities; the rest is array work
+    best = probabilities.argmax(axis=1)
+    categories = np.asarray(class_labels, dtype=object)[best].tolist()
+    confidences = probabilities[np.arange(len(best)), best].round(4).tolist()
+    labels = [str(label) for label in class_labels]
+
+    return [
+        {
+            'predicted_category': str(category),
+            'confidence': confidence,
+            'class_probabilities': dict(zip(labels, row)),
+        }
+        for category, confidence, row in zip(categories, confidences, probabilities.round(4).tolist())
+    ]
+
+
+def predict_output(user_input: dict) -> dict:
+    # a single record is scored straight from the dict by the compiled engine,
+    # skipping the DataFrame a batch call needs
+    _require_model()
+    if engine is not None:
+        probabilities = engine.predict_proba_one(user_input)[np.newaxis, :]
+    else:
+        probabilities = model.predict_proba(_frame([user_input]))
+    return _responses(probabilities)[0]
+
+
+def predict_batch(features: pd.DataFrame) -> list:
+    # one predict_proba call for the whole batch
+    _require_model()
+    return _responses(_predict_proba(model, engine, features))
+
+
+def predict_records(records: list) -> list:
+    """Score a list of {column: value} records, in order"""
+    if len(records) == 1:
+        return [predict_output(records[0])]
+    return predict_batch(_frame(records))
+
+
+if __name__ == '__main__':
+    # cold start report for one process: python -m model.predict
+    _load_or_record_error()
+    print(f"model version     {MODEL_VERSION}")
+    for key, value in MODEL_STATS.items():
+        print(f"{key:<17} {value}")
@@ -0,0 +1,77 @@
+"""
+Train the premium category model and write a versioned artifact
+
+    python -m model.train                 # writes model/artifacts/insurance_premium_v<MODEL_VERSION>.joblib
+    python -m model.train --version 1.1.0
+"""
+
+import argparse
+import os
+from datetime import datetime, timezone
+
+import joblib
+import pandas as pd
+import sklearn
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+from schema.user_input import UserInput
+from model.compiled import compile_pipeline
+from model.artifact import (
+    DATA_PATH, MODEL_VERSION, CATEGORICAL_FEATURES, NUMERIC_FEATURES, FEATURES, artifact_path
+)
+
+
+# derive the model features exactly as the API does for each request
+def build_features(raw: pd.DataFrame) -> pd.DataFrame:
+    records = [UserInput(**row).model_dump() for row in raw.drop(columns='insurance_premium_category').to_dict('records')]
+    return pd.DataFrame(records)[FEATURES]
+
+
+def build_pipeline() -> Pipeline:
+    preprocessor = ColumnTransformer(transformers=[
+        ('cat', OneHotEncoder(handle_unknown='ignore'), CATEGORICAL_FEATURES),
+        ('num', 'passthrough', NUMERIC_FEATURES),
+    ])
+    return Pipeline(steps=[
+        ('preprocessor', preprocessor),
+        ('classifier', RandomForestClassifier(n_estimators=100, random_state=42)),
+    ])
+
+
+def train(version: str = MODEL_VERSION, data_path: str = DATA_PATH) -> str:
+    raw = pd.read_csv(data_path)
+    X = build_features(raw)
+    y = raw['insurance_premium_category']
+    pipeline = build_pipeline().fit(X, y)
+
+    artifact = {
+        'version': version,
+        'pipeline': pipeline,
+        # stored as plain arrays so workers share them through mmap_mode
+        'compiled': compile_pipeline(pipeline),
+        'classes': [str(c) for c in pipeline.classes_],
+        'features': FEATURES,
+        'sklearn_version': sklearn.__version__,
+        'trained_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'training_rows': len(raw),
+    }
+
+    # uncompressed so the service can load it with mmap_mode; written to a
+    # temporary name first so a running service never sees a partial file
+    path = artifact_path(version)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial_path = f"{path}.partial"
+    joblib.dump(artifact, partial_path, compress=0)
+    os.replace(partial_path, path)
+    return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Train the insurance premium category model')
+    parser.add_argument('--version', default=MODEL_VERSION)
+    parser.add_argument('--data', default=DATA_PATH)
+    args = parser.parse_args()
+    print(f"Wrote {train(args.version, args.data)}")
@@ -0,0 +1,148 @@
+"""
+API tests: model loading and readiness, and /predict/batch
+"""
+
+import threading
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from model import predict
+from model.artifact import artifact_path
+from model.compiled import CompiledPipeline
+
+
+@pytest.fixture
+def unloaded(monkeypatch):
+    # a process that has not loaded the model yet; monkeypatch restores the loaded state afterwards
+    monkeypatch.setattr(predict, '_artifact', None)
+    monkeypatch.setattr(predict, 'model', None)
+    monkeypatch.setattr(predict, 'engine', None)
+    monkeypatch.setattr(predict, 'class_labels', [])
+    monkeypatch.setattr(predict, 'MODEL_STATS', dict(predict.MODEL_STATS, ready=False, error=None))
+    monkeypatch.setattr('app.MODEL_STATS', predict.MODEL_STATS)
+
+
+def test_health_is_503_until_the_model_is_warm(unloaded, monkeypatch):
+    from app import app
+    release = threading.Event()
+    real_load = predict.load_model
+
+    def slow_load(*args, **kwargs):
+        release.wait(10)
+        return real_load(*args, **kwargs)
+
+    monkeypatch.setattr(predict, 'load_model', slow_load)
+    with TestClient(app) as client:
+        response = client.get('/health')
+        assert response.status_code == 503
+        assert response.json()['ready'] is False
+        assert response.json()['model_loaded'] is False
+
+        release.set()
+        app.state.model_loader.join(30)
+        response = client.get('/health')
+        assert response.status_code == 200
+        body = response.json()
+        assert body['ready'] is True and body['model_loaded'] is True
+        assert body['engine'] == 'compiled'
+        assert body['load_seconds'] is not None and body['warmup_seconds'] is not None
+
+
+def test_health_reports_load_errors(unloaded, monkeypatch):
+    from app import app
+
+    def broken_load(*args, **kwargs):
+        raise FileNotFoundError('no artifact here')
+
+    monkeypatch.setattr(predict, 'load_model', broken_load)
+    with TestClient(app) as client:
+        app.state.model_loader.join(30)
+        response = client.get('/health')
+        assert response.status_code == 503
+        assert response.json()['error'] == 'no artifact here'
+
+
+def test_warmup_runs_before_ready(unloaded, monkeypatch):
+    ready_during_warmup = []
+    real_warmup = predict._warmup
+
+    def watched_warmup(pipeline, engine):
+        ready_during_warmup.append(predict.model_ready())
+        return real_warmup(pipeline, engine)
+
+    monkeypatch.setattr(predict, '_warmup', watched_warmup)
+    predict.load_model()
+    assert ready_during_warmup == [False]
+    assert predict.model_ready()
+    assert predict.MODEL_STATS['warmup_seconds'] > 0
+
+
+def test_artifact_is_memory_mapped(unloaded):
+    artifact = predict.load_model(artifact_path())
+    assert isinstance(artifact['engine'], CompiledPipeline)
+    assert isinstance(artifact['engine'].threshold.base, np.memmap)
+    assert predict.MODEL_STATS['artifact_bytes'] > 0
+    # later calls return the loaded artifact instead of loading it again
+    assert predict.load_model() is artifact
+
+
+USER = {'age': 30, 'weight': 70.0, 'height': 1.75, 'income_lpa': 10.0, 'smoker': False,
+        'city': 'Mumbai', 'occupation': 'private_job'}
+
+
+@pytest.fixture
+def client():
+    from app import app
+    with TestClient(app) as client:
+        app.state.model_loader.join(30)
+        yield client
+
+
+def varied_users(count):
+    # different age groups, risks, city tiers and occupations, so predictions differ
+    occupations = ['retired', 'freelancer', 'student', 'government_job', 'business_owner', 'unemployed', 'private_job']
+    cities = ['Mumbai', 'Jaipur', 'Shimla', 'Delhi', 'Indore']
+    return [
+        dict(USER, age=18 + (i * 7) % 70, weight=50.0 + (i * 13) % 60, income_lpa=1.0 + (i * 17) % 60,
+             smoker=i % 3 == 0, city=cities[i % len(cities)], occupation=occupations[i % len(occupations)])
+        for i in range(count)
+    ]
+
+
+def test_batch_predictions_are_in_input_order(client):
+    users = varied_users(40)
+    response = client.post('/predict/batch', json=users)
+    assert response.status_code == 200
+    predictions = response.json()['response']
+    assert len(predictions) == len(users)
+    singles = [client.post('/predict', json=user).json()['response'] for user in users]
+    assert predictions == singles
+    assert len({prediction['predicted_category'] for prediction in predictions}) > 1
+
+
+def test_batch_with_an_invalid_record_is_rejected(client):
+    response = client.post('/predict/batch', json=[USER, dict(USER, age=-1), USER, dict(USER, occupation='pilot')])
+    assert response.status_code == 422
+    locations = [error['loc'] for error in response.json()['detail']]
+    assert ['body', 1, 'age'] in locations
+    assert ['body', 3, 'occupation'] in locations
+    assert not any(location[1] in (0, 2) for location in locations)
+
+
+def test_empty_batch_is_rejected(client):
+    response = client.post('/predict/batch', json=[])
+    assert response.status_code == 422
+    assert response.json()['detail'][0]['type'] == 'too_short'
+
+
+def test_batch_size_limit(client):
+    from app import MAX_BATCH_RECORDS
+    response = client.post('/predict/batch', json=[USER] * MAX_BATCH_RECORDS)
+    assert response.status_code == 200
+    assert len(response.json()['response']) == MAX_BATCH_RECORDS
+
+    response = client.post('/predict/batch', json=[USER] * (MAX_BATCH_RECORDS + 1))
+    assert response.status_code == 422
+    assert response.json()['detail'][0]['type'] == 'too_long'
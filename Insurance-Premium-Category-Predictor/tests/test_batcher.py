@@ -0,0 +1,162 @@
+"""
+Micro-batching tests: requests are grouped, flushed on size or timeout,
+errors reach every waiter, and stop() ends the collector
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from model import batcher as batcher_module
+from model.batcher import MicroBatcher
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    # stand-in model: echoes each record's id and remembers the batches it saw
+    seen = []
+
+    def predict_records(records):
+        seen.append([record['id'] for record in records])
+        return [{'id': record['id']} for record in records]
+
+    monkeypatch.setattr(batcher_module, 'predict_records', predict_records)
+    return seen
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_concurrent_requests_share_batches_in_order(calls):
+    async def scenario():
+        batcher = MicroBatcher(max_batch=64, max_wait_ms=50)
+        results = await asyncio.gather(*(batcher.predict({'id': i}) for i in range(20)))
+        await batcher.stop()
+        return batcher, results
+
+    batcher, results = run(scenario())
+    assert results == [{'id': i} for i in range(20)]
+    assert [record for batch in calls for record in batch] == list(range(20))
+    assert len(calls) < 20
+    metrics = batcher.metrics()
+    assert metrics['requests'] == 20
+    assert metrics['batches'] == len(calls)
+    assert sum(int(size) * count for size, count in metrics['batch_size_counts'].items()) == 20
+
+
+def test_flush_on_size(calls):
+    async def scenario():
+        batcher = MicroBatcher(max_batch=4, max_wait_ms=10_000)
+        started = time.perf_counter()
+        await asyncio.gather(*(batcher.predict({'id': i}) for i in range(9)))
+        await batcher.stop()
+        return time.perf_counter() - started
+
+    elapsed = run(scenario())
+    # full batches go out without waiting for max_wait
+    assert elapsed < 5
+    assert all(len(batch) <= 4 for batch in calls)
+    assert [record for batch in calls for record in batch] == list(range(9))
+
+
+def test_flush_on_timeout(calls):
+    async def scenario():
+        batcher = MicroBatcher(max_batch=64, max_wait_ms=100)
+        started = time.perf_counter()
+        first = asyncio.gather(batcher.predict({'id': 0}), batcher.predict({'id': 1}))
+        await asyncio.sleep(0.02)
+        # joins the open batch: its deadline has not passed yet
+        late = await batcher.predict({'id': 2})
+        results = await first
+        elapsed = time.perf_counter() - started
+        await batcher.stop()
+        return results + [late], elapsed
+
+    results, elapsed = run(scenario())
+    assert results == [{'id': 0}, {'id': 1}, {'id': 2}]
+    assert calls == [[0, 1, 2]]
+    assert 0.09 <= elapsed < 5
+
+
+def test_lone_request_is_not_held_back(calls):
+    async def scenario():
+        batcher = MicroBatcher(max_batch=64, max_wait_ms=10_000)
+        started = time.perf_counter()
+        result = await batcher.predict({'id': 7})
+        await batcher.stop()
+        return result, time.perf_counter() - started
+
+    result, elapsed = run(scenario())
+    assert result == {'id': 7}
+    assert calls == [[7]]
+    assert elapsed < 5
+
+
+def test_errors_reach_every_waiter(monkeypatch):
+    def predict_records(records):
+        raise RuntimeError('model exploded')
+
+    monkeypatch.setattr(batcher_module, 'predict_records', predict_records)
+
+    async def scenario():
+        batcher = MicroBatcher(max_batch=8, max_wait_ms=20)
+        results = await asyncio.gather(*(batcher.predict({'id': i}) for i in range(5)), return_exceptions=True)
+        # the collector survives a failed batch
+        monkeypatch.setattr(batcher_module, 'predict_records', lambda records: [{'ok': True}] * len(records))
+        after = await batcher.predict({'id': 5})
+        await batcher.stop()
+        return results, after
+
+    results, after = run(scenario())
+    assert all(isinstance(result, RuntimeError) and str(result) == 'model exploded' for result in results)
+    assert after == {'ok': True}
+
+
+def test_stop_cancels_the_collector(calls):
+    async def scenario():
+        batcher = MicroBatcher(max_wait_ms=5)
+        await batcher.predict({'id': 0})
+        task = batcher._task
+        await batcher.stop()
+        return task, batcher
+
+    task, batcher = run(scenario())
+    assert task.cancelled()
+    assert batcher._task is None
+
+
+def test_stop_before_first_request():
+    run(MicroBatcher().stop())
+
+
+def test_percentiles_from_counts():
+    batcher = MicroBatcher()
+    batcher.batch_sizes.update({1: 90, 8: 9, 64: 1})
+    batcher.batches = 100
+    batcher.requests = 90 + 72 + 64
+    metrics = batcher.metrics()
+    assert metrics['p50_batch_size'] == 1
+    assert metrics['p99_batch_size'] == 64
+    assert metrics['max_batch_size'] == 64
+    assert MicroBatcher().metrics()['p50_batch_size'] is None
+
+
+def test_predictions_run_off_the_event_loop(monkeypatch):
+    worker_threads = []
+
+    def predict_records(records):
+        worker_threads.append(threading.current_thread())
+        return [None] * len(records)
+
+    monkeypatch.setattr(batcher_module, 'predict_records', predict_records)
+
+    async def scenario():
+        batcher = MicroBatcher()
+        await batcher.predict({'id': 0})
+        await batcher.stop()
+
+    run(scenario())
+    assert worker_threads and worker_threads[0] is not threading.main_thread()
@@ -0,0 +1,181 @@
+"""
+Parity tests: the compiled engine must score like the scikit-learn pipeline
+it was compiled from, for single records and batches
+"""
+
+import threading
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.dummy import DummyClassifier
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+from sklearn.tree import DecisionTreeClassifier
+
+from model.artifact import CATEGORICAL_FEATURES, DATA_PATH, FEATURES, NUMERIC_FEATURES, artifact_path
+from model.compiled import CompiledPipeline, compile_pipeline
+from model.train import build_features, build_pipeline
+
+TOLERANCE = 1e-12
+
+CATEGORIES = {
+    'age_group': ['young', 'adult', 'middle_aged', 'senior'],
+    'lifestyle_risk': ['low', 'medium', 'high'],
+    'occupation': ['retired', 'freelancer', 'student', 'government_job', 'business_owner', 'unemployed', 'private_job'],
+    'city_tier': [1, 2, 3],
+}
+
+
+@pytest.fixture(scope='module')
+def training_data():
+    raw = pd.read_csv(DATA_PATH)
+    return build_features(raw), raw['insurance_premium_category']
+
+
+@pytest.fixture(scope='module')
+def pipeline(training_data):
+    return build_pipeline().fit(*training_data)
+
+
+@pytest.fixture(scope='module')
+def random_features():
+    rng = np.random.default_rng(0)
+    size = 2000
+    columns = {column: rng.choice(np.array(values, dtype=object), size) for column, values in CATEGORIES.items()}
+    columns['city_tier'] = columns['city_tier'].astype(np.int64)
+    columns['bmi'] = rng.uniform(12, 45, size)
+    columns['income_lpa'] = rng.uniform(0.5, 100, size)
+    return pd.DataFrame(columns)[FEATURES]
+
+
+def split_point_features(pipeline):
+    # records sitting exactly on every numeric split threshold and one float32 step either side
+    trees = pipeline[-1].estimators_
+    feature_names = list(pipeline[0].get_feature_names_out())
+    records = []
+    for tree in trees[:20]:
+        t = tree.tree_
+        for feature, threshold in zip(t.feature, t.threshold):
+            name = feature_names[feature].split('__', 1)[-1] if feature >= 0 else None
+            if name not in NUMERIC_FEATURES:
+                continue
+            for value in (np.nextafter(np.float32(threshold), np.float32(-np.inf)), np.float32(threshold),
+                          np.nextafter(np.float32(threshold), np.float32(np.inf)), threshold):
+                record = {'age_group': 'adult', 'lifestyle_risk': 'medium', 'occupation': 'private_job',
+                          'city_tier': 2, 'bmi': 25.0, 'income_lpa': 10.0}
+                record[name] = float(value)
+                records.append(record)
+    return pd.DataFrame(records, columns=FEATURES)
+
+
+def assert_parity(pipeline, engine, features):
+    expected = pipeline.predict_proba(features)
+    np.testing.assert_allclose(engine.predict_proba(features), expected, rtol=0, atol=TOLERANCE)
+    single = np.array([engine.predict_proba_one(record) for record in features.to_dict('records')])
+    np.testing.assert_allclose(single, expected, rtol=0, atol=TOLERANCE)
+
+
+def test_training_data(pipeline, training_data):
+    assert_parity(pipeline, compile_pipeline(pipeline), training_data[0])
+
+
+def test_random_records(pipeline, random_features):
+    assert_parity(pipeline, compile_pipeline(pipeline), random_features)
+
+
+def test_split_thresholds(pipeline):
+    features = split_point_features(pipeline)
+    assert len(features) > 0
+    assert_parity(pipeline, compile_pipeline(pipeline), features)
+
+
+def test_unknown_categories_encode_as_zeros(pipeline, random_features):
+    features = random_features.head(50).copy()
+    features['occupation'] = 'astronaut'
+    features['city_tier'] = 4
+    with warnings.catch_warnings():
+        # OneHotEncoder warns about the unknown categories
+        warnings.simplefilter('ignore', UserWarning)
+        assert_parity(pipeline, compile_pipeline(pipeline), features)
+
+
+def test_classes_and_batch_chunks(pipeline, random_features, monkeypatch):
+    engine = compile_pipeline(pipeline)
+    assert list(engine.classes) == list(pipeline.classes_)
+    monkeypatch.setattr('model.compiled.BATCH_CHUNK_ROWS', 7)
+    np.testing.assert_allclose(engine.predict_proba(random_features.head(100)),
+                               pipeline.predict_proba(random_features.head(100)), rtol=0, atol=TOLERANCE)
+
+
+@pytest.mark.parametrize('classifier', [
+    DecisionTreeClassifier(random_state=0),
+    RandomForestClassifier(n_estimators=25, max_depth=3, random_state=0),
+    RandomForestClassifier(n_estimators=25, class_weight='balanced', min_samples_leaf=3, random_state=0),
+    ExtraTreesClassifier(n_estimators=25, random_state=0),
+])
+def test_other_tree_classifiers(classifier, training_data, random_features):
+    other = Pipeline(steps=[('preprocessor', build_pipeline()[0]), ('classifier', classifier)]).fit(*training_data)
+    assert_parity(other, compile_pipeline(other), random_features)
+
+
+@pytest.mark.parametrize('make_pipeline', [
+    lambda: Pipeline(steps=[('preprocessor', build_pipeline()[0]), ('classifier', DummyClassifier())]),
+    lambda: Pipeline(steps=[
+        ('preprocessor', ColumnTransformer(transformers=[
+            ('cat', OneHotEncoder(handle_unknown='error'), CATEGORICAL_FEATURES),
+            ('num', 'passthrough', NUMERIC_FEATURES),
+        ])),
+        ('classifier', RandomForestClassifier(n_estimators=5, random_state=0)),
+    ]),
+])
+def test_unsupported_pipelines_raise(make_pipeline, training_data):
+    with pytest.raises(ValueError):
+        compile_pipeline(make_pipeline().fit(*training_data))
+
+
+def test_memory_mapped_round_trip(pipeline, random_features, tmp_path):
+    path = tmp_path / 'compiled.joblib'
+    joblib.dump({'pipeline': pipeline, 'compiled': compile_pipeline(pipeline)}, path, compress=0)
+    artifact = joblib.load(path, mmap_mode='r')
+    engine = artifact['compiled']
+    assert isinstance(engine, CompiledPipeline)
+    assert isinstance(engine.threshold.base, np.memmap)
+    assert_parity(artifact['pipeline'], engine, random_features.head(200))
+
+
+def test_shipped_artifact(random_features):
+    artifact = joblib.load(artifact_path(), mmap_mode='r')
+    assert_parity(artifact['pipeline'], artifact['compiled'], random_features)
+
+
+def test_threads_use_separate_buffers(pipeline, random_features):
+    engine = compile_pipeline(pipeline)
+    records = random_features.head(300).to_dict('records')
+    expected = pipeline.predict_proba(random_features.head(300))
+    results = {}
+
+    def score(worker):
+        results[worker] = np.array([engine.predict_proba_one(record) for record in records])
+
+    threads = [threading.Thread(target=score, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for result in results.values():
+        np.testing.assert_allclose(result, expected, rtol=0, atol=TOLERANCE)
+
+
+def test_single_record_responses_match_batch(random_features):
+    # /predict scores a lone request straight from its dict; it must answer like a batch of one
+    from model.predict import load_model, predict_batch, predict_records
+    load_model()
+    records = random_features.head(200).to_dict('records')
+    for record in records:
+        assert predict_records([record]) == predict_batch(pd.DataFrame([record], columns=FEATURES))
+    assert predict_records(records) == predict_batch(random_features.head(200))
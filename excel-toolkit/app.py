@@ -6,15 +6,30 @@ This is the refactored modular version with clean separation of concerns.
 All features are organized into separate modules for better maintainability.
 """
 
+import pandas as pd
 import streamlit as st
 from src.config.settings import (
     APP_TITLE, APP_ICON, APP_LAYOUT,
-    SESSION_UPLOADED_FILE, SESSION_WORKBOOK, SESSION_FILE_PATH, SESSION_DF_DICT
+    SESSION_UPLOADED_FILE, SESSION_WORKBOOK, SESSION_FILE_PATH, SESSION_DF_DICT,
+    SESSION_PIPELINE_STEPS, SESSION_PIPELINE_RECORDING, SESSION_FORMULA_ENGINE, SESSION_OPERATION_LOG,
+    SESSION_TRANSFORM_STEPS, SESSION_INSTRUMENTATION, SESSION_INSTRUMENTATION_MEMORY
 )
 from src.ui.tab_basic import render_basic_operations_tab
 from src.ui.tab_analysis import render_data_analysis_tab
 from src.ui.tab_bulk import render_bulk_operations_tab
 from src.ui.tab_sheets import render_sheet_management_tab
+from src.ui.tab_multi import render_multi_workbook_tab
+from src.ui.pipeline_recorder import render_pipeline_recorder
+from src.ui.history_panel import render_history_panel
+from src.ui.instrumentation_panel import rerun_recording, render_instrumentation_panel
+from src.ui.components import render_export_format_selector
+
+
+# ==================== PANDAS OPTIONS ====================
+# pandas 3 always uses copy-on-write; pandas 2 needs it switched on so that the
+# shallow copies the workbook store hands to sessions never write through
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
 
 
 # ==================== PAGE CONFIGURATION ====================
@@ -36,6 +51,20 @@ def initialize_session_state():
         st.session_state[SESSION_FILE_PATH] = None
     if SESSION_DF_DICT not in st.session_state:
         st.session_state[SESSION_DF_DICT] = {}
+    if SESSION_PIPELINE_STEPS not in st.session_state:
+        st.session_state[SESSION_PIPELINE_STEPS] = []
+    if SESSION_PIPELINE_RECORDING not in st.session_state:
+        st.session_state[SESSION_PIPELINE_RECORDING] = False
+    if SESSION_FORMULA_ENGINE not in st.session_state:
+        st.session_state[SESSION_FORMULA_ENGINE] = None
+    if SESSION_OPERATION_LOG not in st.session_state:
+        st.session_state[SESSION_OPERATION_LOG] = None
+    if SESSION_TRANSFORM_STEPS not in st.session_state:
+        st.session_state[SESSION_TRANSFORM_STEPS] = []
+    if SESSION_INSTRUMENTATION not in st.session_state:
+        st.session_state[SESSION_INSTRUMENTATION] = False
+    if SESSION_INSTRUMENTATION_MEMORY not in st.session_state:
+        st.session_state[SESSION_INSTRUMENTATION_MEMORY] = True
 
 
 # ==================== MAIN APPLICATION ====================
@@ -57,27 +86,44 @@ def main():
             st.success("✅ File loaded successfully")
             if st.session_state[SESSION_DF_DICT]:
                 st.metric("Sheets", len(st.session_state[SESSION_DF_DICT]))
+        
+        render_export_format_selector()
     
     # Main tabs
-    tab1, tab2, tab3, tab4 = st.tabs([
+    tab1, tab2, tab3, tab4, tab5 = st.tabs([
         "📁 Basic Operations",
         "📊 Data Analysis & Visualization",
         "⚡ Bulk Operations",
-        "📑 Sheet Management"
+        "📑 Sheet Management",
+        "🗂️ Multi-Workbook"
     ])
     
-    # Render each tab
-    with tab1:
-        render_basic_operations_tab()
-    
-    with tab2:
-        render_data_analysis_tab()
-    
-    with tab3:
-        render_bulk_operations_tab()
+    # Render each tab (feature calls are measured when the performance panel is on)
+    with rerun_recording() as recorder:
+        with tab1:
+            render_basic_operations_tab()
+        
+        with tab2:
+            render_data_analysis_tab()
+        
+        with tab3:
+            render_bulk_operations_tab()
+        
+        with tab4:
+            render_sheet_management_tab()
+        
+        with tab5:
+            render_multi_workbook_tab()
     
-    with tab4:
-        render_sheet_management_tab()
+    # Rendered after the tabs so steps recorded during this run are listed
+    with st.sidebar:
+        st.markdown("---")
+        if st.session_state[SESSION_WORKBOOK] is not None:
+            render_history_panel()
+            st.markdown("---")
+        render_pipeline_recorder()
+        st.markdown("---")
+        render_instrumentation_panel(recorder)
     
     # Footer
     st.markdown("---")
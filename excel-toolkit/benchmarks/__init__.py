@@ -0,0 +1,10 @@
+"""
+Benchmarks
+Synthetic workbooks and a timing/memory suite for the feature and utility functions
+
+Run from the project root:
+
+    uv run python -m benchmarks run --scale small medium -o results.json
+    uv run python -m benchmarks compare baseline.json results.json
+    uv run python -m benchmarks generate sample.xlsx --rows 50000 --styled --formulas
+"""
@@ -0,0 +1,109 @@
+"""
+Benchmark command line
+
+    python -m benchmarks run [--scale small medium large] [--only merge search] [--repeat 5] [-o results.json]
+    python -m benchmarks compare baseline.json results.json [--threshold 0.2]
+    python -m benchmarks generate out.xlsx --rows 10000 --columns 8 [--styled] [--formulas]
+    python -m benchmarks list
+"""
+
+import argparse
+import json
+import logging
+import sys
+from benchmarks.suite import BENCHMARKS, compare_results, run_suite
+from benchmarks.workbook_generator import generate_workbook
+from src.config.settings import BENCHMARK_SCALES, BENCHMARK_REPEATS, BENCHMARK_REGRESSION_THRESHOLD
+
+
+def build_parser():
+    """Build the argument parser"""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Excel toolkit benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="Run the benchmark suite and write JSON results")
+    run.add_argument("--scale", nargs="+", choices=list(BENCHMARK_SCALES), default=["small"])
+    run.add_argument("--only", nargs="+", default=None, help="Run benchmarks whose name contains any of these")
+    run.add_argument("--repeat", type=int, default=BENCHMARK_REPEATS, help="Timed runs per benchmark")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("-o", "--output", default="benchmark_results.json")
+    run.add_argument("--baseline", default=None, help="Compare against this results file when done")
+    run.add_argument("--threshold", type=float, default=BENCHMARK_REGRESSION_THRESHOLD)
+
+    compare = subparsers.add_parser("compare", help="Compare two results files")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=BENCHMARK_REGRESSION_THRESHOLD)
+
+    generate = subparsers.add_parser("generate", help="Write a synthetic workbook")
+    generate.add_argument("output")
+    generate.add_argument("--rows", type=int, default=10000)
+    generate.add_argument("--columns", type=int, default=8)
+    generate.add_argument("--sheets", type=int, default=1)
+    generate.add_argument("--cardinality", type=int, default=100, help="Distinct values per text column")
+    generate.add_argument("--blanks", type=float, default=0.0, help="Fraction of empty cells")
+    generate.add_argument("--styled", action="store_true")
+    generate.add_argument("--formulas", action="store_true")
+    generate.add_argument("--seed", type=int, default=0)
+
+    subparsers.add_parser("list", help="List the registered benchmarks")
+    return parser
+
+
+def print_result(result):
+    """Print one line per finished benchmark"""
+    label = f"{result['benchmark']} [{result['scale']}]"
+    if result['status'] == 'ok':
+        print(f"✅ {label}: median {result['median_seconds']:.4f}s, peak {result['peak_memory_mb']:.1f} MB")
+    elif result['status'] == 'skipped':
+        print(f"⏭️ {label}: {result['message']}")
+    else:
+        print(f"❌ {label}: {result['message']}")
+
+
+def print_comparison(baseline, current, threshold):
+    """Print the comparison table; return the number of regressions"""
+    comparison = compare_results(baseline, current, threshold)
+    print(comparison.to_string(index=False, na_rep=''))
+    regressions = int((comparison['Status'] == 'regression').sum()) if len(comparison) else 0
+    print(f"{regressions} regression(s) beyond {threshold:.0%}")
+    return regressions
+
+
+def main(argv=None):
+    """Parse arguments and run the selected command"""
+    logging.basicConfig(level=logging.CRITICAL)
+    args = build_parser().parse_args(argv)
+
+    if args.command == "list":
+        print("\n".join(BENCHMARKS))
+        return 0
+
+    if args.command == "generate":
+        generate_workbook(args.rows, args.columns, args.sheets, args.cardinality, args.blanks,
+                          args.styled, args.formulas, args.seed).save(args.output)
+        print(f"✅ Wrote {args.output}")
+        return 0
+
+    if args.command == "compare":
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        with open(args.current, encoding='utf-8') as f:
+            current = json.load(f)
+        return 1 if print_comparison(baseline, current, args.threshold) else 0
+
+    results = run_suite(args.scale, args.only, args.repeat, args.seed, on_result=print_result)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Results -> {args.output}")
+    failed = sum(result['status'] == 'error' for result in results['results'])
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if print_comparison(baseline, results, args.threshold):
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,604 @@
+"""
+Benchmark Suite
+Time the feature and utility functions on synthetic workbooks and record peak memory
+
+Each benchmark is a factory registered under "<module>.<function>". It gets
+the Dataset of one scale, does its setup (loading workbooks, building
+inputs) and returns the zero-argument call to measure, so setup never counts
+towards the timing. The factory is called again before every run, so calls
+that modify their input always start from the same state.
+
+Timed runs use time.perf_counter with garbage collection paused (like
+timeit); peak memory comes from one extra run under tracemalloc, which also
+checks that the call did not report an error through show_error.
+
+Functions whose cost does not depend on the data (sheet renames, cell edits,
+the Windows-only password helpers) are not benchmarked.
+"""
+
+import gc
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from functools import cached_property, partial
+from importlib import metadata
+from io import BytesIO
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+from benchmarks.workbook_generator import generate_frames, generate_workbook_bytes
+from src.config.settings import (
+    BENCHMARK_SCALES, BENCHMARK_REPEATS, BENCHMARK_RESULTS_VERSION,
+    BENCHMARK_REGRESSION_THRESHOLD, BENCHMARK_NOISE_SECONDS
+)
+
+BENCHMARKS = {}  # name -> factory(dataset) returning the call to time
+
+_PACKAGES = ('pandas', 'numpy', 'openpyxl', 'pyarrow', 'xlsxwriter', 'polars', 'duckdb', 'plotly')
+
+
+class Skip(Exception):
+    """Raised by a benchmark factory when it cannot run here (e.g. an optional dependency is missing)"""
+
+
+def benchmark(name):
+    """Register a benchmark factory under `name`"""
+    def register(factory):
+        BENCHMARKS[name] = factory
+        return factory
+    return register
+
+
+class Dataset:
+    """Synthetic inputs of one scale, generated on first use and shared by every benchmark"""
+
+    def __init__(self, scale, seed=0, **spec):
+        self.scale = scale
+        self.seed = seed
+        self.spec = dict(BENCHMARK_SCALES[scale], **spec) if scale in BENCHMARK_SCALES else spec
+
+    @cached_property
+    def frames(self):
+        """{sheet_name: DataFrame} with a low-cardinality 'Region' column for grouping"""
+        frames = generate_frames(seed=self.seed, **self.spec)
+        for df in frames.values():
+            df['Region'] = df['Category_1'].str.split('-', n=1).str[0]
+        return frames
+
+    @property
+    def df(self):
+        """First sheet"""
+        return next(iter(self.frames.values()))
+
+    @cached_property
+    def xlsx(self):
+        """Plain values workbook as xlsx bytes"""
+        return generate_workbook_bytes(seed=self.seed, **self.spec)
+
+    @cached_property
+    def styled_xlsx(self):
+        """Workbook with styled cells as xlsx bytes"""
+        return generate_workbook_bytes(seed=self.seed, styled=True, **self.spec)
+
+    @cached_property
+    def formula_xlsx(self):
+        """Workbook with a formula column as xlsx bytes"""
+        return generate_workbook_bytes(seed=self.seed, formulas=True, **self.spec)
+
+    def workbook(self, kind="xlsx"):
+        """Fresh openpyxl workbook loaded from one of the xlsx variants"""
+        return load_workbook(BytesIO(getattr(self, kind)))
+
+
+# ---------------------------------------------------------------------------
+# src/utils
+# ---------------------------------------------------------------------------
+
+@benchmark("file_handlers.load_all_sheet_data")
+def _load_all_sheet_data(data):
+    from src.utils.file_handlers import load_all_sheet_data
+    return lambda: load_all_sheet_data(BytesIO(data.xlsx))
+
+
+@benchmark("file_handlers.load_sheet_data")
+def _load_sheet_data(data):
+    from src.utils.file_handlers import load_sheet_data
+    return lambda: load_sheet_data(BytesIO(data.xlsx), "Sheet_1")
+
+
+@benchmark("file_handlers.get_all_sheets")
+def _get_all_sheets(data):
+    from src.utils.file_handlers import get_all_sheets
+    return lambda: get_all_sheets(BytesIO(data.xlsx))
+
+
+@benchmark("file_handlers.dataframe_to_excel_bytes")
+def _dataframe_to_excel_bytes(data):
+    from src.utils.file_handlers import dataframe_to_excel_bytes
+    return lambda: dataframe_to_excel_bytes(data.frames)
+
+
+@benchmark("export.export_frames (csv)")
+def _export_csv(data):
+    from src.utils.export import export_frames
+    return lambda: export_frames(data.frames, "csv")
+
+
+@benchmark("export.export_frames (parquet)")
+def _export_parquet(data):
+    from src.utils.export import export_frames
+    return lambda: export_frames(data.frames, "parquet")
+
+
+@benchmark("export.export_frames (arrow)")
+def _export_arrow(data):
+    from src.utils.export import export_frames
+    return lambda: export_frames(data.frames, "arrow")
+
+
+@benchmark("file_handlers.create_download_link")
+def _create_download_link(data):
+    from src.utils.file_handlers import create_download_link
+    wb = data.workbook("styled_xlsx")
+    return lambda: create_download_link(wb, "bench.xlsx")
+
+
+@benchmark("workbook_store.WorkbookStore.open")
+def _store_open(data):
+    from src.utils.workbook_store import WorkbookStore
+    store = WorkbookStore()
+    return lambda: store.open(data.formula_xlsx)
+
+
+@benchmark("formula_engine.FormulaEngine.calculate_all")
+def _formula_calculate_all(data):
+    from src.utils.formula_engine import FormulaEngine
+    wb = data.workbook("formula_xlsx")
+    return lambda: FormulaEngine(wb).calculate_all()
+
+
+@benchmark("formula_engine.FormulaEngine.update")
+def _formula_update(data):
+    from src.utils.formula_engine import FormulaEngine
+    wb = data.workbook("formula_xlsx")
+    engine = FormulaEngine(wb)
+    engine.calculate_all()
+    cells = [(ws.title, "C2") for ws in wb.worksheets]
+    for ws in wb.worksheets:
+        ws["C2"] = 12345
+    return lambda: engine.update(cells)
+
+
+@benchmark("range_copy.copy_range")
+def _copy_range(data):
+    from src.utils.range_copy import copy_range
+    wb = data.workbook("styled_xlsx")
+    src_ws = wb.worksheets[0]
+    dst_ws = wb.create_sheet("Copy")
+    return lambda: copy_range(src_ws, f"A1:{src_ws.dimensions.split(':')[1]}", dst_ws, "A1")
+
+
+@benchmark("range_copy.copy_range (to another workbook)")
+def _copy_range_cross(data):
+    from src.utils.range_copy import copy_range
+    src_ws = data.workbook("styled_xlsx").worksheets[0]
+    dst_ws = Workbook().active
+    return lambda: copy_range(src_ws, f"A1:{src_ws.dimensions.split(':')[1]}", dst_ws, "A1")
+
+
+@benchmark("hyperloglog.HyperLogLog.add_hashes")
+def _hyperloglog(data):
+    from src.utils.hyperloglog import HyperLogLog
+    hashes = pd.util.hash_pandas_object(data.df['Category_1'], index=False).to_numpy()
+
+    def run():
+        sketch = HyperLogLog()
+        sketch.add_hashes(hashes)
+        return sketch.count()
+    return run
+
+
+# ---------------------------------------------------------------------------
+# src/features
+# ---------------------------------------------------------------------------
+
+@benchmark("bulk_operations.batch_modify_cells")
+def _batch_modify_cells(data):
+    from src.features.bulk_operations import batch_modify_cells
+    wb = data.workbook()
+    count = max(len(data.df) // 10, 1)
+    modifications = pd.DataFrame({
+        'CellAddress': [f"B{row}" for row in range(2, count + 2)],
+        'NewValue': 'Updated',
+        'SheetName': 'Sheet_1',
+    })
+    return lambda: batch_modify_cells(wb, modifications)
+
+
+@benchmark("bulk_operations.merge_excel_files")
+def _merge_excel_files(data):
+    from src.features.bulk_operations import merge_excel_files
+    files = [(data.styled_xlsx, "first.xlsx"), (data.xlsx, "second.xlsx")]
+    return lambda: merge_excel_files(files, 'all_sheets')
+
+
+@benchmark("bulk_operations.split_excel_by_column")
+def _split_excel_by_column(data):
+    from src.features.bulk_operations import split_excel_by_column
+    return lambda: split_excel_by_column(data.df, 'Region', "bench")
+
+
+@benchmark("bulk_operations.copy_data_between_sheets")
+def _copy_data_between_sheets(data):
+    from src.features.bulk_operations import copy_data_between_sheets
+    wb = data.workbook("styled_xlsx")
+    source = wb.worksheets[0]
+    wb.create_sheet("Copy")
+    return lambda: copy_data_between_sheets(wb, source.title, source.dimensions, "Copy", "A1")
+
+
+@benchmark("bulk_operations.delete_rows_by_condition")
+def _delete_rows_by_condition(data):
+    from src.features.bulk_operations import delete_rows_by_condition
+    return lambda: delete_rows_by_condition(data.df, 'Category_1', 'contains', 'north')
+
+
+@benchmark("bulk_operations.find_and_replace")
+def _find_and_replace(data):
+    from src.features.bulk_operations import find_and_replace
+    wb = data.workbook()
+    return lambda: find_and_replace(wb, "North", "N")
+
+
+@benchmark("bulk_operations.find_and_replace_dataframe")
+def _find_and_replace_dataframe(data):
+    from src.features.bulk_operations import find_and_replace_dataframe
+    return lambda: find_and_replace_dataframe(data.df, "North", "N")
+
+
+@benchmark("bulk_operations.join_sheets")
+def _join_sheets(data):
+    from src.features.bulk_operations import join_sheets
+    frames = list(data.frames.values())
+    lookup = frames[1] if len(frames) > 1 else frames[0]
+    return lambda: join_sheets(frames[0], lookup, ['Category_1'], ['Category_1'], dedupe_lookup=True)
+
+
+@benchmark("bulk_operations.find_duplicates")
+def _find_duplicates(data):
+    from src.features.bulk_operations import find_duplicates, iter_sheet_frames
+    source = partial(iter_sheet_frames, data.frames)
+    return lambda: find_duplicates(source, ['Category_1', 'Quantity_1'])
+
+
+@benchmark("data_analysis.create_chart")
+def _create_chart(data):
+    from src.features.data_analysis import create_chart
+    try:
+        import plotly  # noqa: F401
+    except ImportError:
+        raise Skip("plotly is not installed")
+    return lambda: create_chart(data.df, "Scatter Plot", 'Quantity_1', 'Amount_1')
+
+
+@benchmark("data_analysis.calculate_statistics")
+def _calculate_statistics(data):
+    from src.features.data_analysis import calculate_statistics
+    columns = [col for col in data.df.columns if col.startswith(('Quantity', 'Amount'))]
+    return lambda: calculate_statistics(data.df, columns)
+
+
+@benchmark("data_analysis.workbook_statistics")
+def _workbook_statistics(data):
+    from src.features.data_analysis import workbook_statistics
+    return lambda: workbook_statistics(data.frames)
+
+
+@benchmark("data_analysis.create_pivot_table")
+def _create_pivot_table(data):
+    from src.features.data_analysis import create_pivot_table
+    return lambda: create_pivot_table(data.df, 'Category_1', 'Region', 'Amount_1', 'sum')
+
+
+@benchmark("data_analysis.filter_data")
+def _filter_data(data):
+    from src.features.data_analysis import filter_data
+    return lambda: filter_data(data.df, 'Category_1', 'contains', 'north')
+
+
+@benchmark("data_analysis.search_in_excel")
+def _search_in_excel(data):
+    from src.features.data_analysis import search_in_excel
+    wb = data.workbook()
+    return lambda: search_in_excel(wb, "north")
+
+
+@benchmark("data_analysis.build_time_index")
+def _build_time_index(data):
+    from src.features.data_analysis import build_time_index
+    df = data.df.assign(Date_1=data.df['Date_1'].dt.strftime('%d/%m/%Y'))
+    return lambda: build_time_index(df, 'Date_1', dayfirst=True)
+
+
+@benchmark("data_analysis.time_series_analysis")
+def _time_series_analysis(data):
+    from src.features.data_analysis import build_time_index, time_series_analysis
+    ts, _ = build_time_index(data.df, 'Date_1')
+    return lambda: time_series_analysis(ts, ['Quantity_1', 'Amount_1'], 'Week', 'sum', 4, 'rolling',
+                                        change='percent')
+
+
+@benchmark("sampling.draw_sample")
+def _draw_sample(data):
+    from src.features.sampling import draw_sample
+    return lambda: draw_sample(data.df, len(data.df) // 10, 'Region')
+
+
+@benchmark("sampling.estimate_pivot")
+def _estimate_pivot(data):
+    from src.features.sampling import draw_sample, estimate_pivot
+    sample, design = draw_sample(data.df, len(data.df) // 10, 'Region')
+    return lambda: estimate_pivot(sample, design, 'Region', 'Quantity_1', 'Amount_1', 'mean')
+
+
+@benchmark("column_profile.profile_sheet")
+def _profile_sheet(data):
+    from src.features import column_profile
+    column_profile._cache.clear()
+    return lambda: column_profile.profile_sheet(data.df)
+
+
+@benchmark("column_transforms.apply_transforms")
+def _apply_transforms(data):
+    from src.features.column_transforms import apply_transforms
+    steps = [
+        {'op': 'trim', 'columns': ['Category_1']},
+        {'op': 'upper', 'columns': ['Category_1']},
+        {'op': 'replace', 'columns': ['Category_1'], 'params': {'pattern': '-0+', 'replacement': '-'}},
+        {'op': 'text', 'columns': ['Quantity_1']},
+        {'op': 'number', 'columns': ['Quantity_1']},
+        {'op': 'arithmetic', 'columns': ['Amount_1'], 'params': {'operator': '*', 'operand': 1.2},
+         'target': 'Amount incl. VAT'},
+    ]
+    return lambda: apply_transforms(data.df, steps)
+
+
+@benchmark("column_transforms.write_transformed_columns")
+def _write_transformed_columns(data):
+    from src.features.column_transforms import apply_transforms, write_transformed_columns
+    wb = data.workbook()
+    df = data.df.drop(columns='Region')
+    result_df, written = apply_transforms(df, [{'op': 'upper', 'columns': ['Category_1']}])
+    return lambda: write_transformed_columns(wb.worksheets[0], df, result_df, written)
+
+
+@benchmark("lazy_analysis.run_analysis_plan")
+def _run_analysis_plan(data):
+    from src.features.lazy_analysis import POLARS_AVAILABLE, to_columnar, run_analysis_plan
+    if not POLARS_AVAILABLE:
+        raise Skip("polars is not installed")
+    frame = to_columnar(data.df)
+    return lambda: run_analysis_plan(frame, filter_step=('Quantity_1', 'greater than', '100'),
+                                     pivot_step=('Category_1', 'Region', 'Amount_1', 'sum'))
+
+
+@benchmark("sql_query.run_sql_query (sqlite)")
+def _run_sql_query_sqlite(data):
+    from src.features.sql_query import run_sql_query
+    query = "SELECT Region, COUNT(*) AS n, SUM(Amount_1) AS total FROM Sheet_1 GROUP BY Region"
+    return lambda: run_sql_query(data.frames, query, engine="sqlite")
+
+
+@benchmark("sql_query.run_sql_query (duckdb)")
+def _run_sql_query_duckdb(data):
+    from src.features.sql_query import DUCKDB_AVAILABLE, run_sql_query
+    if not DUCKDB_AVAILABLE:
+        raise Skip("duckdb is not installed")
+    query = "SELECT Region, COUNT(*) AS n, SUM(Amount_1) AS total FROM Sheet_1 GROUP BY Region"
+    return lambda: run_sql_query(data.frames, query, engine="duckdb")
+
+
+@benchmark("workbook_diff.diff_workbooks")
+def _diff_workbooks(data):
+    from src.features.workbook_diff import diff_workbooks
+    new_frames = {name: df.copy() for name, df in data.frames.items()}
+    for df in new_frames.values():
+        df.loc[df.index[::50], 'Amount_1'] += 1
+    return lambda: diff_workbooks(data.frames, new_frames, ['ID'])
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+class _ErrorCollector(logging.Handler):
+    """Collect the errors features report through show_error while a benchmark runs"""
+
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def _timed(call):
+    gc.collect()
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        call()
+        return time.perf_counter() - start
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _peak_memory(call):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        call()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmark(name, data, repeats=BENCHMARK_REPEATS):
+    """
+    Run one benchmark on one dataset
+
+    Args:
+        name: Registered benchmark name
+        data: Dataset
+        repeats: Number of timed runs
+
+    Returns:
+        Result dictionary (status 'ok', 'skipped' or 'error')
+    """
+    factory = BENCHMARKS[name]
+    result = {'benchmark': name, 'scale': data.scale, **data.spec, 'repeats': repeats}
+    collector = _ErrorCollector()
+    logger = logging.getLogger("excel_toolkit")
+    logger.addHandler(collector)
+    try:
+        # The first (memory) run doubles as the check that the call works
+        peak = _peak_memory(factory(data))
+        if collector.messages:
+            raise RuntimeError(collector.messages[0])
+        timings = [_timed(factory(data)) for _ in range(repeats)]
+    except Skip as e:
+        return {**result, 'status': 'skipped', 'message': str(e)}
+    except Exception as e:
+        return {**result, 'status': 'error', 'message': str(e) or type(e).__name__}
+    finally:
+        logger.removeHandler(collector)
+
+    return {
+        **result,
+        'status': 'ok',
+        'min_seconds': round(min(timings), 6),
+        'median_seconds': round(statistics.median(timings), 6),
+        'mean_seconds': round(statistics.fmean(timings), 6),
+        'peak_memory_mb': round(peak / 1024 ** 2, 3),
+    }
+
+
+def environment():
+    """Interpreter, machine, package versions and git commit the results were measured with"""
+    versions = {}
+    for package in _PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            pass
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'packages': versions,
+        'commit': commit or None,
+    }
+
+
+def run_suite(scales=("small",), names=None, repeats=BENCHMARK_REPEATS, seed=0, on_result=None):
+    """
+    Run benchmarks at several scales
+
+    Args:
+        scales: Keys of BENCHMARK_SCALES
+        names: Benchmark names to run, or substrings to match (None for all)
+        repeats: Timed runs per benchmark
+        seed: Seed of the synthetic workbooks
+        on_result: Optional callback receiving each result as it finishes
+
+    Returns:
+        Results dictionary ready to be written as JSON
+    """
+    selected = [name for name in BENCHMARKS
+                if not names or any(pattern in name for pattern in names)]
+    results = []
+    for scale in scales:
+        data = Dataset(scale, seed)
+        for name in selected:
+            result = run_benchmark(name, data, repeats)
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+    return {
+        'version': BENCHMARK_RESULTS_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'seed': seed,
+        'environment': environment(),
+        'results': results,
+    }
+
+
+def compare_results(baseline, current, threshold=BENCHMARK_REGRESSION_THRESHOLD,
+                    noise_seconds=BENCHMARK_NOISE_SECONDS):
+    """
+    Compare two result files benchmark by benchmark
+
+    A benchmark regressed when its median time grew by more than `threshold`
+    (and by more than `noise_seconds`) or its peak memory grew by more than
+    `threshold`.
+
+    Args:
+        baseline: Results dictionary of the reference run
+        current: Results dictionary of the new run
+        threshold: Allowed relative slowdown / memory growth
+        noise_seconds: Absolute timing difference always treated as noise
+
+    Returns:
+        DataFrame with one row per (benchmark, scale) and a Status column
+        (regression, improvement, unchanged, new, missing, skipped)
+    """
+    for results in (baseline, current):
+        if results.get('version') != BENCHMARK_RESULTS_VERSION:
+            raise ValueError(f"Unsupported results version: {results.get('version')}")
+
+    old = {(r['benchmark'], r['scale']): r for r in baseline['results']}
+    new = {(r['benchmark'], r['scale']): r for r in current['results']}
+    rows = []
+    for key in list(old) + [key for key in new if key not in old]:
+        before, after = old.get(key), new.get(key)
+        row = {'Benchmark': key[0], 'Scale': key[1]}
+        if before is None or after is None:
+            row['Status'] = 'new' if before is None else 'missing'
+        elif before['status'] != 'ok' or after['status'] != 'ok':
+            row['Status'] = after['status'] if after['status'] != 'ok' else 'new'
+        else:
+            old_time, new_time = before['median_seconds'], after['median_seconds']
+            old_mem, new_mem = before['peak_memory_mb'], after['peak_memory_mb']
+            time_change = (new_time - old_time) / old_time if old_time else 0.0
+            memory_change = (new_mem - old_mem) / old_mem if old_mem else 0.0
+            row.update({
+                'Old Median (s)': old_time,
+                'New Median (s)': new_time,
+                'Time Change %': round(100 * time_change, 1),
+                'Old Peak (MB)': old_mem,
+                'New Peak (MB)': new_mem,
+                'Memory Change %': round(100 * memory_change, 1),
+            })
+            significant = abs(new_time - old_time) > noise_seconds
+            if (time_change > threshold and significant) or memory_change > threshold:
+                row['Status'] = 'regression'
+            elif time_change < -threshold and significant:
+                row['Status'] = 'improvement'
+            else:
+                row['Status'] = 'unchanged'
+        rows.append(row)
+    comparison = pd.DataFrame(rows)
+    return comparison[['Benchmark', 'Scale', 'Status'] + [c for c in comparison.columns
+                                                          if c not in ('Benchmark', 'Scale', 'Status')]]
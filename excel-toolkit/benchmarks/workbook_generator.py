@@ -0,0 +1,153 @@
+"""
+Synthetic Workbook Generator
+Reproducible workbooks of any shape for benchmarks
+
+Every sheet starts with a unique integer ID column followed by columns that
+cycle through text, integer, float and date kinds:
+
+    ID | Category_1 | Quantity_1 | Amount_1 | Date_1 | Category_2 | ...
+
+Text columns draw from a pool of `cardinality` distinct strings, so the same
+row count can be generated with few repeated labels or near-unique ones.
+Optional blanks, cell styles and a formula column cover the costs that plain
+values do not. The same seed always gives the same workbook.
+"""
+
+from io import BytesIO
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.styles import Font, PatternFill
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.utils import get_column_letter
+
+COLUMN_KINDS = ('text', 'integer', 'float', 'date')
+_KIND_NAMES = {'text': 'Category', 'integer': 'Quantity', 'float': 'Amount', 'date': 'Date'}
+_NUMBER_FORMATS = {'integer': '#,##0', 'float': '#,##0.00', 'date': 'yyyy-mm-dd'}
+_WORDS = ('North', 'South', 'East', 'West', 'Alpha', 'Beta', 'Gamma', 'Delta')
+
+
+def column_layout(columns):
+    """
+    Names and kinds of the generated columns
+
+    Returns:
+        List of (name, kind) tuples, the ID column first
+    """
+    layout = [('ID', 'id')]
+    for i in range(columns - 1):
+        kind = COLUMN_KINDS[i % len(COLUMN_KINDS)]
+        layout.append((f"{_KIND_NAMES[kind]}_{i // len(COLUMN_KINDS) + 1}", kind))
+    return layout
+
+
+def _column(kind, rows, rng, pool):
+    if kind == 'id':
+        return pd.Series(np.arange(1, rows + 1))
+    if kind == 'text':
+        return pd.Series(pool[rng.integers(0, len(pool), rows)], dtype=object)
+    if kind == 'integer':
+        return pd.Series(rng.integers(0, 1000, rows))
+    if kind == 'float':
+        return pd.Series(np.round(rng.uniform(0, 10000, rows), 2))
+    days = rng.integers(0, 5 * 365, rows)
+    return pd.Series(pd.Timestamp('2020-01-01') + pd.to_timedelta(days, unit='D'))
+
+
+def generate_frames(rows, columns, sheets=1, cardinality=100, blanks=0.0, seed=0):
+    """
+    Generate sheet data as DataFrames
+
+    Args:
+        rows: Data rows per sheet
+        columns: Columns per sheet (including the ID column)
+        sheets: Number of sheets ('Sheet_1', 'Sheet_2', ...)
+        cardinality: Distinct values in each text column
+        blanks: Fraction of empty cells in the non-ID columns
+        seed: Random seed
+
+    Returns:
+        Dictionary of {sheet_name: DataFrame}
+    """
+    rng = np.random.default_rng(seed)
+    pool = np.array([f"{_WORDS[i % len(_WORDS)]}-{i:06d}" for i in range(max(cardinality, 1))], dtype=object)
+    frames = {}
+    for s in range(sheets):
+        data = {}
+        for name, kind in column_layout(columns):
+            series = _column(kind, rows, rng, pool)
+            if blanks and kind != 'id':
+                series = series.mask(rng.random(rows) < blanks)
+            data[name] = series
+        frames[f"Sheet_{s + 1}"] = pd.DataFrame(data)
+    return frames
+
+
+def _cell_values(series):
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def generate_workbook(rows, columns, sheets=1, cardinality=100, blanks=0.0, styled=False, formulas=False, seed=0):
+    """
+    Generate an openpyxl workbook (header on row 1, data below)
+
+    Args:
+        rows, columns, sheets, cardinality, blanks, seed: See generate_frames
+        styled: Give the header, every number/date column and alternate rows a style
+        formulas: Append a 'Total' column with =Quantity_1*Amount_1 per row
+            (needs at least 4 columns)
+
+    Returns:
+        openpyxl Workbook
+    """
+    if formulas and columns < 4:
+        raise ValueError("Formulas need at least 4 columns")
+    frames = generate_frames(rows, columns, sheets, cardinality, blanks, seed)
+    layout = column_layout(columns)
+    wb = Workbook()
+    wb.remove(wb.active)
+
+    header_font = Font(bold=True, color='FFFFFF')
+    header_fill = PatternFill('solid', fgColor='4472C4')
+    band_fill = PatternFill('solid', fgColor='DDEBF7')
+
+    for sheet_name, df in frames.items():
+        ws = wb.create_sheet(sheet_name)
+        header = list(df.columns) + (['Total'] if formulas else [])
+        ws.append(header)
+        values = [_cell_values(df[col]) for col in df.columns]
+        if formulas:
+            values.append([f"=C{row}*D{row}" for row in range(2, rows + 2)])
+        for row in zip(*values):
+            ws.append(row)
+
+        if styled:
+            for cell in ws[1]:
+                cell.font = header_font
+                cell.fill = header_fill
+            # Style one cell per (column kind, band) and share its style array with the rest
+            store = ws._cells
+            for col_idx, (_, kind) in enumerate(layout, start=1):
+                templates = {}
+                for band in (0, 1):
+                    template = ws.cell(row=2 + band, column=col_idx)
+                    if kind in _NUMBER_FORMATS:
+                        template.number_format = _NUMBER_FORMATS[kind]
+                    if band == 0:
+                        template.fill = band_fill
+                    templates[band] = template._style
+                for row_idx in range(4, rows + 2):
+                    style = templates[row_idx % 2]
+                    if style is not None:
+                        cell = store.get((row_idx, col_idx)) or ws.cell(row=row_idx, column=col_idx)
+                        cell._style = StyleArray(style)
+            for col_idx in range(1, len(header) + 1):
+                ws.column_dimensions[get_column_letter(col_idx)].width = 14
+    return wb
+
+
+def generate_workbook_bytes(**spec):
+    """Generate a workbook (same arguments as generate_workbook) and return it as xlsx bytes"""
+    output = BytesIO()
+    generate_workbook(**spec).save(output)
+    return output.getvalue()
@@ -1,6 +1,249 @@
-def main():
-    print("Hello from excel-toolkit!")
+"""
+Excel Manipulation Tool - Command Line Interface
+Headless entry point for running toolkit features over many files
+
+Examples:
+    python main.py filter "reports/**/*.xlsx" --column Region --condition equals --value North
+    python main.py stats data/ --sheet Sales --columns Revenue Units --format csv
+    python main.py merge jan.xlsx feb.xlsx mar.xlsx -o q1.xlsx
+    python main.py pipeline monthly.json inbox/ --watch
+    python main.py dedupe exports/ --key "Customer ID" --scope files -o customers.xlsx
+    python main.py export "warehouse/*.xlsx" --sheet "*" --format parquet --out-dir lake/
+    python main.py diff march_v1.xlsx march_v2.xlsx --key "Order ID" -o march_diff.xlsx
+"""
+
+import argparse
+import logging
+import os
+import sys
+from functools import partial
+from src.batch import tasks
+from src.batch.runner import expand_inputs, run_batch
+from src.batch.pipeline import load_pipeline
+from src.batch.watcher import process_folder, watch_folder
+from src.features.workbook_diff import diff_workbooks, build_diff_report
+from src.features.bulk_operations import find_duplicates, iter_file_frames, iter_deduplicated_frames
+from src.utils.file_handlers import load_all_sheet_data, dataframe_to_excel_bytes
+from src.utils.export import export_frames_to_path
+from src.config.settings import (
+    BATCH_MAX_WORKERS, BATCH_OUTPUT_DIR, EXPORT_FORMATS,
+    FILTER_CONDITIONS, DELETE_CONDITIONS, PIVOT_AGGREGATIONS, PIPELINE_POLL_SECONDS
+)
+
+
+def build_parser():
+    """Build the argument parser with one sub-command per operation"""
+    parser = argparse.ArgumentParser(description="Excel Manipulation Tool - batch CLI")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_batch_command(name, help_text):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("inputs", nargs="+", help="Files, directories or glob patterns")
+        sub.add_argument("--sheet", default=None, help="Sheet name (default: first sheet)")
+        sub.add_argument("--out-dir", default=BATCH_OUTPUT_DIR, help="Output directory")
+        sub.add_argument("--workers", type=int, default=BATCH_MAX_WORKERS,
+                         help="Worker processes (default: all cores, 1 to run inline)")
+        return sub
+
+    merge = subparsers.add_parser("merge", help="Merge files into one workbook")
+    merge.add_argument("inputs", nargs="+", help="Files, directories or glob patterns")
+    merge.add_argument("-o", "--output", default="merged_excel.xlsx", help="Output xlsx path")
+
+    split = add_batch_command("split", "Split a sheet by unique values of a column")
+    split.add_argument("--column", required=True)
+
+    filt = add_batch_command("filter", "Filter and sort rows")
+    filt.add_argument("--column", required=True)
+    filt.add_argument("--condition", choices=FILTER_CONDITIONS, default="equals")
+    filt.add_argument("--value", required=True)
+    filt.add_argument("--sort-by", default=None)
+    filt.add_argument("--descending", action="store_true")
+    filt.add_argument("--format", dest="fmt", choices=EXPORT_FORMATS, default="xlsx")
+
+    delete = add_batch_command("delete-rows", "Delete rows matching a condition")
+    delete.add_argument("--column", required=True)
+    delete.add_argument("--condition", choices=DELETE_CONDITIONS, default="equals")
+    delete.add_argument("--value", default="")
+    delete.add_argument("--format", dest="fmt", choices=EXPORT_FORMATS, default="xlsx")
+
+    replace = add_batch_command("replace", "Find and replace text")
+    replace.add_argument("--find", dest="find_text", required=True)
+    replace.add_argument("--replace", dest="replace_text", default="")
+    replace.add_argument("--match-case", action="store_true")
+    replace.add_argument("--match-entire", action="store_true")
+
+    stats = add_batch_command("stats", "Calculate column statistics")
+    stats.add_argument("--columns", nargs="*", default=None, help="Columns (default: all)")
+    stats.add_argument("--format", dest="fmt", choices=EXPORT_FORMATS, default="xlsx")
+
+    pivot = add_batch_command("pivot", "Create a pivot table")
+    pivot.add_argument("--index", dest="index_col", required=True)
+    pivot.add_argument("--columns", dest="columns_col", required=True)
+    pivot.add_argument("--values", dest="values_col", required=True)
+    pivot.add_argument("--agg", dest="aggfunc", choices=PIVOT_AGGREGATIONS, default="sum")
+    pivot.add_argument("--format", dest="fmt", choices=EXPORT_FORMATS, default="xlsx")
+
+    export = add_batch_command("export", "Export a sheet ('*' for all sheets)")
+    export.add_argument("--format", dest="fmt", choices=EXPORT_FORMATS, default="csv")
+
+    pipeline = subparsers.add_parser("pipeline", help="Replay a recorded pipeline, skipping unchanged files")
+    pipeline.add_argument("pipeline_file", help="Pipeline JSON recorded in the app")
+    pipeline.add_argument("inputs", nargs="+", help="Directories, files or glob patterns to process")
+    pipeline.add_argument("--out-dir", default=BATCH_OUTPUT_DIR, help="Output directory")
+    pipeline.add_argument("--workers", type=int, default=BATCH_MAX_WORKERS,
+                          help="Worker processes (default: all cores, 1 to run inline)")
+    pipeline.add_argument("--watch", action="store_true", help="Keep polling the inputs for new files")
+    pipeline.add_argument("--interval", type=float, default=PIPELINE_POLL_SECONDS,
+                          help="Seconds between scans in watch mode")
+
+    dedupe = subparsers.add_parser("dedupe", help="Find duplicate rows across sheets or files and drop them")
+    dedupe.add_argument("inputs", nargs="+", help="Files (xlsx/csv), directories or glob patterns")
+    dedupe.add_argument("--key", nargs="*", default=None, help="Key column(s) (default: entire row)")
+    dedupe.add_argument("--scope", choices=["sheet", "files"], default="files",
+                        help="sheet: duplicates within each sheet, files: across every sheet and file")
+    dedupe.add_argument("--exact", action="store_true", help="Do not trim or ignore case in text")
+    dedupe.add_argument("--tolerance", type=float, default=0.0, help="Numeric tolerance")
+    dedupe.add_argument("-o", "--output", default="deduplicated.xlsx",
+                        help="Deduplicated output path; the extension picks the format (xlsx, csv, parquet, arrow)")
+    dedupe.add_argument("--report", default=None, help="Optional duplicate cluster report path")
+
+    diff = subparsers.add_parser("diff", help="Compare two versions of a workbook")
+    diff.add_argument("old_file", help="Old version (xlsx)")
+    diff.add_argument("new_file", help="New version (xlsx)")
+    diff.add_argument("--key", nargs="*", default=None, help="Key column(s) to match rows by")
+    diff.add_argument("-o", "--output", default="diff_report.xlsx", help="Highlighted report path")
+
+    return parser
+
+
+BATCH_TASKS = {
+    "split": tasks.split_file,
+    "filter": tasks.filter_file,
+    "delete-rows": tasks.delete_rows_file,
+    "replace": tasks.replace_file,
+    "stats": tasks.stats_file,
+    "pivot": tasks.pivot_file,
+    "export": tasks.export_file,
+}
+
+
+def print_results(results):
+    """Print one line per file plus a summary; return the number of failures"""
+    failures = 0
+    for result in results:
+        if result['Status'] == 'Success':
+            print(f"✅ {result['File']} ({result['Seconds']}s) -> {', '.join(result['Outputs'])}")
+        else:
+            failures += 1
+            print(f"❌ {result['File']} ({result['Seconds']}s): {result['Message']}")
+    print(f"Processed {len(results)} file(s), {failures} failed")
+    return failures
+
+
+def run_pipeline_command(args):
+    """Run (or watch) a pipeline over the inputs"""
+    try:
+        pipeline = load_pipeline(args["pipeline_file"])
+    except (OSError, ValueError) as e:
+        print(f"❌ Invalid pipeline: {e}", file=sys.stderr)
+        return 1
+
+    if args["watch"]:
+        print(f"👀 Watching {', '.join(args['inputs'])} every {args['interval']}s (Ctrl+C to stop)")
+        try:
+            watch_folder(pipeline, args["inputs"], args["out_dir"], args["workers"], args["interval"],
+                         on_results=print_results)
+        except KeyboardInterrupt:
+            return 0
+
+    results, skipped = process_folder(pipeline, args["inputs"], args["out_dir"], args["workers"],
+                                      settle_seconds=0)
+    if skipped:
+        print(f"⏭️ Skipped {skipped} unchanged file(s)")
+    return 1 if print_results(results) else 0
+
+
+def run_dedupe_command(args):
+    """Scan files for duplicates, stream the deduplicated workbook and optional cluster report"""
+    paths = expand_inputs(args["inputs"], extensions=("xlsx", "csv"))
+    if not paths:
+        print("No matching files found", file=sys.stderr)
+        return 1
+    output_stem, output_ext = os.path.splitext(args["output"])
+    output_fmt = output_ext.lstrip(".").lower() or "xlsx"
+    if output_fmt not in EXPORT_FORMATS:
+        print(f"Unsupported output format '{output_fmt}' (use {', '.join(EXPORT_FORMATS)})", file=sys.stderr)
+        return 1
+
+    frame_source = partial(iter_file_frames, paths)
+    clusters_df, summary, scan = find_duplicates(
+        frame_source, args["key"], not args["exact"], not args["exact"], args["tolerance"],
+        per_sheet=args["scope"] == "sheet"
+    )
+    if clusters_df is None:
+        return 1
+    for name, value in summary.items():
+        print(f"{name}: {value}")
+    # csv/parquet/arrow output of several sheets is written as a zip with one file per sheet
+    written = export_frames_to_path(iter_deduplicated_frames(frame_source, scan, prefix_source=True),
+                                    output_fmt, output_stem)
+    print(f"✅ Deduplicated -> {written}")
+    if args["report"]:
+        with open(args["report"], "wb") as f:
+            f.write(dataframe_to_excel_bytes({"Duplicates": clusters_df}))
+        print(f"✅ Report -> {args['report']}")
+    return 0
+
+
+def run_diff_command(args):
+    """Diff two workbooks, print the sheet summary and write the highlighted report"""
+    old_frames = load_all_sheet_data(args["old_file"])
+    new_frames = load_all_sheet_data(args["new_file"])
+    if not old_frames or not new_frames:
+        print("❌ Could not read both workbooks", file=sys.stderr)
+        return 1
+
+    summary_df, sheet_diffs, pairs = diff_workbooks(old_frames, new_frames, args["key"])
+    if summary_df is None:
+        return 1
+    print(summary_df.to_string(index=False))
+    build_diff_report(summary_df, sheet_diffs, pairs, old_frames, new_frames).save(args["output"])
+    print(f"✅ Report -> {args['output']}")
+    return 0
+
+
+def main(argv=None):
+    """Parse arguments and run the selected command"""
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s: %(message)s")
+    args = vars(build_parser().parse_args(argv))
+    command = args.pop("command")
+
+    if command == "pipeline":
+        return run_pipeline_command(args)
+    if command == "dedupe":
+        return run_dedupe_command(args)
+    if command == "diff":
+        return run_diff_command(args)
+
+    paths = expand_inputs(args.pop("inputs"))
+    if not paths:
+        print("No matching Excel files found", file=sys.stderr)
+        return 1
+
+    if command == "merge":
+        try:
+            outputs = tasks.merge_files(paths, args["output"])
+        except Exception as e:
+            print(f"❌ Merge failed: {e}", file=sys.stderr)
+            return 1
+        print(f"✅ Merged {len(paths)} file(s) -> {outputs[0]}")
+        return 0
+
+    workers = args.pop("workers")
+    os.makedirs(args["out_dir"], exist_ok=True)
+    results = run_batch(BATCH_TASKS[command], paths, workers=workers, **args)
+    return 1 if print_results(results) else 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1 @@
+# Batch package initialization
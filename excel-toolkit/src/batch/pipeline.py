@@ -0,0 +1,234 @@
+"""
+Recorded Operation Pipelines
+Replay a recorded sequence of feature operations over workbooks
+
+A pipeline is plain JSON:
+
+    {
+        "version": 1,
+        "name": "Monthly clean-up",
+        "steps": [
+            {"operation": "filter", "params": {"sheet": "Sales", "column": "Region",
+                                               "condition": "equals", "value": "North"}},
+            {"operation": "pivot", "params": {"sheet": "Sales", "index_col": "Product", ...}},
+            {"operation": "export", "params": {"sheets": ["Pivot_Table"], "fmt": "xlsx"}}
+        ]
+    }
+
+Steps work on a dictionary of {sheet_name: DataFrame}. Transform steps replace
+their sheet, pivot/statistics/time_series steps add a new sheet named by "target".
+"""
+
+import json
+import hashlib
+import pandas as pd
+from src.features.bulk_operations import delete_rows_by_condition, find_and_replace_dataframe
+from src.features.data_analysis import (
+    calculate_statistics, create_pivot_table, filter_data, build_time_index, time_series_analysis
+)
+from src.features.column_transforms import apply_transforms
+from src.batch.tasks import (
+    output_path, write_bytes, write_dataframe, require_columns, require_condition_value
+)
+from src.utils.file_handlers import dataframe_to_excel_bytes
+from src.config.settings import PIPELINE_VERSION
+
+
+def _sheet(frames, params):
+    """Return the DataFrame a step works on (first sheet if none recorded)"""
+    sheet = params.get('sheet') or next(iter(frames))
+    if sheet not in frames:
+        raise ValueError(f"Sheet '{sheet}' not found")
+    return sheet, frames[sheet]
+
+
+def _step_filter(frames, params):
+    sheet, df = _sheet(frames, params)
+    require_columns(df, [params['column']])
+    require_condition_value(params['condition'], params['value'])
+    frames[sheet] = filter_data(df, params['column'], params['condition'], params['value'])
+
+
+def _step_sort(frames, params):
+    sheet, df = _sheet(frames, params)
+    frames[sheet] = df.sort_values(by=params['column'], ascending=params.get('ascending', True))
+
+
+def _step_delete_rows(frames, params):
+    sheet, df = _sheet(frames, params)
+    require_columns(df, [params['column']])
+    require_condition_value(params['condition'], params.get('value', ''))
+    frames[sheet], _ = delete_rows_by_condition(df, params['column'], params['condition'], params.get('value', ''))
+
+
+def _step_find_replace(frames, params):
+    sheet_names = [_sheet(frames, params)[0]] if params.get('sheet') else list(frames)
+    for sheet in sheet_names:
+        frames[sheet], _ = find_and_replace_dataframe(
+            frames[sheet], params['find_text'], params.get('replace_text', ''),
+            params.get('match_case', False), params.get('match_entire', False)
+        )
+
+
+def _step_transform(frames, params):
+    sheet, df = _sheet(frames, params)
+    result_df, _ = apply_transforms(df, params['steps'])
+    if result_df is None:
+        raise ValueError("Column transform failed")
+    frames[sheet] = result_df
+
+
+def _step_pivot(frames, params):
+    _, df = _sheet(frames, params)
+    pivot_df = create_pivot_table(df, params['index_col'], params['columns_col'],
+                                  params['values_col'], params.get('aggfunc', 'sum'))
+    if pivot_df is None:
+        raise ValueError("Pivot table creation failed")
+    frames[params.get('target', 'Pivot_Table')] = pivot_df.reset_index()
+
+
+def _step_statistics(frames, params):
+    _, df = _sheet(frames, params)
+    stats_df = calculate_statistics(df, params.get('columns') or df.columns.tolist())
+    if stats_df is None:
+        raise ValueError("Statistics calculation failed")
+    frames[params.get('target', 'Statistics')] = stats_df.rename_axis('Column').reset_index()
+
+
+def _step_time_series(frames, params):
+    _, df = _sheet(frames, params)
+    ts, _ = build_time_index(df, params['date_col'], params.get('dayfirst', False))
+    if ts is None:
+        raise ValueError("Date parsing failed")
+    result_df = time_series_analysis(
+        ts, params['value_columns'], params.get('frequency'), params.get('aggfunc', 'sum'),
+        params.get('window'), params.get('window_type'), params.get('window_func', 'mean'),
+        params.get('change'), params.get('periods', 1)
+    )
+    if result_df is None:
+        raise ValueError("Time series analysis failed")
+    frames[params.get('target', 'Time_Series')] = result_df
+
+
+PIPELINE_OPERATIONS = {
+    'filter': _step_filter,
+    'sort': _step_sort,
+    'delete_rows': _step_delete_rows,
+    'find_replace': _step_find_replace,
+    'transform': _step_transform,
+    'pivot': _step_pivot,
+    'statistics': _step_statistics,
+    'time_series': _step_time_series,
+    'export': None,  # Handled by run_pipeline_file
+}
+
+
+def create_pipeline(steps, name="Recorded pipeline"):
+    """
+    Build a pipeline dictionary from recorded steps
+
+    Args:
+        steps: List of {"operation": str, "params": dict}
+        name: Human readable pipeline name
+
+    Returns:
+        Pipeline dictionary
+    """
+    return {'version': PIPELINE_VERSION, 'name': name, 'steps': list(steps)}
+
+
+def validate_pipeline(pipeline):
+    """
+    Check a pipeline dictionary and return its steps
+
+    Raises:
+        ValueError: If the version or an operation is not supported
+    """
+    if pipeline.get('version') != PIPELINE_VERSION:
+        raise ValueError(f"Unsupported pipeline version: {pipeline.get('version')}")
+    steps = pipeline.get('steps') or []
+    for i, step in enumerate(steps, start=1):
+        if step.get('operation') not in PIPELINE_OPERATIONS:
+            raise ValueError(f"Step {i}: unknown operation '{step.get('operation')}'")
+    return steps
+
+
+def pipeline_to_json(pipeline):
+    """Serialize a pipeline to a JSON string"""
+    return json.dumps(pipeline, indent=2, default=str)
+
+
+def load_pipeline(path):
+    """Load and validate a pipeline JSON file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        pipeline = json.load(f)
+    validate_pipeline(pipeline)
+    return pipeline
+
+
+def pipeline_fingerprint(pipeline):
+    """Stable hash of the pipeline definition (changes force re-processing)"""
+    return hashlib.sha256(json.dumps(pipeline, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def apply_steps(frames, steps):
+    """
+    Apply transform steps to a dictionary of DataFrames
+
+    Args:
+        frames: Dictionary of {sheet_name: DataFrame}; modified in place
+        steps: Pipeline steps (export steps are skipped)
+
+    Returns:
+        The frames dictionary
+    """
+    for step in steps:
+        handler = PIPELINE_OPERATIONS[step['operation']]
+        if handler is not None:
+            handler(frames, step.get('params', {}))
+    return frames
+
+
+def _export(frames, path, out_dir, params, suffix):
+    """Write the selected sheets of the pipeline state and return the paths written"""
+    names = params.get('sheets') or list(frames)
+    selected = {name: frames[name] for name in names}
+    fmt = params.get('fmt', 'xlsx')
+
+    if fmt == 'xlsx':
+        return [write_bytes(output_path(out_dir, path, suffix), dataframe_to_excel_bytes(selected))]
+    return [
+        write_dataframe(df, output_path(out_dir, path, suffix if len(selected) == 1 else f"{suffix}_{name}", fmt))
+        for name, df in selected.items()
+    ]
+
+
+def run_pipeline_file(path, out_dir, steps):
+    """
+    Batch task: run a pipeline over one workbook
+
+    Export steps write the state as it is at that point; if the pipeline has
+    no export step, every sheet is written to '<stem>_pipeline.xlsx' at the end.
+
+    Args:
+        path: Input Excel file
+        out_dir: Output directory
+        steps: Validated pipeline steps
+
+    Returns:
+        List of files written
+    """
+    frames = pd.read_excel(path, sheet_name=None, engine='openpyxl')
+    outputs = []
+    export_count = 0
+    for step in steps:
+        if step['operation'] == 'export':
+            export_count += 1
+            suffix = 'pipeline' if export_count == 1 else f"pipeline_{export_count}"
+            outputs.extend(_export(frames, path, out_dir, step.get('params', {}), suffix))
+        else:
+            apply_steps(frames, [step])
+
+    if not export_count:
+        outputs.extend(_export(frames, path, out_dir, {}, 'pipeline'))
+    return outputs
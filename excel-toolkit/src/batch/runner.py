@@ -0,0 +1,98 @@
+"""
+Batch Runner
+Expand input globs and run a task over every file in a process pool
+"""
+
+import glob
+import os
+import time
+from src.config.settings import BATCH_MAX_WORKERS, SUPPORTED_EXTENSIONS
+from src.utils.sheet_executor import map_sheets, PROCESS
+
+
+def expand_inputs(patterns, extensions=SUPPORTED_EXTENSIONS):
+    """
+    Expand file paths, directories and glob patterns into Excel file paths
+
+    Args:
+        patterns: List of paths, directories or glob patterns ('**' is recursive)
+        extensions: Accepted file extensions
+
+    Returns:
+        Sorted, de-duplicated list of matching Excel file paths
+    """
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = []
+            for ext in extensions:
+                matches.extend(glob.glob(os.path.join(pattern, f"*.{ext}")))
+        else:
+            matches = glob.glob(pattern, recursive=True)
+        paths.extend(
+            m for m in matches
+            if os.path.isfile(m) and m.rsplit('.', 1)[-1].lower() in extensions
+            and not os.path.basename(m).startswith('~$')  # Excel lock files
+        )
+    return sorted(set(paths))
+
+
+def run_task(task, path, params):
+    """
+    Run one task on one file, capturing timing and errors
+
+    Args:
+        task: Task function from src.batch.tasks
+        path: Input file path
+        params: Keyword arguments for the task
+
+    Returns:
+        Result dictionary (File, Status, Outputs, Seconds, Message)
+    """
+    start = time.perf_counter()
+    try:
+        outputs = task(path, **params)
+        status, message = 'Success', ''
+    except Exception as e:
+        outputs, status, message = [], 'Error', str(e)
+    return {
+        'File': path,
+        'Status': status,
+        'Outputs': outputs,
+        'Seconds': round(time.perf_counter() - start, 3),
+        'Message': message
+    }
+
+
+def _crashed(task, path, params):
+    """Result for a file whose worker process died twice (crash, out of memory)"""
+    return {
+        'File': path,
+        'Status': 'Error',
+        'Outputs': [],
+        'Seconds': 0.0,
+        'Message': "Worker process crashed while processing this file"
+    }
+
+
+def run_batch(task, paths, workers=BATCH_MAX_WORKERS, **params):
+    """
+    Run a task over many files, in parallel across a process pool
+
+    Worker processes only import pandas/openpyxl and the feature modules,
+    never Streamlit. Files are balanced across workers by size, and results
+    come back in input order. If a worker dies, only its unfinished files are
+    retried, one per fresh process; a file that crashes its worker again is
+    reported as an error instead of being run in this process.
+
+    Args:
+        task: Module-level task function (must be picklable)
+        paths: List of input file paths
+        workers: Number of worker processes (None for all cores, 1 to run inline)
+        **params: Keyword arguments forwarded to the task
+
+    Returns:
+        List of result dictionaries, one per input file
+    """
+    return map_sheets(run_task, [(task, path, params) for path in paths], kind=PROCESS, workers=workers,
+                      weights=[os.path.getsize(path) for path in paths], crashed=_crashed)
@@ -0,0 +1,195 @@
+"""
+Headless Batch Tasks
+File-level wrappers around the feature functions for CLI and worker processes
+
+Every task takes an input path and an output directory, writes its results
+to disk and returns the list of files it produced. Nothing here imports
+Streamlit, so tasks are safe to run inside a process pool.
+"""
+
+import os
+import pandas as pd
+from openpyxl import load_workbook
+from src.features.bulk_operations import (
+    merge_excel_files, split_excel_by_column, delete_rows_by_condition, find_and_replace
+)
+from src.features.data_analysis import calculate_statistics, create_pivot_table, filter_data
+from src.utils.file_handlers import create_download_link, dataframe_to_excel_bytes
+from src.utils.export import write_export
+
+
+def read_sheet(path, sheet_name=None):
+    """
+    Read one sheet of an Excel file into a DataFrame
+
+    Args:
+        path: Path to the Excel file
+        sheet_name: Sheet to read (None for the first sheet)
+
+    Returns:
+        pandas DataFrame
+    """
+    return pd.read_excel(path, sheet_name=sheet_name if sheet_name else 0, engine='openpyxl')
+
+
+def require_columns(df, columns):
+    """
+    Raise if any of the columns is missing from the DataFrame
+
+    The feature functions report bad input with show_error and hand their
+    input back unchanged, which a task would otherwise write out as a success.
+
+    Raises:
+        ValueError: Naming the missing columns and the available ones
+    """
+    missing = [column for column in columns if column not in df.columns]
+    if missing:
+        raise ValueError(f"Column(s) not found: {', '.join(map(str, missing))} "
+                         f"(available: {', '.join(map(str, df.columns))})")
+
+
+def require_condition_value(condition, value):
+    """Raise if a 'greater than' / 'less than' condition is given a value that is not a number"""
+    if condition in ("greater than", "less than"):
+        try:
+            float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"'{value}' is not a number (required for '{condition}')") from None
+
+
+def require_sheet(sheet_names, sheet):
+    """Raise if a sheet name was given and the workbook has no such sheet"""
+    if sheet and sheet not in sheet_names:
+        raise ValueError(f"Sheet '{sheet}' not found (available: {', '.join(sheet_names)})")
+
+
+def output_path(out_dir, path, suffix, extension="xlsx"):
+    """Build '<out_dir>/<input stem>_<suffix>.<extension>'"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(out_dir, f"{stem}_{suffix}.{extension}")
+
+
+def write_bytes(path, data):
+    """Write bytes to disk and return the path"""
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def write_dataframe(df, path, sheet_name="Data", index=False):
+    """
+    Write a DataFrame as xlsx, csv, parquet or arrow depending on the file extension
+
+    Args:
+        df: pandas DataFrame
+        path: Destination path ending in .xlsx, .csv, .parquet or .arrow
+        sheet_name: Sheet title for xlsx output
+        index: Whether to write the DataFrame index
+
+    Returns:
+        Destination path
+    """
+    fmt = os.path.splitext(path)[1].lstrip('.').lower()
+    with open(path, 'wb') as f:
+        write_export({sheet_name: df}, fmt, f, index=index)
+    return path
+
+
+def merge_files(paths, destination):
+    """
+    Merge several Excel files into one workbook
+
+    Args:
+        paths: List of input paths
+        destination: Output xlsx path
+
+    Returns:
+        List containing the destination path
+    """
+    file_list = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            file_list.append((f.read(), os.path.basename(path)))
+
+    merged_wb = merge_excel_files(file_list, "all_sheets")
+    if merged_wb is None:
+        raise ValueError("Merge failed")
+    return [write_bytes(destination, create_download_link(merged_wb, destination))]
+
+
+def split_file(path, out_dir, column, sheet=None):
+    """Split a sheet into one file per unique value of a column"""
+    df = read_sheet(path, sheet)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    files_dict = split_excel_by_column(df, column, stem)
+    if not files_dict:
+        raise ValueError(f"Nothing to split on column '{column}'")
+    return [write_bytes(os.path.join(out_dir, name), data) for name, data in files_dict.items()]
+
+
+def filter_file(path, out_dir, column, condition, value, sheet=None, sort_by=None, descending=False,
+                fmt="xlsx"):
+    """Filter (and optionally sort) a sheet and write the matching rows"""
+    df = read_sheet(path, sheet)
+    require_columns(df, [column] + ([sort_by] if sort_by else []))
+    require_condition_value(condition, value)
+    result_df = filter_data(df, column, condition, value)
+    if sort_by:
+        result_df = result_df.sort_values(by=sort_by, ascending=not descending)
+    return [write_dataframe(result_df, output_path(out_dir, path, "filtered", fmt), "Filtered_Data")]
+
+
+def delete_rows_file(path, out_dir, column, condition, value, sheet=None, fmt="xlsx"):
+    """Delete rows matching a condition and write the remaining rows"""
+    df = read_sheet(path, sheet)
+    require_columns(df, [column])
+    require_condition_value(condition, value)
+    filtered_df, _ = delete_rows_by_condition(df, column, condition, value)
+    return [write_dataframe(filtered_df, output_path(out_dir, path, "rows_deleted", fmt), sheet or "Data")]
+
+
+def replace_file(path, out_dir, find_text, replace_text, match_case=False, match_entire=False, sheet=None):
+    """Find and replace text in a workbook, preserving formatting"""
+    wb = load_workbook(path)
+    require_sheet(wb.sheetnames, sheet)
+    wb, _ = find_and_replace(wb, find_text, replace_text, match_case, match_entire, sheet)
+    return [write_bytes(output_path(out_dir, path, "replaced"), create_download_link(wb, path))]
+
+
+def stats_file(path, out_dir, columns=None, sheet=None, fmt="xlsx"):
+    """Calculate statistics for the given (or all) columns of a sheet"""
+    df = read_sheet(path, sheet)
+    if columns:
+        require_columns(df, columns)
+    stats_df = calculate_statistics(df, columns or df.columns.tolist())
+    if stats_df is None:
+        raise ValueError("Statistics calculation failed")
+    return [write_dataframe(stats_df, output_path(out_dir, path, "statistics", fmt), "Statistics", index=True)]
+
+
+def pivot_file(path, out_dir, index_col, columns_col, values_col, aggfunc="sum", sheet=None, fmt="xlsx"):
+    """Build a pivot table from a sheet"""
+    df = read_sheet(path, sheet)
+    require_columns(df, [index_col, columns_col, values_col])
+    pivot_df = create_pivot_table(df, index_col, columns_col, values_col, aggfunc)
+    if pivot_df is None:
+        raise ValueError("Pivot table creation failed")
+    return [write_dataframe(pivot_df, output_path(out_dir, path, "pivot", fmt), "Pivot_Table", index=True)]
+
+
+def export_file(path, out_dir, sheet=None, fmt="csv"):
+    """Export a sheet (or every sheet with sheet='*') to xlsx, or to one csv/parquet/arrow file per sheet"""
+    if sheet == '*':
+        frames = pd.read_excel(path, sheet_name=None, engine='openpyxl')
+    else:
+        df = read_sheet(path, sheet)
+        frames = {sheet or "Data": df}
+
+    if fmt == "xlsx":
+        return [write_bytes(output_path(out_dir, path, "export"), dataframe_to_excel_bytes(frames))]
+
+    outputs = []
+    for sheet_name, df in frames.items():
+        suffix = "export" if len(frames) == 1 else f"export_{sheet_name}"
+        outputs.append(write_dataframe(df, output_path(out_dir, path, suffix, fmt)))
+    return outputs
@@ -0,0 +1,143 @@
+"""
+Watch Folder Runner
+Replay a pipeline over every workbook dropped into a directory
+
+Files are fingerprinted by content (SHA-256) together with the pipeline
+definition; a manifest in the output directory remembers what has been
+processed, successfully or not, so unchanged files are skipped on the next scan.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from src.batch.pipeline import pipeline_fingerprint, run_pipeline_file, validate_pipeline
+from src.batch.runner import expand_inputs, run_batch
+from src.config.settings import (
+    BATCH_MAX_WORKERS, PIPELINE_MANIFEST_FILE, PIPELINE_POLL_SECONDS, PIPELINE_SETTLE_SECONDS
+)
+
+logger = logging.getLogger("excel_toolkit")
+
+
+def file_content_hash(path, chunk_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(out_dir):
+    """Load the processed-files manifest ({path: {'hash': ..., ...}})"""
+    manifest_path = os.path.join(out_dir, PIPELINE_MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable manifest: {e}")
+        return {}
+
+
+def save_manifest(out_dir, manifest):
+    """Atomically write the processed-files manifest"""
+    manifest_path = os.path.join(out_dir, PIPELINE_MANIFEST_FILE)
+    temp_path = manifest_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temp_path, manifest_path)
+
+
+def pending_files(paths, manifest, pipeline_hash, settle_seconds=PIPELINE_SETTLE_SECONDS):
+    """
+    Select files whose content or pipeline changed since they were last processed
+
+    Files modified within the last `settle_seconds` are left for the next scan,
+    since they may still be being copied into the folder.
+
+    Returns:
+        List of (path, content_hash) tuples
+    """
+    now = time.time()
+    pending = []
+    for path in paths:
+        try:
+            if now - os.path.getmtime(path) < settle_seconds:
+                continue
+            content_hash = file_content_hash(path)
+        except OSError:
+            continue  # Removed or locked between listing and hashing
+        entry = manifest.get(os.path.abspath(path))
+        if entry and entry.get('hash') == content_hash and entry.get('pipeline') == pipeline_hash:
+            continue
+        pending.append((path, content_hash))
+    return pending
+
+
+def process_folder(pipeline, inputs, out_dir, workers=BATCH_MAX_WORKERS, settle_seconds=PIPELINE_SETTLE_SECONDS):
+    """
+    Run a pipeline once over every new or changed file
+
+    Args:
+        pipeline: Pipeline dictionary
+        inputs: List of directories, files or glob patterns to scan
+        out_dir: Output directory (also holds the manifest)
+        workers: Worker processes for the pool
+        settle_seconds: Minimum file age before it is picked up
+
+    Returns:
+        Tuple of (results list, number of skipped unchanged files)
+    """
+    steps = validate_pipeline(pipeline)
+    pipeline_hash = pipeline_fingerprint(pipeline)
+    os.makedirs(out_dir, exist_ok=True)
+
+    manifest = load_manifest(out_dir)
+    # Never feed our own outputs back in when the output folder sits inside a watched tree
+    output_root = os.path.abspath(out_dir) + os.sep
+    paths = [p for p in expand_inputs(inputs) if not os.path.abspath(p).startswith(output_root)]
+    pending = pending_files(paths, manifest, pipeline_hash, settle_seconds)
+    skipped = len(paths) - len(pending)
+    if not pending:
+        return [], skipped
+
+    results = run_batch(run_pipeline_file, [path for path, _ in pending], workers=workers,
+                        out_dir=out_dir, steps=steps)
+
+    # Failures are recorded too, so a broken file is retried only once its content or the pipeline changes
+    for (path, content_hash), result in zip(pending, results):
+        manifest[os.path.abspath(path)] = {
+            'hash': content_hash,
+            'pipeline': pipeline_hash,
+            'status': result['Status'],
+            'message': result['Message'],
+            'outputs': result['Outputs'],
+            'seconds': result['Seconds'],
+            'processed_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+        }
+    save_manifest(out_dir, manifest)
+    return results, skipped
+
+
+def watch_folder(pipeline, inputs, out_dir, workers=BATCH_MAX_WORKERS, interval=PIPELINE_POLL_SECONDS,
+                 on_results=None):
+    """
+    Poll the inputs forever, processing new or changed files as they appear
+
+    Args:
+        pipeline: Pipeline dictionary
+        inputs: List of directories, files or glob patterns to watch
+        out_dir: Output directory
+        workers: Worker processes for the pool
+        interval: Seconds between scans
+        on_results: Optional callback receiving each non-empty results list
+    """
+    while True:
+        results, _ = process_folder(pipeline, inputs, out_dir, workers)
+        if results and on_results:
+            on_results(results)
+        time.sleep(interval)
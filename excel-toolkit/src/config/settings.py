@@ -23,6 +23,29 @@ TEXT_STATS = ['Count', 'Unique', 'Mode']
 # Pivot table aggregations
 PIVOT_AGGREGATIONS = ["sum", "mean", "count", "min", "max"]
 
+# Time series (label -> pandas resample rule; periods are labelled by their first day)
+TIME_FREQUENCIES = {
+    "Day": "D",
+    "Week": "W-MON",
+    "Month": "MS",
+    "Quarter": "QS",
+    "Year": "YS",
+}
+WINDOW_FUNCTIONS = ["mean", "sum", "min", "max"]
+SESSION_TIME_INDEX_CACHE = 'time_index_cache'
+SESSION_TIME_SERIES_RESULT = 'time_series_result'
+
+# Exploration mode (estimates from a stratified sample, exact results computed in the background)
+SAMPLE_ROWS = 50000  # Default sample size
+SAMPLE_MIN_ROWS = 200000  # Shorter sheets are always computed exactly
+SAMPLE_CONFIDENCE = 0.95
+SAMPLE_MAX_STRATA = 1000  # Stratification columns with more distinct values are refused
+SAMPLE_SEED = 0
+EXACT_WORKERS = 2  # Background threads for exact computations
+EXACT_POLL_SECONDS = 1.0
+SESSION_SAMPLE_CACHE = 'sample_cache'
+SESSION_EXACT_JOBS = 'exact_jobs'
+
 # Filter conditions
 FILTER_CONDITIONS = ["equals", "contains", "greater than", "less than", "not equals"]
 DELETE_CONDITIONS = ["equals", "contains", "greater than", "less than", "empty"]
@@ -36,3 +59,128 @@ SESSION_UPLOADED_FILE = 'uploaded_file'
 SESSION_WORKBOOK = 'workbook'
 SESSION_FILE_PATH = 'file_path'
 SESSION_DF_DICT = 'df_dict'
+
+# Batch processing (CLI)
+BATCH_MAX_WORKERS = None  # None uses every available CPU core
+BATCH_OUTPUT_DIR = "output"
+EXPORT_FORMATS = ["xlsx", "csv", "parquet", "arrow"]  # parquet/arrow need pyarrow
+
+# Streaming export (csv/parquet/arrow are written chunk by chunk; several sheets become a zip)
+EXPORT_CHUNK_ROWS = 100000  # Rows converted and written per batch
+EXPORT_SPOOL_BYTES = 64 * 1024 ** 2  # Output kept in memory up to this size, then spooled to a temp file
+EXPORT_MIME_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+    "zip": "application/zip",
+}
+SESSION_EXPORT_FORMAT = 'export_format'
+
+# Recorded pipelines
+PIPELINE_VERSION = 1
+PIPELINE_MANIFEST_FILE = ".pipeline_manifest.json"
+PIPELINE_POLL_SECONDS = 5
+PIPELINE_SETTLE_SECONDS = 2  # Ignore files modified more recently than this
+SESSION_PIPELINE_STEPS = 'pipeline_steps'
+SESSION_PIPELINE_RECORDING = 'pipeline_recording'
+SESSION_DELETE_PREVIEW = 'delete_preview'
+SESSION_REPLACE_PREVIEW = 'replace_preview'
+
+# Analysis execution backends (polars is optional)
+ANALYSIS_BACKENDS = ["pandas", "polars"]
+SESSION_COLUMNAR_CACHE = 'columnar_cache'
+
+# SQL query console (duckdb is optional, sqlite3 is the fallback)
+SQL_ENGINES = ["duckdb", "sqlite"]
+SESSION_SQL_RESULT = 'sql_result'
+
+# Lookup / join
+JOIN_TYPES = ["left", "inner", "anti"]
+EXCEL_MAX_ROWS = 1048576
+
+# Workbook diff
+DIFF_RENAME_SIMILARITY = 0.5  # Share of rows a removed and an added sheet must share to count as a rename
+DIFF_FILL_COLORS = {
+    'inserted': 'C6EFCE',
+    'deleted': 'FFC7CE',
+    'modified': 'FFEB9C',
+    'changed': 'F4B084',
+}
+
+# Duplicate detection
+DEDUP_SCOPES = ["Within each sheet", "Across all sheets", "Across uploaded files"]
+DEDUP_CHUNK_ROWS = 100000  # Rows normalized and hashed per batch (also the CSV read chunk size)
+
+# Per-sheet parallel execution (loading and statistics over every sheet)
+SHEET_WORKERS = None  # Parse processes / statistics threads; None uses every CPU core
+SHEET_PARALLEL_MIN_BYTES = 1024 ** 2  # Smaller files are parsed in one pass
+
+# Multi-workbook sessions
+MULTI_WORKBOOK_WORKERS = None  # Parse processes / analysis threads; None uses every CPU core
+SOURCE_FILE_COLUMN = "Source File"
+SESSION_COLLECTION = 'workbook_collection'
+SESSION_COLLECTION_IDS = 'workbook_collection_ids'
+
+# Shared workbook store (one parsed copy per distinct file, shared by all sessions)
+STORE_MAX_BYTES = 2 * 1024 ** 3  # Evict unused workbooks beyond this estimated size
+STORE_MIN_FREE_BYTES = 512 * 1024 ** 2  # ...or when free memory drops below this
+STORE_CELL_BYTES = 250  # Rough memory of one openpyxl cell, for size estimates
+SESSION_WORKBOOK_HANDLE = 'workbook_handle'
+SESSION_UPLOAD_ID = 'upload_id'
+
+# Formula engine
+FORMULA_EXPAND_CELLS = 256  # Ranges up to this many cells are indexed cell by cell in the dependency graph
+FORMULA_BUCKET_COLUMNS = 64  # Wider ranges are checked per sheet instead of per column
+SESSION_FORMULA_ENGINE = 'formula_engine'
+
+# Undo / redo
+UNDO_LIMIT = 50  # Operations kept in the undo history
+SESSION_OPERATION_LOG = 'operation_log'
+
+# Column transforms (op -> label)
+COLUMN_TRANSFORMS = {
+    'trim': "Trim spaces",
+    'upper': "UPPER CASE",
+    'lower': "lower case",
+    'title': "Title Case",
+    'extract': "Regex extract",
+    'replace': "Regex replace",
+    'number': "Convert to number",
+    'integer': "Convert to integer",
+    'text': "Convert to text",
+    'date': "Parse dates",
+    'fill': "Fill empty cells",
+    'split': "Split into columns",
+    'concat': "Concatenate columns",
+    'arithmetic': "Arithmetic",
+}
+TRANSFORM_OPERATORS = ["+", "-", "*", "/", "round"]
+TRANSFORM_PREVIEW_ROWS = 20
+SESSION_TRANSFORM_STEPS = 'transform_steps'
+
+# Column profiling
+PROFILE_EXACT_ROWS = 100000  # Longer columns get a HyperLogLog distinct count instead of an exact one
+PROFILE_HLL_PRECISION = 14  # 2^14 registers: ~0.8% standard error, 16 KB per column
+PROFILE_TOP_K = 5
+PROFILE_TOPK_MAX_DISTINCT = 50000  # Skip top values for (near-)unique columns such as IDs
+PROFILE_HISTOGRAM_BINS = 10
+PROFILE_CACHE_SIZE = 32  # Profiles kept per server process, keyed by sheet fingerprint
+SESSION_PROFILE_CACHE = 'profile_cache'
+
+# Instrumentation (per-rerun timing/memory panel)
+INSTRUMENTATION_LOG_FILE = "logs/instrumentation.jsonl"  # One JSON object per measured call
+SESSION_INSTRUMENTATION = 'instrumentation_enabled'
+SESSION_INSTRUMENTATION_MEMORY = 'instrumentation_trace_memory'
+SESSION_INSTRUMENTATION_ID = 'instrumentation_session_id'
+
+# Benchmarks (synthetic workbook shapes per scale)
+BENCHMARK_SCALES = {
+    "small": {"rows": 1000, "columns": 8, "sheets": 2, "cardinality": 50},
+    "medium": {"rows": 20000, "columns": 12, "sheets": 3, "cardinality": 1000},
+    "large": {"rows": 100000, "columns": 16, "sheets": 4, "cardinality": 20000},
+}
+BENCHMARK_REPEATS = 5
+BENCHMARK_RESULTS_VERSION = 1
+BENCHMARK_REGRESSION_THRESHOLD = 0.20  # Slower (or more memory) by more than this fraction is a regression
+BENCHMARK_NOISE_SECONDS = 0.005  # Timing differences below this are ignored
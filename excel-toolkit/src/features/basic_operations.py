@@ -6,13 +6,16 @@ Functions for creating, modifying, and password-protecting Excel files
 import streamlit as st
 import openpyxl
 from openpyxl import load_workbook, Workbook
+from openpyxl.utils.cell import coordinate_to_tuple
 from io import BytesIO
 from win32com.client.gencache import EnsureDispatch
 from win32com.client import Dispatch
 import pythoncom
 import os
+from src.utils.instrumentation import instrumented
 
 
+@instrumented
 def create_new_excel(name):
     """
     Create a new Excel file with one sheet
@@ -44,7 +47,8 @@ def create_new_excel(name):
         return None
 
 
-def modify_excel_cell(wb, sheet_name, address, value):
+@instrumented
+def modify_excel_cell(wb, sheet_name, address, value, journal=None):
     """
     Modify a specific cell in Excel workbook
     
@@ -53,12 +57,15 @@ def modify_excel_cell(wb, sheet_name, address, value):
         sheet_name: Name of the sheet
         address: Cell address (e.g., 'A1')
         value: New value for the cell
+        journal: Optional Operation recording the change for undo
         
     Returns:
         Modified workbook
     """
     try:
         sheet = wb[sheet_name]
+        if journal is not None:
+            journal.cell(sheet, *coordinate_to_tuple(address))
         sheet[address] = value
         st.success(f"Value '{value}' has been written to cell '{address}' in sheet '{sheet_name}'.")
         return wb
@@ -67,6 +74,7 @@ def modify_excel_cell(wb, sheet_name, address, value):
         return wb
 
 
+@instrumented
 def set_password_excel(file_path, password):
     """
     Set password for Excel file (Windows only - requires Excel installed)
@@ -96,6 +104,7 @@ def set_password_excel(file_path, password):
         st.error(f"Error setting password: {str(e)}")
 
 
+@instrumented
 def remove_password_excel(file_path, password):
     """
     Remove password from Excel file (Windows only - requires Excel installed)
@@ -1,24 +1,33 @@
 """
 Bulk Operations and Automation
-Functions for batch modifications, merging, splitting, copying, deleting, and find/replace
+Functions for batch modifications, merging, splitting, copying, deleting, find/replace,
+lookups and duplicate detection
 """
 
-import streamlit as st
+import os
+import numpy as np
 import pandas as pd
 from openpyxl import load_workbook, Workbook
 from openpyxl.utils.dataframe import dataframe_to_rows
+from openpyxl.utils.cell import coordinate_to_tuple, get_column_letter
 from io import BytesIO
-from copy import copy
 import re
+from src.utils.notifications import show_error
+from src.utils.instrumentation import instrumented
+from src.utils.range_copy import copy_range
+from src.utils.sheet_executor import cell_values
+from src.config.settings import DEDUP_CHUNK_ROWS
 
 
-def batch_modify_cells(wb, modifications_df):
+@instrumented
+def batch_modify_cells(wb, modifications_df, journal=None):
     """
     Batch modify cells from CSV data
     
     Args:
         wb: openpyxl Workbook object
         modifications_df: DataFrame with columns: CellAddress, NewValue, SheetName (optional)
+        journal: Optional Operation recording the change for undo
         
     Returns:
         Tuple of (modified workbook, results DataFrame)
@@ -33,6 +42,8 @@ def batch_modify_cells(wb, modifications_df):
                 
                 if sheet_name in wb.sheetnames:
                     sheet = wb[sheet_name]
+                    if journal is not None:
+                        journal.cell(sheet, *coordinate_to_tuple(cell_address))
                     sheet[cell_address] = new_value
                     results.append({'Row': idx+1, 'Status': 'Success', 'Message': f'Updated {cell_address}'})
                 else:
@@ -42,10 +53,11 @@ def batch_modify_cells(wb, modifications_df):
         
         return wb, pd.DataFrame(results)
     except Exception as e:
-        st.error(f"Error in batch modification: {str(e)}")
+        show_error(f"Error in batch modification: {str(e)}")
         return wb, pd.DataFrame()
 
 
+@instrumented
 def merge_excel_files(file_list, merge_option):
     """
     Merge multiple Excel files into one workbook
@@ -84,26 +96,18 @@ def merge_excel_files(file_list, merge_option):
                 target_sheet = new_wb.create_sheet(title=new_sheet_name)
                 
                 # Copy data and formatting
-                for row in source_sheet.iter_rows():
-                    for cell in row:
-                        target_cell = target_sheet[cell.coordinate]
-                        target_cell.value = cell.value
-                        if cell.has_style:
-                            target_cell.font = copy(cell.font)
-                            target_cell.border = copy(cell.border)
-                            target_cell.fill = copy(cell.fill)
-                            target_cell.number_format = copy(cell.number_format)
-                            target_cell.protection = copy(cell.protection)
-                            target_cell.alignment = copy(cell.alignment)
+                used_range = f"A1:{get_column_letter(source_sheet.max_column)}{source_sheet.max_row}"
+                copy_range(source_sheet, used_range, target_sheet, "A1")
             
             wb.close()
         
         return new_wb
     except Exception as e:
-        st.error(f"Error merging files: {str(e)}")
+        show_error(f"Error merging files: {str(e)}")
         return None
 
 
+@instrumented
 def split_excel_by_column(df, split_column, original_filename):
     """
     Split Excel file by unique values in a column
@@ -140,49 +144,40 @@ def split_excel_by_column(df, split_column, original_filename):
         
         return files_dict
     except Exception as e:
-        st.error(f"Error splitting file: {str(e)}")
+        show_error(f"Error splitting file: {str(e)}")
         return {}
 
 
-def copy_data_between_sheets(wb, source_sheet, source_range, dest_sheet, dest_start):
+@instrumented
+def copy_data_between_sheets(wb, source_sheet, source_range, dest_sheet, dest_start, journal=None,
+                             source_wb=None, formats=True):
     """
     Copy data from one sheet to another
     
     Args:
-        wb: openpyxl Workbook object
+        wb: openpyxl Workbook object (destination)
         source_sheet: Source sheet name
-        source_range: Cell range (e.g., 'A1:C10')
+        source_range: Cell range (e.g., 'A1:C10', 'B5', 'A:C', '3:5' or a defined name)
         dest_sheet: Destination sheet name
         dest_start: Starting cell in destination (e.g., 'A1')
+        journal: Optional Operation recording the change for undo
+        source_wb: Workbook to copy from (defaults to wb)
+        formats: Also copy styles, merged cells, column widths and row heights
         
     Returns:
         Modified workbook
     """
     try:
-        src_sheet = wb[source_sheet]
+        src_sheet = (source_wb or wb)[source_sheet]
         dst_sheet = wb[dest_sheet]
-        
-        # Parse range (simple implementation for A1:B10 format)
-        if ':' in source_range:
-            cells = src_sheet[source_range]
-            
-            # Get starting cell coordinates
-            dest_cell = dst_sheet[dest_start]
-            start_row = dest_cell.row
-            start_col = dest_cell.column
-            
-            # Copy data
-            for i, row in enumerate(cells):
-                for j, cell in enumerate(row):
-                    target_cell = dst_sheet.cell(row=start_row + i, column=start_col + j)
-                    target_cell.value = cell.value
-        
+        copy_range(src_sheet, source_range, dst_sheet, dest_start, formats=formats, journal=journal)
         return wb
     except Exception as e:
-        st.error(f"Error copying data: {str(e)}")
+        show_error(f"Error copying data: {str(e)}")
         return wb
 
 
+@instrumented
 def delete_rows_by_condition(df, column, condition, value):
     """
     Delete rows based on condition
@@ -213,11 +208,33 @@ def delete_rows_by_condition(df, column, condition, value):
         deleted_count = len(df) - len(filtered_df)
         return filtered_df, deleted_count
     except Exception as e:
-        st.error(f"Error deleting rows: {str(e)}")
+        show_error(f"Error deleting rows: {str(e)}")
         return df, 0
 
 
-def find_and_replace(wb, find_text, replace_text, match_case=False, match_entire=False, sheet_name=None):
+def _replace_cells(cells, find_text, replace_text, match_case, match_entire):
+    """(row, column, old text, new text) of the cells of one sheet to rewrite"""
+    search_value = find_text if match_case else find_text.lower()
+    changes = []
+    for row, col, value in cells:
+        cell_value = str(value)
+        compare_value = cell_value if match_case else cell_value.lower()
+        if match_entire:
+            if compare_value == search_value:
+                changes.append((row, col, cell_value, replace_text))
+        elif search_value in compare_value:
+            if match_case:
+                new_value = cell_value.replace(find_text, replace_text)
+            else:
+                # Case-insensitive replace
+                new_value = re.sub(re.escape(find_text), replace_text, cell_value, flags=re.IGNORECASE)
+            changes.append((row, col, cell_value, new_value))
+    return changes
+
+
+@instrumented
+def find_and_replace(wb, find_text, replace_text, match_case=False, match_entire=False, sheet_name=None,
+                     journal=None):
     """
     Find and replace text in workbook
     
@@ -228,6 +245,7 @@ def find_and_replace(wb, find_text, replace_text, match_case=False, match_entire
         match_case: Whether to match case
         match_entire: Whether to match entire cell
         sheet_name: Specific sheet name or None for all sheets
+        journal: Optional Operation recording the change for undo
         
     Returns:
         Tuple of (modified workbook, replacements DataFrame)
@@ -238,39 +256,335 @@ def find_and_replace(wb, find_text, replace_text, match_case=False, match_entire
         
         for sname in sheets_to_search:
             sheet = wb[sname]
-            for row in sheet.iter_rows():
-                for cell in row:
-                    if cell.value:
-                        cell_value = str(cell.value)
-                        search_value = find_text if match_case else find_text.lower()
-                        compare_value = cell_value if match_case else cell_value.lower()
-                        
-                        if match_entire:
-                            if compare_value == search_value:
-                                cell.value = replace_text
-                                replacements.append({
-                                    'Sheet': sname,
-                                    'Cell': cell.coordinate,
-                                    'Old Value': cell_value,
-                                    'New Value': replace_text
-                                })
-                        else:
-                            if search_value in compare_value:
-                                if match_case:
-                                    new_value = cell_value.replace(find_text, replace_text)
-                                else:
-                                    # Case-insensitive replace
-                                    new_value = re.sub(re.escape(find_text), replace_text, cell_value, flags=re.IGNORECASE)
-                                
-                                cell.value = new_value
-                                replacements.append({
-                                    'Sheet': sname,
-                                    'Cell': cell.coordinate,
-                                    'Old Value': cell_value,
-                                    'New Value': new_value
-                                })
+            changes = _replace_cells(cell_values(sheet), find_text, replace_text, match_case, match_entire)
+            for row, col, cell_value, new_value in changes:
+                if journal is not None:
+                    journal.cell(sheet, row, col)
+                sheet.cell(row=row, column=col).value = new_value
+                replacements.append({
+                    'Sheet': sname,
+                    'Cell': f"{get_column_letter(col)}{row}",
+                    'Old Value': cell_value,
+                    'New Value': new_value
+                })
         
         return wb, pd.DataFrame(replacements)
     except Exception as e:
-        st.error(f"Error in find and replace: {str(e)}")
+        show_error(f"Error in find and replace: {str(e)}")
         return wb, pd.DataFrame()
+
+
+@instrumented
+def find_and_replace_dataframe(df, find_text, replace_text, match_case=False, match_entire=False):
+    """
+    Find and replace text in a DataFrame using vectorized string operations
+    
+    Mirrors find_and_replace: cells are compared as strings and replaced
+    cells become strings, other cells keep their type.
+    
+    Args:
+        df: pandas DataFrame
+        find_text: Text to find
+        replace_text: Replacement text
+        match_case: Whether to match case
+        match_entire: Whether to match entire cell
+        
+    Returns:
+        Tuple of (new DataFrame, number of replaced cells)
+    """
+    try:
+        result_df = df.copy()
+        flags = 0 if match_case else re.IGNORECASE
+        pattern = re.escape(find_text)
+        if match_entire:
+            pattern = f"^{pattern}$"
+        
+        replaced = 0
+        for col in result_df.columns:
+            values = result_df[col]
+            text = values.astype(str).where(values.notna())
+            mask = text.str.contains(pattern, flags=flags, regex=True, na=False)
+            if mask.any():
+                new_values = text[mask].str.replace(pattern, replace_text.replace('\\', r'\\'), flags=flags, regex=True)
+                result_df[col] = values.astype(object).where(~mask, new_values)
+                replaced += int(mask.sum())
+        
+        return result_df, replaced
+    except Exception as e:
+        show_error(f"Error in find and replace: {str(e)}")
+        return df, 0
+
+
+def _key_as_text(series):
+    """Normalize a key column to trimmed text ('1001.0' floats become '1001')"""
+    if pd.api.types.is_float_dtype(series):
+        valid = series.dropna()
+        if (valid == valid.round()).all():
+            series = series.astype('Int64')
+    return series.astype(str).str.strip().where(series.notna())
+
+
+def _join_keys(df, keys, as_text):
+    """Return the key columns of a DataFrame, optionally normalized to trimmed text"""
+    key_df = df[keys]
+    if as_text:
+        key_df = key_df.apply(_key_as_text)
+    return key_df
+
+
+@instrumented
+def join_sheets(left_df, right_df, left_keys, right_keys, how="left", lookup_columns=None,
+                keys_as_text=False, dedupe_lookup=False):
+    """
+    Join (VLOOKUP-style) a sheet against a lookup sheet on one or more key columns
+    
+    Uses a hash join: the lookup keys are hashed once and every row of the
+    main sheet probes that table, so cost grows linearly with both inputs.
+    
+    Args:
+        left_df: Main DataFrame (every row is kept for 'left' joins)
+        right_df: Lookup DataFrame
+        left_keys: Key column names in left_df
+        right_keys: Matching key column names in right_df (same order)
+        how: 'left', 'inner' or 'anti' (rows of left_df with no match)
+        lookup_columns: Columns to bring from right_df (None for all non-key columns)
+        keys_as_text: Compare keys as trimmed text (e.g. 1001 matches '1001 ')
+        dedupe_lookup: Keep only the first lookup row per key to avoid row multiplication
+        
+    Returns:
+        Tuple of (joined DataFrame, diagnostics dict) or (None, {}) on error
+    """
+    try:
+        if len(left_keys) != len(right_keys) or not left_keys:
+            raise ValueError("Select the same number of key columns on both sides")
+        
+        left_key_df = _join_keys(left_df, left_keys, keys_as_text)
+        right_key_df = _join_keys(right_df, right_keys, keys_as_text)
+        key_names = [f"__key_{i}" for i in range(len(left_keys))]
+        left_key_df.columns = key_names
+        right_key_df.columns = key_names
+        
+        # Blank keys never match (unlike pandas, which pairs NaN with NaN)
+        right_valid = right_key_df.notna().all(axis=1)
+        left_valid = left_key_df.notna().all(axis=1)
+        right_key_df = right_key_df[right_valid]
+        
+        # Duplicate-key diagnostics on the lookup side
+        lookup_duplicated = right_key_df.duplicated(keep=False)
+        duplicate_keys = right_key_df[lookup_duplicated].drop_duplicates()
+        
+        right_index = pd.MultiIndex.from_frame(right_key_df)
+        left_index = pd.MultiIndex.from_frame(left_key_df)
+        matched_mask = left_index.isin(right_index) & left_valid.to_numpy()
+        
+        diagnostics = {
+            'Main rows': len(left_df),
+            'Lookup rows': len(right_df),
+            'Matched main rows': int(matched_mask.sum()),
+            'Unmatched main rows': int((~matched_mask).sum()),
+            'Duplicate lookup keys': len(duplicate_keys),
+            'Lookup rows with duplicate keys': int(lookup_duplicated.sum()),
+            'Duplicate key sample': duplicate_keys.head(10).set_axis(right_keys, axis=1),
+        }
+        
+        if how == "anti":
+            result = left_df[~matched_mask]
+        else:
+            if lookup_columns is None:
+                lookup_columns = [c for c in right_df.columns if c not in right_keys]
+            right_part = pd.concat([right_key_df, right_df.loc[right_valid, lookup_columns]], axis=1)
+            if dedupe_lookup:
+                right_part = right_part[~right_key_df.duplicated(keep='first')]
+            
+            left_part = pd.concat([left_key_df.where(left_valid, None), left_df], axis=1)
+            result = left_part.merge(right_part, how=how, on=key_names, suffixes=("", "_lookup"), sort=False)
+            result = result.drop(columns=key_names)
+        
+        diagnostics['Result rows'] = len(result)
+        return result, diagnostics
+    except Exception as e:
+        show_error(f"Error joining sheets: {str(e)}")
+        return None, {}
+
+
+def iter_sheet_frames(df_dict, source="Workbook"):
+    """Yield (source, sheet name, DataFrame) for every loaded sheet"""
+    for sheet_name, df in df_dict.items():
+        yield source, sheet_name, df
+
+
+def iter_file_frames(files, chunk_size=DEDUP_CHUNK_ROWS):
+    """
+    Yield (file name, sheet name, DataFrame) for uploaded files or paths
+    
+    Only one file is held in memory at a time; CSV files are read in chunks
+    of `chunk_size` rows (consecutive chunks share the same file/sheet label).
+    """
+    for file in files:
+        name = os.path.basename(getattr(file, 'name', str(file)))
+        if hasattr(file, 'seek'):
+            file.seek(0)
+        if name.lower().endswith('.csv'):
+            for chunk in pd.read_csv(file, chunksize=chunk_size):
+                yield name, 'CSV', chunk
+        else:
+            for sheet_name, df in pd.read_excel(file, sheet_name=None).items():
+                yield name, sheet_name, df
+
+
+def _normalize_dedup_keys(df, key_columns, trim=True, casefold=True, tolerance=0.0):
+    """Normalize key columns so equivalent values hash identically"""
+    normalized = {}
+    for col in key_columns:
+        series = df[col]
+        if pd.api.types.is_object_dtype(series) and \
+                pd.api.types.infer_dtype(series, skipna=True) in ('integer', 'floating', 'mixed-integer-float'):
+            series = pd.to_numeric(series)
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            series = series.astype('float64')
+            if tolerance:
+                # Values are bucketed to the nearest multiple of the tolerance
+                series = (series / tolerance).round()
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            text = series.astype(str)
+            if trim:
+                text = text.str.strip()
+            if casefold:
+                text = text.str.casefold()
+            series = text.where(series.notna(), None)
+        normalized[col] = series.to_numpy()
+    return pd.DataFrame(normalized)
+
+
+@instrumented
+def scan_duplicate_keys(frame_source, key_columns=None, trim=True, casefold=True, tolerance=0.0,
+                        per_sheet=False, chunk_size=DEDUP_CHUNK_ROWS):
+    """
+    First pass of duplicate detection: hash the key tuple of every row
+    
+    Only the 8-byte hashes are kept, so file sets larger than memory can be
+    scanned. Rows are normalized and hashed in vectorized batches of
+    `chunk_size` rows.
+    
+    Args:
+        frame_source: Callable returning an iterator of (source, sheet, DataFrame)
+        key_columns: Columns forming the key (None for all columns)
+        trim: Ignore leading/trailing whitespace in text
+        casefold: Ignore case in text
+        tolerance: Numbers within the same tolerance bucket are equal (0 for exact)
+        per_sheet: Only count rows as duplicates within the same sheet
+        chunk_size: Rows normalized and hashed per batch
+        
+    Returns:
+        Scan dictionary with per-frame hash arrays (None for skipped frames),
+        duplicate/first-occurrence masks and skipped sheet labels
+    """
+    hashes = []
+    skipped = []
+    frame_ids = {}
+    for source, sheet_name, df in frame_source():
+        label = (source, sheet_name)
+        columns = key_columns or list(df.columns)
+        if any(col not in df.columns for col in columns):
+            hashes.append(None)
+            skipped.append(label)
+            continue
+        frame_id = frame_ids.setdefault(label, len(frame_ids))
+        parts = []
+        for start in range(0, len(df), chunk_size):
+            key_df = _normalize_dedup_keys(df.iloc[start:start + chunk_size], columns, trim, casefold, tolerance)
+            if per_sheet:
+                key_df.insert(0, '\x00sheet', frame_id)
+            parts.append(pd.util.hash_pandas_object(key_df, index=False).to_numpy())
+        hashes.append(np.concatenate(parts) if parts else np.empty(0, dtype='uint64'))
+    
+    all_hashes = np.concatenate([h for h in hashes if h is not None] or [np.empty(0, dtype='uint64')])
+    duplicated = pd.Series(all_hashes).duplicated(keep=False).to_numpy()
+    return {
+        'hashes': hashes,
+        'duplicated': duplicated,
+        'first': ~pd.Series(all_hashes).duplicated(keep='first').to_numpy(),
+        'clusters': pd.unique(all_hashes[duplicated]),
+        'skipped': list(dict.fromkeys(skipped)),
+    }
+
+
+@instrumented
+def duplicate_clusters(frame_source, scan, key_columns=None):
+    """
+    Second pass of duplicate detection: collect the rows of every duplicate cluster
+    
+    Args:
+        frame_source: Same callable passed to scan_duplicate_keys
+        scan: Result of scan_duplicate_keys
+        key_columns: Columns to show (None for all columns)
+        
+    Returns:
+        Tuple of (DataFrame with Cluster, Source, Sheet, Row and key columns, summary dict)
+    """
+    cluster_index = pd.Index(scan['clusters'])
+    parts = []
+    offsets = {}
+    cursor = 0
+    for (source, sheet_name, df), frame_hashes in zip(frame_source(), scan['hashes']):
+        if frame_hashes is None:
+            continue
+        offset = offsets.get((source, sheet_name), 0)
+        offsets[(source, sheet_name)] = offset + len(df)
+        mask = scan['duplicated'][cursor:cursor + len(df)]
+        cursor += len(df)
+        if not mask.any():
+            continue
+        rows = df.loc[mask, key_columns or list(df.columns)].reset_index(drop=True)
+        rows.insert(0, 'Row', np.flatnonzero(mask) + offset + 2)
+        rows.insert(0, 'Sheet', sheet_name)
+        rows.insert(0, 'Source', source)
+        rows.insert(0, 'Cluster', cluster_index.get_indexer(frame_hashes[mask]) + 1)
+        parts.append(rows)
+    
+    clusters_df = pd.concat(parts).sort_values('Cluster', kind='stable').reset_index(drop=True) if parts \
+        else pd.DataFrame(columns=['Cluster', 'Source', 'Sheet', 'Row'] + list(key_columns or []))
+    summary = {
+        'Rows scanned': len(scan['first']),
+        'Duplicate clusters': len(scan['clusters']),
+        'Rows in clusters': int(scan['duplicated'].sum()),
+        'Removable rows': int((~scan['first']).sum()),
+        'Skipped sheets': ', '.join(f"{source}/{sheet}" for source, sheet in scan['skipped']),
+    }
+    return clusters_df, summary
+
+
+@instrumented
+def find_duplicates(frame_source, key_columns=None, trim=True, casefold=True, tolerance=0.0, per_sheet=False):
+    """
+    Find duplicate rows within a sheet, across sheets or across files
+    
+    Returns:
+        Tuple of (clusters DataFrame, summary dict, scan) or (None, {}, None) on error
+    """
+    try:
+        scan = scan_duplicate_keys(frame_source, key_columns, trim, casefold, tolerance, per_sheet)
+        clusters_df, summary = duplicate_clusters(frame_source, scan, key_columns)
+        return clusters_df, summary, scan
+    except Exception as e:
+        show_error(f"Error finding duplicates: {str(e)}")
+        return None, {}, None
+
+
+def iter_deduplicated_frames(frame_source, scan, prefix_source=False):
+    """
+    Yield (sheet name, DataFrame) with only the first occurrence of each key kept
+    
+    Skipped sheets are passed through unchanged. Intended for
+    dataframe_to_excel_bytes, which streams consecutive chunks into one sheet.
+    """
+    cursor = 0
+    for (source, sheet_name, df), frame_hashes in zip(frame_source(), scan['hashes']):
+        title = f"{os.path.splitext(source)[0]}_{sheet_name}" if prefix_source else str(sheet_name)
+        title = re.sub(r'[\\/*?:\[\]]', '_', title)[:31]
+        if frame_hashes is None:
+            yield title, df
+            continue
+        keep = scan['first'][cursor:cursor + len(df)]
+        cursor += len(df)
+        yield title, df[keep]
@@ -0,0 +1,197 @@
+"""
+Column Profiling
+Profile every column of a sheet in one call: nulls, distinct count, min/max,
+histogram, top values and inferred type
+
+Each column is hashed once (vectorized); the hashes give both the sheet's
+content fingerprint, under which finished profiles are cached for every
+session, and the input of the HyperLogLog distinct count used for long
+columns. Everything else is a handful of NumPy/pandas reductions per column,
+so the sheet is never rescanned per statistic.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from src.utils.hyperloglog import HyperLogLog
+from src.utils.notifications import show_error
+from src.utils.instrumentation import instrumented
+from src.config.settings import (
+    PROFILE_EXACT_ROWS, PROFILE_TOP_K, PROFILE_TOPK_MAX_DISTINCT, PROFILE_HISTOGRAM_BINS, PROFILE_CACHE_SIZE
+)
+
+_cache = OrderedDict()  # fingerprint -> (profile DataFrame, histograms)
+_cache_lock = threading.Lock()
+
+_TYPE_NAMES = {
+    'integer': 'integer',
+    'floating': 'float',
+    'mixed-integer-float': 'float',
+    'decimal': 'float',
+    'string': 'text',
+    'boolean': 'boolean',
+    'datetime64': 'datetime',
+    'datetime': 'datetime',
+    'date': 'date',
+    'time': 'time',
+    'timedelta64': 'duration',
+    'timedelta': 'duration',
+    'empty': 'empty',
+}
+
+_NUMBER_PATTERN = r"\s*[+-]?(?:\d[\d,]*\.?\d*|\.\d+)(?:[eE][+-]?\d+)?\s*"
+
+
+def column_hashes(df):
+    """
+    Hash every column of a DataFrame
+
+    Returns:
+        Dictionary of {column: uint64 array}, one hash per row
+    """
+    return {
+        col: pd.util.hash_pandas_object(df[col], index=False, categorize=False).to_numpy()
+        for col in df.columns
+    }
+
+
+def sheet_fingerprint(df, hashes=None):
+    """
+    Content fingerprint of a DataFrame (column names, order and values)
+
+    Args:
+        df: pandas DataFrame
+        hashes: Column hashes from column_hashes, if already computed
+
+    Returns:
+        Hex digest
+    """
+    hashes = hashes if hashes is not None else column_hashes(df)
+    digest = hashlib.sha256(repr((list(map(str, df.columns)), df.shape)).encode())
+    for col in df.columns:
+        digest.update(hashes[col].tobytes())
+    return digest.hexdigest()
+
+
+def _format(value):
+    if isinstance(value, (float, np.floating)):
+        return f"{value:.6g}"
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat(sep=' ') if value != value.normalize() else value.date().isoformat()
+    return str(value)
+
+
+def _histogram(values):
+    """Equal-width histogram as a (Range, Count) DataFrame"""
+    is_datetime = pd.api.types.is_datetime64_any_dtype(values)
+    data = values.to_numpy().astype('int64' if is_datetime else 'float64')
+    counts, edges = np.histogram(data, bins=PROFILE_HISTOGRAM_BINS)
+    if is_datetime:
+        edges = pd.to_datetime(edges.astype('int64'), unit=np.datetime_data(values.dtype)[0])
+    labels = [f"{_format(lo)} – {_format(hi)}" for lo, hi in zip(edges[:-1], edges[1:])]
+    return pd.DataFrame({'Range': labels, 'Count': counts})
+
+
+def _infer_type(values):
+    """Friendly type name of the non-empty values ('text (numbers)' for numeric text)"""
+    inferred = _TYPE_NAMES.get(pd.api.types.infer_dtype(values, skipna=True), 'mixed')
+    if inferred == 'text' and len(values):
+        looks_numeric = values.astype('string').str.fullmatch(_NUMBER_PATTERN)
+        if looks_numeric.all():
+            inferred = 'text (numbers)'
+    return inferred
+
+
+def _profile_column(col, series, hashes):
+    """Profile row and histogram (or None) of one column"""
+    rows = len(series)
+    present = series.notna().to_numpy()
+    values = series[present]
+    inferred = _infer_type(values)
+
+    if rows > PROFILE_EXACT_ROWS:
+        sketch = HyperLogLog()
+        sketch.add_hashes(hashes[present])
+        distinct, approximate = min(sketch.count(), len(values)), True
+    else:
+        distinct, approximate = len(pd.unique(hashes[present])), False
+
+    # Top values only make sense when values repeat
+    top = ""
+    if distinct and distinct < len(values) and distinct <= PROFILE_TOPK_MAX_DISTINCT:
+        counts = values.value_counts().head(PROFILE_TOP_K)
+        top = "; ".join(f"{_format(value)} ({count})" for value, count in counts.items())
+
+    minimum = maximum = mean = None
+    histogram = None
+    if len(values):
+        if inferred in ('integer', 'float', 'datetime', 'date') and (
+                pd.api.types.is_numeric_dtype(values) or pd.api.types.is_datetime64_any_dtype(values)):
+            minimum, maximum = _format(values.min()), _format(values.max())
+            if pd.api.types.is_numeric_dtype(values):
+                mean = float(values.mean())
+            histogram = _histogram(values)
+        elif inferred.startswith('text'):
+            text = values.astype('string')
+            minimum, maximum = text.min(), text.max()
+
+    profile = {
+        'Column': str(col),
+        'Type': inferred,
+        'Rows': rows,
+        'Nulls': rows - len(values),
+        'Null %': round(100 * (rows - len(values)) / rows, 2) if rows else 0.0,
+        'Distinct': distinct,
+        'Distinct is estimate': approximate,
+        'Min': minimum,
+        'Max': maximum,
+        'Mean': mean,
+        f'Top {PROFILE_TOP_K} values': top,
+        'Histogram': " | ".join(str(count) for count in histogram['Count']) if histogram is not None else "",
+    }
+    return profile, histogram
+
+
+@instrumented
+def profile_sheet(df):
+    """
+    Profile every column of a sheet
+
+    Results are cached by content fingerprint, so profiling an unchanged sheet
+    again (from any session) only costs the hashing.
+
+    Args:
+        df: pandas DataFrame
+
+    Returns:
+        Tuple of (profile DataFrame with one row per column,
+        dictionary of {column: histogram DataFrame} for numeric/date columns),
+        or (None, {}) on error
+    """
+    try:
+        hashes = column_hashes(df)
+        key = sheet_fingerprint(df, hashes)
+        with _cache_lock:
+            if key in _cache:
+                _cache.move_to_end(key)
+                return _cache[key]
+
+        rows = []
+        histograms = {}
+        for col in df.columns:
+            profile, histogram = _profile_column(col, df[col], hashes[col])
+            rows.append(profile)
+            if histogram is not None:
+                histograms[str(col)] = histogram
+        result = (pd.DataFrame(rows), histograms)
+
+        with _cache_lock:
+            _cache[key] = result
+            while len(_cache) > PROFILE_CACHE_SIZE:
+                _cache.popitem(last=False)
+        return result
+    except Exception as e:
+        show_error(f"Error profiling sheet: {str(e)}")
+        return None, {}
@@ -0,0 +1,371 @@
+"""
+Column Transforms
+Vectorized data cleaning over whole columns: trim, case, regex, type coercion,
+date parsing, fill-empty, split/concatenate and arithmetic
+
+A transform is a list of JSON-friendly steps, so it can be previewed on a
+sample, applied to the full sheet and recorded in a pipeline unchanged:
+
+    {"op": "trim", "columns": ["Name", "City"]}
+    {"op": "replace", "columns": ["Phone"], "params": {"pattern": "[^0-9]", "replacement": ""}}
+    {"op": "arithmetic", "columns": ["Price"], "params": {"operator": "*", "operand": 1.2},
+     "target": "Price incl. VAT"}
+
+Every step runs as a pandas kernel over the column. Text cells go through
+Arrow string kernels when pyarrow is installed; numbers and dates in a mixed
+column are left alone by text steps.
+"""
+
+import re
+import numpy as np
+import pandas as pd
+from src.utils.notifications import show_error
+from src.utils.instrumentation import instrumented
+from src.config.settings import TRANSFORM_PREVIEW_ROWS
+
+try:
+    import pyarrow  # noqa: F401 (only needed for the Arrow-backed string dtype)
+    TEXT_DTYPE = pd.StringDtype("pyarrow")
+except ImportError:
+    TEXT_DTYPE = pd.StringDtype()
+
+
+def _text_mask(series):
+    """Boolean mask of the cells holding text (None if the column has none)"""
+    if isinstance(series.dtype, pd.StringDtype):
+        return series.notna()
+    if series.dtype != object:
+        return None
+    if pd.api.types.infer_dtype(series, skipna=True) == 'string':
+        return series.notna()
+    try:
+        mask = series.str.len().notna()
+    except AttributeError:  # No strings at all
+        return None
+    return mask if mask.any() else None
+
+
+def _map_text(series, fn):
+    """Apply a string kernel to the text cells of a column, keeping the other cells as they are"""
+    mask = _text_mask(series)
+    if mask is None:
+        return series
+    if mask.all():
+        return fn(series.astype(TEXT_DTYPE).str)
+    result = fn(series[mask].astype(TEXT_DTYPE).str)
+    return series.where(~mask, result.astype(object))
+
+
+def _as_text(series):
+    """Every non-empty cell as text (whole-number floats without the '.0')"""
+    if pd.api.types.is_float_dtype(series):
+        valid = series.dropna()
+        if len(valid) and (valid == valid.round()).all():
+            series = series.astype('Int64')
+    return series.astype(TEXT_DTYPE)
+
+
+_NUMBER_PATTERN = r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?"
+
+
+def _as_number(series):
+    """Numbers as floats, numeric text parsed (thousands separators and padding allowed), anything else empty"""
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series
+    mask = _text_mask(series)
+    if mask is None:
+        return pd.to_numeric(series, errors='coerce')
+
+    # Validate with a regex kernel and cast only the matching text, instead of
+    # letting to_numeric parse string by string
+    text = series[mask].astype(TEXT_DTYPE).str.replace(",", "", regex=False).str.strip()
+    valid = text.str.fullmatch(_NUMBER_PATTERN).fillna(False).astype(bool)
+    numbers = pd.Series(np.nan, index=series.index)
+    numbers[valid[valid].index] = text[valid].astype('float64')
+    if not mask.all():
+        others = series[~mask]
+        numbers[others.index] = pd.to_numeric(others, errors='coerce')
+    return numbers
+
+
+def _trim(series, params, df):
+    return _map_text(series, lambda s: s.strip())
+
+
+def _upper(series, params, df):
+    return _map_text(series, lambda s: s.upper())
+
+
+def _lower(series, params, df):
+    return _map_text(series, lambda s: s.lower())
+
+
+def _title(series, params, df):
+    return _map_text(series, lambda s: s.title())
+
+
+def _extract(series, params, df):
+    pattern = params['pattern']
+    flags = 0 if params.get('match_case', True) else re.IGNORECASE
+    if re.compile(pattern).groups == 0:
+        pattern = f"({pattern})"
+    return _map_text(series, lambda s: s.extract(pattern, flags=flags, expand=True)[0])
+
+
+def _replace(series, params, df):
+    flags = 0 if params.get('match_case', True) else re.IGNORECASE
+    return _map_text(series, lambda s: s.replace(params['pattern'], params.get('replacement', ''),
+                                                 flags=flags, regex=True))
+
+
+def _number(series, params, df):
+    return _as_number(series)
+
+
+def _integer(series, params, df):
+    return _as_number(series).round().astype('Int64')
+
+
+def _text(series, params, df):
+    return _as_text(series)
+
+
+def _date(series, params, df):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    if pd.api.types.is_numeric_dtype(series):
+        # Excel serial day numbers
+        return pd.to_datetime(series, unit='D', origin='1899-12-30', errors='coerce')
+    return pd.to_datetime(series, format=params.get('format') or None,
+                          dayfirst=params.get('dayfirst', False), errors='coerce')
+
+
+def _fill(series, params, df):
+    method = params.get('method', 'value')
+    if method == 'previous':
+        return series.ffill()
+    if method == 'next':
+        return series.bfill()
+    value = params.get('value', '')
+    if pd.api.types.is_numeric_dtype(series):
+        try:
+            value = float(value)
+        except ValueError:
+            series = series.astype(object)
+    return series.fillna(value)
+
+
+def _arithmetic(series, params, df):
+    numbers = _as_number(series)
+    operator = params['operator']
+    if operator == 'round':
+        return numbers.round(int(params.get('operand') or 0))
+    if params.get('operand_column'):
+        operand = _as_number(df[params['operand_column']])
+    else:
+        operand = float(params['operand'])
+
+    if operator == '+':
+        result = numbers + operand
+    elif operator == '-':
+        result = numbers - operand
+    elif operator == '*':
+        result = numbers * operand
+    elif operator == '/':
+        result = numbers / operand
+    else:
+        raise ValueError(f"Unknown operator: {operator}")
+    # Division by zero leaves the cell empty rather than writing inf
+    return result.replace([np.inf, -np.inf], np.nan)
+
+
+_COLUMN_KERNELS = {
+    'trim': _trim,
+    'upper': _upper,
+    'lower': _lower,
+    'title': _title,
+    'extract': _extract,
+    'replace': _replace,
+    'number': _number,
+    'integer': _integer,
+    'text': _text,
+    'date': _date,
+    'fill': _fill,
+    'arithmetic': _arithmetic,
+}
+
+
+def _split(df, step):
+    """Split each column on a separator into <column>_1, <column>_2, ... (appended at the end)"""
+    params = step.get('params', {})
+    parts = int(params.get('parts') or 2)
+    written = []
+    for col in step['columns']:
+        pieces = _as_text(df[col]).str.split(params.get('separator', ' '), n=parts - 1, regex=False, expand=True)
+        for i in range(parts):
+            name = f"{col}_{i + 1}"
+            df[name] = pieces[i] if i in pieces.columns else pd.Series(pd.NA, index=df.index, dtype=TEXT_DTYPE)
+            written.append(name)
+    return written
+
+
+def _concat(df, step):
+    """Join the columns' text into one column (empty cells are skipped)"""
+    params = step.get('params', {})
+    separator = params.get('separator', ' ')
+    target = step.get('target') or "Combined"
+    texts = [_as_text(df[col]) for col in step['columns']]
+    # str.cat keeps the separators around missing values, so join the non-empty parts explicitly
+    combined = texts[0].fillna('')
+    has_value = texts[0].notna()
+    for text in texts[1:]:
+        combined = combined + np.where(has_value & text.notna(), separator, '') + text.fillna('')
+        has_value |= text.notna()
+    df[target] = combined.where(has_value)
+    return [target]
+
+
+def apply_transform(df, step):
+    """
+    Apply one transform step to a DataFrame in place
+
+    Args:
+        df: pandas DataFrame (modified in place)
+        step: {"op": str, "columns": [...], "params": {...}, "target": optional output column}
+
+    Returns:
+        List of columns written
+    """
+    op = step['op']
+    missing = [col for col in step['columns'] if col not in df.columns]
+    if missing:
+        raise ValueError(f"Column(s) not found: {', '.join(map(str, missing))}")
+    if op == 'split':
+        return _split(df, step)
+    if op == 'concat':
+        return _concat(df, step)
+    if op not in _COLUMN_KERNELS:
+        raise ValueError(f"Unknown transform: {op}")
+
+    kernel = _COLUMN_KERNELS[op]
+    params = step.get('params', {})
+    # A target column only makes sense for a single input column
+    target = step.get('target') if len(step['columns']) == 1 else None
+    written = []
+    for col in step['columns']:
+        out = target or col
+        df[out] = kernel(df[col], params, df)
+        written.append(out)
+    return written
+
+
+@instrumented
+def apply_transforms(df, steps):
+    """
+    Apply transform steps to a copy of a DataFrame
+
+    Args:
+        df: pandas DataFrame
+        steps: List of transform steps
+
+    Returns:
+        Tuple of (new DataFrame, list of columns written) or (None, []) on error
+    """
+    try:
+        result_df = df.copy()
+        written = []
+        for step in steps:
+            for col in apply_transform(result_df, step):
+                if col not in written:
+                    written.append(col)
+        return result_df, written
+    except Exception as e:
+        show_error(f"Error transforming columns: {str(e)}")
+        return None, []
+
+
+@instrumented
+def preview_transforms(df, steps, rows=TRANSFORM_PREVIEW_ROWS):
+    """
+    Run the steps on the first rows of a sheet
+
+    Args:
+        df: pandas DataFrame
+        steps: List of transform steps
+        rows: Sample size
+
+    Returns:
+        Tuple of (before DataFrame, after DataFrame) restricted to the columns
+        the steps read or write, or (None, None) on error
+    """
+    sample = df.head(rows)
+    result_df, written = apply_transforms(sample, steps)
+    if result_df is None:
+        return None, None
+    read = [col for step in steps for col in step['columns']]
+    before_cols = list(dict.fromkeys(col for col in read + written if col in sample.columns))
+    return sample[before_cols], result_df[list(dict.fromkeys(read + written))]
+
+
+def changed_mask(before, after):
+    """Boolean array of the cells whose value differs (empty vs empty counts as unchanged)"""
+    before_values = before.astype(object).where(before.notna(), None).to_numpy()
+    after_values = after.astype(object).where(after.notna(), None).to_numpy()
+    return before_values != after_values
+
+
+def _cell_values(series):
+    """Column values as Python objects openpyxl can store (empty cells become None)"""
+    values = series.astype(object)
+    return values.where(series.notna(), None).tolist()
+
+
+@instrumented
+def write_transformed_columns(ws, df, result_df, columns, journal=None):
+    """
+    Write transformed columns back to a worksheet in bulk
+
+    The sheet is assumed to hold the DataFrame with its header on row 1
+    (as read by read_excel). Existing columns keep their position and only the
+    cells whose value changed are written; formula cells are left untouched.
+    New columns are added after the last column.
+
+    Args:
+        ws: openpyxl Worksheet
+        df: DataFrame the transform started from
+        result_df: Transformed DataFrame
+        columns: Columns to write (as returned by apply_transforms)
+        journal: Optional Operation recording the change for undo
+
+    Returns:
+        Number of cells written
+    """
+    positions = {col: i + 1 for i, col in enumerate(df.columns)}
+    next_col = max(len(df.columns), ws.max_column) + 1
+    store = ws._cells
+    written = 0
+
+    for col in columns:
+        after = result_df[col]
+        if col in positions:
+            col_idx = positions[col]
+            rows = np.flatnonzero(changed_mask(df[col], after))
+        else:
+            col_idx = next_col
+            next_col += 1
+            if journal is not None:
+                journal.cell(ws, 1, col_idx)
+            ws.cell(row=1, column=col_idx).value = col
+            rows = np.flatnonzero(after.notna().to_numpy())
+
+        values = _cell_values(after)
+        for i in rows.tolist():
+            row = i + 2
+            cell = store.get((row, col_idx))
+            if cell is not None and cell.data_type == 'f':
+                continue
+            if journal is not None:
+                journal.cell(ws, row, col_idx)
+            ws.cell(row=row, column=col_idx).value = values[i]
+            written += 1
+    return written
@@ -1,14 +1,18 @@
 """
 Data Analysis and Visualization
-Functions for charts, statistics, pivot tables, filtering, and search
+Functions for charts, statistics, pivot tables, time series, filtering, and search
 """
 
-import streamlit as st
 import pandas as pd
-import plotly.express as px
 import re
+from openpyxl.utils import get_column_letter
+from src.utils.notifications import show_error
+from src.utils.instrumentation import instrumented
+from src.utils.sheet_executor import THREAD, cell_values, map_sheets
+from src.config.settings import TIME_FREQUENCIES, SHEET_WORKERS
 
 
+@instrumented
 def create_chart(df, chart_type, x_col, y_col, title="Chart"):
     """
     Create interactive charts using Plotly
@@ -17,12 +21,14 @@ def create_chart(df, chart_type, x_col, y_col, title="Chart"):
         df: pandas DataFrame
         chart_type: Type of chart (Bar Chart, Line Chart, Pie Chart, Scatter Plot)
         x_col: Column name for X-axis
-        y_col: Column name for Y-axis
+        y_col: Column name for Y-axis (or a list of columns for bar and line charts)
         title: Chart title
         
     Returns:
         Plotly figure object or None on error
     """
+    # Imported lazily so headless batch workers don't pay for Plotly
+    import plotly.express as px
     try:
         if chart_type == "Bar Chart":
             fig = px.bar(df, x=x_col, y=y_col, title=title)
@@ -38,10 +44,11 @@ def create_chart(df, chart_type, x_col, y_col, title="Chart"):
         fig.update_layout(template="plotly_white")
         return fig
     except Exception as e:
-        st.error(f"Error creating chart: {str(e)}")
+        show_error(f"Error creating chart: {str(e)}")
         return None
 
 
+@instrumented
 def calculate_statistics(df, columns):
     """
     Calculate statistics for selected columns
@@ -77,10 +84,41 @@ def calculate_statistics(df, columns):
         stats_df = pd.DataFrame(stats_dict).T
         return stats_df
     except Exception as e:
-        st.error(f"Error calculating statistics: {str(e)}")
+        show_error(f"Error calculating statistics: {str(e)}")
         return None
 
 
+@instrumented
+def workbook_statistics(frames, workers=SHEET_WORKERS):
+    """
+    Calculate statistics for every column of every sheet
+    
+    Sheets are described side by side on a thread pool (the pandas kernels
+    release the GIL) and stacked in sheet order.
+    
+    Args:
+        frames: Dictionary of {sheet_name: DataFrame}
+        workers: Threads (None for all cores, 1 to run inline)
+        
+    Returns:
+        DataFrame with Sheet and Column followed by the statistics, or None on error
+    """
+    try:
+        sheets = [(name, df) for name, df in frames.items() if len(df.columns)]
+        results = map_sheets(calculate_statistics, [(df, df.columns.tolist()) for _, df in sheets],
+                             kind=THREAD, workers=workers)
+        parts = [stats_df.rename_axis('Column').reset_index().assign(Sheet=name)
+                 for (name, _), stats_df in zip(sheets, results) if stats_df is not None]
+        if not parts:
+            return pd.DataFrame(columns=['Sheet', 'Column'])
+        result = pd.concat(parts, ignore_index=True)
+        return result[['Sheet', 'Column'] + [c for c in result.columns if c not in ('Sheet', 'Column')]]
+    except Exception as e:
+        show_error(f"Error calculating workbook statistics: {str(e)}")
+        return None
+
+
+@instrumented
 def create_pivot_table(df, index_col, columns_col, values_col, aggfunc):
     """
     Create pivot table from DataFrame
@@ -100,10 +138,105 @@ def create_pivot_table(df, index_col, columns_col, values_col, aggfunc):
                               values=values_col, aggfunc=aggfunc, fill_value=0)
         return pivot
     except Exception as e:
-        st.error(f"Error creating pivot table: {str(e)}")
+        show_error(f"Error creating pivot table: {str(e)}")
+        return None
+
+
+@instrumented
+def build_time_index(df, date_column, dayfirst=False):
+    """
+    Parse a date column once and index the sheet by it
+    
+    Args:
+        df: pandas DataFrame
+        date_column: Column holding dates (datetimes, date text or Excel serial numbers)
+        dayfirst: Whether text dates put the day first (31/12/2024)
+        
+    Returns:
+        Tuple of (DataFrame with a sorted DatetimeIndex, number of rows dropped
+        for having no valid date) or (None, 0) on error
+    """
+    try:
+        dates = df[date_column]
+        if pd.api.types.is_datetime64_any_dtype(dates):
+            parsed = dates
+        elif pd.api.types.is_numeric_dtype(dates):
+            parsed = pd.to_datetime(dates, unit='D', origin='1899-12-30', errors='coerce')
+        else:
+            parsed = pd.to_datetime(dates, dayfirst=dayfirst, errors='coerce', format='mixed')
+        
+        valid = parsed.notna().to_numpy()
+        ts = df.loc[valid].drop(columns=[date_column])
+        ts.index = pd.DatetimeIndex(parsed[valid], name=date_column)
+        if not ts.index.is_monotonic_increasing:
+            ts = ts.sort_index(kind='stable')
+        return ts, int((~valid).sum())
+    except Exception as e:
+        show_error(f"Error parsing dates: {str(e)}")
+        return None, 0
+
+
+@instrumented
+def time_series_analysis(ts, value_columns, frequency=None, aggfunc="sum", window=None, window_type=None,
+                         window_func="mean", change=None, periods=1):
+    """
+    Resample, window and compare a time-indexed sheet
+    
+    Steps run in that order, each as one vectorized pandas operation over all
+    value columns: resample to a calendar frequency, add rolling or expanding
+    window columns, then add period-over-period change columns.
+    
+    Args:
+        ts: DataFrame indexed by build_time_index
+        value_columns: Columns to aggregate
+        frequency: Key of TIME_FREQUENCIES (Day, Week, Month, Quarter, Year) or None to keep every row
+        aggfunc: Aggregation per period (sum, mean, count, min, max)
+        window: Rolling window size: number of periods, or a time span such as '7D' when not resampling
+        window_type: 'rolling', 'expanding' or None
+        window_func: Window aggregation (sum, mean, min, max)
+        change: 'difference', 'percent' or None
+        periods: How many periods back the change compares against
+        
+    Returns:
+        DataFrame with a 'Period' column followed by the value and derived columns, or None on error
+    """
+    try:
+        values = ts[value_columns]
+        if aggfunc != "count":
+            values = values.apply(pd.to_numeric, errors='coerce')
+        
+        if frequency:
+            rule = TIME_FREQUENCIES[frequency]
+            result = values.resample(rule, label='left', closed='left').agg(aggfunc)
+        else:
+            result = values
+        
+        derived = []
+        if window_type == "rolling" and window:
+            window = int(window) if str(window).isdigit() else window
+            rolled = result[value_columns].rolling(window, min_periods=1).agg(window_func)
+            derived.append(rolled.add_suffix(f" (rolling {window_func} {window})"))
+        elif window_type == "expanding":
+            expanded = result[value_columns].expanding().agg(window_func)
+            derived.append(expanded.add_suffix(f" (cumulative {window_func})"))
+        
+        if change == "difference":
+            derived.append(result[value_columns].diff(periods).add_suffix(f" (change vs {periods} back)"))
+        elif change == "percent":
+            pct = result[value_columns].pct_change(periods, fill_method=None) * 100
+            # A change from zero has no percentage
+            pct = pct.replace([float('inf'), float('-inf')], float('nan'))
+            derived.append(pct.add_suffix(f" (% change vs {periods} back)"))
+        
+        if derived:
+            result = pd.concat([result] + derived, axis=1)
+        return result.rename_axis('Period').reset_index()
+    except Exception as e:
+        show_error(f"Error in time series analysis: {str(e)}")
         return None
 
 
+@instrumented
 def filter_data(df, column, condition, value):
     """
     Filter DataFrame based on condition
@@ -131,10 +264,23 @@ def filter_data(df, column, condition, value):
         else:
             return df
     except Exception as e:
-        st.error(f"Error filtering data: {str(e)}")
+        show_error(f"Error filtering data: {str(e)}")
         return df
 
 
+def _match_cells(cells, search_term, case_sensitive):
+    """(row, column, text) of the cells of one sheet containing the term"""
+    search_value = search_term if case_sensitive else search_term.lower()
+    matches = []
+    for row, col, value in cells:
+        cell_value = str(value)
+        compare_value = cell_value if case_sensitive else cell_value.lower()
+        if search_value in compare_value:
+            matches.append((row, col, cell_value))
+    return matches
+
+
+@instrumented
 def search_in_excel(wb, search_term, case_sensitive=False):
     """
     Search for term across all sheets in workbook
@@ -150,21 +296,13 @@ def search_in_excel(wb, search_term, case_sensitive=False):
     results = []
     try:
         for sheet_name in wb.sheetnames:
-            sheet = wb[sheet_name]
-            for row in sheet.iter_rows():
-                for cell in row:
-                    if cell.value:
-                        cell_value = str(cell.value)
-                        search_value = search_term if case_sensitive else search_term.lower()
-                        compare_value = cell_value if case_sensitive else cell_value.lower()
-                        
-                        if search_value in compare_value:
-                            results.append({
-                                'Sheet': sheet_name,
-                                'Cell': cell.coordinate,
-                                'Value': cell_value
-                            })
+            for row, col, cell_value in _match_cells(cell_values(wb[sheet_name]), search_term, case_sensitive):
+                results.append({
+                    'Sheet': sheet_name,
+                    'Cell': f"{get_column_letter(col)}{row}",
+                    'Value': cell_value
+                })
         return pd.DataFrame(results)
     except Exception as e:
-        st.error(f"Error searching: {str(e)}")
+        show_error(f"Error searching: {str(e)}")
         return pd.DataFrame()
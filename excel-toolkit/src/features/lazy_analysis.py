@@ -0,0 +1,213 @@
+"""
+Lazy Analysis Backend (Polars)
+Optional execution engine that fuses filter, sort, pivot and statistics into one query plan
+
+Each sheet is converted to a columnar Polars frame once and cached by the
+caller. Analysis steps only build a LazyFrame; nothing is materialized until
+the plan is collected, so Polars can push predicates into the scan, prune
+unused columns and run the whole chain multi-threaded. Results are converted
+to pandas at the end, for display and export.
+
+Polars is optional: install it with `pip install polars` (or `uv sync --extra polars`).
+"""
+
+import re
+import pandas as pd
+from src.utils.notifications import show_error
+from src.utils.instrumentation import instrumented
+
+try:
+    import polars as pl
+    POLARS_AVAILABLE = True
+except ImportError:
+    pl = None
+    POLARS_AVAILABLE = False
+
+
+@instrumented
+def to_columnar(df):
+    """
+    Convert a pandas DataFrame to a Polars DataFrame
+
+    Object columns holding mixed types (common in Excel sheets) cannot be
+    converted directly; they are stored as strings instead.
+
+    Args:
+        df: pandas DataFrame
+
+    Returns:
+        Polars DataFrame
+    """
+    try:
+        return pl.from_pandas(df)
+    except Exception:
+        mixed = {col: "string" for col in df.columns if df[col].dtype == object}
+        return pl.from_pandas(df.astype(mixed))
+
+
+def _equals(schema, column, value):
+    """
+    `column == value` as filter_data evaluates it with pandas, or None if no row can match
+
+    filter_data compares the column with the value as given (text from the UI
+    or a recorded pipeline), not converted to the column's type: text only
+    equals text columns, and numbers only equal number or boolean columns.
+    """
+    dtype = schema[column]
+    col = pl.col(column)
+    if isinstance(value, str):
+        return col.cast(pl.Utf8) == value if dtype in (pl.Utf8, pl.Categorical) else None
+    if isinstance(value, (int, float)) and (dtype.is_numeric() or dtype == pl.Boolean):
+        return col.cast(pl.Float64) == float(value)
+    return None
+
+
+def filter_matches_pandas(df, column):
+    """
+    Whether lazy_filter on this column selects the same rows as filter_data
+
+    Mixed object columns are stored as strings by to_columnar, so the number 3
+    and the text "3" can no longer be told apart; such filters run with pandas.
+    """
+    return df[column].dtype != object or pd.api.types.infer_dtype(df[column], skipna=True) in ("string", "empty")
+
+
+def lazy_filter(lf, column, condition, value):
+    """
+    Add a filter to a LazyFrame (same conditions as filter_data)
+
+    Args:
+        lf: Polars LazyFrame
+        column: Column name to filter
+        condition: equals, contains, greater than, less than, not equals
+        value: Value to compare against
+
+    Returns:
+        LazyFrame with the filter applied
+    """
+    schema = lf.collect_schema()
+    col = pl.col(column)
+    if condition == "equals":
+        matches = _equals(schema, column, value)
+        return lf.filter(pl.lit(False) if matches is None else matches)
+    elif condition == "contains":
+        pattern = "(?i)" + re.escape(str(value))
+        return lf.filter(col.cast(pl.Utf8).str.contains(pattern).fill_null(False))
+    elif condition == "greater than":
+        return lf.filter(col > float(value))
+    elif condition == "less than":
+        return lf.filter(col < float(value))
+    elif condition == "not equals":
+        # pandas keeps missing values for '!=', so keep nulls here too
+        matches = _equals(schema, column, value)
+        return lf if matches is None else lf.filter((~matches).fill_null(True))
+    return lf
+
+
+def lazy_sort(lf, column, ascending=True):
+    """Add a sort to a LazyFrame (nulls last, like pandas)"""
+    return lf.sort(column, descending=not ascending, nulls_last=True)
+
+
+def _aggregate(expr, aggfunc):
+    """Map a PIVOT_AGGREGATIONS name to a Polars expression"""
+    return {
+        "sum": expr.sum,
+        "mean": expr.mean,
+        "count": expr.count,
+        "min": expr.min,
+        "max": expr.max,
+    }[aggfunc]()
+
+
+def lazy_pivot(lf, index_col, columns_col, values_col, aggfunc):
+    """
+    Build a pivot table from a LazyFrame
+
+    The group-by runs inside the lazy plan; only the (small) aggregated result
+    is collected and reshaped.
+
+    Returns:
+        pandas DataFrame shaped like create_pivot_table's output
+    """
+    grouped = (
+        lf.select([index_col, columns_col, values_col])
+        .drop_nulls([index_col, columns_col])
+        .group_by([index_col, columns_col])
+        .agg(_aggregate(pl.col(values_col), aggfunc))
+        .collect()
+    )
+    pivot = grouped.pivot(on=columns_col, index=index_col, values=values_col).fill_null(0)
+    pivot_df = pivot.to_pandas().set_index(index_col).sort_index()
+    pivot_df = pivot_df[sorted(pivot_df.columns, key=str)]
+    pivot_df.columns.name = columns_col
+    return pivot_df
+
+
+def lazy_statistics(lf, columns):
+    """
+    Calculate the same statistics as calculate_statistics in a single pass
+
+    Returns:
+        pandas DataFrame with one row per column
+    """
+    schema = lf.collect_schema()
+    exprs = []
+    for column in columns:
+        col = pl.col(column)
+        mode = col.drop_nulls().mode().sort().first()
+        if schema[column].is_numeric():
+            exprs += [
+                col.mean().alias(f"{column}\x00Mean"),
+                col.median().alias(f"{column}\x00Median"),
+                mode.alias(f"{column}\x00Mode"),
+                col.sum().alias(f"{column}\x00Sum"),
+                col.count().alias(f"{column}\x00Count"),
+                col.min().alias(f"{column}\x00Min"),
+                col.max().alias(f"{column}\x00Max"),
+                col.std().alias(f"{column}\x00Std Dev"),
+            ]
+        else:
+            exprs += [
+                col.count().alias(f"{column}\x00Count"),
+                col.drop_nulls().n_unique().alias(f"{column}\x00Unique"),
+                mode.cast(pl.Utf8).alias(f"{column}\x00Mode"),
+            ]
+
+    row = lf.select(exprs).collect().row(0, named=True)
+    stats_dict = {}
+    for key, value in row.items():
+        column, stat = key.split("\x00")
+        stats_dict.setdefault(column, {})[stat] = value
+    return pd.DataFrame(stats_dict).T
+
+
+@instrumented
+def run_analysis_plan(frame, filter_step=None, sort_step=None, pivot_step=None, stats_columns=None):
+    """
+    Run a chained analysis as one fused lazy plan
+
+    Args:
+        frame: Polars DataFrame from the columnar cache
+        filter_step: Optional (column, condition, value)
+        sort_step: Optional (column, ascending); ignored when pivoting
+        pivot_step: Optional (index_col, columns_col, values_col, aggfunc)
+        stats_columns: Optional list of columns to calculate statistics for
+
+    Returns:
+        pandas DataFrame or None on error
+    """
+    try:
+        lf = frame.lazy()
+        if filter_step:
+            lf = lazy_filter(lf, *filter_step)
+        if pivot_step:
+            return lazy_pivot(lf, *pivot_step)
+        if stats_columns:
+            return lazy_statistics(lf, stats_columns)
+        if sort_step:
+            lf = lazy_sort(lf, *sort_step)
+        return lf.collect().to_pandas()
+    except Exception as e:
+        show_error(f"Error running Polars analysis: {str(e)}")
+        return None
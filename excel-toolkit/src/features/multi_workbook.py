@@ -0,0 +1,301 @@
+"""
+Multi-Workbook Sessions
+Load many workbooks at once and analyze them together with a source file dimension
+
+A collection is a plain dictionary of {file name: {sheet name: DataFrame}}.
+Files are parsed in a process pool (parsing is pure-Python openpyxl work, so
+threads would not help). Analyses then run file by file on a thread pool and
+combine the per-file results, so twelve monthly files roll up into a quarter
+without merging them into one workbook first:
+
+- statistics: per file plus an "All files" row per column
+- pivot: partial aggregates (sum, count, min, max) per file, reduced into one
+  pivot; the source file can be the row or column dimension
+- search: vectorized per column over every sheet of every file
+- duplicates: iter_collection_frames feeds find_duplicates directly
+"""
+
+import os
+from io import BytesIO
+import numpy as np
+import pandas as pd
+from openpyxl.utils import get_column_letter
+from src.features.data_analysis import calculate_statistics
+from src.utils.notifications import show_error
+from src.utils.instrumentation import instrumented
+from src.utils.sheet_executor import map_sheets, PROCESS
+from src.config.settings import MULTI_WORKBOOK_WORKERS, SOURCE_FILE_COLUMN
+
+# Partial aggregates computed per file and how they are reduced across files
+_PARTIALS = {
+    'sum': {'sum': 'sum'},
+    'count': {'count': 'sum'},
+    'min': {'min': 'min'},
+    'max': {'max': 'max'},
+    'mean': {'sum': 'sum', 'count': 'sum'},
+}
+
+
+def _read_frames(file_bytes, file_name):
+    """Parse one file into {sheet: DataFrame} (runs in a worker process)"""
+    if file_name.lower().endswith('.csv'):
+        return {'CSV': pd.read_csv(BytesIO(file_bytes))}
+    return pd.read_excel(BytesIO(file_bytes), sheet_name=None, engine='openpyxl')
+
+
+def _read_safely(file_bytes, file_name):
+    try:
+        return _read_frames(file_bytes, file_name), None
+    except Exception as e:
+        return None, str(e)
+
+
+def unique_file_names(names, existing=()):
+    """
+    Make file names unique with ' (2)', ' (3)', ... suffixes
+
+    Args:
+        names: File names to add
+        existing: Names already in use (e.g. the collection's keys)
+
+    Returns:
+        List of unique names in the order given
+    """
+    taken = set(existing)
+    unique = []
+    for name in names:
+        stem, ext = os.path.splitext(name)
+        candidate, count = name, 1
+        while candidate in taken:
+            count += 1
+            candidate = f"{stem} ({count}){ext}"
+        taken.add(candidate)
+        unique.append(candidate)
+    return unique
+
+
+@instrumented
+def load_workbooks(files, workers=MULTI_WORKBOOK_WORKERS):
+    """
+    Parse several workbooks concurrently
+
+    Args:
+        files: List of (file_bytes, file_name) tuples (xlsx, xls or csv)
+        workers: Worker processes (None for all cores, 1 to parse inline)
+
+    Returns:
+        Tuple of (collection {file name: {sheet: DataFrame}}, {file name: error message})
+    """
+    names = unique_file_names([name for _, name in files])
+    results = map_sheets(_read_safely, files, kind=PROCESS, workers=workers,
+                         weights=[len(file_bytes) for file_bytes, _ in files])
+
+    collection, errors = {}, {}
+    for name, (frames, error) in zip(names, results):
+        if error is None:
+            collection[name] = frames
+        else:
+            errors[name] = error
+    return collection, errors
+
+
+def iter_collection_frames(collection, sheet=None):
+    """Yield (file name, sheet name, DataFrame) for every sheet, or only for `sheet`"""
+    for source, frames in collection.items():
+        for sheet_name, df in frames.items():
+            if sheet is None or sheet_name == sheet:
+                yield source, sheet_name, df
+
+
+def collection_sheets(collection):
+    """Sheet names in first-seen order with the number of files holding each"""
+    counts = {}
+    for frames in collection.values():
+        for sheet_name in frames:
+            counts[sheet_name] = counts.get(sheet_name, 0) + 1
+    return counts
+
+
+def collection_summary(collection):
+    """One row per file and sheet: File, Sheet, Rows, Columns"""
+    return pd.DataFrame([
+        {'File': source, 'Sheet': sheet_name, 'Rows': len(df), 'Columns': len(df.columns)}
+        for source, sheet_name, df in iter_collection_frames(collection)
+    ])
+
+
+@instrumented
+def combine_sheets(collection, sheet=None):
+    """
+    Stack sheets of every file into one DataFrame with a source file column
+
+    Args:
+        collection: {file name: {sheet: DataFrame}}
+        sheet: Sheet name to stack, or None for every sheet (adds a 'Sheet' column)
+
+    Returns:
+        DataFrame with SOURCE_FILE_COLUMN first (columns aligned by name) or None on error
+    """
+    try:
+        parts = []
+        for source, sheet_name, df in iter_collection_frames(collection, sheet):
+            part = df.copy(deep=False)
+            if sheet is None:
+                part.insert(0, 'Sheet', sheet_name)
+            part.insert(0, SOURCE_FILE_COLUMN, source)
+            parts.append(part)
+        if not parts:
+            return pd.DataFrame(columns=[SOURCE_FILE_COLUMN])
+        return pd.concat(parts, ignore_index=True)
+    except Exception as e:
+        show_error(f"Error combining sheets: {str(e)}")
+        return None
+
+
+@instrumented
+def collection_statistics(collection, sheet, columns, workers=MULTI_WORKBOOK_WORKERS):
+    """
+    Statistics per file plus across all files
+
+    Args:
+        collection: {file name: {sheet: DataFrame}}
+        sheet: Sheet to analyze in every file (files without it are left out)
+        columns: Columns to describe (missing columns are left out per file)
+        workers: Threads (None for all cores, 1 to run inline)
+
+    Returns:
+        DataFrame with Source File and Column followed by the statistics, or None on error
+    """
+    try:
+        frames = [(source, df) for source, _, df in iter_collection_frames(collection, sheet)]
+
+        def describe(source, df):
+            present = [col for col in columns if col in df.columns]
+            stats_df = calculate_statistics(df, present) if present else None
+            if stats_df is None:
+                return None
+            return stats_df.rename_axis('Column').reset_index().assign(**{SOURCE_FILE_COLUMN: source})
+
+        parts = [part for part in map_sheets(describe, frames, workers=workers) if part is not None]
+        # Medians and modes do not combine from per-file results, so the totals
+        # are computed over the stacked columns (only the selected ones are copied)
+        stacked = pd.concat([df[[col for col in columns if col in df.columns]] for _, df in frames],
+                            ignore_index=True) if frames else pd.DataFrame()
+        present = [col for col in columns if col in stacked.columns]
+        if present:
+            overall = calculate_statistics(stacked, present)
+            if overall is not None:
+                parts.append(overall.rename_axis('Column').reset_index().assign(**{SOURCE_FILE_COLUMN: "All files"}))
+        if not parts:
+            return pd.DataFrame(columns=[SOURCE_FILE_COLUMN, 'Column'])
+        result = pd.concat(parts, ignore_index=True)
+        return result[[SOURCE_FILE_COLUMN, 'Column'] + [c for c in result.columns
+                                                        if c not in (SOURCE_FILE_COLUMN, 'Column')]]
+    except Exception as e:
+        show_error(f"Error calculating statistics across files: {str(e)}")
+        return None
+
+
+@instrumented
+def collection_pivot(collection, sheet, index_col, columns_col, values_col, aggfunc, workers=MULTI_WORKBOOK_WORKERS):
+    """
+    Pivot a sheet across every file without stacking the files first
+
+    Each file is reduced to partial aggregates per (row, column) pair on a
+    thread pool; the partials are then combined, so only the small partial
+    tables are ever concatenated. The result matches create_pivot_table run
+    on the stacked sheets.
+
+    Args:
+        collection: {file name: {sheet: DataFrame}}
+        sheet: Sheet to pivot in every file (files without it are left out)
+        index_col: Column for rows (may be SOURCE_FILE_COLUMN)
+        columns_col: Column for columns (may be SOURCE_FILE_COLUMN)
+        values_col: Column to aggregate
+        aggfunc: sum, mean, count, min or max
+        workers: Threads (None for all cores, 1 to run inline)
+
+    Returns:
+        Pivot table DataFrame or None on error
+    """
+    try:
+        if aggfunc not in _PARTIALS:
+            raise ValueError(f"Unsupported aggregation: {aggfunc}")
+        keys = [index_col, columns_col]
+        partials = list(_PARTIALS[aggfunc])
+
+        def reduce_file(source, df):
+            missing = [col for col in keys + [values_col] if col != SOURCE_FILE_COLUMN and col not in df.columns]
+            if missing:
+                raise ValueError(f"'{source}' has no column(s): {', '.join(map(str, missing))}")
+            if SOURCE_FILE_COLUMN in keys:
+                df = df.assign(**{SOURCE_FILE_COLUMN: source})
+            return df.groupby(keys, sort=False)[values_col].agg(partials)
+
+        frames = [(source, df) for source, _, df in iter_collection_frames(collection, sheet)]
+        if not frames:
+            raise ValueError(f"No file has a sheet named '{sheet}'")
+        combined = pd.concat(map_sheets(reduce_file, frames, workers=workers))
+        combined = combined.groupby(level=[0, 1]).agg(_PARTIALS[aggfunc])
+        if aggfunc == 'mean':
+            values = combined['sum'] / combined['count'].replace(0, np.nan)
+        else:
+            values = combined[aggfunc]
+        # pd.pivot_table drops (row, column) groups without any values before filling with 0
+        return values.dropna().unstack(level=1, fill_value=0)
+    except Exception as e:
+        show_error(f"Error creating pivot table across files: {str(e)}")
+        return None
+
+
+def _search_frame(source, sheet_name, df, term, case_sensitive):
+    """Matches of one sheet as (Source File, Sheet, Cell, Value) rows, the header row included"""
+    needle = term if case_sensitive else term.lower()
+    parts = []
+    for j, col in enumerate(df.columns):
+        letter = get_column_letter(j + 1)
+        header = str(col)
+        if needle in (header if case_sensitive else header.lower()):
+            parts.append(pd.DataFrame({'row': [1], 'col': [j], 'Cell': [f"{letter}1"], 'Value': [header]}))
+        series = df[col]
+        present = series.notna()
+        text = series[present].astype(str)
+        hits = text[text.str.contains(term, case=case_sensitive, regex=False).to_numpy()]
+        if len(hits):
+            rows = df.index.get_indexer(hits.index) + 2
+            parts.append(pd.DataFrame({'row': rows, 'col': j, 'Cell': [f"{letter}{r}" for r in rows],
+                                       'Value': hits.to_numpy()}))
+    if not parts:
+        return None
+    found = pd.concat(parts, ignore_index=True).sort_values(['row', 'col'], kind='stable')
+    found.insert(0, 'Sheet', sheet_name)
+    found.insert(0, SOURCE_FILE_COLUMN, source)
+    return found.drop(columns=['row', 'col'])
+
+
+@instrumented
+def search_collection(collection, term, case_sensitive=False, workers=MULTI_WORKBOOK_WORKERS):
+    """
+    Search every sheet of every file for a term
+
+    Values are searched as loaded (formulas show their last saved result).
+
+    Args:
+        collection: {file name: {sheet: DataFrame}}
+        term: Text to search for
+        case_sensitive: Whether to match case
+        workers: Threads (None for all cores, 1 to run inline)
+
+    Returns:
+        DataFrame with Source File, Sheet, Cell and Value columns
+    """
+    try:
+        items = [(source, sheet_name, df, term, case_sensitive)
+                 for source, sheet_name, df in iter_collection_frames(collection)]
+        parts = [part for part in map_sheets(_search_frame, items, workers=workers) if part is not None]
+        if not parts:
+            return pd.DataFrame(columns=[SOURCE_FILE_COLUMN, 'Sheet', 'Cell', 'Value'])
+        return pd.concat(parts, ignore_index=True)
+    except Exception as e:
+        show_error(f"Error searching files: {str(e)}")
+        return pd.DataFrame()
@@ -0,0 +1,310 @@
+"""
+Sampling-Based Exploration
+Estimate statistics, pivots and filter counts from a stratified random sample
+
+A sample is drawn once per sheet (and stratification column) and reused for
+every interaction, so exploring a multi-million-row sheet costs about the same
+as exploring a SAMPLE_ROWS-row one. Each stratum (a value of the stratification
+column) is sampled in proportion to its size, with at least two rows per
+stratum so small groups still show up and get a variance.
+
+Estimates come with design-based confidence bounds (stratified sampling with
+finite population correction): totals and counts are expanded stratum by
+stratum, means are ratio estimates with linearized variance. Minimum, maximum,
+median and mode are read off the sample and carry no bounds. When the sheet is
+no longer than the sample the whole sheet is used and the bounds collapse to
+the exact values.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+from src.features.data_analysis import filter_data
+from src.utils.notifications import show_error
+from src.utils.instrumentation import instrumented
+from src.config.settings import (
+    SAMPLE_ROWS, SAMPLE_CONFIDENCE, SAMPLE_MAX_STRATA, SAMPLE_SEED, EXACT_WORKERS
+)
+
+# Exact computations requested from the UI run here, off the script thread
+_exact_executor = ThreadPoolExecutor(max_workers=EXACT_WORKERS, thread_name_prefix="exact")
+
+
+def run_exact(func, *args, **kwargs):
+    """Run a full computation in the background and return its Future"""
+    return _exact_executor.submit(func, *args, **kwargs)
+
+
+@instrumented
+def draw_sample(df, size=SAMPLE_ROWS, strata=None, seed=SAMPLE_SEED):
+    """
+    Draw a stratified random sample of rows
+
+    Args:
+        df: pandas DataFrame
+        size: Target number of sampled rows
+        strata: Column to stratify by (None for a simple random sample)
+        seed: Random seed, so the same sheet always gives the same sample
+
+    Returns:
+        Tuple of (sample DataFrame keeping the original row labels, design dict with
+        'population', 'strata', 'stratum' (code per sampled row), 'population_sizes'
+        and 'sample_sizes' per stratum) or (None, None) on error
+    """
+    try:
+        n_rows = len(df)
+        if strata is None:
+            codes = np.zeros(n_rows, dtype=np.intp)
+            population_sizes = np.array([n_rows])
+        else:
+            codes, uniques = pd.factorize(df[strata], use_na_sentinel=False)
+            if len(uniques) > SAMPLE_MAX_STRATA:
+                raise ValueError(f"'{strata}' has {len(uniques)} distinct values; "
+                                 f"stratify by a column with at most {SAMPLE_MAX_STRATA}")
+            population_sizes = np.bincount(codes, minlength=len(uniques))
+
+        if n_rows <= size:
+            positions = np.arange(n_rows)
+            sample_sizes = population_sizes
+        else:
+            # Proportional allocation, at least two rows per stratum for a variance
+            sample_sizes = np.minimum(population_sizes,
+                                      np.maximum(np.floor(size * population_sizes / n_rows).astype(np.intp), 2))
+            rng = np.random.default_rng(seed)
+            if strata is None:
+                positions = np.sort(rng.choice(n_rows, size=sample_sizes[0], replace=False))
+            else:
+                # Rows grouped by stratum (radix sort on small integer codes), then sampled per group
+                order = np.argsort(codes.astype(np.int16 if len(population_sizes) < 2 ** 15 else np.intp),
+                                   kind='stable')
+                starts = np.concatenate([[0], np.cumsum(population_sizes)[:-1]])
+                positions = np.sort(np.concatenate([
+                    order[start + rng.choice(n_h, size=k_h, replace=False)]
+                    for start, n_h, k_h in zip(starts, population_sizes, sample_sizes)
+                ]))
+
+        design = {
+            'population': n_rows,
+            'strata': strata,
+            'stratum': codes[positions],
+            'population_sizes': population_sizes.astype(float),
+            'sample_sizes': sample_sizes.astype(float),
+        }
+        return df.iloc[positions], design
+    except Exception as e:
+        show_error(f"Error drawing sample: {str(e)}")
+        return None, None
+
+
+def _z_value(confidence):
+    return NormalDist().inv_cdf((1 + confidence) / 2)
+
+
+def _stratum_weights(design):
+    """Per-stratum expansion weight N_h/n_h and variance factor N_h^2 (1 - f_h) / n_h"""
+    population, sample = design['population_sizes'], design['sample_sizes']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weight = np.where(sample > 0, population / sample, 0.0)
+        variance_factor = np.where(sample > 0, population ** 2 * (1 - sample / population) / sample, 0.0)
+    return weight, variance_factor
+
+
+def _grouped_totals(design, keys, values):
+    """
+    Estimated totals and their variances per group
+
+    Args:
+        design: Sample design from draw_sample
+        keys: List of per-row group arrays (empty for one overall group)
+        values: Per-row values to total (NaN counts as 0)
+
+    Returns:
+        DataFrame indexed by the group keys with 'total' and 'variance'
+    """
+    weight, variance_factor = _stratum_weights(design)
+    frame = pd.DataFrame({'stratum': design['stratum'], 'z': np.nan_to_num(np.asarray(values, dtype=float))})
+    key_names = [f"k{i}" for i in range(len(keys))]
+    for name, key in zip(key_names, keys):
+        frame[name] = np.asarray(key)
+    frame['z2'] = frame['z'] ** 2
+    sums = frame.groupby(['stratum'] + key_names, sort=False, dropna=False)[['z', 'z2']].sum().reset_index()
+
+    n_h = design['sample_sizes'][sums['stratum']]
+    # Sample variance of z within the stratum (rows outside the group contribute zeros)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s2 = np.where(n_h > 1, (sums['z2'] - sums['z'] ** 2 / n_h) / (n_h - 1), 0.0)
+    sums['total'] = weight[sums['stratum']] * sums['z']
+    sums['variance'] = variance_factor[sums['stratum']] * np.maximum(s2, 0.0)
+    if not key_names:
+        return sums[['total', 'variance']].sum().to_frame().T
+    return sums.groupby(key_names, sort=True, dropna=False)[['total', 'variance']].sum()
+
+
+def _bounds(estimate, variance, z):
+    margin = z * np.sqrt(np.maximum(variance, 0.0))
+    return estimate - margin, estimate + margin
+
+
+def _mean_estimate(design, keys, values):
+    """Ratio estimate of the mean of non-missing values per group and its variance"""
+    values = np.asarray(values, dtype=float)
+    present = ~np.isnan(values)
+    totals = _grouped_totals(design, keys, np.where(present, values, 0.0))
+    counts = _grouped_totals(design, keys, present.astype(float))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = totals['total'] / counts['total']
+    # Linearization: variance of the estimated total of (y - R) over the group, divided by N^2
+    if keys:
+        key_frame = pd.DataFrame({f"k{i}": np.asarray(key) for i, key in enumerate(keys)})
+        row_ratio = key_frame.merge(ratio.rename('ratio').reset_index(), how='left',
+                                    on=list(key_frame.columns))['ratio'].to_numpy()
+    else:
+        row_ratio = np.full(len(values), ratio.iloc[0])
+    residuals = np.where(present, values - row_ratio, 0.0)
+    residual_var = _grouped_totals(design, keys, residuals)['variance']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variance = residual_var / counts['total'] ** 2
+    return ratio, variance
+
+
+def _row(column, statistic, estimate, variance=None, z=None):
+    if variance is None:
+        return {'Column': column, 'Statistic': statistic, 'Estimate': estimate, 'Lower': None, 'Upper': None}
+    lower, upper = _bounds(estimate, variance, z)
+    return {'Column': column, 'Statistic': statistic, 'Estimate': estimate, 'Lower': lower, 'Upper': upper}
+
+
+@instrumented
+def estimate_statistics(sample, design, columns, confidence=SAMPLE_CONFIDENCE):
+    """
+    Estimate the statistics of calculate_statistics from a sample
+
+    Args:
+        sample: Sample DataFrame from draw_sample
+        design: Sample design from draw_sample
+        columns: List of column names
+        confidence: Confidence level of the bounds
+
+    Returns:
+        DataFrame with Column, Statistic, Estimate, Lower and Upper (bounds are
+        empty for statistics read off the sample) or None on error
+    """
+    try:
+        z = _z_value(confidence)
+        rows = []
+        for col in columns:
+            series = sample[col]
+            count = _grouped_totals(design, [], series.notna().to_numpy(dtype=float)).iloc[0]
+            if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                values = series.to_numpy(dtype=float, na_value=np.nan)
+                mean, mean_var = _mean_estimate(design, [], values)
+                total = _grouped_totals(design, [], values).iloc[0]
+                rows += [
+                    _row(col, 'Mean', float(mean.iloc[0]), float(mean_var.iloc[0]), z),
+                    _row(col, 'Median', series.median()),
+                    _row(col, 'Mode', series.mode()[0] if not series.mode().empty else None),
+                    _row(col, 'Sum', float(total['total']), float(total['variance']), z),
+                    _row(col, 'Count', float(count['total']), float(count['variance']), z),
+                    _row(col, 'Min', series.min()),
+                    _row(col, 'Max', series.max()),
+                    _row(col, 'Std Dev', series.std()),
+                ]
+            else:
+                rows += [
+                    _row(col, 'Count', float(count['total']), float(count['variance']), z),
+                    _row(col, 'Unique (in sample)', series.nunique()),
+                    _row(col, 'Mode', series.mode()[0] if not series.mode().empty else None),
+                ]
+        return pd.DataFrame(rows)
+    except Exception as e:
+        show_error(f"Error estimating statistics: {str(e)}")
+        return None
+
+
+@instrumented
+def estimate_pivot(sample, design, index_col, columns_col, values_col, aggfunc, confidence=SAMPLE_CONFIDENCE):
+    """
+    Estimate a pivot table from a sample
+
+    Args:
+        sample: Sample DataFrame from draw_sample
+        design: Sample design from draw_sample
+        index_col: Column for rows
+        columns_col: Column for columns
+        values_col: Column to aggregate
+        aggfunc: sum, mean, count, min or max
+        confidence: Confidence level of the margins
+
+    Returns:
+        Tuple of (estimated pivot, margin pivot with the ± half-width of each
+        cell's bounds, NaN for min/max) shaped like create_pivot_table's output,
+        or (None, None) on error
+    """
+    try:
+        z = _z_value(confidence)
+        values = sample[values_col]
+        if aggfunc in ('min', 'max'):
+            estimate = pd.pivot_table(sample, index=index_col, columns=columns_col, values=values_col,
+                                      aggfunc=aggfunc, fill_value=0)
+            return estimate, pd.DataFrame(np.nan, index=estimate.index, columns=estimate.columns)
+
+        # A cell's total is the total of y * 1{row in cell}: rows outside the cell
+        # count as zeros in their stratum, which grouping by cell gives for free
+        keys = [sample[index_col].to_numpy(), sample[columns_col].to_numpy()]
+        if aggfunc == 'count':
+            result = _grouped_totals(design, keys, values.notna().to_numpy(dtype=float))
+            estimate, variance = result['total'], result['variance']
+        elif aggfunc == 'sum':
+            result = _grouped_totals(design, keys, pd.to_numeric(values).to_numpy(dtype=float, na_value=np.nan))
+            estimate, variance = result['total'], result['variance']
+        elif aggfunc == 'mean':
+            estimate, variance = _mean_estimate(design, keys,
+                                                pd.to_numeric(values).to_numpy(dtype=float, na_value=np.nan))
+        else:
+            raise ValueError(f"Unsupported aggregation: {aggfunc}")
+
+        # pivot_table leaves out rows and columns whose label is missing
+        labelled = estimate.index.get_level_values(0).notna() & estimate.index.get_level_values(1).notna()
+        estimate, variance = estimate[labelled], variance[labelled]
+        margin = z * np.sqrt(np.maximum(variance, 0.0))
+        estimate_pivot_df = estimate.unstack(level=1, fill_value=0).fillna(0)
+        margin_pivot_df = margin.unstack(level=1, fill_value=0).fillna(0)
+        for pivot_df in (estimate_pivot_df, margin_pivot_df):
+            pivot_df.index.name, pivot_df.columns.name = index_col, columns_col
+        return estimate_pivot_df, margin_pivot_df.reindex_like(estimate_pivot_df)
+    except Exception as e:
+        show_error(f"Error estimating pivot table: {str(e)}")
+        return None, None
+
+
+@instrumented
+def estimate_filter_count(sample, design, column, condition, value, confidence=SAMPLE_CONFIDENCE):
+    """
+    Estimate how many rows of the sheet a filter keeps
+
+    Args:
+        sample: Sample DataFrame from draw_sample
+        design: Sample design from draw_sample
+        column: Column to filter
+        condition: One of FILTER_CONDITIONS
+        value: Value to compare against
+        confidence: Confidence level of the bounds
+
+    Returns:
+        Tuple of (estimated row count, lower bound, upper bound, matching sample rows)
+        or None on error
+    """
+    try:
+        # Filter by position so duplicate row labels cannot be miscounted
+        matched = filter_data(sample.reset_index(drop=True), column, condition, value)
+        if matched is None:
+            return None
+        in_filter = np.zeros(len(sample))
+        in_filter[matched.index.to_numpy()] = 1.0
+        result = _grouped_totals(design, [], in_filter).iloc[0]
+        lower, upper = _bounds(float(result['total']), float(result['variance']), _z_value(confidence))
+        return float(result['total']), max(lower, 0.0), upper, sample.iloc[matched.index.to_numpy()]
+    except Exception as e:
+        show_error(f"Error estimating filter: {str(e)}")
+        return None
@@ -3,10 +3,12 @@ Sheet Management Operations
 Functions for adding, deleting, renaming, reordering, hiding, and protecting sheets
 """
 
-import streamlit as st
+from src.utils.notifications import show_error
+from src.utils.instrumentation import instrumented
 
 
-def add_sheet(wb, sheet_name, position='end'):
+@instrumented
+def add_sheet(wb, sheet_name, position='end', journal=None):
     """
     Add new sheet to workbook
     
@@ -14,44 +16,53 @@ def add_sheet(wb, sheet_name, position='end'):
         wb: openpyxl Workbook object
         sheet_name: Name for new sheet
         position: Position to add ('end' or 'beginning')
+        journal: Optional Operation recording the change for undo
         
     Returns:
         Modified workbook
     """
     try:
+        ws = None
         if position == 'end':
-            wb.create_sheet(title=sheet_name)
+            ws = wb.create_sheet(title=sheet_name)
         elif position == 'beginning':
-            wb.create_sheet(title=sheet_name, index=0)
+            ws = wb.create_sheet(title=sheet_name, index=0)
+        if journal is not None and ws is not None:
+            journal.sheet_added(ws)
         return wb
     except Exception as e:
-        st.error(f"Error adding sheet: {str(e)}")
+        show_error(f"Error adding sheet: {str(e)}")
         return wb
 
 
-def delete_sheet(wb, sheet_name):
+@instrumented
+def delete_sheet(wb, sheet_name, journal=None):
     """
     Delete sheet from workbook
     
     Args:
         wb: openpyxl Workbook object
         sheet_name: Name of sheet to delete
+        journal: Optional Operation recording the change for undo
         
     Returns:
         Modified workbook
     """
     try:
         if len(wb.sheetnames) > 1:
+            if journal is not None:
+                journal.sheet_removing(wb[sheet_name])
             del wb[sheet_name]
         else:
-            st.error("Cannot delete the last sheet in the workbook")
+            show_error("Cannot delete the last sheet in the workbook")
         return wb
     except Exception as e:
-        st.error(f"Error deleting sheet: {str(e)}")
+        show_error(f"Error deleting sheet: {str(e)}")
         return wb
 
 
-def rename_sheet(wb, old_name, new_name):
+@instrumented
+def rename_sheet(wb, old_name, new_name, journal=None):
     """
     Rename sheet in workbook
     
@@ -59,39 +70,48 @@ def rename_sheet(wb, old_name, new_name):
         wb: openpyxl Workbook object
         old_name: Current sheet name
         new_name: New sheet name
+        journal: Optional Operation recording the change for undo
         
     Returns:
         Modified workbook
     """
     try:
         sheet = wb[old_name]
+        if journal is not None:
+            journal.sheet_attribute(sheet, 'title')
         sheet.title = new_name
         return wb
     except Exception as e:
-        st.error(f"Error renaming sheet: {str(e)}")
+        show_error(f"Error renaming sheet: {str(e)}")
         return wb
 
 
-def reorder_sheets(wb, new_order):
+@instrumented
+def reorder_sheets(wb, new_order, journal=None):
     """
     Reorder sheets in workbook
     
     Args:
         wb: openpyxl Workbook object
         new_order: List of sheet names in desired order
+        journal: Optional Operation recording the change for undo
         
     Returns:
         Modified workbook
     """
     try:
-        wb._sheets = [wb[name] for name in new_order]
+        new_sheets = [wb[name] for name in new_order]
+        if journal is not None:
+            journal.sheets_reordering()
+        wb._sheets = new_sheets
         return wb
     except Exception as e:
-        st.error(f"Error reordering sheets: {str(e)}")
+        show_error(f"Error reordering sheets: {str(e)}")
         return wb
 
 
-def hide_unhide_sheet(wb, sheet_name, hide=True):
+@instrumented
+def hide_unhide_sheet(wb, sheet_name, hide=True, journal=None):
     """
     Hide or unhide a sheet
     
@@ -99,6 +119,7 @@ def hide_unhide_sheet(wb, sheet_name, hide=True):
         wb: openpyxl Workbook object
         sheet_name: Name of sheet
         hide: True to hide, False to unhide
+        journal: Optional Operation recording the change for undo
         
     Returns:
         Modified workbook
@@ -109,18 +130,23 @@ def hide_unhide_sheet(wb, sheet_name, hide=True):
             # Check if it's the last visible sheet
             visible_count = sum(1 for s in wb.worksheets if s.sheet_state == 'visible')
             if visible_count <= 1:
-                st.error("Cannot hide the last visible sheet")
+                show_error("Cannot hide the last visible sheet")
                 return wb
+            if journal is not None:
+                journal.sheet_attribute(sheet, 'sheet_state')
             sheet.sheet_state = 'hidden'
         else:
+            if journal is not None:
+                journal.sheet_attribute(sheet, 'sheet_state')
             sheet.sheet_state = 'visible'
         return wb
     except Exception as e:
-        st.error(f"Error hiding/unhiding sheet: {str(e)}")
+        show_error(f"Error hiding/unhiding sheet: {str(e)}")
         return wb
 
 
-def protect_sheet(wb, sheet_name, password=None):
+@instrumented
+def protect_sheet(wb, sheet_name, password=None, journal=None):
     """
     Protect a sheet with optional password
     
@@ -128,37 +154,44 @@ def protect_sheet(wb, sheet_name, password=None):
         wb: openpyxl Workbook object
         sheet_name: Name of sheet
         password: Optional password string
+        journal: Optional Operation recording the change for undo
         
     Returns:
         Modified workbook
     """
     try:
         sheet = wb[sheet_name]
+        if journal is not None:
+            journal.sheet_attribute(sheet, 'protection')
         sheet.protection.sheet = True
         if password:
             sheet.protection.password = password
         return wb
     except Exception as e:
-        st.error(f"Error protecting sheet: {str(e)}")
+        show_error(f"Error protecting sheet: {str(e)}")
         return wb
 
 
-def unprotect_sheet(wb, sheet_name):
+@instrumented
+def unprotect_sheet(wb, sheet_name, journal=None):
     """
     Unprotect a sheet
     
     Args:
         wb: openpyxl Workbook object
         sheet_name: Name of sheet
+        journal: Optional Operation recording the change for undo
         
     Returns:
         Modified workbook
     """
     try:
         sheet = wb[sheet_name]
+        if journal is not None:
+            journal.sheet_attribute(sheet, 'protection')
         sheet.protection.sheet = False
         sheet.protection.password = None
         return wb
     except Exception as e:
-        st.error(f"Error unprotecting sheet: {str(e)}")
+        show_error(f"Error unprotecting sheet: {str(e)}")
         return wb
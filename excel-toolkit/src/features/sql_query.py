@@ -0,0 +1,108 @@
+"""
+SQL Query Engine
+Run SQL over every loaded sheet with an embedded DuckDB (or SQLite) engine
+
+DuckDB scans the pandas DataFrames in place (no copy) and executes joins,
+window functions and group-bys vectorized and multi-threaded. When DuckDB
+is not installed the standard library's SQLite is used instead; it copies
+each sheet into an in-memory database first, so it is only suitable for
+smaller workbooks.
+
+Queries only see the registered sheets: DuckDB runs with external access
+disabled (no read_csv/COPY/ATTACH on server files) and SQLite refuses
+ATTACH (which VACUUM INTO also needs).
+"""
+
+import re
+import sqlite3
+import pandas as pd
+from src.utils.notifications import show_error
+from src.utils.instrumentation import instrumented
+
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    duckdb = None
+    DUCKDB_AVAILABLE = False
+
+
+def sql_table_name(sheet_name):
+    """
+    Turn a sheet name into a SQL-friendly table name
+
+    Args:
+        sheet_name: Excel sheet name (may contain spaces or punctuation)
+
+    Returns:
+        Lower-case identifier, e.g. 'Q1 Sales (EU)' -> 'q1_sales_eu'
+    """
+    name = re.sub(r'\W+', '_', str(sheet_name)).strip('_').lower() or 'sheet'
+    if name[0].isdigit():
+        name = f"t_{name}"
+    return name
+
+
+def build_table_map(df_dict):
+    """
+    Map unique SQL table names to sheet names
+
+    Args:
+        df_dict: Dictionary of {sheet_name: DataFrame}
+
+    Returns:
+        Dictionary of {table_name: sheet_name}
+    """
+    tables = {}
+    for sheet_name in df_dict:
+        base = sql_table_name(sheet_name)
+        name, counter = base, 1
+        while name in tables:
+            counter += 1
+            name = f"{base}_{counter}"
+        tables[name] = sheet_name
+    return tables
+
+
+def _deny_attach(action, *args):
+    """SQLite authorizer: refuse ATTACH/DETACH so queries cannot open or create files"""
+    if action in (sqlite3.SQLITE_ATTACH, sqlite3.SQLITE_DETACH):
+        return sqlite3.SQLITE_DENY
+    return sqlite3.SQLITE_OK
+
+
+@instrumented
+def run_sql_query(df_dict, query, engine="duckdb"):
+    """
+    Execute a SQL query with every sheet registered as a table
+
+    Args:
+        df_dict: Dictionary of {sheet_name: DataFrame}
+        query: SQL query text
+        engine: 'duckdb' or 'sqlite' (falls back to sqlite if DuckDB is missing)
+
+    Returns:
+        Result DataFrame or None on error
+    """
+    tables = build_table_map(df_dict)
+    try:
+        if engine == "duckdb" and DUCKDB_AVAILABLE:
+            con = duckdb.connect(database=':memory:', config={'enable_external_access': False})
+            try:
+                for table_name, sheet_name in tables.items():
+                    con.register(table_name, df_dict[sheet_name])
+                return con.execute(query).df()
+            finally:
+                con.close()
+
+        con = sqlite3.connect(':memory:')
+        try:
+            for table_name, sheet_name in tables.items():
+                df_dict[sheet_name].to_sql(table_name, con, index=False)
+            con.set_authorizer(_deny_attach)
+            return pd.read_sql_query(query, con)
+        finally:
+            con.close()
+    except Exception as e:
+        show_error(f"Error running SQL query: {str(e)}")
+        return None
@@ -0,0 +1,325 @@
+"""
+Workbook Diff Engine
+Compare two versions of a workbook using row hashes
+
+Every row is reduced to a 64-bit hash in one vectorized pass, so finding
+inserted, deleted and modified rows never compares cells pairwise. Cell-level
+differences are only computed for the rows flagged as modified.
+
+Without key columns, identical rows are paired by hash; rows that keep their
+relative order act as anchors, and unmatched rows between the same two anchors
+are paired as modifications. With key columns, rows are paired by key.
+"""
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill, Font
+from src.utils.notifications import show_error
+from src.utils.instrumentation import instrumented
+from src.config.settings import DIFF_RENAME_SIMILARITY, DIFF_FILL_COLORS
+
+# Object columns holding only numbers (openpyxl often yields these) hash like float columns
+NUMERIC_INFERRED = ('integer', 'floating', 'mixed-integer-float', 'decimal')
+
+SUMMARY_COLUMNS = ['Sheet', 'Status', 'Inserted Rows', 'Deleted Rows', 'Modified Rows', 'Changed Cells',
+                   'Added Columns', 'Removed Columns']
+
+
+def _normalize(df, columns):
+    """Select columns and give numeric columns one dtype so 1 and 1.0 hash alike"""
+    data = {}
+    for col in columns:
+        series = df[col]
+        if pd.api.types.is_bool_dtype(series):
+            pass
+        elif pd.api.types.is_numeric_dtype(series):
+            series = series.astype('float64')
+        elif series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) in NUMERIC_INFERRED:
+            series = pd.to_numeric(series).astype('float64')
+        data[col] = series.reset_index(drop=True)
+    # An explicit index keeps the row count when there are no columns to select
+    return pd.DataFrame(data, columns=columns, index=range(len(df)))
+
+
+def hash_rows(df):
+    """Return one uint64 hash per row (index excluded)"""
+    if df.shape[1] == 0:
+        return np.zeros(len(df), dtype='uint64')
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def _with_occurrence(hashes, name):
+    """Frame of (hash, occurrence number, position) so duplicate rows pair up in order"""
+    frame = pd.DataFrame({'h': hashes, name: np.arange(len(hashes))})
+    frame['occ'] = frame.groupby('h').cumcount()
+    return frame
+
+
+def _pair_unkeyed(old_hashes, new_hashes):
+    """
+    Pair rows of two sheets without keys
+
+    Returns:
+        Tuple of (modified pairs DataFrame[old, new], deleted old positions, inserted new positions)
+    """
+    matched = _with_occurrence(old_hashes, 'old').merge(
+        _with_occurrence(new_hashes, 'new'), on=['h', 'occ'], how='inner'
+    ).sort_values('old')
+
+    # Anchors: matched rows whose order is preserved (greedy, O(n))
+    new_positions = matched['new'].to_numpy()
+    keep = new_positions >= np.maximum.accumulate(new_positions) if len(new_positions) else np.array([], bool)
+    anchor_old = matched['old'].to_numpy()[keep]
+    anchor_new = new_positions[keep]
+
+    unmatched_old = np.setdiff1d(np.arange(len(old_hashes)), matched['old'].to_numpy())
+    unmatched_new = np.setdiff1d(np.arange(len(new_hashes)), new_positions)
+
+    # Rows between the same pair of anchors are candidates for modification
+    old_gaps = pd.DataFrame({'old': unmatched_old, 'gap': np.searchsorted(anchor_old, unmatched_old)})
+    new_gaps = pd.DataFrame({'new': unmatched_new, 'gap': np.searchsorted(anchor_new, unmatched_new)})
+    old_gaps['rank'] = old_gaps.groupby('gap').cumcount()
+    new_gaps['rank'] = new_gaps.groupby('gap').cumcount()
+    paired = old_gaps.merge(new_gaps, on=['gap', 'rank'], how='outer')
+
+    modified = paired.dropna(subset=['old', 'new'])[['old', 'new']].astype('int64')
+    deleted = paired.loc[paired['new'].isna(), 'old'].astype('int64').to_numpy()
+    inserted = paired.loc[paired['old'].isna(), 'new'].astype('int64').to_numpy()
+    return modified, deleted, inserted
+
+
+def _pair_keyed(old_df, new_df, old_hashes, new_hashes, key_columns):
+    """
+    Pair rows of two sheets by key columns
+
+    Returns:
+        Tuple of (modified pairs DataFrame[old, new], deleted old positions, inserted new positions)
+    """
+    old_keys = _with_occurrence(hash_rows(old_df[key_columns]), 'old')
+    new_keys = _with_occurrence(hash_rows(new_df[key_columns]), 'new')
+    old_keys['row_hash'] = old_hashes
+    new_keys['row_hash'] = new_hashes
+
+    joined = old_keys.merge(new_keys, on=['h', 'occ'], how='outer', suffixes=('_old', '_new'))
+    both = joined.dropna(subset=['old', 'new'])
+    modified = both.loc[both['row_hash_old'] != both['row_hash_new'], ['old', 'new']].astype('int64')
+    deleted = joined.loc[joined['new'].isna(), 'old'].astype('int64').to_numpy()
+    inserted = joined.loc[joined['old'].isna(), 'new'].astype('int64').to_numpy()
+    return modified, deleted, inserted
+
+
+def _cell_changes(old_df, new_df, old_norm, new_norm, modified, columns):
+    """
+    Compare cells of modified row pairs only; returns (old pos, new pos, column, old, new) rows
+
+    Cells are compared in their normalized form (so 1 and 1.0 are equal) but
+    reported with the values as they appear in the sheets.
+    """
+    if modified.empty or not columns:
+        return pd.DataFrame(columns=['old', 'new', 'Column', 'Old Value', 'New Value'])
+    old_pos = modified['old'].to_numpy()
+    new_pos = modified['new'].to_numpy()
+    old_values = old_norm[columns].to_numpy(dtype=object)[old_pos]
+    new_values = new_norm[columns].to_numpy(dtype=object)[new_pos]
+    same = (old_values == new_values) | (pd.isna(old_values) & pd.isna(new_values))
+    rows, cols = np.nonzero(~same)
+    return pd.DataFrame({
+        'old': old_pos[rows],
+        'new': new_pos[rows],
+        'Column': np.asarray(columns, dtype=object)[cols],
+        'Old Value': old_df[columns].to_numpy(dtype=object)[old_pos][rows, cols],
+        'New Value': new_df[columns].to_numpy(dtype=object)[new_pos][rows, cols],
+    })
+
+
+@instrumented
+def diff_sheet(old_df, new_df, key_columns=None):
+    """
+    Diff two versions of a sheet
+
+    Args:
+        old_df: DataFrame of the old version
+        new_df: DataFrame of the new version
+        key_columns: Optional list of key columns (must exist in both versions)
+
+    Returns:
+        Dictionary with inserted/deleted positions, modified pairs, cell changes
+        and added/removed columns
+    """
+    common = [c for c in old_df.columns if c in set(new_df.columns)]
+    old_norm = _normalize(old_df, common)
+    new_norm = _normalize(new_df, common)
+    old_hashes = hash_rows(old_norm)
+    new_hashes = hash_rows(new_norm)
+
+    keys = [k for k in (key_columns or []) if k in common]
+    if keys:
+        modified, deleted, inserted = _pair_keyed(old_norm, new_norm, old_hashes, new_hashes, keys)
+    else:
+        modified, deleted, inserted = _pair_unkeyed(old_hashes, new_hashes)
+
+    return {
+        'columns': common,
+        'added_columns': [c for c in new_df.columns if c not in set(common)],
+        'removed_columns': [c for c in old_df.columns if c not in set(common)],
+        'inserted': np.sort(inserted),
+        'deleted': np.sort(deleted),
+        'modified': modified.sort_values('new').reset_index(drop=True),
+        'cell_changes': _cell_changes(old_df, new_df, old_norm, new_norm, modified, common),
+        'keyed': bool(keys),
+    }
+
+
+def _similarity(old_df, new_df):
+    """Share of distinct rows two sheets have in common (0..1), by row hash"""
+    if list(old_df.columns) != list(new_df.columns):
+        return 0.0
+    old_set = np.unique(hash_rows(_normalize(old_df, list(old_df.columns))))
+    new_set = np.unique(hash_rows(_normalize(new_df, list(new_df.columns))))
+    if not len(old_set) and not len(new_set):
+        return 1.0
+    return len(np.intersect1d(old_set, new_set, assume_unique=True)) / max(len(old_set), len(new_set))
+
+
+@instrumented
+def diff_workbooks(old_frames, new_frames, key_columns=None):
+    """
+    Diff two workbooks sheet by sheet, detecting added, removed and renamed sheets
+
+    Args:
+        old_frames: Dictionary of {sheet_name: DataFrame} for the old version
+        new_frames: Dictionary of {sheet_name: DataFrame} for the new version
+        key_columns: Optional key columns used where a sheet has all of them
+
+    Returns:
+        Tuple of (summary DataFrame, {new sheet name: sheet diff}, sheet pairs dict)
+        or (None, {}, {}) on error
+    """
+    try:
+        removed = [s for s in old_frames if s not in new_frames]
+        added = [s for s in new_frames if s not in old_frames]
+        pairs = {s: s for s in new_frames if s in old_frames}  # new name -> old name
+
+        # A removed sheet whose rows mostly reappear in an added sheet was renamed
+        for old_name in list(removed):
+            scores = [(_similarity(old_frames[old_name], new_frames[new_name]), new_name) for new_name in added]
+            if scores:
+                score, new_name = max(scores)
+                if score >= DIFF_RENAME_SIMILARITY:
+                    pairs[new_name] = old_name
+                    removed.remove(old_name)
+                    added.remove(new_name)
+
+        summary = []
+        sheet_diffs = {}
+        for new_name, old_name in pairs.items():
+            result = diff_sheet(old_frames[old_name], new_frames[new_name], key_columns)
+            sheet_diffs[new_name] = result
+            changed = (len(result['inserted']) or len(result['deleted']) or len(result['modified'])
+                       or result['added_columns'] or result['removed_columns'])
+            status = 'Modified' if changed else 'Unchanged'
+            if new_name != old_name:
+                status = f"Renamed from '{old_name}'" + (' (modified)' if changed else '')
+            summary.append({
+                'Sheet': new_name,
+                'Status': status,
+                'Inserted Rows': len(result['inserted']),
+                'Deleted Rows': len(result['deleted']),
+                'Modified Rows': len(result['modified']),
+                'Changed Cells': len(result['cell_changes']),
+                'Added Columns': ', '.join(map(str, result['added_columns'])),
+                'Removed Columns': ', '.join(map(str, result['removed_columns'])),
+            })
+        for name in added:
+            summary.append({'Sheet': name, 'Status': 'Added', 'Inserted Rows': len(new_frames[name])})
+        for name in removed:
+            summary.append({'Sheet': name, 'Status': 'Removed', 'Deleted Rows': len(old_frames[name])})
+
+        summary_df = pd.DataFrame(summary, columns=SUMMARY_COLUMNS)
+        counts = SUMMARY_COLUMNS[2:6]
+        summary_df[counts] = summary_df[counts].fillna(0).astype('int64')
+        return summary_df.fillna(''), sheet_diffs, pairs
+    except Exception as e:
+        show_error(f"Error comparing workbooks: {str(e)}")
+        return None, {}, {}
+
+
+def _styled_row(ws, values, fill=None, cell_fills=None):
+    """Build a row of WriteOnlyCells with an optional row fill and per-cell overrides"""
+    row = []
+    for i, value in enumerate(values):
+        if value is pd.NaT or (isinstance(value, float) and value != value):
+            value = None
+        cell = WriteOnlyCell(ws, value=value)
+        cell_fill = (cell_fills or {}).get(i, fill)
+        if cell_fill is not None:
+            cell.fill = cell_fill
+        row.append(cell)
+    return row
+
+
+@instrumented
+def build_diff_report(summary_df, sheet_diffs, pairs, old_frames, new_frames):
+    """
+    Build a highlighted xlsx diff report (write-only, so large diffs stay cheap)
+
+    Sheets: 'Summary', one 'Δ <sheet>' per changed sheet (inserted rows green,
+    deleted red, modified yellow with changed cells orange) and 'Cell Changes'.
+
+    Returns:
+        openpyxl write-only Workbook
+    """
+    fills = {name: PatternFill(start_color=color, end_color=color, fill_type='solid')
+             for name, color in DIFF_FILL_COLORS.items()}
+    bold = Font(bold=True)
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Summary")
+    ws.append([WriteOnlyCell(ws, value=c) for c in summary_df.columns])
+    for values in summary_df.itertuples(index=False):
+        ws.append(_styled_row(ws, list(values)))
+
+    all_changes = []
+    for new_name, result in sheet_diffs.items():
+        if not (len(result['inserted']) or len(result['deleted']) or len(result['modified'])):
+            continue
+        old_df = old_frames[pairs[new_name]]
+        new_df = new_frames[new_name]
+        columns = list(new_df.columns)
+        column_index = {c: i + 3 for i, c in enumerate(columns)}
+
+        ws = wb.create_sheet(f"Δ {new_name}"[:31])
+        header = [WriteOnlyCell(ws, value=v) for v in ['Status', 'Old Row', 'New Row'] + columns]
+        for cell in header:
+            cell.font = bold
+        ws.append(header)
+
+        changes = result['cell_changes']
+        changed_cells = changes.groupby('new')['Column'].apply(list).to_dict() if not changes.empty else {}
+        new_values = new_df.to_numpy(dtype=object)
+        old_values = old_df.reindex(columns=columns).to_numpy(dtype=object)
+
+        for old_pos, new_pos in result['modified'].itertuples(index=False):
+            cell_fills = {column_index[c]: fills['changed'] for c in changed_cells.get(new_pos, [])}
+            ws.append(_styled_row(ws, ['Modified', old_pos + 2, new_pos + 2] + list(new_values[new_pos]),
+                                  fills['modified'], cell_fills))
+        for new_pos in result['inserted']:
+            ws.append(_styled_row(ws, ['Inserted', None, new_pos + 2] + list(new_values[new_pos]),
+                                  fills['inserted']))
+        for old_pos in result['deleted']:
+            ws.append(_styled_row(ws, ['Deleted', old_pos + 2, None] + list(old_values[old_pos]),
+                                  fills['deleted']))
+
+        if not changes.empty:
+            all_changes.append(changes.assign(Sheet=new_name, **{'Old Row': changes['old'] + 2,
+                                                                 'New Row': changes['new'] + 2}))
+
+    ws = wb.create_sheet("Cell Changes")
+    change_columns = ['Sheet', 'Old Row', 'New Row', 'Column', 'Old Value', 'New Value']
+    ws.append(change_columns)
+    if all_changes:
+        for values in pd.concat(all_changes)[change_columns].itertuples(index=False):
+            ws.append(_styled_row(ws, list(values)))
+    return wb
@@ -3,8 +3,15 @@ Reusable UI Components
 Common UI elements used across the application
 """
 
+from contextlib import contextmanager
 import streamlit as st
-from src.config.settings import MAX_PREVIEW_ROWS
+from src.utils.formula_engine import FormulaEngine
+from src.utils.operation_log import OperationLog
+from src.utils.export import export_frames
+from src.config.settings import (
+    MAX_PREVIEW_ROWS, SESSION_WORKBOOK, SESSION_WORKBOOK_HANDLE, SESSION_FORMULA_ENGINE, SESSION_DF_DICT,
+    SESSION_OPERATION_LOG, EXPORT_FORMATS, EXPORT_MIME_TYPES, SESSION_EXPORT_FORMAT
+)
 
 
 def render_file_uploader(label="Choose an Excel file", key="file_uploader"):
@@ -27,8 +34,120 @@ def render_download_button(data, filename, label="📥 Download File"):
     )
 
 
+def render_export_format_selector():
+    """Sidebar choice of the format every DataFrame download is written in"""
+    return st.selectbox("Download format:", EXPORT_FORMATS, key=SESSION_EXPORT_FORMAT,
+                        help="csv, parquet and arrow hold one table per file; several sheets download as a zip")
+
+
+def render_export_button(frames, file_stem, key, label="📥 Download", index=False, on_demand=False):
+    """
+    Download button for DataFrames in the format chosen in the sidebar
+    
+    Args:
+        frames: {sheet_name: DataFrame} or an iterable of (sheet_name, DataFrame) pairs
+        file_stem: Download file name without extension
+        key: Unique widget key
+        label: Download button label
+        index: Whether to write the DataFrame index
+        on_demand: Only build the file after a "Prepare Download" click (large sheets)
+    """
+    fmt = st.session_state.get(SESSION_EXPORT_FORMAT) or EXPORT_FORMATS[0]
+    if on_demand and not st.button(f"Prepare {fmt} Download", key=f"{key}_prepare"):
+        return None
+    data, extension = export_frames(frames, fmt, index=index)
+    if data is None:
+        return None
+    return st.download_button(
+        label=f"{label} ({extension})",
+        data=data,
+        file_name=f"{file_stem}.{extension}",
+        mime=EXPORT_MIME_TYPES[extension],
+        key=key
+    )
+
+
 def show_dataframe_preview(df, max_rows=MAX_PREVIEW_ROWS):
     """Display DataFrame with pagination info"""
     st.dataframe(df.head(max_rows), use_container_width=True)
     if len(df) > max_rows:
         st.info(f"Showing first {max_rows} rows of {len(df)} total rows")
+
+
+def get_editable_workbook():
+    """
+    Return this session's workbook for editing
+    
+    Uploaded workbooks are shared between sessions through the workbook
+    store; the first edit clones a private copy so other users are unaffected.
+    """
+    handle = st.session_state.get(SESSION_WORKBOOK_HANDLE)
+    if handle is not None and handle.workbook is st.session_state.get(SESSION_WORKBOOK):
+        st.session_state[SESSION_WORKBOOK] = handle.writable_workbook()
+    return st.session_state[SESSION_WORKBOOK]
+
+
+def get_formula_engine():
+    """
+    Return the formula engine for this session's editable workbook
+    
+    Copied from the workbook store's engine on first use.
+    """
+    wb = get_editable_workbook()
+    engine = st.session_state.get(SESSION_FORMULA_ENGINE)
+    if engine is None or engine.workbook is not wb:
+        handle = st.session_state.get(SESSION_WORKBOOK_HANDLE)
+        if handle is not None and handle.workbook is wb:
+            engine = handle.formula_engine()
+        else:
+            engine = FormulaEngine(wb)
+            engine.calculate_all()
+        st.session_state[SESSION_FORMULA_ENGINE] = engine
+    return engine
+
+
+def recalculate_workbook(cells=None, sheets=None):
+    """
+    Recompute the formulas affected by an edit and refresh the touched sheets' DataFrames
+    
+    Args:
+        cells: Iterable of (sheet_name, cell_address) pairs that were edited
+        sheets: Sheet names edited in bulk (re-scanned completely)
+        
+    Returns:
+        Number of formulas recomputed
+    """
+    engine = get_formula_engine()
+    # Sheets added, removed or renamed since the graph was built: rebuild it
+    rebuilt = engine.refresh()
+    cells = list(cells or [])
+    recomputed = engine.update(cells) if cells else set()
+    for sheet in sheets or []:
+        recomputed |= engine.update_sheet(sheet)
+    
+    touched = {key[0] for key in recomputed} | {sheet for sheet, _ in cells} | set(sheets or [])
+    if rebuilt:
+        touched |= engine.formula_sheets()
+    df_dict = st.session_state.get(SESSION_DF_DICT)
+    if df_dict is not None:
+        sheet_names = [ws.title for ws in engine.workbook.worksheets]
+        for sheet in [name for name in df_dict if name not in sheet_names]:
+            del df_dict[sheet]
+        for sheet in sheet_names:
+            if sheet in touched or sheet not in df_dict:
+                df_dict[sheet] = engine.to_frame(sheet)
+    return len(recomputed)
+
+
+@contextmanager
+def record_operation(label):
+    """
+    Record the workbook edits made inside the block as one undoable operation
+    
+    Yields the journal to pass to feature functions as `journal=`.
+    """
+    log = st.session_state.get(SESSION_OPERATION_LOG)
+    if log is None:
+        log = st.session_state[SESSION_OPERATION_LOG] = OperationLog()
+    with log.record(get_editable_workbook(), label) as journal:
+        yield journal
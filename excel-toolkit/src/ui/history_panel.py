@@ -0,0 +1,41 @@
+"""
+Undo / Redo UI
+Sidebar controls over the session's operation log
+"""
+
+import streamlit as st
+from src.ui.components import recalculate_workbook
+from src.config.settings import SESSION_OPERATION_LOG, SESSION_WORKBOOK
+
+
+def _replay(undo):
+    """Undo or redo the last operation and bring formulas and previews up to date"""
+    log = st.session_state[SESSION_OPERATION_LOG]
+    operation = log.undo() if undo else log.redo()
+    if operation is None:
+        return
+    st.session_state[SESSION_WORKBOOK] = operation.workbook
+    recalculate_workbook(cells=operation.cells())
+    st.rerun()
+
+
+def render_history_panel():
+    """Render the undo/redo panel (sidebar)"""
+    st.subheader("↩️ History")
+    log = st.session_state.get(SESSION_OPERATION_LOG)
+    if log is None or (log.undo_label is None and log.redo_label is None):
+        st.caption("Edits to the workbook can be undone here")
+        return
+    
+    undo_col, redo_col = st.columns(2)
+    with undo_col:
+        if st.button("Undo", key="undo_btn", disabled=log.undo_label is None,
+                     help=f"Undo: {log.undo_label}" if log.undo_label else None):
+            _replay(undo=True)
+    with redo_col:
+        if st.button("Redo", key="redo_btn", disabled=log.redo_label is None,
+                     help=f"Redo: {log.redo_label}" if log.redo_label else None):
+            _replay(undo=False)
+    
+    for label in log.history()[:5]:
+        st.caption(f"• {label}")
@@ -0,0 +1,75 @@
+"""
+Instrumentation UI
+Sidebar breakdown of the time and memory each feature call took in the last rerun
+"""
+
+import uuid
+from contextlib import contextmanager
+import pandas as pd
+import streamlit as st
+from src.utils.instrumentation import recording, append_to_log
+from src.utils.notifications import show_warning
+from src.config.settings import (
+    SESSION_INSTRUMENTATION, SESSION_INSTRUMENTATION_MEMORY, SESSION_INSTRUMENTATION_ID,
+    INSTRUMENTATION_LOG_FILE
+)
+
+
+@contextmanager
+def rerun_recording():
+    """
+    Measure the feature calls of this rerun when the panel is switched on
+    
+    Yields the Recorder, or None when measuring is off (nothing is measured
+    then). Records are appended to the log even if the rerun is interrupted.
+    """
+    if not st.session_state.get(SESSION_INSTRUMENTATION):
+        yield None
+        return
+    
+    session_id = st.session_state.setdefault(SESSION_INSTRUMENTATION_ID, uuid.uuid4().hex[:8])
+    recorder = None
+    try:
+        with recording(trace_memory=st.session_state.get(SESSION_INSTRUMENTATION_MEMORY, True),
+                       label=session_id) as recorder:
+            yield recorder
+    finally:
+        if recorder is not None:
+            try:
+                append_to_log(recorder, INSTRUMENTATION_LOG_FILE)
+            except OSError as e:
+                show_warning(f"Could not write instrumentation log: {e}")
+
+
+def render_instrumentation_panel(recorder):
+    """Render the performance panel (sidebar) for the rerun measured by `recorder`"""
+    st.subheader("⏱️ Performance")
+    st.toggle("Measure operations", key=SESSION_INSTRUMENTATION)
+    if not st.session_state.get(SESSION_INSTRUMENTATION):
+        st.caption("Time every feature call and file load/save while you work")
+        return
+    
+    st.checkbox("Track peak memory (slower)", key=SESSION_INSTRUMENTATION_MEMORY)
+    if recorder is None:
+        st.caption("Measurements start with the next interaction")
+        return
+    
+    records = recorder.sorted_records()
+    elapsed_ms = 1000 * recorder.elapsed
+    if not records:
+        st.caption(f"Last rerun: {elapsed_ms:,.0f} ms, no feature calls")
+        return
+    
+    measured_ms = sum(record['wall_ms'] for record in records if record['depth'] == 0)
+    st.caption(f"Last rerun: {elapsed_ms:,.0f} ms, of which {measured_ms:,.0f} ms in "
+               f"{len(records)} measured call(s); the rest is Streamlit and UI code")
+    breakdown = pd.DataFrame([{
+        'Operation': ("↳ " * record['depth']) + record['operation'] + (" ⚠️" if record['error'] else ""),
+        'Wall (ms)': record['wall_ms'],
+        'CPU (ms)': record['cpu_ms'],
+        'Peak (MB)': record['peak_mb'],
+        'Input cells': record['input_cells'],
+        'Input KB': round(record['input_bytes'] / 1024, 1),
+    } for record in records])
+    st.dataframe(breakdown, hide_index=True, use_container_width=True)
+    st.caption(f"Appended to {INSTRUMENTATION_LOG_FILE}")
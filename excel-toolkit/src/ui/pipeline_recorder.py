@@ -0,0 +1,69 @@
+"""
+Pipeline Recorder UI
+Record feature operations performed in the app as a replayable pipeline
+"""
+
+import streamlit as st
+from src.batch.pipeline import create_pipeline, pipeline_to_json
+from src.config.settings import (
+    SESSION_DF_DICT, SESSION_PIPELINE_STEPS, SESSION_PIPELINE_RECORDING, EXPORT_FORMATS
+)
+
+
+def record_steps(steps):
+    """
+    Append (operation, params) pairs to the recorded pipeline if recording is on
+
+    Steps are recorded when an operation is applied. Clicking the same button
+    again with the same inputs would append the same steps again, so a group
+    identical to the end of the pipeline is skipped.
+    """
+    if not st.session_state.get(SESSION_PIPELINE_RECORDING) or not steps:
+        return
+    recorded = st.session_state[SESSION_PIPELINE_STEPS]
+    new_steps = [{'operation': operation, 'params': params} for operation, params in steps]
+    if recorded[-len(new_steps):] == new_steps:
+        return
+    recorded.extend(new_steps)
+
+
+def record_step(operation, **params):
+    """Append one operation to the recorded pipeline (see record_steps)"""
+    record_steps([(operation, params)])
+
+
+def render_pipeline_recorder():
+    """Render the pipeline recorder panel (sidebar)"""
+    st.subheader("🎬 Pipeline Recorder")
+    st.toggle("Record operations", key=SESSION_PIPELINE_RECORDING)
+    steps = st.session_state[SESSION_PIPELINE_STEPS]
+
+    if not steps:
+        st.caption("Turn recording on, then filter, delete rows, clean columns, find/replace, pivot or resample as usual")
+        return
+
+    for i, step in enumerate(steps, start=1):
+        sheet = step['params'].get('sheet')
+        st.caption(f"{i}. {step['operation']}" + (f" ({sheet})" if sheet else ""))
+
+    available_sheets = list(st.session_state.get(SESSION_DF_DICT, {}).keys())
+    available_sheets += [step['params']['target'] for step in steps if step['params'].get('target')]
+    export_sheets = st.multiselect("Export sheets:", available_sheets, key="pipeline_export_sheets",
+                                   help="Leave empty to export every sheet")
+    export_format = st.selectbox("Export format:", EXPORT_FORMATS, key="pipeline_export_fmt")
+    if st.button("Add Export Step", key="pipeline_add_export"):
+        steps.append({'operation': 'export', 'params': {'sheets': export_sheets, 'fmt': export_format}})
+        st.rerun()
+
+    pipeline_name = st.text_input("Pipeline name:", value="Recorded pipeline", key="pipeline_name")
+    st.download_button(
+        label="📥 Download Pipeline",
+        data=pipeline_to_json(create_pipeline(steps, pipeline_name)),
+        file_name="pipeline.json",
+        mime="application/json"
+    )
+    st.caption("Replay with: python main.py pipeline pipeline.json <folder> --watch")
+
+    if st.button("Clear Steps", key="pipeline_clear"):
+        st.session_state[SESSION_PIPELINE_STEPS] = []
+        st.rerun()
@@ -1,18 +1,171 @@
 """
 Tab 2: Data Analysis & Visualization UI
-Charts, statistics, pivot tables, filtering, and search
+Charts, statistics, profiling, pivot tables, time series, filtering, and search
+
+In exploration mode, charts, statistics, pivots and filters on long sheets are
+answered from a cached stratified sample on every rerun; "Compute exact" runs
+the full computation on a background thread and shows it once it finishes.
 """
 
+from functools import partial
 import streamlit as st
 from openpyxl import Workbook
 from openpyxl.utils.dataframe import dataframe_to_rows
 from src.features.data_analysis import (
-    create_chart, calculate_statistics, create_pivot_table,
-    filter_data, search_in_excel
+    create_chart, calculate_statistics, workbook_statistics, create_pivot_table,
+    build_time_index, time_series_analysis, filter_data, search_in_excel
+)
+from src.features.lazy_analysis import POLARS_AVAILABLE, to_columnar, run_analysis_plan, filter_matches_pandas
+from src.features.sql_query import DUCKDB_AVAILABLE, build_table_map, run_sql_query
+from src.features.column_profile import profile_sheet
+from src.features.sampling import (
+    run_exact, draw_sample, estimate_statistics, estimate_pivot, estimate_filter_count
 )
 from src.utils.file_handlers import create_download_link
-from src.ui.components import show_dataframe_preview
-from src.config.settings import SESSION_WORKBOOK, SESSION_DF_DICT
+from src.ui.components import (
+    show_dataframe_preview, get_editable_workbook, recalculate_workbook, record_operation, render_export_button
+)
+from src.ui.pipeline_recorder import record_step, record_steps
+from src.config.settings import (
+    SESSION_WORKBOOK, SESSION_DF_DICT, SESSION_COLUMNAR_CACHE, ANALYSIS_BACKENDS, PIVOT_AGGREGATIONS,
+    SQL_ENGINES, SESSION_SQL_RESULT, CHART_TYPES, SESSION_PROFILE_CACHE, MAX_SHEET_NAME_LENGTH,
+    TIME_FREQUENCIES, WINDOW_FUNCTIONS, SESSION_TIME_INDEX_CACHE, SESSION_TIME_SERIES_RESULT,
+    SAMPLE_ROWS, SAMPLE_MIN_ROWS, SAMPLE_CONFIDENCE, EXACT_POLL_SECONDS, SESSION_SAMPLE_CACHE, SESSION_EXACT_JOBS
+)
+
+
+def get_columnar_frame(sheet_name):
+    """
+    Return the cached Polars frame for a sheet, converting it on first use
+    
+    The cache entry is keyed on the pandas object, so edits that replace the
+    sheet's DataFrame in SESSION_DF_DICT trigger a fresh conversion.
+    """
+    df = st.session_state[SESSION_DF_DICT][sheet_name]
+    cache = st.session_state.setdefault(SESSION_COLUMNAR_CACHE, {})
+    entry = cache.get(sheet_name)
+    if entry is None or entry[0] is not df:
+        entry = (df, to_columnar(df))
+        cache[sheet_name] = entry
+    return entry[1]
+
+
+def get_sheet_profile(sheet_name, compute=False):
+    """
+    Return the profile of a sheet if it is up to date, profiling it when `compute` is set
+    
+    Like the columnar cache, entries are tied to the sheet's DataFrame object,
+    so reruns skip even the fingerprint hashing until the sheet changes.
+    """
+    df = st.session_state[SESSION_DF_DICT][sheet_name]
+    cache = st.session_state.setdefault(SESSION_PROFILE_CACHE, {})
+    entry = cache.get(sheet_name)
+    if entry is None or entry[0] is not df:
+        if not compute:
+            return None
+        profile_df, histograms = profile_sheet(df)
+        if profile_df is None:
+            return None
+        entry = (df, (profile_df, histograms))
+        cache[sheet_name] = entry
+    return entry[1]
+
+
+def get_time_index(sheet_name, date_column, dayfirst=False):
+    """
+    Return a sheet indexed by a date column, parsing the dates only once
+    
+    Entries are tied to the sheet's DataFrame object like the other caches, so
+    changing frequency, window or comparison reuses the parsed index.
+    """
+    df = st.session_state[SESSION_DF_DICT][sheet_name]
+    cache = st.session_state.setdefault(SESSION_TIME_INDEX_CACHE, {})
+    key = (sheet_name, date_column, dayfirst)
+    entry = cache.get(key)
+    if entry is None or entry[0] is not df:
+        entry = (df, build_time_index(df, date_column, dayfirst))
+        cache[key] = entry
+    return entry[1]
+
+
+def get_sample(sheet_name, size, strata=None):
+    """
+    Return the (sample, design) of a sheet, drawing it on first use
+    
+    Entries are tied to the sheet's DataFrame object like the other caches, so
+    every interaction reuses one sample until the sheet changes.
+    """
+    df = st.session_state[SESSION_DF_DICT][sheet_name]
+    cache = st.session_state.setdefault(SESSION_SAMPLE_CACHE, {})
+    key = (sheet_name, size, strata)
+    entry = cache.get(key)
+    if entry is None or entry[0] is not df:
+        entry = (df, draw_sample(df, size, strata))
+        cache[key] = entry
+    return entry[1]
+
+
+@st.fragment(run_every=EXACT_POLL_SECONDS)
+def _poll_exact(future):
+    """Rerun the app once a background computation has finished"""
+    if future.done():
+        st.rerun()
+    st.caption("⏳ Computing the exact result in the background...")
+
+
+def render_exact_refinement(kind, df, params, compute, steps=()):
+    """
+    "Compute exact" button backed by a background job
+    
+    Only the latest job per kind is kept; its result is shown while the sheet
+    and the inputs (`params`) are unchanged.
+    
+    Args:
+        kind: Job slot and widget key prefix (one per analysis)
+        df: Sheet DataFrame the job runs on
+        params: Hashable description of the inputs
+        compute: Zero-argument callable doing the full computation
+        steps: (operation, params) pairs recorded in the pipeline when the job is submitted
+    
+    Returns:
+        The exact result once available for the current inputs, else None
+    """
+    jobs = st.session_state.setdefault(SESSION_EXACT_JOBS, {})
+    if st.button("🎯 Compute exact", key=f"{kind}_exact"):
+        jobs[kind] = (df, params, run_exact(compute))
+        record_steps(steps)
+    entry = jobs.get(kind)
+    if entry is None or entry[0] is not df or entry[1] != params:
+        return None
+    future = entry[2]
+    if not future.done():
+        _poll_exact(future)
+        return None
+    if future.exception() is not None or future.result() is None:
+        st.error("❌ The exact computation failed")
+        return None
+    return future.result()
+
+
+def apply_filter_sort(df, filter_step, sort_step, pivot_step):
+    """Filter, sort and optionally pivot a sheet with pandas"""
+    result_df = df.copy()
+    if filter_step:
+        result_df = filter_data(result_df, *filter_step)
+    result_df = result_df.sort_values(by=sort_step[0], ascending=sort_step[1])
+    if pivot_step:
+        result_df = create_pivot_table(result_df, *pivot_step)
+    return result_df
+
+
+def unique_sheet_title(wb, base_title):
+    """Sheet title based on `base_title` that is not taken yet and fits Excel's length limit"""
+    title = base_title[:MAX_SHEET_NAME_LENGTH]
+    suffix = 1
+    while title in wb.sheetnames:
+        suffix += 1
+        title = f"{base_title[:MAX_SHEET_NAME_LENGTH - len(str(suffix)) - 1]}_{suffix}"
+    return title
 
 
 def render_data_analysis_tab():
@@ -23,6 +176,22 @@ def render_data_analysis_tab():
         st.warning("⚠️ Please upload an Excel file in the Basic Operations tab first")
         return
     
+    if POLARS_AVAILABLE:
+        backend = st.radio("Execution engine:", ANALYSIS_BACKENDS, key="analysis_backend", horizontal=True,
+                           help="polars fuses filter → sort → pivot/statistics into one multi-threaded plan")
+    else:
+        backend = "pandas"
+        st.caption("Install polars to enable the fast lazy execution engine")
+    use_polars = backend == "polars"
+    
+    explore = st.toggle("🎲 Exploration mode", key="explore_mode",
+                        help=f"Sheets over {SAMPLE_MIN_ROWS:,} rows are analyzed on a stratified random sample "
+                             f"with {SAMPLE_CONFIDENCE:.0%} confidence bounds; exact results are computed on request")
+    sample_rows = SAMPLE_ROWS
+    if explore:
+        sample_rows = int(st.number_input("Sample rows:", min_value=1000, value=SAMPLE_ROWS, step=10000,
+                                          key="explore_sample_rows"))
+    
     # Chart Generation
     with st.expander("📈 Chart Generation", expanded=True):
         chart_sheet = st.selectbox("Select sheet:", list(st.session_state[SESSION_DF_DICT].keys()), key="chart_sheet")
@@ -38,7 +207,19 @@ def render_data_analysis_tab():
         
         chart_title = st.text_input("Chart title:", value=f"{chart_type} - {y_column} by {x_column}", key="chart_title")
         
-        if st.button("Generate Chart", key="gen_chart"):
+        if explore and len(df) > SAMPLE_MIN_ROWS:
+            sample_df, _ = get_sample(chart_sheet, sample_rows)
+            fig = create_chart(sample_df, chart_type, x_column, y_column, chart_title) if sample_df is not None else None
+            if fig:
+                st.plotly_chart(fig, use_container_width=True, key="chart_sample_figure")
+                st.caption(f"Plotted from {len(sample_df):,} sampled rows of {len(df):,}; "
+                           "bar and pie sizes add up sampled rows only")
+            exact_fig = render_exact_refinement(
+                'chart', df, (chart_type, x_column, y_column, chart_title),
+                partial(create_chart, df, chart_type, x_column, y_column, chart_title))
+            if exact_fig:
+                st.plotly_chart(exact_fig, use_container_width=True, key="chart_exact_figure")
+        elif st.button("Generate Chart", key="gen_chart"):
             fig = create_chart(df, chart_type, x_column, y_column, chart_title)
             if fig:
                 st.plotly_chart(fig, use_container_width=True)
@@ -48,19 +229,58 @@ def render_data_analysis_tab():
         stats_sheet = st.selectbox("Select sheet:", list(st.session_state[SESSION_DF_DICT].keys()), key="stats_sheet")
         df = st.session_state[SESSION_DF_DICT][stats_sheet]
         
-        selected_columns = st.multiselect("Select columns:", df.columns.tolist(), key="stats_cols")
+        all_sheets = st.checkbox("Every column of every sheet", key="stats_all_sheets",
+                                 help="Sheets are described side by side on all CPU cores")
+        selected_columns = st.multiselect("Select columns:", df.columns.tolist(), key="stats_cols",
+                                          disabled=all_sheets)
         
-        if st.button("Calculate Statistics", key="calc_stats"):
+        if all_sheets:
+            if st.button("Calculate Statistics", key="calc_stats_all"):
+                with st.spinner("Calculating..."):
+                    stats_df = workbook_statistics(st.session_state[SESSION_DF_DICT])
+                if stats_df is not None:
+                    st.dataframe(stats_df, use_container_width=True)
+                    render_export_button({"Statistics": stats_df}, "statistics_all_sheets", "stats_all_download",
+                                         label="📥 Download Statistics")
+        elif explore and len(df) > SAMPLE_MIN_ROWS:
             if selected_columns:
-                stats_df = calculate_statistics(df, selected_columns)
+                sample_df, design = get_sample(stats_sheet, sample_rows)
+                estimate_df = estimate_statistics(sample_df, design, selected_columns) if sample_df is not None else None
+                if estimate_df is not None:
+                    st.caption(f"Estimated from {len(sample_df):,} sampled rows of {len(df):,} "
+                               f"({SAMPLE_CONFIDENCE:.0%} bounds; median, mode, min, max and spread are sample values)")
+                    st.dataframe(estimate_df, use_container_width=True)
+                stats_df = render_exact_refinement(
+                    'stats', df, tuple(selected_columns), partial(calculate_statistics, df, selected_columns),
+                    steps=[('statistics', {'sheet': stats_sheet, 'columns': selected_columns})])
                 if stats_df is not None:
+                    st.write("**Exact statistics**")
                     st.dataframe(stats_df, use_container_width=True)
+                    render_export_button({"Statistics": stats_df}, f"statistics_{stats_sheet}", "stats_download",
+                                         label="📥 Download Statistics", index=True)
+            else:
+                st.info("Select columns to see estimates")
+        elif st.button("Calculate Statistics", key="calc_stats"):
+            if selected_columns:
+                if use_polars:
+                    stats_df = run_analysis_plan(get_columnar_frame(stats_sheet), stats_columns=selected_columns)
+                else:
+                    stats_df = calculate_statistics(df, selected_columns)
+                if stats_df is not None:
+                    record_step('statistics', sheet=stats_sheet, columns=selected_columns)
+                    st.dataframe(stats_df, use_container_width=True)
+                    render_export_button({"Statistics": stats_df}, f"statistics_{stats_sheet}", "stats_download",
+                                         label="📥 Download Statistics", index=True)
                     
                     if st.button("Save Statistics to New Sheet", key="save_stats"):
-                        wb = st.session_state[SESSION_WORKBOOK]
-                        new_sheet = wb.create_sheet(title="Statistics")
-                        for r in dataframe_to_rows(stats_df, index=True, header=True):
-                            new_sheet.append(r)
+                        with record_operation(f"Add statistics of '{stats_sheet}'") as journal:
+                            wb = get_editable_workbook()
+                            new_sheet = wb.create_sheet(title="Statistics")
+                            journal.sheet_added(new_sheet)
+                            for r in dataframe_to_rows(stats_df, index=True, header=True):
+                                new_sheet.append(r)
+                        st.session_state[SESSION_WORKBOOK] = wb
+                        recalculate_workbook()
                         
                         st.download_button(
                             label="📥 Download with Statistics",
@@ -71,6 +291,42 @@ def render_data_analysis_tab():
             else:
                 st.warning("Please select at least one column")
     
+    # Sheet Profile
+    with st.expander("🧾 Profile Sheet"):
+        profile_sheet_name = st.selectbox("Select sheet:", list(st.session_state[SESSION_DF_DICT].keys()), key="profile_sheet")
+        
+        if st.button("Profile Sheet", key="profile_btn"):
+            with st.spinner("Profiling columns..."):
+                get_sheet_profile(profile_sheet_name, compute=True)
+        
+        profile = get_sheet_profile(profile_sheet_name)
+        if profile is not None:
+            profile_df, histograms = profile
+            if profile_df['Distinct is estimate'].any():
+                st.caption("Distinct counts of long columns are HyperLogLog estimates (±1%)")
+            st.dataframe(profile_df, use_container_width=True)
+            
+            if histograms:
+                hist_column = st.selectbox("Histogram of:", list(histograms), key="profile_hist_col")
+                st.bar_chart(histograms[hist_column].set_index('Range')['Count'])
+            
+            export_col1, export_col2 = st.columns(2)
+            with export_col1:
+                render_export_button({"Profile": profile_df}, f"profile_{profile_sheet_name}", "profile_download",
+                                     label="📥 Download Profile")
+            with export_col2:
+                if st.button("Add Profile Sheet to Workbook", key="profile_save"):
+                    with record_operation(f"Add profile of '{profile_sheet_name}'") as journal:
+                        wb = get_editable_workbook()
+                        title = unique_sheet_title(wb, f"Profile_{profile_sheet_name}")
+                        profile_ws = wb.create_sheet(title=title)
+                        journal.sheet_added(profile_ws)
+                        for r in dataframe_to_rows(profile_df, index=False, header=True):
+                            profile_ws.append(r)
+                    st.session_state[SESSION_WORKBOOK] = wb
+                    recalculate_workbook()
+                    st.success(f"✅ Added sheet '{title}'")
+    
     # Pivot Table
     with st.expander("🔄 Pivot Table Creator"):
         pivot_sheet = st.selectbox("Select sheet:", list(st.session_state[SESSION_DF_DICT].keys()), key="pivot_sheet")
@@ -84,18 +340,53 @@ def render_data_analysis_tab():
         with piv_col3:
             values_col = st.selectbox("Values:", df.columns.tolist(), key="pivot_vals")
         with piv_col4:
-            aggfunc = st.selectbox("Aggregation:", ["sum", "mean", "count", "min", "max"], key="pivot_agg")
+            aggfunc = st.selectbox("Aggregation:", PIVOT_AGGREGATIONS, key="pivot_agg")
         
-        if st.button("Create Pivot Table", key="create_pivot"):
-            pivot_df = create_pivot_table(df, index_col, columns_col, values_col, aggfunc)
+        if explore and len(df) > SAMPLE_MIN_ROWS:
+            # Stratified by the row column so every row group is represented
+            sample_df, design = get_sample(pivot_sheet, sample_rows, index_col)
+            if sample_df is None:
+                sample_df, design = get_sample(pivot_sheet, sample_rows)
+            estimate_df, margin_df = (estimate_pivot(sample_df, design, index_col, columns_col, values_col, aggfunc)
+                                      if sample_df is not None else (None, None))
+            if estimate_df is not None:
+                st.caption(f"Estimated from {len(sample_df):,} sampled rows of {len(df):,}")
+                st.dataframe(estimate_df, use_container_width=True)
+                if aggfunc in ("sum", "mean", "count"):
+                    st.write(f"**± margin ({SAMPLE_CONFIDENCE:.0%} confidence)**")
+                    st.dataframe(margin_df, use_container_width=True)
+            pivot_df = render_exact_refinement(
+                'pivot', df, (index_col, columns_col, values_col, aggfunc),
+                partial(create_pivot_table, df, index_col, columns_col, values_col, aggfunc),
+                steps=[('pivot', {'sheet': pivot_sheet, 'index_col': index_col, 'columns_col': columns_col,
+                                  'values_col': values_col, 'aggfunc': aggfunc})])
             if pivot_df is not None:
+                st.write("**Exact pivot table**")
                 st.dataframe(pivot_df, use_container_width=True)
+                render_export_button({"Pivot_Table": pivot_df}, f"pivot_{pivot_sheet}", "pivot_download",
+                                     label="📥 Download Pivot Table", index=True)
+        elif st.button("Create Pivot Table", key="create_pivot"):
+            if use_polars:
+                pivot_df = run_analysis_plan(get_columnar_frame(pivot_sheet),
+                                             pivot_step=(index_col, columns_col, values_col, aggfunc))
+            else:
+                pivot_df = create_pivot_table(df, index_col, columns_col, values_col, aggfunc)
+            if pivot_df is not None:
+                record_step('pivot', sheet=pivot_sheet, index_col=index_col, columns_col=columns_col,
+                            values_col=values_col, aggfunc=aggfunc)
+                st.dataframe(pivot_df, use_container_width=True)
+                render_export_button({"Pivot_Table": pivot_df}, f"pivot_{pivot_sheet}", "pivot_download",
+                                     label="📥 Download Pivot Table", index=True)
                 
                 if st.button("Save Pivot to New Sheet", key="save_pivot"):
-                    wb = st.session_state[SESSION_WORKBOOK]
-                    new_sheet = wb.create_sheet(title="Pivot_Table")
-                    for r in dataframe_to_rows(pivot_df, index=True, header=True):
-                        new_sheet.append(r)
+                    with record_operation(f"Add pivot of '{pivot_sheet}'") as journal:
+                        wb = get_editable_workbook()
+                        new_sheet = wb.create_sheet(title="Pivot_Table")
+                        journal.sheet_added(new_sheet)
+                        for r in dataframe_to_rows(pivot_df, index=True, header=True):
+                            new_sheet.append(r)
+                    st.session_state[SESSION_WORKBOOK] = wb
+                    recalculate_workbook()
                     
                     st.download_button(
                         label="📥 Download with Pivot Table",
@@ -104,6 +395,89 @@ def render_data_analysis_tab():
                         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                     )
     
+    # Time Series
+    with st.expander("📅 Time Series"):
+        ts_sheet = st.selectbox("Select sheet:", list(st.session_state[SESSION_DF_DICT].keys()), key="ts_sheet")
+        df = st.session_state[SESSION_DF_DICT][ts_sheet]
+        
+        ts_col1, ts_col2, ts_col3 = st.columns(3)
+        with ts_col1:
+            date_col = st.selectbox("Date column:", df.columns.tolist(), key="ts_date_col")
+        with ts_col2:
+            ts_frequency = st.selectbox("Resample to:", ["(every row)"] + list(TIME_FREQUENCIES), index=3, key="ts_freq")
+        with ts_col3:
+            ts_aggfunc = st.selectbox("Aggregation:", PIVOT_AGGREGATIONS, key="ts_agg")
+        value_cols = st.multiselect("Value columns:", [c for c in df.columns if c != date_col], key="ts_values")
+        dayfirst = st.checkbox("Text dates are day-first (31/12/2024)", key="ts_dayfirst")
+        
+        win_col1, win_col2, win_col3 = st.columns(3)
+        with win_col1:
+            window_type = st.selectbox("Window:", ["None", "rolling", "expanding"], key="ts_window_type")
+        with win_col2:
+            window = st.text_input("Rolling size (periods, or a span like 7D):", value="3", key="ts_window")
+        with win_col3:
+            window_func = st.selectbox("Window function:", WINDOW_FUNCTIONS, key="ts_window_func")
+        
+        chg_col1, chg_col2 = st.columns(2)
+        with chg_col1:
+            change_label = st.selectbox("Period-over-period:", ["None", "difference", "percent"], key="ts_change")
+        with chg_col2:
+            periods = st.number_input("Compare with N periods back:", min_value=1, value=1, key="ts_periods")
+        
+        if st.button("Analyze Time Series", key="ts_run"):
+            if value_cols:
+                ts, dropped = get_time_index(ts_sheet, date_col, dayfirst)
+                if ts is not None:
+                    params = dict(
+                        value_columns=value_cols,
+                        frequency=None if ts_frequency == "(every row)" else ts_frequency,
+                        aggfunc=ts_aggfunc,
+                        window=window.strip() if window_type == "rolling" else None,
+                        window_type=None if window_type == "None" else window_type,
+                        window_func=window_func,
+                        change=None if change_label == "None" else change_label,
+                        periods=int(periods),
+                    )
+                    result_df = time_series_analysis(ts, **params)
+                    st.session_state[SESSION_TIME_SERIES_RESULT] = (ts_sheet, result_df)
+                    if result_df is not None:
+                        record_step('time_series', sheet=ts_sheet, date_col=date_col, dayfirst=dayfirst, **params)
+                    if dropped:
+                        st.warning(f"⚠️ Skipped {dropped} row(s) without a valid date in '{date_col}'")
+            else:
+                st.warning("Please select at least one value column")
+        
+        ts_result = st.session_state.get(SESSION_TIME_SERIES_RESULT)
+        if ts_result is not None and ts_result[0] == ts_sheet and ts_result[1] is not None:
+            result_df = ts_result[1]
+            st.dataframe(result_df, use_container_width=True)
+            
+            series_cols = result_df.columns[1:].tolist()
+            chart_cols = st.multiselect("Chart series:", series_cols, default=series_cols[:4], key="ts_chart_cols")
+            if chart_cols:
+                fig = create_chart(result_df, "Line Chart", 'Period', chart_cols, f"{', '.join(map(str, chart_cols))} over time")
+                if fig:
+                    st.plotly_chart(fig, use_container_width=True)
+            
+            ts_export1, ts_export2 = st.columns(2)
+            with ts_export1:
+                render_export_button({"Time_Series": result_df}, f"time_series_{ts_sheet}", "ts_download",
+                                     label="📥 Download Time Series")
+            with ts_export2:
+                if st.button("Add Time Series Sheet to Workbook", key="ts_save"):
+                    with record_operation(f"Add time series of '{ts_sheet}'") as journal:
+                        wb = get_editable_workbook()
+                        title = unique_sheet_title(wb, f"TimeSeries_{ts_sheet}")
+                        ts_ws = wb.create_sheet(title=title)
+                        journal.sheet_added(ts_ws)
+                        # Empty periods are written as blank cells rather than NaN
+                        cells_df = result_df.astype(object).where(result_df.notna(), None)
+                        for r in dataframe_to_rows(cells_df, index=False, header=True):
+                            ts_ws.append(r)
+                    st.session_state[SESSION_WORKBOOK] = wb
+                    recalculate_workbook()
+                    st.success(f"✅ Added sheet '{title}'")
+    
     # Filter & Sort
     with st.expander("🔍 Filter & Sort Data"):
         filter_sheet = st.selectbox("Select sheet:", list(st.session_state[SESSION_DF_DICT].keys()), key="filter_sheet")
@@ -125,28 +499,102 @@ def render_data_analysis_tab():
         with sort_col2:
             sort_order = st.radio("Order:", ["Ascending", "Descending"], key="sort_order", horizontal=True)
         
-        if st.button("Apply Filter & Sort", key="apply_filter"):
-            result_df = df.copy()
-            if filter_value:
-                result_df = filter_data(result_df, filter_column, filter_condition, filter_value)
-            result_df = result_df.sort_values(by=sort_column, ascending=(sort_order == "Ascending"))
+        pivot_result = st.checkbox("Pivot the filtered result", key="filter_pivot")
+        if pivot_result:
+            fp_col1, fp_col2, fp_col3, fp_col4 = st.columns(4)
+            with fp_col1:
+                fp_index = st.selectbox("Rows (Index):", df.columns.tolist(), key="filter_pivot_index")
+            with fp_col2:
+                fp_columns = st.selectbox("Columns:", df.columns.tolist(), key="filter_pivot_cols")
+            with fp_col3:
+                fp_values = st.selectbox("Values:", df.columns.tolist(), key="filter_pivot_vals")
+            with fp_col4:
+                fp_agg = st.selectbox("Aggregation:", PIVOT_AGGREGATIONS, key="filter_pivot_agg")
+        
+        ascending = sort_order == "Ascending"
+        filter_step = (filter_column, filter_condition, filter_value) if filter_value else None
+        pivot_step = (fp_index, fp_columns, fp_values, fp_agg) if pivot_result else None
+        steps = [('filter', {'sheet': filter_sheet, 'column': filter_column,
+                             'condition': filter_condition, 'value': filter_value})] if filter_step else []
+        steps.append(('sort', {'sheet': filter_sheet, 'column': sort_column, 'ascending': ascending}))
+        if pivot_step:
+            steps.append(('pivot', {'sheet': filter_sheet, 'index_col': fp_index, 'columns_col': fp_columns,
+                                    'values_col': fp_values, 'aggfunc': fp_agg}))
+        
+        if explore and len(df) > SAMPLE_MIN_ROWS:
+            if filter_step:
+                sample_df, design = get_sample(filter_sheet, sample_rows)
+                estimate = estimate_filter_count(sample_df, design, *filter_step) if sample_df is not None else None
+                if estimate is not None:
+                    count, lower, upper, matched_df = estimate
+                    st.metric("Estimated matching rows", f"{count:,.0f}")
+                    st.caption(f"{SAMPLE_CONFIDENCE:.0%} bounds: {lower:,.0f} – {upper:,.0f} of {len(df):,} rows "
+                               f"(from {len(sample_df):,} sampled rows; preview shows sampled matches)")
+                    show_dataframe_preview(matched_df.sort_values(by=sort_column, ascending=ascending))
+            result_df = render_exact_refinement(
+                'filter', df, (filter_step, sort_column, ascending, pivot_step),
+                partial(apply_filter_sort, df, filter_step, (sort_column, ascending), pivot_step), steps=steps)
+            if result_df is not None:
+                if pivot_step:
+                    st.success(f"Pivoted into {len(result_df)} rows from {len(df)} total rows")
+                else:
+                    st.success(f"Filtered to {len(result_df)} rows from {len(df)} total rows")
+                show_dataframe_preview(result_df)
+                render_export_button({"Filtered_Data": result_df}, "filtered_data", "filter_download",
+                                     label="📥 Download Filtered Data", index=pivot_result)
+        elif st.button("Apply Filter & Sort", key="apply_filter"):
+            if use_polars and (not filter_step or filter_matches_pandas(df, filter_column)):
+                # One fused plan; only the final result is materialized
+                result_df = run_analysis_plan(get_columnar_frame(filter_sheet), filter_step=filter_step,
+                                              sort_step=(sort_column, ascending), pivot_step=pivot_step)
+            else:
+                result_df = apply_filter_sort(df, filter_step, (sort_column, ascending), pivot_step)
             
-            st.success(f"Filtered to {len(result_df)} rows from {len(df)} total rows")
-            show_dataframe_preview(result_df)
+            if result_df is not None:
+                record_steps(steps)
+                if pivot_step:
+                    st.success(f"Pivoted into {len(result_df)} rows from {len(df)} total rows")
+                else:
+                    st.success(f"Filtered to {len(result_df)} rows from {len(df)} total rows")
+                show_dataframe_preview(result_df)
+                render_export_button({"Filtered_Data": result_df}, "filtered_data", "filter_download",
+                                     label="📥 Download Filtered Data", index=pivot_result)
+    
+    # SQL Query Console
+    with st.expander("🧮 SQL Query Console"):
+        tables = build_table_map(st.session_state[SESSION_DF_DICT])
+        st.caption("Tables: " + ", ".join(f"`{table}` ({sheet})" for table, sheet in tables.items()))
+        
+        sql_engines = SQL_ENGINES if DUCKDB_AVAILABLE else ["sqlite"]
+        sql_engine = st.radio("Engine:", sql_engines, key="sql_engine", horizontal=True)
+        default_table = next(iter(tables))
+        query = st.text_area("SQL query:", value=f"SELECT * FROM {default_table} LIMIT 100", key="sql_query")
+        
+        if st.button("Run Query", key="run_sql"):
+            with st.spinner("Running query..."):
+                st.session_state[SESSION_SQL_RESULT] = run_sql_query(st.session_state[SESSION_DF_DICT], query, sql_engine)
+        
+        sql_result = st.session_state.get(SESSION_SQL_RESULT)
+        if sql_result is not None:
+            st.success(f"Query returned {len(sql_result)} rows")
+            show_dataframe_preview(sql_result)
             
-            if st.button("Save Filtered Data", key="save_filtered"):
-                wb = Workbook()
-                ws = wb.active
-                ws.title = "Filtered_Data"
-                for r in dataframe_to_rows(result_df, index=False, header=True):
-                    ws.append(r)
+            if not sql_result.empty:
+                sql_col1, sql_col2, sql_col3 = st.columns(3)
+                with sql_col1:
+                    sql_chart_type = st.selectbox("Chart type:", CHART_TYPES, key="sql_chart_type")
+                with sql_col2:
+                    sql_x = st.selectbox("X-axis / Names:", sql_result.columns.tolist(), key="sql_x_col")
+                with sql_col3:
+                    sql_y = st.selectbox("Y-axis / Values:", sql_result.columns.tolist(), key="sql_y_col")
                 
-                st.download_button(
-                    label="📥 Download Filtered Data",
-                    data=create_download_link(wb, "filtered.xlsx"),
-                    file_name="filtered_data.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
+                if st.button("Chart Result", key="sql_chart"):
+                    fig = create_chart(sql_result, sql_chart_type, sql_x, sql_y, f"{sql_chart_type} - {sql_y} by {sql_x}")
+                    if fig:
+                        st.plotly_chart(fig, use_container_width=True)
+            
+            render_export_button({"Query_Result": sql_result}, "query_result", "sql_download",
+                                 label="📥 Download Query Result")
     
     # Search
     with st.expander("🔎 Search Functionality"):
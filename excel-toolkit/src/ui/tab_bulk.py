@@ -1,21 +1,34 @@
 """
 Tab 3: Bulk Operations UI
-Batch modifications, merge, split, copy, delete, and find/replace
+Batch modifications, merge, split, copy, lookup, diff, delete, column transforms, dedup, and find/replace
 """
 
 import streamlit as st
 import pandas as pd
-from openpyxl import Workbook
+from openpyxl import Workbook, load_workbook
 from openpyxl.utils.dataframe import dataframe_to_rows
 from io import BytesIO
 import zipfile
+from functools import partial
 from src.features.bulk_operations import (
     batch_modify_cells, merge_excel_files, split_excel_by_column,
-    copy_data_between_sheets, delete_rows_by_condition, find_and_replace
+    copy_data_between_sheets, delete_rows_by_condition, find_and_replace, join_sheets,
+    find_duplicates, iter_sheet_frames, iter_file_frames, iter_deduplicated_frames
+)
+from src.features.workbook_diff import diff_workbooks, build_diff_report
+from src.features.column_transforms import apply_transforms, preview_transforms, write_transformed_columns
+from src.utils.file_handlers import (
+    create_download_link, load_all_sheet_data
+)
+from src.utils.workbook_store import workbook_store
+from src.ui.components import (
+    show_dataframe_preview, get_editable_workbook, recalculate_workbook, record_operation, render_export_button
+)
+from src.ui.pipeline_recorder import record_step
+from src.config.settings import (
+    SESSION_WORKBOOK, SESSION_DF_DICT, SESSION_TRANSFORM_STEPS, JOIN_TYPES, DEDUP_SCOPES,
+    COLUMN_TRANSFORMS, TRANSFORM_OPERATORS, SESSION_DELETE_PREVIEW, SESSION_REPLACE_PREVIEW
 )
-from src.utils.file_handlers import create_download_link, load_excel_with_password
-from src.ui.components import show_dataframe_preview
-from src.config.settings import SESSION_WORKBOOK, SESSION_DF_DICT
 
 
 def render_bulk_operations_tab():
@@ -39,8 +52,16 @@ def render_bulk_operations_tab():
                 
                 if st.button("Apply Batch Modifications", key="apply_batch"):
                     with st.spinner("Applying modifications..."):
-                        wb, results_df = batch_modify_cells(st.session_state[SESSION_WORKBOOK], modifications_df)
+                        with record_operation("Batch modify cells") as journal:
+                            wb, results_df = batch_modify_cells(get_editable_workbook(), modifications_df, journal=journal)
                         st.session_state[SESSION_WORKBOOK] = wb
+                        edited = [
+                            (row.get('SheetName', wb.sheetnames[0]), row['CellAddress'])
+                            for _, row in modifications_df.iterrows()
+                        ]
+                        recomputed = recalculate_workbook(cells=edited)
+                    if recomputed:
+                        st.info(f"🔄 Recalculated {recomputed} dependent formula(s)")
                     
                     st.write("**Results:**")
                     st.dataframe(results_df)
@@ -115,17 +136,30 @@ def render_bulk_operations_tab():
         copy_col1, copy_col2 = st.columns(2)
         with copy_col1:
             st.write("**Source**")
-            source_sheet = st.selectbox("Source sheet:", sheets, key="copy_src_sheet")
-            source_range = st.text_input("Source range (e.g., A1:C10):", key="copy_src_range")
+            copy_source = st.radio("Source:", ["This workbook", "Upload file"], key="copy_source", horizontal=True)
+            source_wb = None
+            source_sheets = sheets
+            if copy_source == "Upload file":
+                copy_file = st.file_uploader("Source file:", type=["xlsx"], key="copy_src_file")
+                # Read-only use, so the parsed workbook can come straight from the shared store
+                source_wb = workbook_store.open(copy_file.getvalue()).workbook if copy_file else None
+                source_sheets = source_wb.sheetnames if source_wb is not None else []
+            source_sheet = st.selectbox("Source sheet:", source_sheets, key="copy_src_sheet")
+            source_range = st.text_input("Source range (e.g., A1:C10, B5, A:C, 3:5 or a named range):", key="copy_src_range")
         with copy_col2:
             st.write("**Destination**")
             dest_sheet = st.selectbox("Destination sheet:", sheets, key="copy_dest_sheet")
             dest_start = st.text_input("Destination start cell (e.g., A1):", key="copy_dest_start")
+            copy_formats = st.checkbox("Keep formatting (styles, merged cells, column widths, row heights)",
+                                       value=True, key="copy_formats")
         
         if st.button("Copy Data", key="copy_data_btn"):
-            if source_range and dest_start:
-                wb = copy_data_between_sheets(wb, source_sheet, source_range, dest_sheet, dest_start)
+            if source_sheet and source_range and dest_start:
+                with record_operation(f"Copy {source_sheet}!{source_range} to {dest_sheet}!{dest_start}") as journal:
+                    wb = copy_data_between_sheets(get_editable_workbook(), source_sheet, source_range, dest_sheet, dest_start,
+                                                  journal=journal, source_wb=source_wb, formats=copy_formats)
                 st.session_state[SESSION_WORKBOOK] = wb
+                recalculate_workbook(sheets=[dest_sheet])
                 st.success("✅ Data copied successfully")
                 st.download_button(
                     label="📥 Download Updated File",
@@ -136,6 +170,101 @@ def render_bulk_operations_tab():
             else:
                 st.warning("Please fill in all fields")
     
+    # Lookup / Join Sheets
+    with st.expander("🔍 Lookup / Join Sheets"):
+        if st.session_state.get(SESSION_DF_DICT):
+            df_dict = st.session_state[SESSION_DF_DICT]
+            join_col1, join_col2 = st.columns(2)
+            with join_col1:
+                st.write("**Main sheet**")
+                left_sheet = st.selectbox("Sheet:", list(df_dict.keys()), key="join_left_sheet")
+                left_df = df_dict[left_sheet]
+                left_keys = st.multiselect("Key column(s):", left_df.columns.tolist(), key="join_left_keys")
+            with join_col2:
+                st.write("**Lookup sheet**")
+                lookup_source = st.radio("Source:", ["This workbook", "Upload file"], key="join_source", horizontal=True)
+                right_df = None
+                if lookup_source == "This workbook":
+                    right_sheet = st.selectbox("Sheet:", list(df_dict.keys()), key="join_right_sheet")
+                    right_df = df_dict[right_sheet]
+                else:
+                    lookup_file = st.file_uploader("Lookup file:", type=["xlsx", "csv"], key="join_lookup_file")
+                    if lookup_file:
+                        if lookup_file.name.lower().endswith(".csv"):
+                            right_df = pd.read_csv(lookup_file)
+                        else:
+                            lookup_frames = pd.read_excel(lookup_file, sheet_name=None)
+                            right_sheet = st.selectbox("Sheet:", list(lookup_frames.keys()), key="join_upload_sheet")
+                            right_df = lookup_frames[right_sheet]
+                right_columns = right_df.columns.tolist() if right_df is not None else []
+                right_keys = st.multiselect("Key column(s):", right_columns, key="join_right_keys")
+            
+            opt_col1, opt_col2 = st.columns(2)
+            with opt_col1:
+                join_how = st.selectbox("Join type:", JOIN_TYPES, key="join_how",
+                                        help="left: keep every main row · inner: matches only · anti: main rows with no match")
+                lookup_columns = st.multiselect("Columns to bring in:", [c for c in right_columns if c not in right_keys],
+                                                key="join_lookup_cols", help="Leave empty to bring in all columns")
+            with opt_col2:
+                keys_as_text = st.checkbox("Match keys as text (trim, ignore 1001 vs '1001')", key="join_as_text")
+                dedupe_lookup = st.checkbox("Use first match only for duplicate lookup keys", key="join_dedupe")
+            
+            if st.button("Run Lookup", key="join_btn"):
+                if right_df is None or not left_keys or len(left_keys) != len(right_keys):
+                    st.warning("Please choose a lookup sheet and the same number of key columns on both sides")
+                else:
+                    with st.spinner("Joining..."):
+                        result_df, diagnostics = join_sheets(
+                            left_df, right_df, left_keys, right_keys, join_how,
+                            lookup_columns or None, keys_as_text, dedupe_lookup
+                        )
+                    
+                    if result_df is not None:
+                        duplicate_sample = diagnostics.pop('Duplicate key sample')
+                        st.dataframe(pd.DataFrame([diagnostics]), use_container_width=True)
+                        if diagnostics['Duplicate lookup keys'] and not dedupe_lookup:
+                            st.warning(f"⚠️ {diagnostics['Duplicate lookup keys']} lookup key(s) appear more than once, "
+                                       "so matching main rows are repeated. Sample:")
+                            st.dataframe(duplicate_sample)
+                        show_dataframe_preview(result_df)
+                        render_export_button({"Joined": result_df}, "joined_data", "join_download",
+                                             label="📥 Download Joined Data")
+    
+    # Compare Workbook Versions
+    with st.expander("🆚 Compare Workbook Versions"):
+        if st.session_state.get(SESSION_DF_DICT):
+            df_dict = st.session_state[SESSION_DF_DICT]
+            other_file = st.file_uploader("Other version of this workbook:", type=["xlsx"], key="diff_file")
+            other_is = st.radio("Uploaded file is the:", ["Older version", "Newer version"], key="diff_direction",
+                                horizontal=True)
+            all_columns = list(dict.fromkeys(c for df in df_dict.values() for c in df.columns))
+            diff_keys = st.multiselect("Key column(s) (optional):", all_columns, key="diff_keys",
+                                       help="Match rows by key instead of by position; used on sheets that have every key")
+
+            if st.button("Compare", key="diff_btn"):
+                if not other_file:
+                    st.warning("Please upload the other version to compare against")
+                else:
+                    with st.spinner("Comparing..."):
+                        other_frames = load_all_sheet_data(other_file)
+                        old_frames, new_frames = (other_frames, df_dict) if other_is == "Older version" else (df_dict, other_frames)
+                        summary_df, sheet_diffs, pairs = diff_workbooks(old_frames, new_frames, diff_keys)
+
+                    if summary_df is not None:
+                        st.dataframe(summary_df, use_container_width=True)
+                        for sheet_name, result in sheet_diffs.items():
+                            if not result['cell_changes'].empty:
+                                st.write(f"**{sheet_name}** - changed cells")
+                                changes = result['cell_changes'].assign(Row=result['cell_changes']['new'] + 2)
+                                st.dataframe(changes[['Row', 'Column', 'Old Value', 'New Value']].head(100))
+                        report = build_diff_report(summary_df, sheet_diffs, pairs, old_frames, new_frames)
+                        st.download_button(
+                            label="📥 Download Diff Report",
+                            data=create_download_link(report, "diff_report.xlsx"),
+                            file_name="diff_report.xlsx",
+                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                        )
+    
     # Delete Rows by Condition
     with st.expander("🗑️ Delete Rows by Condition"):
         if st.session_state.get(SESSION_DF_DICT):
@@ -151,6 +280,11 @@ def render_bulk_operations_tab():
                 del_value = st.text_input("Value:", key="del_val")
             
             if st.button("Preview Deletion", key="preview_del"):
+                st.session_state[SESSION_DELETE_PREVIEW] = (df, del_column, del_condition, del_value)
+            
+            # The preview is kept until the inputs change so Confirm works on the next run
+            preview = st.session_state.get(SESSION_DELETE_PREVIEW)
+            if preview is not None and preview[0] is df and preview[1:] == (del_column, del_condition, del_value):
                 filtered_df, deleted_count = delete_rows_by_condition(df, del_column, del_condition, del_value)
                 st.warning(f"⚠️ This will delete {deleted_count} rows")
                 st.write("**Remaining data preview:**")
@@ -162,6 +296,8 @@ def render_bulk_operations_tab():
                     ws.title = del_sheet
                     for r in dataframe_to_rows(filtered_df, index=False, header=True):
                         ws.append(r)
+                    record_step('delete_rows', sheet=del_sheet, column=del_column,
+                                condition=del_condition, value=del_value)
                     
                     st.success(f"✅ Deleted {deleted_count} rows")
                     st.download_button(
@@ -171,6 +307,164 @@ def render_bulk_operations_tab():
                         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                     )
     
+    # Clean & Transform Columns
+    with st.expander("🧹 Clean & Transform Columns"):
+        if st.session_state.get(SESSION_DF_DICT):
+            df_dict = st.session_state[SESSION_DF_DICT]
+            tf_sheet = st.selectbox("Select sheet:", list(df_dict.keys()), key="tf_sheet")
+            df = df_dict[tf_sheet]
+            steps = st.session_state[SESSION_TRANSFORM_STEPS]
+            
+            tf_col1, tf_col2 = st.columns(2)
+            with tf_col1:
+                tf_columns = st.multiselect("Column(s):", df.columns.tolist(), key="tf_columns")
+            with tf_col2:
+                tf_op = st.selectbox("Transform:", list(COLUMN_TRANSFORMS), format_func=COLUMN_TRANSFORMS.get, key="tf_op")
+            
+            params = {}
+            if tf_op in ("extract", "replace"):
+                params['pattern'] = st.text_input("Regex pattern:", key="tf_pattern")
+                if tf_op == "replace":
+                    params['replacement'] = st.text_input("Replace with:", key="tf_replacement")
+                params['match_case'] = st.checkbox("Match case", value=True, key="tf_match_case")
+            elif tf_op == "date":
+                params['format'] = st.text_input("Date format (optional, e.g. %d/%m/%Y):", key="tf_date_format")
+                params['dayfirst'] = st.checkbox("Day comes first (31/12/2024)", key="tf_dayfirst")
+            elif tf_op == "fill":
+                params['method'] = st.selectbox("Fill with:", ["value", "previous", "next"], key="tf_fill_method")
+                if params['method'] == "value":
+                    params['value'] = st.text_input("Value:", key="tf_fill_value")
+            elif tf_op in ("split", "concat"):
+                params['separator'] = st.text_input("Separator:", value=" ", key="tf_separator")
+                if tf_op == "split":
+                    params['parts'] = int(st.number_input("Number of parts:", min_value=2, max_value=20, value=2, key="tf_parts"))
+            elif tf_op == "arithmetic":
+                params['operator'] = st.selectbox("Operator:", TRANSFORM_OPERATORS, key="tf_operator")
+                operand_kind = "Number" if params['operator'] == "round" else st.radio(
+                    "Operand:", ["Number", "Column"], key="tf_operand_kind", horizontal=True)
+                if operand_kind == "Column":
+                    params['operand_column'] = st.selectbox("Operand column:", df.columns.tolist(), key="tf_operand_col")
+                else:
+                    params['operand'] = st.number_input("Decimals:" if params['operator'] == "round" else "Number:",
+                                                        value=0.0, format="%g", key="tf_operand")
+            
+            target = None
+            if tf_op != "split":
+                target = st.text_input("Output column (optional):", key="tf_target",
+                                       help="Write to a new column instead of overwriting (single column only); "
+                                            "concatenation defaults to 'Combined'")
+            
+            if st.button("Add Step", key="tf_add"):
+                if tf_columns and (tf_op != "concat" or len(tf_columns) > 1):
+                    steps.append({'op': tf_op, 'columns': tf_columns, 'params': params, 'target': target or None})
+                else:
+                    st.warning("Please select the column(s) to transform (at least two to concatenate)")
+            
+            for i, step in enumerate(steps, start=1):
+                st.caption(f"{i}. {COLUMN_TRANSFORMS[step['op']]}: {', '.join(map(str, step['columns']))}"
+                           + (f" → {step['target']}" if step.get('target') else ""))
+            
+            if steps:
+                tf_btn1, tf_btn2, tf_btn3 = st.columns(3)
+                with tf_btn1:
+                    preview_clicked = st.button("Preview", key="tf_preview")
+                with tf_btn2:
+                    apply_clicked = st.button("Apply to Workbook", key="tf_apply")
+                with tf_btn3:
+                    if st.button("Clear Steps", key="tf_clear"):
+                        st.session_state[SESSION_TRANSFORM_STEPS] = []
+                        st.rerun()
+                
+                if preview_clicked:
+                    before_df, after_df = preview_transforms(df, steps)
+                    if after_df is not None:
+                        before_col, after_col = st.columns(2)
+                        with before_col:
+                            st.write("**Before**")
+                            st.dataframe(before_df, use_container_width=True)
+                        with after_col:
+                            st.write("**After**")
+                            st.dataframe(after_df, use_container_width=True)
+                
+                if apply_clicked:
+                    with st.spinner("Transforming columns..."):
+                        result_df, written_columns = apply_transforms(df, steps)
+                    if result_df is not None:
+                        with record_operation(f"Transform columns in '{tf_sheet}'") as journal:
+                            wb = get_editable_workbook()
+                            cell_count = write_transformed_columns(wb[tf_sheet], df, result_df, written_columns,
+                                                                   journal=journal)
+                        st.session_state[SESSION_WORKBOOK] = wb
+                        recalculate_workbook(sheets=[tf_sheet])
+                        record_step('transform', sheet=tf_sheet, steps=list(steps))
+                        st.success(f"✅ Updated {cell_count} cells in {len(written_columns)} column(s)")
+                        st.download_button(
+                            label="📥 Download Updated File",
+                            data=create_download_link(wb, "transformed.xlsx"),
+                            file_name="columns_transformed.xlsx",
+                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                        )
+    
+    # Find Duplicates
+    with st.expander("🧬 Find & Remove Duplicates"):
+        if st.session_state.get(SESSION_DF_DICT):
+            df_dict = st.session_state[SESSION_DF_DICT]
+            dup_scope = st.radio("Look for duplicates:", DEDUP_SCOPES, key="dup_scope", horizontal=True)
+            
+            if dup_scope == "Across uploaded files":
+                dup_files = st.file_uploader("Files to scan:", type=["xlsx", "csv"], accept_multiple_files=True,
+                                             key="dup_files")
+                frame_source = partial(iter_file_frames, dup_files or [])
+                key_options = []
+                for f in dup_files or []:
+                    f.seek(0)
+                    header = pd.read_csv(f, nrows=0) if f.name.lower().endswith(".csv") else pd.read_excel(f, nrows=0)
+                    key_options += [c for c in header.columns if c not in key_options]
+            else:
+                frame_source = partial(iter_sheet_frames, df_dict)
+                key_options = list(dict.fromkeys(c for df in df_dict.values() for c in df.columns))
+            
+            dup_keys = st.multiselect("Key column(s):", key_options, key="dup_keys",
+                                      help="Leave empty to compare entire rows; sheets missing a key column are skipped")
+            
+            norm_col1, norm_col2, norm_col3 = st.columns(3)
+            with norm_col1:
+                dup_trim = st.checkbox("Ignore surrounding spaces", value=True, key="dup_trim")
+            with norm_col2:
+                dup_casefold = st.checkbox("Ignore case", value=True, key="dup_casefold")
+            with norm_col3:
+                dup_tolerance = st.number_input("Numeric tolerance:", min_value=0.0, value=0.0, format="%g",
+                                                key="dup_tolerance", help="Numbers rounded to this step compare equal")
+            
+            if st.button("Find Duplicates", key="dup_btn"):
+                if dup_scope == "Across uploaded files" and not dup_files:
+                    st.warning("Please upload the files to scan")
+                else:
+                    with st.spinner("Hashing rows..."):
+                        clusters_df, summary, scan = find_duplicates(
+                            frame_source, dup_keys or None, dup_trim, dup_casefold, dup_tolerance,
+                            per_sheet=dup_scope == "Within each sheet"
+                        )
+                    
+                    if clusters_df is not None:
+                        st.dataframe(pd.DataFrame([summary]), use_container_width=True)
+                        if clusters_df.empty:
+                            st.info("No duplicates found")
+                        else:
+                            st.write("**Duplicate clusters:**")
+                            show_dataframe_preview(clusters_df)
+                            report_col, dedup_col = st.columns(2)
+                            with report_col:
+                                render_export_button({"Duplicates": clusters_df}, "duplicate_report", "dup_report_download",
+                                                     label="📥 Download Duplicate Report")
+                            with dedup_col:
+                                render_export_button(
+                                    iter_deduplicated_frames(frame_source, scan,
+                                                             prefix_source=dup_scope == "Across uploaded files"),
+                                    "deduplicated", "dedup_download",
+                                    label=f"📥 Download Without Duplicates (-{summary['Removable rows']} rows)"
+                                )
+    
     # Find and Replace
     with st.expander("🔄 Find and Replace"):
         wb = st.session_state[SESSION_WORKBOOK]
@@ -192,26 +486,36 @@ def render_bulk_operations_tab():
         if st.button("Preview Replacements", key="preview_replace"):
             if find_text:
                 sheet_name = None if search_sheet == "All sheets" else search_sheet
-                wb_copy = load_excel_with_password(create_download_link(wb, "temp.xlsx"))
-                from openpyxl import load_workbook
                 wb_copy = load_workbook(BytesIO(create_download_link(wb, "temp.xlsx")))
                 _, replacements_df = find_and_replace(wb_copy, find_text, replace_text, match_case, match_entire, sheet_name)
-                
-                if not replacements_df.empty:
-                    st.info(f"Found {len(replacements_df)} matches")
-                    st.dataframe(replacements_df.head(50))
-                    
-                    if st.button("Confirm Replace", key="confirm_replace"):
-                        wb, _ = find_and_replace(wb, find_text, replace_text, match_case, match_entire, sheet_name)
-                        st.session_state[SESSION_WORKBOOK] = wb
-                        st.success(f"✅ Replaced {len(replacements_df)} occurrences")
-                        st.download_button(
-                            label="📥 Download Updated File",
-                            data=create_download_link(wb, "replaced.xlsx"),
-                            file_name="find_replace.xlsx",
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                        )
-                else:
-                    st.info("No matches found")
+                st.session_state[SESSION_REPLACE_PREVIEW] = (wb, (find_text, replace_text, match_case, match_entire, sheet_name),
+                                                             replacements_df)
             else:
                 st.warning("Please enter text to find")
+        
+        # The preview is kept until the workbook or the inputs change so Confirm works on the next run
+        sheet_name = None if search_sheet == "All sheets" else search_sheet
+        preview = st.session_state.get(SESSION_REPLACE_PREVIEW)
+        if preview is not None and preview[0] is wb and preview[1] == (find_text, replace_text, match_case, match_entire, sheet_name):
+            replacements_df = preview[2]
+            if not replacements_df.empty:
+                st.info(f"Found {len(replacements_df)} matches")
+                st.dataframe(replacements_df.head(50))
+                
+                if st.button("Confirm Replace", key="confirm_replace"):
+                    with record_operation(f"Replace '{find_text}' with '{replace_text}'") as journal:
+                        wb, _ = find_and_replace(get_editable_workbook(), find_text, replace_text, match_case, match_entire, sheet_name, journal=journal)
+                    st.session_state[SESSION_WORKBOOK] = wb
+                    st.session_state[SESSION_REPLACE_PREVIEW] = None
+                    recalculate_workbook(sheets=[sheet_name] if sheet_name else wb.sheetnames)
+                    record_step('find_replace', sheet=sheet_name, find_text=find_text, replace_text=replace_text,
+                                match_case=match_case, match_entire=match_entire)
+                    st.success(f"✅ Replaced {len(replacements_df)} occurrences")
+                    st.download_button(
+                        label="📥 Download Updated File",
+                        data=create_download_link(wb, "replaced.xlsx"),
+                        file_name="find_replace.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    )
+            else:
+                st.info("No matches found")
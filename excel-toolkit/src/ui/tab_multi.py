@@ -0,0 +1,176 @@
+"""
+Tab 5: Multi-Workbook UI
+Load several workbooks at once and analyze them together by source file
+"""
+
+import streamlit as st
+import pandas as pd
+from functools import partial
+from src.features.multi_workbook import (
+    unique_file_names, load_workbooks, iter_collection_frames, collection_sheets, collection_summary,
+    combine_sheets, collection_statistics, collection_pivot, search_collection
+)
+from src.features.bulk_operations import find_duplicates, iter_deduplicated_frames
+from src.ui.components import show_dataframe_preview, render_export_button
+from src.config.settings import (
+    PIVOT_AGGREGATIONS, SOURCE_FILE_COLUMN, SESSION_COLLECTION, SESSION_COLLECTION_IDS
+)
+
+
+def sync_collection(files):
+    """
+    Keep the session collection in step with the uploader
+
+    Only files not seen before are parsed (all of them at once, in parallel);
+    files removed from the uploader are dropped from the collection.
+
+    Returns:
+        {file name: error message} for files that failed to load on this run
+    """
+    collection = st.session_state.setdefault(SESSION_COLLECTION, {})
+    ids = st.session_state.setdefault(SESSION_COLLECTION_IDS, {})  # uploader file id -> collection name
+    current = {f.file_id: f for f in files or []}
+
+    for file_id in [file_id for file_id in ids if file_id not in current]:
+        collection.pop(ids.pop(file_id), None)
+
+    new_files = [f for file_id, f in current.items() if file_id not in ids]
+    if not new_files:
+        return {}
+    names = unique_file_names([f.name for f in new_files], existing=collection)
+    with st.spinner(f"Loading {len(new_files)} file(s)..."):
+        loaded, errors = load_workbooks([(f.getvalue(), name) for f, name in zip(new_files, names)])
+    collection.update(loaded)
+    for f, name in zip(new_files, names):
+        ids[f.file_id] = name
+    return errors
+
+
+def render_multi_workbook_tab():
+    """Render the Multi-Workbook tab"""
+    st.header("🗂️ Multi-Workbook Analysis")
+
+    files = st.file_uploader("Choose Excel or CSV files", type=["xlsx", "xls", "csv"],
+                             accept_multiple_files=True, key="multi_files")
+    for name, error in sync_collection(files).items():
+        st.error(f"Could not load '{name}': {error}")
+
+    collection = st.session_state[SESSION_COLLECTION]
+    if not collection:
+        st.info("Upload two or more workbooks (e.g. one per month) to compare and roll them up together")
+        return
+
+    summary_df = collection_summary(collection)
+    metric_col1, metric_col2, metric_col3 = st.columns(3)
+    metric_col1.metric("Files", len(collection))
+    metric_col2.metric("Sheets", len(summary_df))
+    metric_col3.metric("Rows", f"{int(summary_df['Rows'].sum()):,}")
+    with st.expander("📋 Loaded Files"):
+        st.dataframe(summary_df, use_container_width=True)
+
+    sheet_counts = collection_sheets(collection)
+    sheet = st.selectbox("Sheet to analyze:", list(sheet_counts), key="multi_sheet",
+                         format_func=lambda s: f"{s} ({sheet_counts[s]} of {len(collection)} files)")
+    columns = list(dict.fromkeys(c for _, _, df in iter_collection_frames(collection, sheet) for c in df.columns))
+
+    # Combined data
+    with st.expander("🧩 Combined Data"):
+        all_sheets = st.checkbox("Stack every sheet (adds a 'Sheet' column)", key="multi_all_sheets")
+        combined_df = combine_sheets(collection, None if all_sheets else sheet)
+        if combined_df is not None:
+            st.write(f"**{len(combined_df):,} rows from {combined_df[SOURCE_FILE_COLUMN].nunique()} file(s)**")
+            show_dataframe_preview(combined_df)
+            render_export_button({"Combined": combined_df}, "combined", "multi_combined_download",
+                                 label="📥 Download Combined Data", on_demand=True)
+
+    # Statistics
+    with st.expander("📈 Statistics by File"):
+        stats_cols = st.multiselect("Select columns:", columns, key="multi_stats_cols")
+        if st.button("Calculate Statistics", key="multi_stats_btn"):
+            if stats_cols:
+                with st.spinner("Calculating..."):
+                    stats_df = collection_statistics(collection, sheet, stats_cols)
+                if stats_df is not None:
+                    st.dataframe(stats_df, use_container_width=True)
+                    render_export_button({"Statistics": stats_df}, "statistics_by_file", "multi_stats_download",
+                                         label="📥 Download Statistics")
+            else:
+                st.warning("Please select at least one column")
+
+    # Pivot / roll-up
+    with st.expander("🔄 Pivot & Roll-up Across Files"):
+        st.caption(f"Use '{SOURCE_FILE_COLUMN}' as rows or columns to compare files side by side; "
+                   "each file is aggregated separately and the results are combined")
+        dimension_options = [SOURCE_FILE_COLUMN] + columns
+        pivot_col1, pivot_col2 = st.columns(2)
+        with pivot_col1:
+            pivot_index = st.selectbox("Rows:", dimension_options, index=min(1, len(columns)), key="multi_pivot_index")
+            pivot_values = st.selectbox("Values:", columns, key="multi_pivot_values")
+        with pivot_col2:
+            pivot_columns = st.selectbox("Columns:", dimension_options, key="multi_pivot_columns")
+            pivot_agg = st.selectbox("Aggregation:", PIVOT_AGGREGATIONS, key="multi_pivot_agg")
+        pivot_total = st.checkbox("Add a Total column", value=True, key="multi_pivot_total",
+                                  disabled=pivot_agg not in ("sum", "count"))
+
+        if st.button("Create Pivot", key="multi_pivot_btn"):
+            if pivot_index == pivot_columns:
+                st.warning("Rows and columns must be different")
+            else:
+                with st.spinner("Aggregating files..."):
+                    pivot_df = collection_pivot(collection, sheet, pivot_index, pivot_columns, pivot_values, pivot_agg)
+                if pivot_df is not None:
+                    if pivot_total and pivot_agg in ("sum", "count"):
+                        pivot_df["Total"] = pivot_df.sum(axis=1)
+                    st.dataframe(pivot_df, use_container_width=True)
+                    render_export_button({"Pivot": pivot_df}, "pivot_across_files", "multi_pivot_download",
+                                         label="📥 Download Pivot", index=True)
+
+    # Search
+    with st.expander("🔍 Search All Files"):
+        search_col1, search_col2 = st.columns([3, 1])
+        with search_col1:
+            search_term = st.text_input("Search for:", key="multi_search_term")
+        with search_col2:
+            search_case = st.checkbox("Match case", key="multi_search_case")
+        if st.button("Search", key="multi_search_btn"):
+            if search_term:
+                results_df = search_collection(collection, search_term, search_case)
+                if results_df.empty:
+                    st.info("No matches found")
+                else:
+                    st.success(f"Found {len(results_df)} match(es) in "
+                               f"{results_df[SOURCE_FILE_COLUMN].nunique()} file(s)")
+                    show_dataframe_preview(results_df)
+                    render_export_button({"Search": results_df}, "search_results", "multi_search_download",
+                                         label="📥 Download Results")
+            else:
+                st.warning("Please enter a search term")
+
+    # Duplicates
+    with st.expander("🧬 Duplicates Across Files"):
+        frame_source = partial(iter_collection_frames, collection, sheet)
+        dup_keys = st.multiselect("Key column(s):", columns, key="multi_dup_keys",
+                                  help="Leave empty to compare entire rows; files missing a key column are skipped")
+        norm_col1, norm_col2, norm_col3 = st.columns(3)
+        with norm_col1:
+            dup_trim = st.checkbox("Ignore surrounding spaces", value=True, key="multi_dup_trim")
+        with norm_col2:
+            dup_casefold = st.checkbox("Ignore case", value=True, key="multi_dup_casefold")
+        with norm_col3:
+            dup_tolerance = st.number_input("Numeric tolerance:", min_value=0.0, value=0.0, format="%g",
+                                            key="multi_dup_tolerance", help="Numbers rounded to this step compare equal")
+
+        if st.button("Find Duplicates", key="multi_dup_btn"):
+            with st.spinner("Hashing rows..."):
+                clusters_df, summary, scan = find_duplicates(frame_source, dup_keys or None, dup_trim,
+                                                             dup_casefold, dup_tolerance)
+            if clusters_df is not None:
+                st.dataframe(pd.DataFrame([summary]), use_container_width=True)
+                if clusters_df.empty:
+                    st.info("No duplicates found")
+                else:
+                    st.write("**Duplicate clusters:**")
+                    show_dataframe_preview(clusters_df)
+                    render_export_button(iter_deduplicated_frames(frame_source, scan, prefix_source=True),
+                                         "deduplicated", "multi_dedup_download",
+                                         label=f"📥 Download Without Duplicates (-{summary['Removable rows']} rows)")
@@ -10,6 +10,7 @@ from src.features.sheet_management import (
 )
 from src.utils.file_handlers import create_download_link
 from src.utils.excel_helpers import validate_sheet_name
+from src.ui.components import get_editable_workbook, record_operation
 from src.config.settings import SESSION_WORKBOOK
 
 
@@ -36,7 +37,8 @@ def render_sheet_management_tab():
                 if new_sheet_name:
                     valid, msg = validate_sheet_name(new_sheet_name, wb.sheetnames)
                     if valid:
-                        wb = add_sheet(wb, new_sheet_name, position.lower())
+                        with record_operation(f"Add sheet '{new_sheet_name}'") as journal:
+                            wb = add_sheet(get_editable_workbook(), new_sheet_name, position.lower(), journal=journal)
                         st.session_state[SESSION_WORKBOOK] = wb
                         st.success(f"✅ Added sheet '{new_sheet_name}'")
                         st.rerun()
@@ -54,7 +56,8 @@ def render_sheet_management_tab():
                 if rename_new_name:
                     valid, msg = validate_sheet_name(rename_new_name, [s for s in wb.sheetnames if s != old_sheet_name])
                     if valid:
-                        wb = rename_sheet(wb, old_sheet_name, rename_new_name)
+                        with record_operation(f"Rename '{old_sheet_name}' to '{rename_new_name}'") as journal:
+                            wb = rename_sheet(get_editable_workbook(), old_sheet_name, rename_new_name, journal=journal)
                         st.session_state[SESSION_WORKBOOK] = wb
                         st.success(f"✅ Renamed to '{rename_new_name}'")
                         st.rerun()
@@ -69,7 +72,8 @@ def render_sheet_management_tab():
             
             if st.button("Delete Sheet", key="delete_sheet_btn"):
                 if len(wb.sheetnames) > 1:
-                    wb = delete_sheet(wb, delete_sheet_name)
+                    with record_operation(f"Delete sheet '{delete_sheet_name}'") as journal:
+                        wb = delete_sheet(get_editable_workbook(), delete_sheet_name, journal=journal)
                     st.session_state[SESSION_WORKBOOK] = wb
                     st.success(f"✅ Deleted sheet '{delete_sheet_name}'")
                     st.rerun()
@@ -98,7 +102,8 @@ def render_sheet_management_tab():
         if st.button("Apply New Order", key="reorder_btn"):
             new_order = [s.strip() for s in new_order_input.split(",")]
             if set(new_order) == set(current_order):
-                wb = reorder_sheets(wb, new_order)
+                with record_operation("Reorder sheets") as journal:
+                    wb = reorder_sheets(get_editable_workbook(), new_order, journal=journal)
                 st.session_state[SESSION_WORKBOOK] = wb
                 st.success("✅ Sheets reordered successfully")
                 st.download_button(
@@ -123,12 +128,14 @@ def render_sheet_management_tab():
             with col3:
                 if sheet.sheet_state == 'visible':
                     if st.button("Hide", key=f"hide_{sheet.title}"):
-                        wb = hide_unhide_sheet(wb, sheet.title, hide=True)
+                        with record_operation(f"Hide '{sheet.title}'") as journal:
+                            wb = hide_unhide_sheet(get_editable_workbook(), sheet.title, hide=True, journal=journal)
                         st.session_state[SESSION_WORKBOOK] = wb
                         st.rerun()
                 else:
                     if st.button("Unhide", key=f"unhide_{sheet.title}"):
-                        wb = hide_unhide_sheet(wb, sheet.title, hide=False)
+                        with record_operation(f"Unhide '{sheet.title}'") as journal:
+                            wb = hide_unhide_sheet(get_editable_workbook(), sheet.title, hide=False, journal=journal)
                         st.session_state[SESSION_WORKBOOK] = wb
                         st.rerun()
         
@@ -155,13 +162,15 @@ def render_sheet_management_tab():
                 if not is_protected:
                     protect_pw = st.text_input(f"Password for {sheet.title}:", type="password", key=f"protect_pw_{sheet.title}")
                     if st.button(f"Protect", key=f"protect_{sheet.title}"):
-                        wb = protect_sheet(wb, sheet.title, protect_pw if protect_pw else None)
+                        with record_operation(f"Protect '{sheet.title}'") as journal:
+                            wb = protect_sheet(get_editable_workbook(), sheet.title, protect_pw if protect_pw else None, journal=journal)
                         st.session_state[SESSION_WORKBOOK] = wb
                         st.success(f"✅ Protected '{sheet.title}'")
                         st.rerun()
                 else:
                     if st.button(f"Unprotect", key=f"unprotect_{sheet.title}"):
-                        wb = unprotect_sheet(wb, sheet.title)
+                        with record_operation(f"Unprotect '{sheet.title}'") as journal:
+                            wb = unprotect_sheet(get_editable_workbook(), sheet.title, journal=journal)
                         st.session_state[SESSION_WORKBOOK] = wb
                         st.success(f"✅ Unprotected '{sheet.title}'")
                         st.rerun()
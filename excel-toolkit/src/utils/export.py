@@ -0,0 +1,259 @@
+"""
+Streaming Export
+Write sheets and analysis results as xlsx, CSV, Parquet or Arrow IPC
+
+Frames are written in chunks of EXPORT_CHUNK_ROWS rows: each chunk is
+converted to text or Arrow on its own and appended to the output, so memory
+beyond the output itself stays bounded by one chunk however long the sheet
+is. xlsx output goes through dataframe_to_excel_bytes (write-only openpyxl).
+CSV, Parquet and Arrow hold one table per file, so exporting several sheets
+produces a zip archive with one file per sheet.
+
+Parquet and Arrow need pyarrow (installed with Streamlit). Arrow needs one
+type per column, so object columns are typed once per DataFrame: numbers,
+booleans and dates keep their type, anything mixed is written as text.
+"""
+
+import itertools
+import os
+import shutil
+import tempfile
+import zipfile
+from io import BytesIO
+import pandas as pd
+from src.utils.file_handlers import dataframe_to_excel_bytes
+from src.utils.notifications import show_error
+from src.utils.instrumentation import instrumented
+from src.config.settings import EXPORT_FORMATS, EXPORT_CHUNK_ROWS, EXPORT_SPOOL_BYTES
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow ships with Streamlit
+    pa = pq = None
+
+
+def _column_name(col):
+    """Arrow/CSV header for a column label (MultiIndex labels are joined)"""
+    if isinstance(col, tuple):
+        return " / ".join(str(part) for part in col if str(part) != "")
+    return str(col)
+
+
+def _prepare_frame(df, index):
+    """Move the index into columns if requested and make every header a string"""
+    if index:
+        df = df.reset_index()
+    if not all(isinstance(col, str) for col in df.columns):
+        df = df.set_axis([_column_name(col) for col in df.columns], axis=1)
+    return df
+
+
+def _object_arrow_type(series):
+    """Arrow type for an object column, or None to write it as text"""
+    kind = pd.api.types.infer_dtype(series, skipna=True)
+    if kind == 'integer':
+        return pa.int64()
+    if kind in ('floating', 'mixed-integer-float', 'integer-na'):
+        return pa.float64()
+    if kind == 'boolean':
+        return pa.bool_()
+    if kind in ('datetime', 'datetime64'):
+        return pa.timestamp('us')
+    if kind == 'date':
+        return pa.date32()
+    return None
+
+
+class _ArrowChunks:
+    """Convert the chunks of one sheet to Arrow tables sharing one schema"""
+
+    def __init__(self):
+        self.schema = None
+        self._frame = None
+        self._types = {}
+        self._text_columns = []
+
+    def _plan(self, df):
+        """Type the object columns of a whole DataFrame (one pass per column, no copies)"""
+        self._types = {}
+        self._text_columns = []
+        for col in df.columns:
+            if pd.api.types.is_object_dtype(df[col]):
+                arrow_type = _object_arrow_type(df[col])
+                if arrow_type is None:
+                    self._text_columns.append(col)
+                    arrow_type = pa.string()
+                self._types[col] = arrow_type
+
+    def convert(self, frame, chunk):
+        """Arrow table of one chunk of `frame`, cast to the sheet's schema"""
+        if frame is not self._frame:
+            self._frame = frame
+            self._plan(frame)
+        for col in self._text_columns:
+            chunk = chunk.assign(**{col: chunk[col].map(str, na_action='ignore')})
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        for col, arrow_type in self._types.items():
+            position = table.schema.get_field_index(col)
+            if table.schema.field(position).type != arrow_type:
+                table = table.set_column(position, pa.field(col, arrow_type), table.column(position).cast(arrow_type))
+        if self.schema is None:
+            # Dictionary (categorical) columns are stored as plain values so
+            # later chunks with other categories fit the same schema
+            self.schema = pa.schema([
+                pa.field(field.name, field.type.value_type) if pa.types.is_dictionary(field.type) else field
+                for field in table.schema
+            ])
+        if not table.schema.equals(self.schema):
+            try:
+                table = table.cast(self.schema)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError, ValueError) as e:
+                raise ValueError(f"Column types change between chunks ({e}); export as csv instead") from e
+        return table
+
+
+def _write_sheet(chunks, fmt, out):
+    """Write one sheet's (DataFrame, chunk) pairs to a binary file object"""
+    if fmt == "csv":
+        header = True
+        for _, chunk in chunks:
+            chunk.to_csv(out, header=header, index=False, encoding='utf-8')
+            header = False
+        return
+
+    converter = _ArrowChunks()
+    writer = None
+    try:
+        for frame, chunk in chunks:
+            table = converter.convert(frame, chunk)
+            if writer is None:
+                writer = (pq.ParquetWriter(out, converter.schema) if fmt == "parquet"
+                          else pa.ipc.new_file(out, converter.schema))
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _sheet_groups(frames, index, chunk_rows):
+    """Group chunks per sheet as (sheet name, iterator of (DataFrame, chunk))"""
+    def tagged():
+        for sheet_name, df in (frames.items() if isinstance(frames, dict) else frames):
+            df = _prepare_frame(df, index)
+            for start in range(0, max(len(df), 1), chunk_rows):
+                yield sheet_name, df, df.iloc[start:start + chunk_rows]
+
+    for sheet_name, group in itertools.groupby(tagged(), key=lambda item: item[0]):
+        yield sheet_name, ((df, chunk) for _, df, chunk in group)
+
+
+def _archive_name(sheet_name, fmt, used):
+    """Unique, filesystem-safe member name for a sheet inside the zip"""
+    stem = "".join(ch if ch.isalnum() or ch in " ._-" else "_" for ch in str(sheet_name)).strip() or "Sheet"
+    name, count = f"{stem}.{fmt}", 1
+    while name in used:
+        count += 1
+        name = f"{stem}_{count}.{fmt}"
+    used.add(name)
+    return name
+
+
+def write_export(frames, fmt, out, index=False, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Stream frames to a binary file object
+
+    Args:
+        frames: {sheet_name: DataFrame} or an iterable of (sheet_name, DataFrame) pairs
+        fmt: One of EXPORT_FORMATS (xlsx, csv, parquet, arrow)
+        out: Writable binary file object
+        index: Whether to write the DataFrame index
+        chunk_rows: Rows converted and written per batch
+
+    Returns:
+        Extension of what was written: fmt, or 'zip' when several sheets were
+        written in a format holding one table per file
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if fmt == "xlsx":
+        out.write(dataframe_to_excel_bytes(frames, index=index))
+        return fmt
+    if fmt != "csv" and pa is None:
+        raise ImportError(f"Exporting to {fmt} requires pyarrow (pip install pyarrow)")
+
+    groups = _sheet_groups(frames, index, chunk_rows)
+    first = next(groups, None)
+    if first is None:
+        raise ValueError("Nothing to export")
+    # The first sheet is spooled until we know whether a second one follows
+    with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES) as spool:
+        _write_sheet(first[1], fmt, spool)
+        second = next(groups, None)
+        spool.seek(0)
+        if second is None:
+            shutil.copyfileobj(spool, out)
+            return fmt
+
+        compression = zipfile.ZIP_DEFLATED if fmt == "csv" else zipfile.ZIP_STORED
+        used = set()
+        with zipfile.ZipFile(out, 'w', compression) as archive:
+            with archive.open(_archive_name(first[0], fmt, used), 'w') as member:
+                shutil.copyfileobj(spool, member)
+            for sheet_name, chunks in itertools.chain([second], groups):
+                with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES) as sheet_spool:
+                    _write_sheet(chunks, fmt, sheet_spool)
+                    sheet_spool.seek(0)
+                    with archive.open(_archive_name(sheet_name, fmt, used), 'w') as member:
+                        shutil.copyfileobj(sheet_spool, member)
+    return "zip"
+
+
+@instrumented
+def export_frames(frames, fmt, index=False, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Export frames for download
+
+    Args:
+        frames: {sheet_name: DataFrame} or an iterable of (sheet_name, DataFrame) pairs
+        fmt: One of EXPORT_FORMATS (xlsx, csv, parquet, arrow)
+        index: Whether to write the DataFrame index
+        chunk_rows: Rows converted and written per batch
+
+    Returns:
+        Tuple of (bytes, file extension) or (None, None) on error
+    """
+    try:
+        buffer = BytesIO()
+        extension = write_export(frames, fmt, buffer, index=index, chunk_rows=chunk_rows)
+        return buffer.getvalue(), extension
+    except Exception as e:
+        show_error(f"Error exporting to {fmt}: {str(e)}")
+        return None, None
+
+
+@instrumented
+def export_frames_to_path(frames, fmt, path_stem, index=False, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Export frames straight to disk (nothing but the current chunk is held in memory)
+
+    Args:
+        frames: {sheet_name: DataFrame} or an iterable of (sheet_name, DataFrame) pairs
+        fmt: One of EXPORT_FORMATS (xlsx, csv, parquet, arrow)
+        path_stem: Destination path without extension
+        index: Whether to write the DataFrame index
+        chunk_rows: Rows converted and written per batch
+
+    Returns:
+        Path written ('<path_stem>.<fmt>' or '<path_stem>.zip')
+    """
+    partial_path = f"{path_stem}.partial"
+    try:
+        with open(partial_path, 'wb') as f:
+            extension = write_export(frames, fmt, f, index=index, chunk_rows=chunk_rows)
+        path = f"{path_stem}.{extension}"
+        os.replace(partial_path, path)
+        return path
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
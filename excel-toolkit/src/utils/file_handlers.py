@@ -3,14 +3,19 @@ File Handling Utilities
 Functions for loading, saving, and managing Excel files
 """
 
-import streamlit as st
 import pandas as pd
-from openpyxl import load_workbook
+from openpyxl import load_workbook, Workbook
+from openpyxl.utils.dataframe import dataframe_to_rows
 import msoffcrypto
 from io import BytesIO
+from src.utils.notifications import show_error, cache_data
+from src.utils.instrumentation import instrumented
+from src.utils.sheet_executor import PROCESS, map_sheets, partition, worker_count
+from src.config.settings import EXCEL_MAX_ROWS, SHEET_WORKERS, SHEET_PARALLEL_MIN_BYTES
 
 
-@st.cache_data
+@instrumented
+@cache_data
 def load_excel_with_password(file_bytes, password=None):
     """
     Load Excel file with optional password protection
@@ -34,10 +39,11 @@ def load_excel_with_password(file_bytes, password=None):
         else:
             return BytesIO(file_bytes)
     except Exception as e:
-        st.error(f"Error loading file: {str(e)}")
+        show_error(f"Error loading file: {str(e)}")
         return None
 
 
+@instrumented
 def get_all_sheets(file_io):
     """
     Get all sheet names from Excel file
@@ -54,10 +60,11 @@ def get_all_sheets(file_io):
         wb.close()
         return sheets
     except Exception as e:
-        st.error(f"Error reading sheets: {str(e)}")
+        show_error(f"Error reading sheets: {str(e)}")
         return []
 
 
+@instrumented
 def load_sheet_data(file_io, sheet_name=None):
     """
     Load data from specific sheet into DataFrame
@@ -73,10 +80,11 @@ def load_sheet_data(file_io, sheet_name=None):
         df = pd.read_excel(file_io, sheet_name=sheet_name, engine='openpyxl')
         return df
     except Exception as e:
-        st.error(f"Error loading sheet data: {str(e)}")
+        show_error(f"Error loading sheet data: {str(e)}")
         return None
 
 
+@instrumented
 def create_download_link(wb, filename):
     """
     Create downloadable bytes from workbook
@@ -92,3 +100,116 @@ def create_download_link(wb, filename):
     wb.save(output)
     output.seek(0)
     return output.getvalue()
+
+
+def _read_sheets(file_bytes, sheet_names):
+    """Parse some sheets of an Excel file (runs in a worker process)"""
+    return pd.read_excel(BytesIO(file_bytes), sheet_name=sheet_names, engine='openpyxl')
+
+
+def _sheet_sizes(file_bytes):
+    """
+    {sheet name: uncompressed XML size} in workbook order, for balancing parse work
+
+    Relies on openpyxl's read-only internals (the zip archive and each sheet's
+    part path); returns None if they are not available.
+    """
+    wb = load_workbook(BytesIO(file_bytes), read_only=True)
+    try:
+        archive = getattr(wb, '_archive', None)
+        paths = [getattr(ws, '_worksheet_path', None) for ws in wb.worksheets]
+        if archive is None or None in paths:
+            return None
+        return {ws.title: archive.getinfo(path).file_size for ws, path in zip(wb.worksheets, paths)}
+    finally:
+        wb.close()
+
+
+@instrumented
+def load_all_sheet_data(file_io, workers=SHEET_WORKERS):
+    """
+    Load every sheet of an Excel file into DataFrames
+    
+    Files of SHEET_PARALLEL_MIN_BYTES or more with several sheets are parsed
+    in worker processes, each taking a batch of sheets of similar total size.
+    
+    Args:
+        file_io: BytesIO object or path of the Excel file
+        workers: Worker processes (None for all cores, 1 for a single parse)
+        
+    Returns:
+        Dictionary of {sheet_name: DataFrame} or empty dict on error
+    """
+    try:
+        if hasattr(file_io, 'read'):
+            file_io.seek(0)
+            file_bytes = file_io.read()
+        else:
+            with open(file_io, 'rb') as f:
+                file_bytes = f.read()
+        if len(file_bytes) < SHEET_PARALLEL_MIN_BYTES or worker_count(2, workers) == 1:
+            return _read_sheets(file_bytes, None)
+
+        sizes = _sheet_sizes(file_bytes)
+        if sizes is None:
+            return _read_sheets(file_bytes, None)
+        names = list(sizes)
+        batches = partition(list(sizes.values()), worker_count(len(names), workers))
+        if len(batches) == 1:
+            return _read_sheets(file_bytes, None)
+        tasks = [(file_bytes, [names[i] for i in batch]) for batch in batches]
+        parsed = {}
+        for frames in map_sheets(_read_sheets, tasks, kind=PROCESS, workers=workers):
+            parsed.update(frames)
+        return {name: parsed[name] for name in names}
+    except Exception as e:
+        show_error(f"Error loading sheet data: {str(e)}")
+        return {}
+
+
+def _clean_row(row):
+    """Replace NaN/NaT with None so openpyxl writes empty cells"""
+    return [None if v is pd.NaT or (isinstance(v, float) and v != v) else v for v in row]
+
+
+@instrumented
+def dataframe_to_excel_bytes(frames, index=False):
+    """
+    Serialize DataFrames to xlsx bytes using openpyxl's write-only mode
+    
+    Write-only worksheets stream rows to disk instead of building Cell
+    objects, so memory stays flat regardless of row count. Frames longer
+    than Excel's row limit continue on '<sheet>_2', '<sheet>_3', ...
+    
+    Args:
+        frames: Dictionary of {sheet_name: DataFrame}, or an iterable of
+            (sheet_name, DataFrame) pairs where consecutive pairs with the
+            same sheet name are appended to one sheet (chunked streaming)
+        index: Whether to write the DataFrame index
+        
+    Returns:
+        Bytes content of the workbook
+    """
+    wb = Workbook(write_only=True)
+    current_sheet = None
+    for sheet_name, df in (frames.items() if isinstance(frames, dict) else frames):
+        rows = dataframe_to_rows(df, index=index, header=True)
+        header = [next(rows) for _ in range(df.columns.nlevels + (1 if index else 0))]
+        
+        if sheet_name != current_sheet:
+            current_sheet = sheet_name
+            part = 1
+            ws = wb.create_sheet(title=sheet_name)
+            for r in header:
+                ws.append(r)
+            written = len(header)
+        for r in rows:
+            if written >= EXCEL_MAX_ROWS:
+                part += 1
+                ws = wb.create_sheet(title=f"{sheet_name[:28]}_{part}")
+                for h in header:
+                    ws.append(h)
+                written = len(header)
+            ws.append(_clean_row(r))
+            written += 1
+    return create_download_link(wb, None)
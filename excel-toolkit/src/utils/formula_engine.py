@@ -0,0 +1,1487 @@
+"""
+Formula Engine
+Dependency graph and incremental recalculation of workbook formulas
+
+openpyxl loads formulas as text and never calculates them. FormulaEngine
+parses every formula of a workbook into a compiled expression plus its
+precedents (cells and ranges), keeps a dependency graph between cells and
+evaluates formulas in topological order:
+
+- constants are read straight from the openpyxl workbook; the engine only
+  stores formulas, their computed values and the graph
+- after an edit only the transitive dependents of the changed cells are
+  recomputed (a one-cell edit touches its dependents, not the whole model)
+- range arguments are materialised once per recalculation as NumPy arrays
+  (numeric view, lower-cased text, exact/sorted lookup indexes) shared by
+  every formula that reads the same range, so SUM/AVERAGE/COUNTIF style
+  aggregates are vectorised and repeated VLOOKUP/MATCH calls against one
+  table are hash lookups
+- unsupported functions evaluate to #NAME?, circular references to #CYCLE!
+
+Supported functions: SUM, AVERAGE, MIN, MAX, COUNT, COUNTA, COUNTBLANK,
+PRODUCT, SUMPRODUCT, SUMIF(S), COUNTIF(S), AVERAGEIF(S), IF, IFERROR, IFNA,
+AND, OR, NOT, ISERROR, ISNA, ISBLANK, ISNUMBER, ISTEXT, ROUND, ROUNDUP,
+ROUNDDOWN, INT, MOD, ABS, SQRT, POWER, EXP, LN, LOG10, CONCATENATE, CONCAT,
+LEN, UPPER, LOWER, TRIM, LEFT, RIGHT, MID, VALUE, VLOOKUP, HLOOKUP, INDEX,
+MATCH, XLOOKUP.
+"""
+
+import math
+import re
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP, ROUND_UP
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+from openpyxl.formula.tokenizer import Tokenizer, Token
+from openpyxl.utils.cell import column_index_from_string, coordinate_to_tuple, range_boundaries
+from openpyxl.utils.datetime import to_excel
+from src.config.settings import FORMULA_EXPAND_CELLS, FORMULA_BUCKET_COLUMNS
+
+_MAX_ROW = 1048576
+_MAX_COL = 16384
+_MISSING = object()
+
+
+class FormulaError:
+    """An Excel error value (#DIV/0!, #N/A, ...)"""
+
+    __slots__ = ('code',)
+
+    def __init__(self, code):
+        self.code = code
+
+    def __eq__(self, other):
+        return isinstance(other, FormulaError) and other.code == self.code
+
+    def __hash__(self):
+        return hash(self.code)
+
+    def __str__(self):
+        return self.code
+
+    __repr__ = __str__
+
+
+DIV0 = FormulaError('#DIV/0!')
+VALUE = FormulaError('#VALUE!')
+REF = FormulaError('#REF!')
+NAME = FormulaError('#NAME?')
+NA = FormulaError('#N/A')
+NUM = FormulaError('#NUM!')
+CYCLE = FormulaError('#CYCLE!')
+_ERRORS = {e.code: e for e in (DIV0, VALUE, REF, NAME, NA, NUM, FormulaError('#NULL!'))}
+
+
+class _Propagate(Exception):
+    """Raised to unwind evaluation when an operand is an error value"""
+
+    def __init__(self, error):
+        super().__init__(error.code)
+        self.error = error
+
+
+# ==================== VALUE COERCION ====================
+
+def _is_number(v):
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def _num(v):
+    """Coerce a scalar operand to a number the way Excel arithmetic does"""
+    if isinstance(v, _Range):
+        v = v.scalar()
+    if isinstance(v, bool):
+        return int(v)
+    if isinstance(v, (int, float)):
+        return v
+    if v is None:
+        return 0
+    if isinstance(v, FormulaError):
+        raise _Propagate(v)
+    if isinstance(v, str):
+        try:
+            return float(v)
+        except ValueError:
+            raise _Propagate(VALUE)
+    if isinstance(v, (datetime, date, time, timedelta)):
+        return to_excel(v)
+    raise _Propagate(VALUE)
+
+
+def _int(v):
+    return int(_num(v))
+
+
+def _text(v):
+    """Coerce a scalar operand to text"""
+    if isinstance(v, _Range):
+        v = v.scalar()
+    if isinstance(v, str):
+        return v
+    if v is None:
+        return ''
+    if isinstance(v, bool):
+        return 'TRUE' if v else 'FALSE'
+    if isinstance(v, FormulaError):
+        raise _Propagate(v)
+    v = _num(v)
+    if float(v).is_integer():
+        return str(int(v))
+    return '%.15g' % v
+
+
+def _bool(v):
+    """Coerce a scalar operand to a logical value"""
+    if isinstance(v, _Range):
+        v = v.scalar()
+    if isinstance(v, bool):
+        return v
+    if v is None:
+        return False
+    if isinstance(v, str):
+        if v.upper() in ('TRUE', 'FALSE'):
+            return v.upper() == 'TRUE'
+        raise _Propagate(VALUE)
+    return _num(v) != 0
+
+
+def _scalar(v):
+    """Unwrap a 1x1 range and raise on error values"""
+    if isinstance(v, _Range):
+        v = v.scalar()
+    if isinstance(v, FormulaError):
+        raise _Propagate(v)
+    return v
+
+
+def _family(v):
+    """Excel sort order of value types: numbers < text < logicals"""
+    if isinstance(v, bool):
+        return 2
+    if isinstance(v, str):
+        return 1
+    return 0
+
+
+def _lookup_key(v):
+    """Hashable key used for exact matching (text is case-insensitive)"""
+    if v is None or isinstance(v, FormulaError):
+        return None
+    if isinstance(v, bool):
+        return (2, v)
+    if isinstance(v, str):
+        return (1, v.lower())
+    try:
+        return (0, float(_num(v)))
+    except _Propagate:
+        return None
+
+
+def _compare(a, b):
+    """Three-way comparison with Excel's type ordering and case-insensitive text"""
+    a, b = _scalar(a), _scalar(b)
+    if isinstance(a, (datetime, date, time, timedelta)):
+        a = to_excel(a)
+    if isinstance(b, (datetime, date, time, timedelta)):
+        b = to_excel(b)
+    if a is None:
+        a = '' if isinstance(b, str) else (False if isinstance(b, bool) else 0)
+    if b is None:
+        b = '' if isinstance(a, str) else (False if isinstance(a, bool) else 0)
+    fa, fb = _family(a), _family(b)
+    if fa != fb:
+        return (fa > fb) - (fa < fb)
+    if fa == 1:
+        a, b = a.lower(), b.lower()
+    return (a > b) - (a < b)
+
+
+def _range_number(v):
+    if isinstance(v, bool):
+        return math.nan
+    if isinstance(v, (int, float)):
+        return v
+    if isinstance(v, (datetime, date)):
+        return to_excel(v)
+    return math.nan
+
+
+def _range_text(v):
+    if isinstance(v, str):
+        return v.lower()
+    return '' if v is None else None
+
+
+class _Range:
+    """A rectangular block of cell values with lazily built vector views and lookup indexes"""
+
+    __slots__ = ('values', 'origin', '_views')
+
+    def __init__(self, values, origin):
+        self.values = values
+        self.origin = origin
+        self._views = {}
+
+    @property
+    def height(self):
+        return self.values.shape[0]
+
+    @property
+    def width(self):
+        return self.values.shape[1]
+
+    def scalar(self):
+        if self.values.shape == (1, 1):
+            return self.values[0, 0]
+        raise _Propagate(VALUE)
+
+    def _view(self, name, build):
+        view = self._views.get(name)
+        if view is None:
+            view = self._views[name] = build()
+        return view
+
+    def error(self):
+        """First error value in the range, or None"""
+        found = self._view('error', lambda: (next((v for v in self.values.ravel() if isinstance(v, FormulaError)), None),))
+        return found[0]
+
+    def numbers(self):
+        """Float array of the range (NaN for text, logicals and blanks)"""
+        flat = self.values.ravel()
+        return self._view('numbers', lambda: np.fromiter((_range_number(v) for v in flat), dtype=float, count=len(flat)))
+
+    def text(self):
+        """Lower-cased text array ('' for blanks, None for non-text)"""
+        flat = self.values.ravel()
+        return self._view('text', lambda: np.array([_range_text(v) for v in flat], dtype=object))
+
+    def set(self, i, j, value):
+        """Patch one cell, keeping the numeric/text views and unaffected lookup indexes"""
+        old = self.values[i, j]
+        self.values[i, j] = value
+        flat = i * self.width + j
+        views = self._views
+        if 'numbers' in views:
+            views['numbers'][flat] = _range_number(value)
+        if 'text' in views:
+            views['text'][flat] = _range_text(value)
+        if isinstance(value, FormulaError) or isinstance(old, FormulaError):
+            views.pop('error', None)
+        for name in [name for name in views if isinstance(name, tuple)]:
+            kind, axis, index = name
+            if (j if axis == 0 else i) != index:
+                continue
+            if kind != 'exact':
+                del views[name]
+                continue
+            # Keep the hash index: re-point the new key, and mark the old one for a rescan
+            # if this cell was its first occurrence
+            pos = i if axis == 0 else j
+            lookup, dirty = views[name]
+            old_key, new_key = _lookup_key(old), _lookup_key(value)
+            if old_key is not None and lookup.get(old_key) == pos:
+                del lookup[old_key]
+                dirty.add(old_key)
+            if new_key is not None and (new_key in dirty or lookup.get(new_key, pos + 1) > pos):
+                if new_key in dirty:
+                    dirty.discard(new_key)
+                    found = self._scan(axis, index, new_key)
+                    pos = pos if found is None else min(found, pos)
+                lookup[new_key] = pos
+
+    def _scan(self, axis, i, key):
+        """First position of key along column/row i (linear)"""
+        return next((pos for pos, v in enumerate(self.vector(axis, i)) if _lookup_key(v) == key), None)
+
+    def vector(self, axis, i):
+        """Column i (axis 0) or row i (axis 1) as a 1-D object array"""
+        return self.values[:, i] if axis == 0 else self.values[i, :]
+
+    def line(self):
+        """The range as a 1-D vector (it must be a single row or column)"""
+        if self.width == 1:
+            return 0, 0
+        if self.height == 1:
+            return 1, 0
+        raise _Propagate(NA)
+
+    def find(self, value, axis, i, mode):
+        """
+        Position of value along column/row i
+
+        mode 0 is an exact match (first occurrence), 1 the largest value <=
+        value in an ascending vector, -1 the smallest value >= value in a
+        descending one. Returns None when nothing matches.
+        """
+        value = _scalar(value)
+        if mode == 0:
+            def build():
+                index = {}
+                for pos, v in enumerate(self.vector(axis, i)):
+                    key = _lookup_key(v)
+                    if key is not None and key not in index:
+                        index[key] = pos
+                return index, set()
+            index, dirty = self._view(('exact', axis, i), build)
+            key = _lookup_key(value)
+            if key in dirty:
+                dirty.discard(key)
+                found = self._scan(axis, i, key)
+                if found is not None:
+                    index[key] = found
+            return index.get(key)
+
+        key = _lookup_key(value)
+        if key is None:
+            return None
+        vector = self.vector(axis, i)
+        if mode < 0:
+            best = None
+            for pos, v in enumerate(vector):
+                k = _lookup_key(v)
+                if k is not None and k[0] == key[0] and k[1] >= key[1]:
+                    best = pos
+            return best
+
+        def build_sorted():
+            keys, positions = {}, {}
+            for pos, v in enumerate(vector):
+                k = _lookup_key(v)
+                if k is not None:
+                    keys.setdefault(k[0], []).append(k[1])
+                    positions.setdefault(k[0], []).append(pos)
+            return keys, positions
+        keys, positions = self._view(('sorted', axis, i), build_sorted)
+        at = bisect_right(keys.get(key[0], []), key[1]) - 1
+        return positions[key[0]][at] if at >= 0 else None
+
+
+_CRITERION = re.compile(r'^(<=|>=|<>|<|>|=)?(.*)$', re.S)
+
+
+def _criteria_mask(rng, criterion):
+    """Boolean mask of the cells of rng matching a COUNTIF-style criterion"""
+    if not isinstance(rng, _Range):
+        raise _Propagate(VALUE)
+    criterion = _scalar(criterion)
+    if isinstance(criterion, str):
+        op, operand = _CRITERION.match(criterion).groups()
+        op = op or '='
+        try:
+            operand = float(operand)
+        except ValueError:
+            if operand.upper() in ('TRUE', 'FALSE'):
+                operand = operand.upper() == 'TRUE'
+    else:
+        op, operand = '=', criterion if criterion is not None else 0
+
+    if isinstance(operand, bool):
+        flat = rng.values.ravel()
+        mask = np.fromiter((v is operand for v in flat), dtype=bool, count=len(flat))
+        return ~mask if op == '<>' else mask
+    if _is_number(operand) or isinstance(operand, (datetime, date)):
+        numbers = rng.numbers()
+        operand = _num(operand)
+        with np.errstate(invalid='ignore'):
+            if op == '<>':
+                return ~(numbers == operand)
+            return {'=': numbers == operand, '<': numbers < operand, '>': numbers > operand,
+                    '<=': numbers <= operand, '>=': numbers >= operand}[op]
+
+    text = rng.text()
+    operand = operand.lower()
+    if op in ('=', '<>'):
+        if '*' in operand or '?' in operand:
+            pattern = re.compile(
+                ''.join('.*' if ch == '*' else '.' if ch == '?' else re.escape(ch) for ch in operand) + r'\Z', re.S)
+            mask = np.fromiter((t is not None and pattern.match(t) is not None for t in text), dtype=bool, count=len(text))
+        else:
+            mask = text == operand
+        return ~mask if op == '<>' else mask
+    compare = {'<': str.__lt__, '>': str.__gt__, '<=': str.__le__, '>=': str.__ge__}[op]
+    return np.fromiter((bool(t) and compare(t, operand) for t in text), dtype=bool, count=len(text))
+
+
+# ==================== FUNCTIONS ====================
+
+def _numbers_of(args):
+    """Numbers contributed by aggregate arguments (ranges skip text/logicals, scalars are coerced)"""
+    parts = []
+    for arg in args:
+        if isinstance(arg, _Range):
+            error = arg.error()
+            if error is not None:
+                raise _Propagate(error)
+            numbers = arg.numbers()
+            parts.append(numbers[~np.isnan(numbers)])
+        elif arg is not None:
+            parts.append(np.array([_num(arg)], dtype=float))
+    return np.concatenate(parts) if parts else np.empty(0)
+
+
+def _fn_sum(*args):
+    return float(_numbers_of(args).sum())
+
+
+def _fn_average(*args):
+    numbers = _numbers_of(args)
+    if not len(numbers):
+        raise _Propagate(DIV0)
+    return float(numbers.mean())
+
+
+def _fn_min(*args):
+    numbers = _numbers_of(args)
+    return float(numbers.min()) if len(numbers) else 0.0
+
+
+def _fn_max(*args):
+    numbers = _numbers_of(args)
+    return float(numbers.max()) if len(numbers) else 0.0
+
+
+def _fn_product(*args):
+    numbers = _numbers_of(args)
+    return float(numbers.prod()) if len(numbers) else 0.0
+
+
+def _fn_count(*args):
+    total = 0
+    for arg in args:
+        if isinstance(arg, _Range):
+            total += int(np.count_nonzero(~np.isnan(arg.numbers())))
+        elif _is_number(arg) or isinstance(arg, (bool, datetime, date)):
+            total += 1
+        elif isinstance(arg, str):
+            try:
+                float(arg)
+                total += 1
+            except ValueError:
+                pass
+    return total
+
+
+def _fn_counta(*args):
+    total = 0
+    for arg in args:
+        if isinstance(arg, _Range):
+            total += sum(v is not None for v in arg.values.ravel())
+        elif arg is not None:
+            total += 1
+    return total
+
+
+def _fn_countblank(rng):
+    if not isinstance(rng, _Range):
+        raise _Propagate(VALUE)
+    return int(np.count_nonzero(rng.text() == ''))
+
+
+def _fn_sumproduct(*args):
+    arrays = []
+    for arg in args:
+        if isinstance(arg, _Range):
+            error = arg.error()
+            if error is not None:
+                raise _Propagate(error)
+            arrays.append(np.nan_to_num(arg.numbers()))
+        else:
+            arrays.append(np.array([_num(arg)], dtype=float))
+    if not arrays or any(len(a) != len(arrays[0]) for a in arrays):
+        raise _Propagate(VALUE)
+    return float(np.prod(arrays, axis=0).sum())
+
+
+def _conditional_numbers(target, pairs):
+    """Numbers of target where every (range, criterion) pair matches"""
+    if not isinstance(target, _Range):
+        raise _Propagate(VALUE)
+    mask = np.ones(target.height * target.width, dtype=bool)
+    for rng, criterion in pairs:
+        if not isinstance(rng, _Range) or rng.values.shape != target.values.shape:
+            raise _Propagate(VALUE)
+        mask &= _criteria_mask(rng, criterion)
+    numbers = target.numbers()[mask]
+    return numbers[~np.isnan(numbers)]
+
+
+def _fn_sumif(rng, criterion, sum_range=None):
+    return float(_conditional_numbers(sum_range if sum_range is not None else rng, [(rng, criterion)]).sum())
+
+
+def _fn_averageif(rng, criterion, average_range=None):
+    numbers = _conditional_numbers(average_range if average_range is not None else rng, [(rng, criterion)])
+    if not len(numbers):
+        raise _Propagate(DIV0)
+    return float(numbers.mean())
+
+
+def _fn_countif(rng, criterion):
+    return int(np.count_nonzero(_criteria_mask(rng, criterion)))
+
+
+def _pairs(args):
+    if len(args) % 2:
+        raise _Propagate(VALUE)
+    return list(zip(args[::2], args[1::2]))
+
+
+def _fn_sumifs(sum_range, *args):
+    return float(_conditional_numbers(sum_range, _pairs(args)).sum())
+
+
+def _fn_averageifs(average_range, *args):
+    numbers = _conditional_numbers(average_range, _pairs(args))
+    if not len(numbers):
+        raise _Propagate(DIV0)
+    return float(numbers.mean())
+
+
+def _fn_countifs(*args):
+    pairs = _pairs(args)
+    if not pairs:
+        raise _Propagate(VALUE)
+    mask = None
+    for rng, criterion in pairs:
+        current = _criteria_mask(rng, criterion)
+        if mask is not None and current.shape != mask.shape:
+            raise _Propagate(VALUE)
+        mask = current if mask is None else mask & current
+    return int(np.count_nonzero(mask))
+
+
+def _logicals(args):
+    values = []
+    for arg in args:
+        if isinstance(arg, _Range):
+            for v in arg.values.ravel():
+                if isinstance(v, FormulaError):
+                    raise _Propagate(v)
+                if isinstance(v, bool) or _is_number(v):
+                    values.append(bool(v))
+        elif arg is not None:
+            values.append(_bool(arg))
+    if not values:
+        raise _Propagate(VALUE)
+    return values
+
+
+def _fn_and(*args):
+    return all(_logicals(args))
+
+
+def _fn_or(*args):
+    return any(_logicals(args))
+
+
+def _fn_not(v):
+    return not _bool(v)
+
+
+def _probe(fn, ev, row, col):
+    """Evaluate a lazy argument, returning error values instead of raising them"""
+    try:
+        return _scalar(fn(ev, row, col))
+    except _Propagate as e:
+        return e.error
+
+
+def _lazy_if(ev, row, col, condition, if_true=None, if_false=None):
+    if _bool(condition(ev, row, col)):
+        return if_true(ev, row, col) if if_true is not None else True
+    return if_false(ev, row, col) if if_false is not None else False
+
+
+def _lazy_iferror(ev, row, col, value, fallback):
+    result = _probe(value, ev, row, col)
+    return fallback(ev, row, col) if isinstance(result, FormulaError) else result
+
+
+def _lazy_ifna(ev, row, col, value, fallback):
+    result = _probe(value, ev, row, col)
+    return fallback(ev, row, col) if result == NA else result
+
+
+def _lazy_iserror(ev, row, col, value):
+    return isinstance(_probe(value, ev, row, col), FormulaError)
+
+
+def _lazy_isna(ev, row, col, value):
+    return _probe(value, ev, row, col) == NA
+
+
+def _fn_isblank(v):
+    return (v.scalar() if isinstance(v, _Range) else v) is None
+
+
+def _fn_isnumber(v):
+    v = v.scalar() if isinstance(v, _Range) else v
+    return _is_number(v) or isinstance(v, (datetime, date))
+
+
+def _fn_istext(v):
+    return isinstance(v.scalar() if isinstance(v, _Range) else v, str)
+
+
+def _decimal_round(x, digits, rounding):
+    x, digits = _num(x), _int(digits)
+    return float(Decimal(repr(float(x))).quantize(Decimal(1).scaleb(-digits), rounding=rounding))
+
+
+def _fn_round(x, digits=0):
+    return _decimal_round(x, digits, ROUND_HALF_UP)
+
+
+def _fn_roundup(x, digits=0):
+    return _decimal_round(x, digits, ROUND_UP)
+
+
+def _fn_rounddown(x, digits=0):
+    return _decimal_round(x, digits, ROUND_DOWN)
+
+
+def _fn_mod(x, y):
+    x, y = _num(x), _num(y)
+    if y == 0:
+        raise _Propagate(DIV0)
+    return x - y * math.floor(x / y)
+
+
+def _fn_sqrt(x):
+    x = _num(x)
+    if x < 0:
+        raise _Propagate(NUM)
+    return math.sqrt(x)
+
+
+def _fn_ln(x):
+    x = _num(x)
+    if x <= 0:
+        raise _Propagate(NUM)
+    return math.log(x)
+
+
+def _fn_log10(x):
+    x = _num(x)
+    if x <= 0:
+        raise _Propagate(NUM)
+    return math.log10(x)
+
+
+def _fn_concatenate(*args):
+    return ''.join(_text(arg) for arg in args)
+
+
+def _fn_concat(*args):
+    parts = []
+    for arg in args:
+        if isinstance(arg, _Range):
+            parts.extend(_text(v) for v in arg.values.ravel())
+        else:
+            parts.append(_text(arg))
+    return ''.join(parts)
+
+
+def _fn_left(text, count=1):
+    count = _int(count)
+    if count < 0:
+        raise _Propagate(VALUE)
+    return _text(text)[:count]
+
+
+def _fn_right(text, count=1):
+    count = _int(count)
+    if count < 0:
+        raise _Propagate(VALUE)
+    return _text(text)[-count:] if count else ''
+
+
+def _fn_mid(text, start, count):
+    start, count = _int(start), _int(count)
+    if start < 1 or count < 0:
+        raise _Propagate(VALUE)
+    return _text(text)[start - 1:start - 1 + count]
+
+
+def _fn_value(v):
+    v = _scalar(v)
+    return _num(v.strip() if isinstance(v, str) else v)
+
+
+def _fn_vlookup(value, table, column, approximate=True):
+    return _table_lookup(value, table, column, approximate, axis=0)
+
+
+def _fn_hlookup(value, table, row, approximate=True):
+    return _table_lookup(value, table, row, approximate, axis=1)
+
+
+def _table_lookup(value, table, index, approximate, axis):
+    if not isinstance(table, _Range):
+        raise _Propagate(VALUE)
+    index = _int(index)
+    if index < 1:
+        raise _Propagate(VALUE)
+    if index > (table.width if axis == 0 else table.height):
+        raise _Propagate(REF)
+    pos = table.find(value, axis, 0, 1 if _bool(approximate) else 0)
+    if pos is None:
+        raise _Propagate(NA)
+    return table.values[pos, index - 1] if axis == 0 else table.values[index - 1, pos]
+
+
+def _fn_match(value, rng, match_type=1):
+    if not isinstance(rng, _Range):
+        raise _Propagate(NA)
+    axis, i = rng.line()
+    match_type = _int(match_type)
+    pos = rng.find(value, axis, i, 0 if match_type == 0 else (1 if match_type > 0 else -1))
+    if pos is None:
+        raise _Propagate(NA)
+    return pos + 1
+
+
+def _fn_index(rng, row, column=None):
+    if not isinstance(rng, _Range):
+        raise _Propagate(VALUE)
+    row = _int(row)
+    if column is None and rng.height == 1:
+        row, column = 1, row
+    column = 1 if column is None else _int(column)
+    if not (1 <= row <= rng.height and 1 <= column <= rng.width):
+        raise _Propagate(REF)
+    return rng.values[row - 1, column - 1]
+
+
+def _fn_xlookup(value, lookup, result, if_not_found=_MISSING):
+    if not isinstance(lookup, _Range) or not isinstance(result, _Range):
+        raise _Propagate(VALUE)
+    axis, i = lookup.line()
+    pos = lookup.find(value, axis, i, 0)
+    if pos is None:
+        if if_not_found is _MISSING:
+            raise _Propagate(NA)
+        return if_not_found
+    vector = result.values.ravel()
+    if pos >= len(vector):
+        raise _Propagate(VALUE)
+    return vector[pos]
+
+
+_FUNCTIONS = {
+    'SUM': _fn_sum, 'AVERAGE': _fn_average, 'MIN': _fn_min, 'MAX': _fn_max,
+    'COUNT': _fn_count, 'COUNTA': _fn_counta, 'COUNTBLANK': _fn_countblank,
+    'PRODUCT': _fn_product, 'SUMPRODUCT': _fn_sumproduct,
+    'SUMIF': _fn_sumif, 'SUMIFS': _fn_sumifs, 'COUNTIF': _fn_countif, 'COUNTIFS': _fn_countifs,
+    'AVERAGEIF': _fn_averageif, 'AVERAGEIFS': _fn_averageifs,
+    'AND': _fn_and, 'OR': _fn_or, 'NOT': _fn_not,
+    'ISBLANK': _fn_isblank, 'ISNUMBER': _fn_isnumber, 'ISTEXT': _fn_istext,
+    'ROUND': _fn_round, 'ROUNDUP': _fn_roundup, 'ROUNDDOWN': _fn_rounddown,
+    'INT': lambda x: math.floor(_num(x)), 'MOD': _fn_mod, 'ABS': lambda x: abs(_num(x)),
+    'SQRT': _fn_sqrt, 'POWER': lambda x, y: _power(x, y), 'EXP': lambda x: math.exp(_num(x)),
+    'LN': _fn_ln, 'LOG10': _fn_log10,
+    'CONCATENATE': _fn_concatenate, 'CONCAT': _fn_concat,
+    'LEN': lambda s: len(_text(s)), 'UPPER': lambda s: _text(s).upper(), 'LOWER': lambda s: _text(s).lower(),
+    'TRIM': lambda s: re.sub(' +', ' ', _text(s)).strip(' '),
+    'LEFT': _fn_left, 'RIGHT': _fn_right, 'MID': _fn_mid, 'VALUE': _fn_value,
+    'VLOOKUP': _fn_vlookup, 'HLOOKUP': _fn_hlookup, 'INDEX': _fn_index, 'MATCH': _fn_match,
+    'XLOOKUP': _fn_xlookup,
+}
+
+# Functions that receive unevaluated arguments (short-circuiting / error trapping)
+_LAZY_FUNCTIONS = {
+    'IF': _lazy_if, 'IFERROR': _lazy_iferror, 'IFNA': _lazy_ifna,
+    'ISERROR': _lazy_iserror, 'ISNA': _lazy_isna,
+}
+
+
+def _power(x, y):
+    x, y = _num(x), _num(y)
+    if x == 0 and y < 0:
+        raise _Propagate(DIV0)
+    result = x ** y
+    if isinstance(result, complex):
+        raise _Propagate(NUM)
+    return result
+
+
+def _divide(x, y):
+    x, y = _num(x), _num(y)
+    if y == 0:
+        raise _Propagate(DIV0)
+    return x / y
+
+
+_OPERATORS = {
+    '+': lambda a, b: _num(a) + _num(b),
+    '-': lambda a, b: _num(a) - _num(b),
+    '*': lambda a, b: _num(a) * _num(b),
+    '/': _divide,
+    '^': _power,
+    '&': lambda a, b: _text(a) + _text(b),
+    '=': lambda a, b: _compare(a, b) == 0,
+    '<>': lambda a, b: _compare(a, b) != 0,
+    '<': lambda a, b: _compare(a, b) < 0,
+    '>': lambda a, b: _compare(a, b) > 0,
+    '<=': lambda a, b: _compare(a, b) <= 0,
+    '>=': lambda a, b: _compare(a, b) >= 0,
+}
+
+_BINDING_POWER = {'=': 10, '<>': 10, '<': 10, '>': 10, '<=': 10, '>=': 10,
+                  '&': 20, '+': 30, '-': 30, '*': 40, '/': 40, '^': 50}
+_PREFIX_POWER = 60  # Excel negation binds tighter than ^ (-2^2 = 4)
+
+
+# ==================== PARSER ====================
+
+# String literals and quoted sheet names are skipped; everything else that
+# looks like a cell reference is rewritten relative to the formula's cell
+_CELL_REFERENCE = re.compile(
+    r'"(?:[^"]|"")*"|\'(?:[^\']|\'\')*\'|(?<![\w.$])(\$?)([A-Za-z]{1,3})(\$?)([0-9]+)(?![\w(!])')
+_RELATIVE_CELL = re.compile(r'^__(?:R(\d+)|r(m?)(\d+))(?:C(\d+)|c(m?)(\d+))$')
+_SHEET_REF = re.compile(r"^(?:(?:'((?:[^']|'')+)'|([^'!]+))!)?(.+)$")
+
+
+def _signed(n):
+    return str(n) if n >= 0 else f"m{-n}"
+
+
+def _template(text, row, col):
+    """
+    Rewrite cell references as offsets from (row, col)
+
+    Formulas filled down or across a sheet (=A2*B2, =A3*B3, ...) share one
+    template, so each distinct shape is tokenized and compiled only once.
+    """
+    def offset(match):
+        if match.group(2) is None:
+            return match.group(0)
+        ref_col = column_index_from_string(match.group(2).upper())
+        ref_row = int(match.group(4))
+        if ref_col > _MAX_COL or not 1 <= ref_row <= _MAX_ROW:
+            return match.group(0)
+        r = f"R{ref_row}" if match.group(3) else "r" + _signed(ref_row - row)
+        c = f"C{ref_col}" if match.group(1) else "c" + _signed(ref_col - col)
+        return f"__{r}{c}"
+    return _CELL_REFERENCE.sub(offset, text)
+
+
+def _cell_spec(part):
+    """(row_base, row_relative, col_base, col_relative) of a template cell, or None"""
+    match = _RELATIVE_CELL.match(part)
+    if match is None:
+        return None
+    row_abs, row_sign, row_off, col_abs, col_sign, col_off = match.groups()
+    if row_abs is not None:
+        row = (int(row_abs), 0)
+    else:
+        row = (-int(row_off) if row_sign else int(row_off), 1)
+    if col_abs is not None:
+        column = (int(col_abs), 0)
+    else:
+        column = (-int(col_off) if col_sign else int(col_off), 1)
+    return row + column
+
+
+def _shift_cell(spec, row, col):
+    sheet, row_base, row_rel, col_base, col_rel = spec
+    return (sheet, row_base + row * row_rel, col_base + col * col_rel)
+
+
+def _shift_range(spec, row, col):
+    """Concrete (sheet, min_row, min_col, max_row, max_col) of a range spec; None = to the sheet's end"""
+    sheet, start, end = spec
+    _, r1, c1 = _shift_cell((sheet,) + start, row, col)
+    if end is None:
+        return (sheet, r1, c1, None, None)
+    r2 = end[0] + row * end[1] if end[0] is not None else None
+    c2 = end[2] + col * end[3] if end[2] is not None else None
+    if r2 is not None and r2 < r1:
+        r1, r2 = r2, r1
+    if c2 is not None and c2 < c1:
+        c1, c2 = c2, c1
+    return (sheet, r1, c1, r2, c2)
+
+
+def _name_error(ev, row, col):
+    return NAME
+
+
+class _Compiler:
+    """Turn a formula template into a closure fn(engine, row, col) and collect its precedents"""
+
+    def __init__(self, template, sheet, sheet_names, defined_names):
+        self.tokens = [t for t in Tokenizer(template).items if t.type != Token.WSPACE]
+        self.pos = 0
+        self.sheet = sheet
+        self.sheet_names = sheet_names
+        self.defined_names = defined_names
+        self.cells = []
+        self.ranges = []
+
+    def compile(self):
+        fn = self.expression(0)
+        if self.pos != len(self.tokens):
+            raise ValueError("Unexpected token")
+        return fn
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        if token is None:
+            raise ValueError("Unexpected end of formula")
+        self.pos += 1
+        return token
+
+    def expression(self, min_power):
+        left = self.operand()
+        while True:
+            token = self.peek()
+            if token is None:
+                return left
+            if token.type == Token.OP_POST and token.value == '%':
+                self.pos += 1
+                left = (lambda fn: lambda ev, row, col: _num(fn(ev, row, col)) / 100)(left)
+                continue
+            if token.type != Token.OP_IN or token.value not in _BINDING_POWER:
+                return left
+            power = _BINDING_POWER[token.value]
+            if power <= min_power:
+                return left
+            self.pos += 1
+            right = self.expression(power)
+            left = (lambda op, a, b: lambda ev, row, col: op(a(ev, row, col), b(ev, row, col)))(
+                _OPERATORS[token.value], left, right)
+
+    def operand(self):
+        token = self.take()
+        if token.type == Token.OP_PRE:
+            operand = self.expression(_PREFIX_POWER)
+            if token.value == '-':
+                return lambda ev, row, col: -_num(operand(ev, row, col))
+            return operand
+        if token.type == Token.PAREN and token.subtype == Token.OPEN:
+            inner = self.expression(0)
+            if self.take().subtype != Token.CLOSE:
+                raise ValueError("Unbalanced parenthesis")
+            return inner
+        if token.type == Token.FUNC and token.subtype == Token.OPEN:
+            return self.function(token.value[:-1].upper())
+        if token.type != Token.OPERAND:
+            raise ValueError(f"Unsupported token {token.value}")
+
+        if token.subtype == Token.NUMBER:
+            value = float(token.value)
+        elif token.subtype == Token.TEXT:
+            value = token.value[1:-1].replace('""', '"')
+        elif token.subtype == Token.LOGICAL:
+            value = token.value.upper() == 'TRUE'
+        elif token.subtype == Token.ERROR:
+            value = _ERRORS.get(token.value.upper(), VALUE)
+        else:
+            return self.reference(token.value)
+        return lambda ev, row, col: value
+
+    def function(self, name):
+        if name.startswith('_XLFN.'):
+            name = name[6:]
+        args = []
+        token = self.peek()
+        if token is not None and token.type == Token.FUNC and token.subtype == Token.CLOSE:
+            self.pos += 1
+        else:
+            while True:
+                token = self.peek()
+                if token is not None and (token.type == Token.SEP or token.type == Token.FUNC and token.subtype == Token.CLOSE):
+                    # Empty argument (IF(x,,1)) is a blank
+                    args.append(lambda ev, row, col: None)
+                else:
+                    args.append(self.expression(0))
+                token = self.take()
+                if token.type == Token.FUNC and token.subtype == Token.CLOSE:
+                    break
+                if token.type != Token.SEP or token.subtype != Token.ARG:
+                    raise ValueError(f"Unexpected token {token.value}")
+
+        if name in _LAZY_FUNCTIONS:
+            impl = _LAZY_FUNCTIONS[name]
+            return lambda ev, row, col: impl(ev, row, col, *args)
+        impl = _FUNCTIONS.get(name)
+        if impl is None:
+            return _name_error
+        return lambda ev, row, col: impl(*[arg(ev, row, col) for arg in args])
+
+    def reference(self, text):
+        quoted, plain, address = _SHEET_REF.match(text).groups()
+        sheet = quoted.replace("''", "'") if quoted else (plain or self.sheet)
+        parts = address.split(':')
+        specs = [_cell_spec(part) for part in parts]
+        if len(parts) > 2:
+            raise ValueError(f"Unsupported reference {text}")
+        if not all(specs):
+            # Column (A:C) / row (1:3) ranges and named-range destinations stay absolute
+            try:
+                min_col, min_row, max_col, max_row = range_boundaries(address.replace('$', ''))
+            except (ValueError, TypeError):
+                return self.named_range(text)
+            specs = [(min_row or 1, 0, min_col or 1, 0)]
+            if len(parts) == 2:
+                specs.append((max_row, 0, max_col, 0))
+        if sheet not in self.sheet_names:
+            return lambda ev, row, col: REF
+
+        if len(specs) == 1:
+            spec = (sheet,) + specs[0]
+            self.cells.append(spec)
+            return lambda ev, row, col: ev._get(_shift_cell(spec, row, col))
+        spec = (sheet, specs[0], specs[1])
+        self.ranges.append(spec)
+        return lambda ev, row, col: ev._range(_shift_range(spec, row, col))
+
+    def named_range(self, name):
+        defined = self.defined_names.get(name)
+        if defined is None:
+            return _name_error
+        destinations = list(defined.destinations)
+        if len(destinations) != 1:
+            return _name_error
+        sheet, address = destinations[0]
+        return self.reference("'" + sheet.replace("'", "''") + "'!" + address)
+
+
+def _formula_text(value):
+    """Formula text of a cell value (plain formulas or openpyxl ArrayFormula)"""
+    return value if isinstance(value, str) else getattr(value, 'text', None)
+
+
+class _Formula:
+    """A compiled formula and its precedents"""
+
+    __slots__ = ('text', 'fn', 'refs', 'ranges')
+
+    def __init__(self, text, fn, refs, ranges):
+        self.text = text
+        self.fn = fn
+        self.refs = refs
+        self.ranges = ranges
+
+
+# ==================== ENGINE ====================
+
+class FormulaEngine:
+    """
+    Dependency graph and evaluator for the formulas of an openpyxl workbook
+
+    The workbook stays the source of truth for constants and formula text;
+    edit it as usual, then call update() (or update_sheet() after bulk
+    edits) to recompute what depends on the change.
+    """
+
+    def __init__(self, workbook):
+        self.workbook = workbook
+        self._build()
+
+    def _build(self):
+        self._cells = {ws.title: ws._cells for ws in self.workbook.worksheets}
+        self._compiled = {}          # (sheet, template) -> (fn, cell specs, range specs)
+        self.formulas = {}
+        self.values = {}
+        self._dependents = {}        # (sheet, row, col) -> formulas reading it directly
+        self._column_ranges = {}     # (sheet, col) -> {formula: [(min_row, max_row), ...]}
+        self._wide_ranges = {}       # sheet -> {formula: [(min_row, min_col, max_row, max_col), ...]}
+        self._formula_rows = {}      # sheet -> {col: sorted rows holding formulas}
+        self._range_cache = {}       # small ranges, valid for one recalculation
+        self._large_ranges = {}      # large ranges, kept between recalculations and patched in place
+        for sheet, cells in self._cells.items():
+            for (row, col), cell in cells.items():
+                if cell.data_type == 'f':
+                    self._register((sheet, row, col), cell.value)
+
+    def copy(self, workbook):
+        """
+        Return an engine for a clone of this engine's workbook
+
+        Compiled formulas are immutable and shared; values and the graph are copied.
+        """
+        clone = FormulaEngine.__new__(FormulaEngine)
+        clone.workbook = workbook
+        clone._cells = {ws.title: ws._cells for ws in workbook.worksheets}
+        clone._compiled = self._compiled
+        clone.formulas = dict(self.formulas)
+        clone.values = dict(self.values)
+        clone._dependents = {key: set(deps) for key, deps in self._dependents.items()}
+        clone._column_ranges = {key: dict(spans) for key, spans in self._column_ranges.items()}
+        clone._wide_ranges = {key: dict(boxes) for key, boxes in self._wide_ranges.items()}
+        clone._formula_rows = {sheet: {col: list(rows) for col, rows in cols.items()}
+                               for sheet, cols in self._formula_rows.items()}
+        clone._range_cache = {}
+        clone._large_ranges = {}
+        return clone
+
+    # ---------- graph maintenance ----------
+
+    def _compile(self, sheet, template):
+        compiled = self._compiled.get((sheet, template))
+        if compiled is None:
+            try:
+                compiler = _Compiler(template, sheet, self._cells, self.workbook.defined_names)
+                compiled = (compiler.compile(), tuple(compiler.cells), tuple(compiler.ranges))
+            except Exception:
+                compiled = (_name_error, (), ())
+            self._compiled[(sheet, template)] = compiled
+        return compiled
+
+    def _register(self, key, value):
+        sheet, row, col = key
+        text = _formula_text(value)
+        if text is None:
+            fn, cell_specs, range_specs = _name_error, (), ()
+        else:
+            fn, cell_specs, range_specs = self._compile(sheet, _template(text, row, col))
+        refs = tuple(_shift_cell(spec, row, col) for spec in cell_specs)
+        ranges = tuple(_shift_range(spec, row, col) for spec in range_specs)
+        self.formulas[key] = _Formula(text, fn, refs, ranges)
+
+        for ref in refs:
+            self._dependents.setdefault(ref, set()).add(key)
+        for bounds in ranges:
+            self._index_range(key, bounds)
+        insort(self._formula_rows.setdefault(sheet, {}).setdefault(col, []), row)
+
+    @staticmethod
+    def _extent(bounds):
+        sheet, min_row, min_col, max_row, max_col = bounds
+        return sheet, min_row, min_col, max_row or _MAX_ROW, max_col or _MAX_COL
+
+    def _index_range(self, key, bounds):
+        sheet, min_row, min_col, max_row, max_col = self._extent(bounds)
+        if (max_row - min_row + 1) * (max_col - min_col + 1) <= FORMULA_EXPAND_CELLS:
+            for row in range(min_row, max_row + 1):
+                for col in range(min_col, max_col + 1):
+                    self._dependents.setdefault((sheet, row, col), set()).add(key)
+        elif max_col - min_col < FORMULA_BUCKET_COLUMNS:
+            for col in range(min_col, max_col + 1):
+                spans = self._column_ranges.setdefault((sheet, col), {})
+                spans[key] = spans.get(key, []) + [(min_row, max_row)]
+        else:
+            boxes = self._wide_ranges.setdefault(sheet, {})
+            boxes[key] = boxes.get(key, []) + [(min_row, min_col, max_row, max_col)]
+
+    def _unregister(self, key):
+        formula = self.formulas.pop(key, None)
+        if formula is None:
+            return
+        self.values.pop(key, None)
+        for ref in formula.refs:
+            self._dependents.get(ref, set()).discard(key)
+        for bounds in formula.ranges:
+            sheet, min_row, min_col, max_row, max_col = self._extent(bounds)
+            if (max_row - min_row + 1) * (max_col - min_col + 1) <= FORMULA_EXPAND_CELLS:
+                for row in range(min_row, max_row + 1):
+                    for col in range(min_col, max_col + 1):
+                        self._dependents.get((sheet, row, col), set()).discard(key)
+            elif max_col - min_col < FORMULA_BUCKET_COLUMNS:
+                for col in range(min_col, max_col + 1):
+                    self._column_ranges.get((sheet, col), {}).pop(key, None)
+            else:
+                self._wide_ranges.get(sheet, {}).pop(key, None)
+        rows = self._formula_rows[key[0]][key[2]]
+        del rows[bisect_left(rows, key[1])]
+
+    def _dependents_of(self, key):
+        """Formulas that read cell key directly or through a range"""
+        sheet, row, col = key
+        found = set(self._dependents.get(key, ()))
+        for formula, spans in self._column_ranges.get((sheet, col), {}).items():
+            if any(lo <= row <= hi for lo, hi in spans):
+                found.add(formula)
+        for formula, boxes in self._wide_ranges.get(sheet, {}).items():
+            if any(r1 <= row <= r2 and c1 <= col <= c2 for r1, c1, r2, c2 in boxes):
+                found.add(formula)
+        return found
+
+    def _precedents_within(self, formula, targets):
+        """Formula cells in targets read by formula (directly or inside its ranges)"""
+        for ref in formula.refs:
+            if ref in targets:
+                yield ref
+        for bounds in formula.ranges:
+            sheet, min_row, min_col, max_row, max_col = self._extent(bounds)
+            if len(targets) <= FORMULA_EXPAND_CELLS:
+                # Small recalculation: scanning the targets beats walking a large range
+                for key in targets:
+                    if key[0] == sheet and min_row <= key[1] <= max_row and min_col <= key[2] <= max_col:
+                        yield key
+                continue
+            for col, rows in self._formula_rows.get(sheet, {}).items():
+                if min_col <= col <= max_col:
+                    for row in rows[bisect_left(rows, min_row):bisect_right(rows, max_row)]:
+                        if (sheet, row, col) in targets:
+                            yield (sheet, row, col)
+
+    def _affected(self, changed):
+        """All formulas transitively depending on the changed cells"""
+        affected = set()
+        queue = list(changed)
+        while queue:
+            for formula in self._dependents_of(queue.pop()):
+                if formula not in affected:
+                    affected.add(formula)
+                    queue.append(formula)
+        return affected
+
+    def _order(self, targets):
+        """Topological order of targets (precedents first) and the formulas caught in cycles"""
+        order, cyclic, state = [], set(), {}
+        for root in targets:
+            if root in state:
+                continue
+            state[root] = 1
+            stack = [(root, self._precedents_within(self.formulas[root], targets))]
+            on_stack = {root: 0}
+            while stack:
+                node, precedents = stack[-1]
+                for precedent in precedents:
+                    seen = state.get(precedent)
+                    if seen is None:
+                        state[precedent] = 1
+                        on_stack[precedent] = len(stack)
+                        stack.append((precedent, self._precedents_within(self.formulas[precedent], targets)))
+                        break
+                    if seen == 1:
+                        cyclic.update(n for n, _ in stack[on_stack[precedent]:])
+                else:
+                    stack.pop()
+                    del on_stack[node]
+                    state[node] = 2
+                    order.append(node)
+        return order, cyclic
+
+    # ---------- evaluation ----------
+
+    def _get(self, key):
+        value = self.values.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        cell = self._cells[key[0]].get((key[1], key[2]))
+        if cell is None:
+            return None
+        if cell.data_type == 'e':
+            return _ERRORS.get(cell.value, VALUE)
+        return cell.value
+
+    def _range(self, bounds):
+        cached = self._range_cache.get(bounds) or self._large_ranges.get(bounds)
+        if cached is not None:
+            return cached
+        sheet, min_row, min_col, max_row, max_col = bounds
+        ws = self.workbook[sheet]
+        max_row = max_row or max(ws.max_row, min_row)
+        max_col = max_col or max(ws.max_column, min_col)
+        cells, values = self._cells[sheet], self.values
+        block = np.empty((max_row - min_row + 1, max_col - min_col + 1), dtype=object)
+        for i, row in enumerate(range(min_row, max_row + 1)):
+            line = block[i]
+            for j, col in enumerate(range(min_col, max_col + 1)):
+                cell = cells.get((row, col))
+                if cell is None:
+                    continue
+                if cell.data_type == 'f':
+                    line[j] = values.get((sheet, row, col))
+                elif cell.data_type == 'e':
+                    line[j] = _ERRORS.get(cell.value, VALUE)
+                else:
+                    line[j] = cell.value
+        cached = _Range(block, (min_row, min_col))
+        if block.size > FORMULA_EXPAND_CELLS:
+            self._large_ranges[bounds] = cached
+        else:
+            self._range_cache[bounds] = cached
+        return cached
+
+    def _patch(self, key, value):
+        """Write a changed value into the large ranges kept between recalculations"""
+        sheet, row, col = key
+        stale = []
+        for bounds, rng in self._large_ranges.items():
+            if bounds[0] != sheet:
+                continue
+            i, j = row - rng.origin[0], col - rng.origin[1]
+            if 0 <= i < rng.height and 0 <= j < rng.width:
+                rng.set(i, j, value)
+            elif i >= 0 and j >= 0 and (bounds[3] is None or row <= bounds[3]) and (bounds[4] is None or col <= bounds[4]):
+                # Open-ended range (A:A) grew past its materialised extent
+                stale.append(bounds)
+        for bounds in stale:
+            del self._large_ranges[bounds]
+
+    def _evaluate(self, key, formula):
+        try:
+            value = formula.fn(self, key[1], key[2])
+            if isinstance(value, _Range):
+                value = value.scalar()
+        except _Propagate as e:
+            return e.error
+        except ZeroDivisionError:
+            return DIV0
+        except (OverflowError, ValueError):
+            return NUM
+        except Exception:
+            return VALUE
+        if value is None:
+            return 0
+        if isinstance(value, np.generic):
+            value = value.item()
+        return value
+
+    def _recalculate(self, targets):
+        order, cyclic = self._order(targets)
+        self._range_cache = {}
+        try:
+            for key in order:
+                value = CYCLE if key in cyclic else self._evaluate(key, self.formulas[key])
+                self.values[key] = value
+                if self._large_ranges:
+                    self._patch(key, value)
+        finally:
+            self._range_cache = {}
+        return set(order)
+
+    def calculate_all(self):
+        """
+        Evaluate every formula in dependency order
+
+        Returns:
+            Set of (sheet, row, col) formula cells evaluated
+        """
+        self._large_ranges = {}
+        return self._recalculate(set(self.formulas))
+
+    def update(self, cells):
+        """
+        Re-read edited cells from the workbook and recompute their dependents
+
+        Args:
+            cells: Iterable of (sheet_name, cell_address) pairs, e.g. ('Sheet1', 'B2');
+                addresses or sheets that cannot be resolved are ignored
+
+        Returns:
+            Set of (sheet, row, col) formula cells recomputed
+        """
+        changed, targets = set(), set()
+        for sheet, address in cells:
+            if sheet not in self._cells:
+                continue
+            try:
+                row, col = coordinate_to_tuple(str(address).upper())
+            except (ValueError, TypeError):
+                continue
+            key = (sheet, row, col)
+            self._unregister(key)
+            cell = self._cells[sheet].get((row, col))
+            if cell is not None and cell.data_type == 'f':
+                self._register(key, cell.value)
+                targets.add(key)
+            elif self._large_ranges:
+                self._patch(key, self._get(key))
+            changed.add(key)
+        return self._recalculate(targets | self._affected(changed))
+
+    def update_sheet(self, sheet):
+        """
+        Re-scan a whole sheet after a bulk edit (copy, find and replace)
+
+        Formulas whose text changed are re-registered and every formula
+        reading the sheet is recomputed, along with its dependents.
+
+        Returns:
+            Set of (sheet, row, col) formula cells recomputed
+        """
+        if sheet not in self._cells:
+            return set()
+        cells = self._cells[sheet]
+        targets = set()
+        for key in [key for key in self.formulas if key[0] == sheet and (key[1], key[2]) not in cells]:
+            self._unregister(key)
+        for (row, col), cell in list(cells.items()):
+            key = (sheet, row, col)
+            current = self.formulas.get(key)
+            if cell.data_type == 'f':
+                if current is None or current.text != _formula_text(cell.value):
+                    self._unregister(key)
+                    self._register(key, cell.value)
+                    targets.add(key)
+            elif current is not None:
+                self._unregister(key)
+        for key, formula in self.formulas.items():
+            if any(ref[0] == sheet for ref in formula.refs) or any(b[0] == sheet for b in formula.ranges):
+                targets.add(key)
+        self._large_ranges = {b: rng for b, rng in self._large_ranges.items() if b[0] != sheet}
+        return self._recalculate(targets | self._affected(targets))
+
+    def refresh(self):
+        """
+        Rebuild the graph if sheets were added, removed or renamed since it was built
+
+        Returns:
+            True if the engine was rebuilt
+        """
+        if list(self._cells) == [ws.title for ws in self.workbook.worksheets]:
+            return False
+        self._build()
+        self.calculate_all()
+        return True
+
+    # ---------- results ----------
+
+    def value(self, sheet, address):
+        """Computed value of a cell (constants are returned as stored)"""
+        row, col = coordinate_to_tuple(address.upper())
+        return self._get((sheet, row, col))
+
+    def formula_sheets(self):
+        """Names of sheets containing at least one formula"""
+        return {key[0] for key in self.formulas}
+
+    def to_frame(self, sheet):
+        """
+        Build a sheet's DataFrame from computed values
+
+        Mirrors pd.read_excel(..., header=0): first row as header, trailing
+        blank rows dropped, integral floats as ints.
+        """
+        ws = self.workbook[sheet]
+        cells, values = self._cells[sheet], self.values
+        data = []
+        # max_row/max_column scan every cell, so read them once
+        max_row, max_col = ws.max_row, ws.max_column
+        for row in range(1, max_row + 1):
+            line = []
+            for col in range(1, max_col + 1):
+                cell = cells.get((row, col))
+                if cell is None:
+                    value = None
+                elif cell.data_type == 'f':
+                    value = values.get((sheet, row, col))
+                elif cell.data_type == 'e':
+                    value = np.nan
+                else:
+                    value = cell.value
+                if value is None:
+                    value = ''
+                elif isinstance(value, FormulaError):
+                    value = value.code
+                elif isinstance(value, float) and value.is_integer():
+                    value = int(value)
+                line.append(value)
+            data.append(line)
+        while data and all(v == '' for v in data[-1]):
+            data.pop()
+        if not data:
+            return pd.DataFrame()
+        return TextParser(data, header=0).read()
@@ -0,0 +1,58 @@
+"""
+HyperLogLog
+Fixed-memory distinct-count estimate over 64-bit hashes, updated with NumPy
+
+With the default precision of 14 the sketch holds 16,384 one-byte registers
+and the estimate has a standard error of about 0.8%, however many values are
+added. Sketches of the same precision can be merged, so per-chunk or per-file
+sketches combine into one count.
+"""
+
+import numpy as np
+from src.config.settings import PROFILE_HLL_PRECISION
+
+
+class HyperLogLog:
+    """Approximate distinct counter fed with arrays of uint64 hashes"""
+
+    def __init__(self, precision=PROFILE_HLL_PRECISION):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_hashes(self, hashes):
+        """
+        Add values by their 64-bit hashes (e.g. pd.util.hash_pandas_object)
+
+        Args:
+            hashes: Array-like of uint64 hashes
+        """
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if not len(hashes):
+            return
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.intp)
+        # Rank = position of the first set bit in the remaining bits. Only the
+        # next 32 bits are looked at, which is exact in float64 and enough
+        # for any realistic cardinality.
+        rest = ((hashes << np.uint64(p)) >> np.uint64(32)).astype(np.float64)
+        rank = (33 - np.frexp(rest)[1]).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        """Fold another sketch of the same precision into this one"""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches of different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self):
+        """Estimated number of distinct values added"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int32)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Small cardinalities: linear counting is more accurate
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
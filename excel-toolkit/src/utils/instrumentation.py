@@ -0,0 +1,206 @@
+"""
+Instrumentation
+Opt-in wall-clock, CPU and peak-memory measurements of feature and file calls
+
+Feature functions and file loaders/savers are wrapped with @instrumented.
+Outside a recording() block the wrapper only looks up one context variable
+before calling through, so instrumentation costs next to nothing while it is
+off. Inside a block every call is measured and appended to the recorder:
+
+    with recording() as recorder:
+        df = load_sheet_data(file_io)
+        stats_df = calculate_statistics(df, ["Revenue"])
+    recorder.records  # [{'operation': 'file_handlers.load_sheet_data', 'wall_ms': ..., ...}, ...]
+
+Nested calls are recorded too (with their depth), so a feature that loads a
+file shows both its own time and the time spent loading. CPU time is the
+calling thread's; peak memory is the tracemalloc peak above the memory in use
+when the call started. tracemalloc is process-wide, so memory figures of
+sessions measured at the same moment can include each other's allocations.
+"""
+
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+_recorder = contextvars.ContextVar('instrumentation_recorder', default=None)
+
+# tracemalloc is shared by every session: trace while at least one recorder needs it
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+
+
+def _start_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def _size(value, depth=0):
+    """(cells, bytes) of one argument: tables, workbooks, raw file content and containers of them"""
+    shape = getattr(value, 'shape', None)
+    if isinstance(shape, tuple) and len(shape) == 2:  # pandas / Polars DataFrames
+        return shape[0] * shape[1], 0
+    if hasattr(value, 'worksheets'):  # openpyxl Workbook
+        return sum(len(getattr(ws, '_cells', ())) for ws in value.worksheets), 0
+    if hasattr(value, '_cells'):  # openpyxl Worksheet
+        return len(value._cells), 0
+    if isinstance(value, (bytes, bytearray)):
+        return 0, len(value)
+    if hasattr(value, 'getbuffer'):  # BytesIO
+        return 0, value.getbuffer().nbytes
+    if depth < 2 and isinstance(value, (list, tuple, dict)):
+        items = value.values() if isinstance(value, dict) else value
+        cells = nbytes = 0
+        for item in items:
+            item_cells, item_bytes = _size(item, depth + 1)
+            cells += item_cells
+            nbytes += item_bytes
+        return cells, nbytes
+    return 0, 0
+
+
+def input_size(args, kwargs):
+    """
+    Total size of a call's inputs
+
+    Returns:
+        Tuple of (cells in DataFrames/workbooks, bytes of raw file content)
+    """
+    cells = nbytes = 0
+    for value in list(args) + list(kwargs.values()):
+        value_cells, value_bytes = _size(value)
+        cells += value_cells
+        nbytes += value_bytes
+    return cells, nbytes
+
+
+class Recorder:
+    """Measurements of the instrumented calls made inside one recording() block"""
+
+    def __init__(self, trace_memory=True, label=None):
+        self.trace_memory = trace_memory
+        self.label = label
+        self.records = []
+        self.started = time.perf_counter()
+        self.elapsed = None
+        self._open = []  # Highest absolute memory peak seen so far by each open call
+
+    def measure(self, name, func, args, kwargs):
+        """Call func and record its timings, peak memory and input size"""
+        cells, nbytes = input_size(args, kwargs)
+        trace = self.trace_memory and tracemalloc.is_tracing()
+        start_memory = 0
+        if trace:
+            start_memory, peak = tracemalloc.get_traced_memory()
+            if self._open:
+                self._open[-1] = max(self._open[-1], peak)
+            tracemalloc.reset_peak()
+        record = {
+            'operation': name,
+            'depth': len(self._open),
+            'start_ms': round(1000 * (time.perf_counter() - self.started), 3),
+        }
+        self._open.append(0)
+        error = None
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            return func(*args, **kwargs)
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+            peak = self._open.pop()
+            peak_mb = None
+            if trace:
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                peak_mb = round(max(peak - start_memory, 0) / 1024 ** 2, 3)
+                if self._open:
+                    self._open[-1] = max(self._open[-1], peak)
+            record.update({
+                'wall_ms': round(1000 * wall, 3),
+                'cpu_ms': round(1000 * cpu, 3),
+                'peak_mb': peak_mb,
+                'input_cells': cells,
+                'input_bytes': nbytes,
+                'error': error,
+            })
+            self.records.append(record)
+
+    def sorted_records(self):
+        """Records in call order (a call before the calls it made)"""
+        return sorted(self.records, key=lambda record: (record['start_ms'], record['depth']))
+
+
+@contextmanager
+def recording(trace_memory=True, label=None):
+    """
+    Measure every instrumented call made inside the block (in this thread/context)
+
+    Args:
+        trace_memory: Also track peak memory with tracemalloc (slows Python allocations down)
+        label: Optional name stored with the records (e.g. a session or rerun id)
+
+    Yields:
+        Recorder
+    """
+    recorder = Recorder(trace_memory, label)
+    token = _recorder.set(recorder)
+    if trace_memory:
+        _start_tracing()
+    try:
+        yield recorder
+    finally:
+        recorder.elapsed = time.perf_counter() - recorder.started
+        _recorder.reset(token)
+        if trace_memory:
+            _stop_tracing()
+
+
+def instrumented(func):
+    """Decorator measuring the function while a recording() block is active"""
+    name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        recorder = _recorder.get()
+        if recorder is None:
+            return func(*args, **kwargs)
+        return recorder.measure(name, func, args, kwargs)
+    return wrapper
+
+
+def append_to_log(recorder, path):
+    """
+    Append a recorder's measurements to a JSON-lines log (one object per call)
+
+    Args:
+        recorder: Finished Recorder
+        path: Log file path (its directory is created if needed)
+    """
+    if not recorder.records:
+        return
+    timestamp = datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        for record in recorder.sorted_records():
+            f.write(json.dumps({'timestamp': timestamp, 'label': recorder.label, **record}) + "\n")
@@ -0,0 +1,65 @@
+"""
+User Notification Helpers
+Route feature messages to Streamlit inside the app and to logging when headless
+"""
+
+import logging
+import sys
+
+logger = logging.getLogger("excel_toolkit")
+
+
+def _get_streamlit():
+    """
+    Return the Streamlit module only if the running process already imported it
+
+    Feature modules never import Streamlit themselves, so CLI and worker
+    processes stay free of its startup cost.
+    """
+    return sys.modules.get("streamlit")
+
+
+def show_error(message):
+    """Report an error message to the UI or the log"""
+    st = _get_streamlit()
+    if st is not None:
+        st.error(message)
+    else:
+        logger.error(message)
+
+
+def show_warning(message):
+    """Report a warning message to the UI or the log"""
+    st = _get_streamlit()
+    if st is not None:
+        st.warning(message)
+    else:
+        logger.warning(message)
+
+
+def show_success(message):
+    """Report a success message to the UI or the log"""
+    st = _get_streamlit()
+    if st is not None:
+        st.success(message)
+    else:
+        logger.info(message)
+
+
+def cache_data(func):
+    """
+    Apply st.cache_data when running inside Streamlit, otherwise leave uncached
+
+    Headless callers own their objects, so returning a shared cached
+    BytesIO to several of them would be unsafe.
+
+    Args:
+        func: Function to cache
+
+    Returns:
+        Cached function (or the function unchanged when headless)
+    """
+    st = _get_streamlit()
+    if st is not None:
+        return st.cache_data(func)
+    return func
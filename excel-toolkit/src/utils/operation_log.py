@@ -0,0 +1,326 @@
+"""
+Operation Log
+Multi-level undo/redo for workbook edits, recorded as deltas
+
+Feature functions that mutate a workbook accept an optional `journal` (an
+Operation) and report what they are about to change:
+
+- cells: the old value is captured the first time a cell is touched, the
+  new value when the operation closes
+- ranges: a block replaced wholesale (e.g. a formatted range copy) keeps
+  references to the cell objects, merged ranges and row/column dimensions
+  it replaced, since the new ones are fresh objects
+- structure: sheets added, removed, renamed, reordered, hidden or
+  protected; removed worksheets are kept by reference, not copied
+
+Undo and redo replay these deltas on the live workbook, so memory grows
+with the size of the edits and the workbook is never deep-copied or
+re-serialized.
+"""
+
+from contextlib import contextmanager
+from copy import copy
+from openpyxl.utils.cell import get_column_letter, column_index_from_string
+from openpyxl.worksheet.cell_range import MultiCellRange
+from openpyxl.worksheet.merge import MergedCellRange
+from src.utils.range_copy import cells_in
+from src.config.settings import UNDO_LIMIT
+
+
+def _fix_active(wb):
+    """Keep the active sheet index valid after sheets are removed or re-inserted"""
+    if wb._active_sheet_index >= len(wb._sheets):
+        wb.active = len(wb._sheets) - 1
+
+
+class _CellChanges:
+    """Old and new values of the cells written by one operation"""
+
+    def __init__(self):
+        self.changes = {}  # (worksheet, row, col) -> [old, new]
+
+    def capture(self, ws, row, col):
+        key = (ws, row, col)
+        if key not in self.changes:
+            cell = ws._cells.get((row, col))
+            self.changes[key] = [None if cell is None else cell.value, None]
+
+    def close(self, wb):
+        for (ws, row, col), change in list(self.changes.items()):
+            cell = ws._cells.get((row, col))
+            change[1] = None if cell is None else cell.value
+            if change[0] == change[1]:
+                del self.changes[(ws, row, col)]
+
+    def _write(self, index):
+        for (ws, row, col), change in self.changes.items():
+            ws.cell(row=row, column=col).value = change[index]
+
+    def undo(self, wb):
+        self._write(0)
+
+    def redo(self, wb):
+        self._write(1)
+
+    def cells(self):
+        return [(ws.title, f"{get_column_letter(col)}{row}") for ws, row, col in self.changes]
+
+    def __bool__(self):
+        return bool(self.changes)
+
+
+class _RangeReplaced:
+    """Cell objects, merged ranges and dimensions of a block before and after it was replaced"""
+
+    def __init__(self, ws, min_row, min_col, max_row, max_col):
+        self.ws = ws
+        self.bounds = (min_row, min_col, max_row, max_col)
+        self.old = self._snapshot()
+        self.new = None
+
+    def _rows(self, dims):
+        min_row, _, max_row, _ = self.bounds
+        return {index: dim for index, dim in dims.items() if min_row <= index <= max_row}
+
+    def _columns(self, dims):
+        _, min_col, _, max_col = self.bounds
+        return {letter: dim for letter, dim in dims.items()
+                if min_col <= column_index_from_string(letter) <= max_col}
+
+    def _snapshot(self):
+        ws = self.ws
+        return (
+            dict(cells_in(ws, *self.bounds)),
+            [mcr.coord for mcr in ws.merged_cells.ranges],
+            self._rows(ws.row_dimensions),
+            self._columns(ws.column_dimensions),
+        )
+
+    def _restore(self, state):
+        ws = self.ws
+        cells, merged, rows, columns = state
+        for key, _ in cells_in(ws, *self.bounds):
+            del ws._cells[key]
+        ws._cells.update(cells)
+        ws.merged_cells = MultiCellRange([MergedCellRange(ws, coord) for coord in merged])
+        for index in self._rows(ws.row_dimensions):
+            del ws.row_dimensions[index]
+        ws.row_dimensions.update(rows)
+        for letter in self._columns(ws.column_dimensions):
+            del ws.column_dimensions[letter]
+        ws.column_dimensions.update(columns)
+
+    def close(self, wb):
+        self.new = self._snapshot()
+
+    def undo(self, wb):
+        self._restore(self.old)
+
+    def redo(self, wb):
+        self._restore(self.new)
+
+    def cells(self):
+        keys = self.old[0].keys() | self.new[0].keys()
+        return [(self.ws.title, f"{get_column_letter(col)}{row}") for row, col in keys]
+
+
+class _SheetAdded:
+    def __init__(self, ws):
+        self.ws = ws
+        self.index = None
+
+    def close(self, wb):
+        self.index = wb._sheets.index(self.ws)
+
+    def undo(self, wb):
+        wb.remove(self.ws)
+        _fix_active(wb)
+
+    def redo(self, wb):
+        wb._add_sheet(self.ws, self.index)
+
+    def cells(self):
+        return []
+
+
+class _SheetRemoved(_SheetAdded):
+    def __init__(self, wb, ws):
+        super().__init__(ws)
+        self.index = wb._sheets.index(ws)
+
+    def close(self, wb):
+        pass
+
+    def undo(self, wb):
+        _SheetAdded.redo(self, wb)
+
+    def redo(self, wb):
+        _SheetAdded.undo(self, wb)
+
+
+class _SheetAttribute:
+    """A worksheet attribute (title, sheet_state, protection) before and after"""
+
+    def __init__(self, ws, name):
+        self.ws = ws
+        self.name = name
+        self.old = copy(getattr(ws, name))
+        self.new = None
+
+    def close(self, wb):
+        self.new = copy(getattr(self.ws, self.name))
+
+    def undo(self, wb):
+        setattr(self.ws, self.name, copy(self.old))
+
+    def redo(self, wb):
+        setattr(self.ws, self.name, copy(self.new))
+
+    def cells(self):
+        return []
+
+
+class _SheetOrder:
+    def __init__(self, wb):
+        self.old = list(wb._sheets)
+        self.new = None
+
+    def close(self, wb):
+        self.new = list(wb._sheets)
+
+    def undo(self, wb):
+        wb._sheets = list(self.old)
+
+    def redo(self, wb):
+        wb._sheets = list(self.new)
+
+    def cells(self):
+        return []
+
+
+class Operation:
+    """
+    One undoable user action: an ordered list of deltas on a workbook
+
+    Call the recording methods *before* making the change they describe.
+    """
+
+    def __init__(self, workbook, label):
+        self.workbook = workbook
+        self.label = label
+        self._deltas = []
+        self._cells = None
+
+    def _add(self, delta):
+        self._cells = None
+        self._deltas.append(delta)
+
+    def cell(self, ws, row, col):
+        """Record a cell about to be written"""
+        if self._cells is None:
+            self._cells = _CellChanges()
+            self._deltas.append(self._cells)
+        self._cells.capture(ws, row, col)
+
+    def range_replacing(self, ws, min_row, min_col, max_row, max_col):
+        """Record a block of cells about to be replaced with new cell objects"""
+        self._add(_RangeReplaced(ws, min_row, min_col, max_row, max_col))
+
+    def sheet_added(self, ws):
+        """Record a sheet that has just been created"""
+        self._add(_SheetAdded(ws))
+
+    def sheet_removing(self, ws):
+        """Record a sheet about to be removed"""
+        self._add(_SheetRemoved(self.workbook, ws))
+
+    def sheet_attribute(self, ws, name):
+        """Record a worksheet attribute (title, sheet_state, protection) about to change"""
+        self._add(_SheetAttribute(ws, name))
+
+    def sheets_reordering(self):
+        """Record the sheet order before it changes"""
+        self._add(_SheetOrder(self.workbook))
+
+    def close(self):
+        for delta in self._deltas:
+            delta.close(self.workbook)
+        self._deltas = [delta for delta in self._deltas if not isinstance(delta, _CellChanges) or delta]
+        self._cells = None
+
+    def undo(self):
+        for delta in reversed(self._deltas):
+            delta.undo(self.workbook)
+
+    def redo(self):
+        for delta in self._deltas:
+            delta.redo(self.workbook)
+
+    def cells(self):
+        """(sheet_name, cell_address) pairs written by this operation"""
+        return [cell for delta in self._deltas for cell in delta.cells()]
+
+    @property
+    def structural(self):
+        """True if sheets were added, removed, renamed or reordered"""
+        return any(not isinstance(delta, (_CellChanges, _RangeReplaced)) for delta in self._deltas)
+
+    def __bool__(self):
+        return bool(self._deltas)
+
+
+class OperationLog:
+    """Undo and redo stacks of Operations (oldest dropped beyond `limit`)"""
+
+    def __init__(self, limit=UNDO_LIMIT):
+        self.limit = limit
+        self._undo = []
+        self._redo = []
+
+    @contextmanager
+    def record(self, workbook, label):
+        """
+        Record the edits made inside the block as one operation
+
+        Whatever was recorded is kept even if the block raises, since the
+        workbook has been changed up to that point.
+        """
+        operation = Operation(workbook, label)
+        try:
+            yield operation
+        finally:
+            operation.close()
+            if operation:
+                self._undo.append(operation)
+                del self._undo[:-self.limit]
+                self._redo.clear()
+
+    def undo(self):
+        """Revert the last operation; returns it, or None if there is nothing to undo"""
+        if not self._undo:
+            return None
+        operation = self._undo.pop()
+        operation.undo()
+        self._redo.append(operation)
+        return operation
+
+    def redo(self):
+        """Re-apply the last undone operation; returns it, or None"""
+        if not self._redo:
+            return None
+        operation = self._redo.pop()
+        operation.redo()
+        self._undo.append(operation)
+        return operation
+
+    @property
+    def undo_label(self):
+        return self._undo[-1].label if self._undo else None
+
+    @property
+    def redo_label(self):
+        return self._redo[-1].label if self._redo else None
+
+    def history(self):
+        """Labels of undoable operations, most recent first"""
+        return [operation.label for operation in reversed(self._undo)]
@@ -0,0 +1,279 @@
+"""
+Range Copy
+Copy blocks of cells between worksheets (and workbooks) with their formatting
+
+Cells are read a row slice at a time straight from the worksheet's cell store
+and written as new cell objects, so a 100k-row block costs one pass instead of
+a Python-level ``copy()`` per style attribute per cell. Styles are remapped
+once per distinct style and the result is reused by every cell sharing it.
+"""
+
+from copy import copy
+from openpyxl.cell.cell import Cell, MergedCell
+from openpyxl.formula.translate import Translator
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.styles.numbers import BUILTIN_FORMATS_MAX_SIZE
+from openpyxl.utils.cell import get_column_letter, range_boundaries, range_to_tuple
+from openpyxl.worksheet.dimensions import ColumnDimension, RowDimension
+from openpyxl.worksheet.formula import ArrayFormula
+from openpyxl.worksheet.merge import MergedCellRange
+
+
+def parse_range(ref, ws):
+    """
+    Resolve an Excel range reference against a worksheet
+
+    Accepts single cells (A1), blocks (A1:C10, $A$1:$C$10, C10:A1), whole
+    columns (A, A:C), whole rows (3, 3:5), sheet-qualified references
+    ('Sales 2024'!A1:C10) and defined names. Whole columns and rows are
+    clipped to the sheet's used area.
+
+    Args:
+        ref: Range reference
+        ws: Worksheet the reference is relative to
+
+    Returns:
+        Tuple of (worksheet, min_row, min_col, max_row, max_col)
+    """
+    ref = ref.strip()
+    wb = ws.parent
+    if ref in ws.defined_names:
+        ref = ws.defined_names[ref].attr_text
+    elif ref in wb.defined_names:
+        ref = wb.defined_names[ref].attr_text
+
+    if '!' in ref:
+        sheet_name, _ = range_to_tuple(ref)
+        if sheet_name not in wb.sheetnames:
+            raise ValueError(f"Sheet '{sheet_name}' not found")
+        ws = wb[sheet_name]
+        ref = ref.rsplit('!', 1)[1]
+
+    try:
+        min_col, min_row, max_col, max_row = range_boundaries(ref.replace('$', '').upper())
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid range: {ref}")
+
+    if min_row is None:
+        min_row, max_row = 1, ws.max_row
+    if min_col is None:
+        min_col, max_col = 1, ws.max_column
+    if min_row > max_row:
+        min_row, max_row = max_row, min_row
+    if min_col > max_col:
+        min_col, max_col = max_col, min_col
+    return ws, min_row, min_col, max_row, max_col
+
+
+def cells_in(ws, min_row, min_col, max_row, max_col):
+    """
+    Existing cells of a block without creating the empty ones
+
+    Returns:
+        List of ((row, col), cell) pairs
+    """
+    store = ws._cells
+    if (max_row - min_row + 1) * (max_col - min_col + 1) <= len(store):
+        get = store.get
+        return [((row, col), cell)
+                for row in range(min_row, max_row + 1)
+                for col in range(min_col, max_col + 1)
+                if (cell := get((row, col))) is not None]
+    return [(key, cell) for key, cell in store.items()
+            if min_row <= key[0] <= max_row and min_col <= key[1] <= max_col]
+
+
+class _StyleMap:
+    """Translate cell style arrays from one workbook's style tables to another's"""
+
+    def __init__(self, src_wb, dst_wb):
+        self.src = src_wb
+        self.dst = dst_wb
+        self._cache = {}
+
+    def __call__(self, style):
+        if style is None or self.src is self.dst:
+            return style
+        mapped = self._cache.get(style)
+        if mapped is None:
+            mapped = self._cache[StyleArray(style)] = self._remap(style)
+        return mapped
+
+    def _remap(self, style):
+        # Same attributes as copy_cell_style: the named style is not carried over
+        src, dst = self.src, self.dst
+        mapped = StyleArray()
+        mapped.fontId = dst._fonts.add(src._fonts[style.fontId])
+        mapped.fillId = dst._fills.add(src._fills[style.fillId])
+        mapped.borderId = dst._borders.add(src._borders[style.borderId])
+        mapped.protectionId = dst._protections.add(src._protections[style.protectionId])
+        mapped.alignmentId = dst._alignments.add(src._alignments[style.alignmentId])
+        if style.numFmtId < BUILTIN_FORMATS_MAX_SIZE:
+            mapped.numFmtId = style.numFmtId
+        else:
+            number_format = src._number_formats[style.numFmtId - BUILTIN_FORMATS_MAX_SIZE]
+            mapped.numFmtId = dst._number_formats.add(number_format) + BUILTIN_FORMATS_MAX_SIZE
+        mapped.quotePrefix = style.quotePrefix
+        mapped.pivotButton = style.pivotButton
+        return mapped
+
+
+def _new_cell(ws, row, col, value, data_type, style):
+    """Build a cell from an already validated value (Cell.__init__ would re-check its type)"""
+    cell = Cell.__new__(Cell)
+    cell.parent = ws
+    cell.row = row
+    cell.column = col
+    cell._value = value
+    cell.data_type = data_type
+    cell._style = None if style is None else StyleArray(style)
+    cell._hyperlink = None
+    cell._comment = None
+    return cell
+
+
+def _translate(value, row, col, row_delta, col_delta):
+    """Shift the relative references of a formula moved by (row_delta, col_delta)"""
+    origin = f"{get_column_letter(col)}{row}"
+    if isinstance(value, ArrayFormula):
+        min_col, min_row, max_col, max_row = range_boundaries(value.ref)
+        ref = (f"{get_column_letter(min_col + col_delta)}{min_row + row_delta}:"
+               f"{get_column_letter(max_col + col_delta)}{max_row + row_delta}")
+        text = Translator(value.text, origin).translate_formula(row_delta=row_delta, col_delta=col_delta)
+        return ArrayFormula(ref, text)
+    if isinstance(value, str):
+        return Translator(value, origin).translate_formula(row_delta=row_delta, col_delta=col_delta)
+    return value
+
+
+def _clip_merges(src_ws, min_row, min_col, max_row, max_col):
+    """Source merged ranges intersected with the block (ranges reduced to one cell are dropped)"""
+    merges = []
+    for mcr in src_ws.merged_cells.ranges:
+        top, left = max(mcr.min_row, min_row), max(mcr.min_col, min_col)
+        bottom, right = min(mcr.max_row, max_row), min(mcr.max_col, max_col)
+        if top <= bottom and left <= right and (top, left) != (bottom, right):
+            merges.append((top, left, bottom, right))
+    return merges
+
+
+def _overlapping_merges(ws, min_row, min_col, max_row, max_col):
+    return [mcr for mcr in ws.merged_cells.ranges
+            if mcr.min_row <= max_row and mcr.max_row >= min_row
+            and mcr.min_col <= max_col and mcr.max_col >= min_col]
+
+
+def _copy_dimensions(src_ws, dst_ws, min_row, min_col, max_row, max_col, row_delta, col_delta):
+    """Carry column widths and row heights of the block over to the destination"""
+    for index, dim in list(src_ws.row_dimensions.items()):
+        if min_row <= index <= max_row and (dim.ht is not None or dim.hidden):
+            dst_ws.row_dimensions[index + row_delta] = RowDimension(
+                dst_ws, index=index + row_delta, ht=dim.ht, hidden=dim.hidden
+            )
+
+    for dim in list(src_ws.column_dimensions.values()):
+        dim.reindex()
+        for col in range(max(dim.min, min_col), min(dim.max, max_col) + 1):
+            letter = get_column_letter(col + col_delta)
+            dst_ws.column_dimensions[letter] = ColumnDimension(
+                dst_ws, index=letter, width=dim.width, hidden=dim.hidden
+            )
+
+
+def copy_range(src_ws, source_range, dst_ws, dest_start, formats=True, journal=None):
+    """
+    Copy a range of cells to another place, sheet or workbook
+
+    Blank source cells clear the destination, like a paste in Excel, and
+    relative references in formulas are shifted to the new position.
+
+    Args:
+        src_ws: Source worksheet
+        source_range: Source range in any form accepted by parse_range
+        dst_ws: Destination worksheet (may belong to another workbook)
+        dest_start: Top-left destination cell (a range uses its top-left cell)
+        formats: Also copy styles, merged cells, column widths and row heights
+        journal: Optional Operation recording the change for undo
+
+    Returns:
+        Tuple of (rows, columns) copied
+    """
+    src_ws, min_row, min_col, max_row, max_col = parse_range(source_range, src_ws)
+    dst_ws, dest_row, dest_col = parse_range(dest_start, dst_ws)[:3]
+    row_delta, col_delta = dest_row - min_row, dest_col - min_col
+    end_row, end_col = max_row + row_delta, max_col + col_delta
+
+    # Read the whole block before writing so overlapping copies on one sheet work
+    source = cells_in(src_ws, min_row, min_col, max_row, max_col)
+    merges = _clip_merges(src_ws, min_row, min_col, max_row, max_col) if formats else []
+
+    # Destination merges cut by the block are removed, so their cells are part of the change
+    stale_merges = _overlapping_merges(dst_ws, dest_row, dest_col, end_row, end_col) if formats else []
+    if journal is not None:
+        journal.range_replacing(
+            dst_ws,
+            min([dest_row] + [mcr.min_row for mcr in stale_merges]),
+            min([dest_col] + [mcr.min_col for mcr in stale_merges]),
+            max([end_row] + [mcr.max_row for mcr in stale_merges]),
+            max([end_col] + [mcr.max_col for mcr in stale_merges]),
+        )
+
+    store = dst_ws._cells
+    for mcr in stale_merges:
+        dst_ws.unmerge_cells(mcr.coord)
+    existing = dict(cells_in(dst_ws, dest_row, dest_col, end_row, end_col))
+    if formats:
+        for key in existing:
+            del store[key]
+
+    style_map = _StyleMap(src_ws.parent, dst_ws.parent)
+    merged_targets = {
+        (row + row_delta, col + col_delta)
+        for top, left, bottom, right in merges
+        for row in range(top, bottom + 1)
+        for col in range(left, right + 1)
+    } - {(top + row_delta, left + col_delta) for top, left, _, _ in merges}
+
+    translate = row_delta or col_delta
+    for (row, col), cell in source:
+        target = (row + row_delta, col + col_delta)
+        if formats:
+            style = style_map(cell._style)
+            if target in merged_targets:
+                store[target] = merged = MergedCell(dst_ws, *target)
+                merged._style = None if style is None else StyleArray(style)
+                continue
+        else:
+            old = existing.pop(target, None)
+            if type(old) is MergedCell:
+                continue
+            style = None if old is None else old._style
+
+        if type(cell) is MergedCell:
+            store[target] = _new_cell(dst_ws, *target, None, 'n', style)
+            continue
+        value = cell._value
+        if cell.data_type == 'f' and translate:
+            value = _translate(value, row, col, row_delta, col_delta)
+        store[target] = new = _new_cell(dst_ws, *target, value, cell.data_type, style)
+        if formats:
+            if cell._comment is not None:
+                new.comment = copy(cell._comment)
+            if cell._hyperlink is not None:
+                new.hyperlink = copy(cell._hyperlink)
+
+    if not formats:
+        # Destination cells with nothing to paste over them are cleared but keep their style
+        for (row, col), old in existing.items():
+            if type(old) is not MergedCell:
+                store[row, col] = _new_cell(dst_ws, row, col, None, 'n', old._style)
+
+    if formats:
+        for top, left, bottom, right in merges:
+            dst_ws.merged_cells.add(MergedCellRange(
+                dst_ws, f"{get_column_letter(left + col_delta)}{top + row_delta}:"
+                        f"{get_column_letter(right + col_delta)}{bottom + row_delta}"
+            ))
+        _copy_dimensions(src_ws, dst_ws, min_row, min_col, max_row, max_col, row_delta, col_delta)
+
+    return max_row - min_row + 1, max_col - min_col + 1
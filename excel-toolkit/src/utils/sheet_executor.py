@@ -0,0 +1,171 @@
+"""
+Per-Sheet Parallel Execution
+Run one task per sheet on a process or thread pool and merge in sheet order
+
+Workbook-wide operations (loading every sheet, statistics over every
+sheet) are independent per sheet. map_sheets runs them side by side:
+
+- processes for parse work (pure-Python openpyxl, which threads cannot
+  speed up); sheets are partitioned into one batch per worker, balanced by a
+  size weight (largest sheets first), so each worker is started and fed once
+- threads for pandas/NumPy kernels that release the GIL; threads pick the
+  next sheet as they finish, so no partitioning is needed
+
+Results always come back in task order, whatever order the workers finish
+in. A single core or a platform where no process pool can be started runs
+inline. If a worker process dies (crash, out of memory), only the tasks it
+had not finished are resubmitted, one at a time, so a task that kills its
+worker again is isolated; exceptions raised by a task itself propagate.
+
+Scans of an in-memory openpyxl workbook (search, find & replace) stay in
+this process: handing its cell values to workers costs more than the string
+matching itself. They walk each sheet's cells with cell_values instead of
+iter_rows, which skips gaps and never creates empty cells.
+"""
+
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from src.config.settings import SHEET_WORKERS
+
+PROCESS, THREAD = 'process', 'thread'
+
+
+def worker_count(tasks, workers=SHEET_WORKERS):
+    """Workers worth starting for `tasks` tasks (None uses every CPU core)"""
+    return max(1, min(workers or os.cpu_count() or 1, tasks))
+
+
+def partition(weights, parts):
+    """
+    Split task positions into `parts` batches of similar total weight
+
+    Greedy longest-processing-time: the heaviest task goes to the lightest
+    batch. Positions inside each batch stay in ascending order.
+
+    Args:
+        weights: Weight (e.g. cell count or bytes) per task
+        parts: Number of batches
+
+    Returns:
+        List of non-empty lists of task positions
+    """
+    heap = [(0, part) for part in range(parts)]
+    batches = [[] for _ in range(parts)]
+    for position in sorted(range(len(weights)), key=lambda i: weights[i], reverse=True):
+        load, part = heapq.heappop(heap)
+        batches[part].append(position)
+        heapq.heappush(heap, (load + max(weights[position], 1), part))
+    return [sorted(batch) for batch in batches if batch]
+
+
+def _run_batch(func, batch):
+    """Run a batch of argument tuples (in a worker process)"""
+    return [func(*args) for args in batch]
+
+
+class _PoolUnavailable(Exception):
+    """No process pool can be started on this platform"""
+
+
+def _run_in_processes(func, tasks, batches, results):
+    """
+    Run batches of task positions in a process pool, filling `results`
+
+    Returns:
+        Positions of tasks whose worker process died before returning them
+
+    Raises:
+        _PoolUnavailable if the pool cannot be started (exceptions raised by
+        func itself propagate unchanged)
+    """
+    try:
+        executor = ProcessPoolExecutor(max_workers=len(batches))
+    except (OSError, NotImplementedError) as e:
+        raise _PoolUnavailable() from e
+    unfinished, futures = [], []
+    with executor:
+        for index, batch in enumerate(batches):
+            try:
+                futures.append((batch, executor.submit(_run_batch, func, [tasks[i] for i in batch])))
+            except BrokenProcessPool:
+                unfinished += [position for rest in batches[index:] for position in rest]
+                break
+            except (OSError, NotImplementedError) as e:
+                raise _PoolUnavailable() from e
+        for batch, future in futures:
+            try:
+                batch_result = future.result()
+            except BrokenProcessPool:
+                unfinished += batch
+                continue
+            for position, result in zip(batch, batch_result):
+                results[position] = result
+    return unfinished
+
+
+def map_sheets(func, tasks, kind=THREAD, workers=SHEET_WORKERS, weights=None, crashed=None):
+    """
+    Apply func to every per-sheet argument tuple, in parallel
+
+    Args:
+        func: Function called as func(*task); for processes it must be a
+            module-level function and tasks/results must pickle
+        tasks: List of argument tuples, one per sheet
+        kind: 'process' or 'thread'
+        workers: Pool size (None for all cores, 1 to run inline)
+        weights: Optional size per task used to balance process batches
+        crashed: Optional function called as crashed(*task) for the result of
+            a task whose worker process died twice; by default
+            BrokenProcessPool is raised
+
+    Returns:
+        List of results in task order
+    """
+    tasks = list(tasks)
+    workers = worker_count(len(tasks), workers)
+    if workers == 1:
+        return _run_batch(func, tasks)
+
+    if kind == THREAD:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda task: func(*task), tasks))
+
+    results = [None] * len(tasks)
+    try:
+        unfinished = _run_in_processes(func, tasks, partition(weights or [1] * len(tasks), workers), results)
+    except _PoolUnavailable:
+        # No process pool on this platform (no semaphores, sandboxed): run inline
+        return _run_batch(func, tasks)
+
+    # A worker died: retry only its unfinished tasks, each in a fresh single-process pool so
+    # a task that kills its worker again cannot take other tasks down with it
+    for position in sorted(unfinished):
+        try:
+            died = _run_in_processes(func, tasks, [[position]], results)
+        except _PoolUnavailable:
+            died = [position]
+        if died:
+            if crashed is None:
+                raise BrokenProcessPool(f"Worker process died twice running task {position}")
+            results[position] = crashed(*tasks[position])
+    return results
+
+
+def cell_values(ws):
+    """
+    Non-empty cells of an openpyxl worksheet as (row, column, value), row by row
+
+    Walks the worksheet's cell dictionary instead of iter_rows, so gaps are
+    skipped and no empty cells are created. Worksheets without one (read-only
+    sheets) are streamed with iter_rows instead. Falsy values (0, '', False)
+    are left out, as the workbook-wide scans have always done.
+    """
+    cells = getattr(ws, '_cells', None)
+    if cells is None:
+        return [(row, col, value)
+                for row, values in enumerate(ws.iter_rows(values_only=True), start=1)
+                for col, value in enumerate(values, start=1) if value]
+    return [(row, col, value) for (row, col) in sorted(cells) if (value := cells[(row, col)].value)]
+
@@ -0,0 +1,250 @@
+"""
+Shared Workbook Store
+Process-wide, content-addressed cache of parsed workbooks
+
+Every Streamlit session runs in the same server process. Instead of each
+session parsing its own copy of an uploaded file, workbooks are parsed once
+per distinct content (SHA-256 of the bytes, plus the password for protected
+files) and shared:
+
+- the parsed openpyxl workbook and the sheet DataFrames are treated as
+  immutable and shared by every session that opened the same file
+- sessions get a WorkbookHandle: DataFrames are handed out as pandas
+  copy-on-write views, and the openpyxl workbook is cloned privately the
+  first time a session edits it
+- workbooks with formulas are calculated once by a FormulaEngine; frames
+  show computed values and editing sessions get a copy of the engine
+- handles are reference counted (released automatically when a session's
+  state is garbage collected); unreferenced entries stay cached and are
+  evicted least-recently-used first when the store exceeds its memory
+  budget or the machine runs low on free memory
+
+Server memory therefore grows with the number of distinct files, not with
+the number of users viewing them.
+"""
+
+import hashlib
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from io import BytesIO
+import pandas as pd
+from openpyxl import load_workbook
+from src.utils.formula_engine import FormulaEngine
+from src.utils.instrumentation import instrumented
+from src.config.settings import STORE_MAX_BYTES, STORE_MIN_FREE_BYTES, STORE_CELL_BYTES
+
+
+def content_key(file_bytes, password=None):
+    """SHA-256 of the file content (and password, so protected files are only shared with its holders)"""
+    digest = hashlib.sha256(file_bytes)
+    if password:
+        digest.update(b'\x00' + password.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def available_memory():
+    """Free physical memory in bytes, or None where the platform does not report it"""
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+class _Entry:
+    """One parsed workbook shared by every handle with the same content key"""
+
+    __slots__ = ('key', 'file_bytes', 'workbook', 'frames', 'engine', 'nbytes', 'refs', 'last_used')
+
+    def __init__(self, key, file_bytes, workbook, frames, engine):
+        self.key = key
+        self.file_bytes = file_bytes
+        self.workbook = workbook
+        self.frames = frames
+        self.engine = engine
+        cells = sum(len(ws._cells) for ws in workbook.worksheets) + (len(engine.formulas) if engine else 0)
+        self.nbytes = (len(file_bytes) + cells * STORE_CELL_BYTES
+                       + sum(int(df.memory_usage(deep=True).sum()) for df in frames.values()))
+        self.refs = 0
+        self.last_used = time.time()
+
+
+class WorkbookHandle:
+    """
+    A session's view of a shared workbook
+
+    `workbook` is the shared (read-only) openpyxl workbook until
+    writable_workbook() is called; `frames()` returns copy-on-write
+    DataFrames that can be modified freely.
+    """
+
+    def __init__(self, store, entry):
+        self._entry = entry
+        self._private_workbook = None
+        self._private_engine = None
+        weakref.finalize(self, store._release, entry.key)
+
+    @property
+    def key(self):
+        return self._entry.key
+
+    @property
+    def is_shared(self):
+        """True while this handle still reads the shared workbook"""
+        return self._private_workbook is None
+
+    @property
+    def workbook(self):
+        return self._private_workbook if self._private_workbook is not None else self._entry.workbook
+
+    def writable_workbook(self):
+        """Return a private workbook, cloning the shared one on first use"""
+        if self._private_workbook is None:
+            self._private_workbook = load_workbook(BytesIO(self._entry.file_bytes))
+        return self._private_workbook
+
+    def formula_engine(self):
+        """Return a private FormulaEngine over writable_workbook(), copied from the shared one on first use"""
+        if self._private_engine is None:
+            workbook = self.writable_workbook()
+            shared = self._entry.engine
+            self._private_engine = shared.copy(workbook) if shared is not None else FormulaEngine(workbook)
+        return self._private_engine
+
+    def frames(self):
+        """Return {sheet_name: DataFrame} as copy-on-write views of the shared frames"""
+        return {name: df.copy(deep=False) for name, df in self._entry.frames.items()}
+
+
+class WorkbookStore:
+    """Thread-safe, content-addressed store of parsed workbooks"""
+
+    def __init__(self, max_bytes=STORE_MAX_BYTES, min_free_bytes=STORE_MIN_FREE_BYTES):
+        self.max_bytes = max_bytes
+        self.min_free_bytes = min_free_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending_releases = deque()  # Keys of collected handles, applied under the lock
+
+    @instrumented
+    def open(self, file_bytes, password=None):
+        """
+        Return a handle to the parsed workbook, parsing it only if no session has it loaded
+
+        Args:
+            file_bytes: Raw bytes of the uploaded file
+            password: Optional password for protected files
+
+        Returns:
+            WorkbookHandle
+
+        Raises:
+            Exception from decryption or parsing if the file cannot be loaded
+        """
+        key = content_key(file_bytes, password)
+        with self._lock:
+            self._apply_releases()
+            entry = self._entries.get(key)
+            if entry is not None:
+                return self._acquire(entry)
+
+        # Parse outside the lock so other sessions are not blocked meanwhile
+        entry = self._parse(key, file_bytes, password)
+        with self._lock:
+            self._apply_releases()
+            entry = self._entries.setdefault(key, entry)
+            handle = self._acquire(entry)
+            self._evict()
+            return handle
+
+    @staticmethod
+    def _parse(key, file_bytes, password):
+        """Decrypt (if needed) and parse a workbook into a new entry"""
+        if password:
+            import msoffcrypto
+            decrypted = BytesIO()
+            office_file = msoffcrypto.OfficeFile(BytesIO(file_bytes))
+            office_file.load_key(password=password)
+            office_file.decrypt(decrypted)
+            file_bytes = decrypted.getvalue()
+        workbook = load_workbook(BytesIO(file_bytes))
+        # pandas reads straight from the parsed workbook, so the file is parsed once
+        frames = pd.read_excel(workbook, sheet_name=None, engine='openpyxl')
+        # openpyxl keeps formulas as text; calculate them once for every session
+        engine = FormulaEngine(workbook)
+        if engine.formulas:
+            engine.calculate_all()
+            for sheet in engine.formula_sheets():
+                frames[sheet] = engine.to_frame(sheet)
+        else:
+            engine = None
+        return _Entry(key, file_bytes, workbook, frames, engine)
+
+    def _acquire(self, entry):
+        """Create a handle and bump the entry's reference count (lock held)"""
+        entry.refs += 1
+        entry.last_used = time.time()
+        self._entries.move_to_end(entry.key)
+        return WorkbookHandle(self, entry)
+
+    def _release(self, key):
+        """
+        Called when a handle is garbage collected
+
+        The garbage collector can run this finalizer on a thread that already
+        holds the lock, so it only queues the release; queued releases are
+        applied the next time the lock is taken (right away if it is free).
+        """
+        self._pending_releases.append(key)
+        if self._lock.acquire(blocking=False):
+            try:
+                self._apply_releases()
+                self._evict()
+            finally:
+                self._lock.release()
+
+    def _apply_releases(self):
+        """Decrement reference counts of queued releases (lock held)"""
+        while self._pending_releases:
+            entry = self._entries.get(self._pending_releases.popleft())
+            if entry is not None:
+                entry.refs = max(0, entry.refs - 1)
+                entry.last_used = time.time()
+
+    def _under_pressure(self):
+        """True when the store is over budget or free memory is low (lock held)"""
+        if sum(entry.nbytes for entry in self._entries.values()) > self.max_bytes:
+            return True
+        free = available_memory()
+        return free is not None and free < self.min_free_bytes
+
+    def _evict(self):
+        """Drop unreferenced entries, least recently used first, until pressure is relieved (lock held)"""
+        for key in [key for key, entry in self._entries.items() if entry.refs == 0]:
+            if not self._under_pressure():
+                break
+            del self._entries[key]
+
+    def evict_unused(self):
+        """Drop every unreferenced entry; returns the number removed"""
+        with self._lock:
+            self._apply_releases()
+            unused = [key for key, entry in self._entries.items() if entry.refs == 0]
+            for key in unused:
+                del self._entries[key]
+            return len(unused)
+
+    def stats(self):
+        """Summary of the store for display"""
+        with self._lock:
+            self._apply_releases()
+            return {
+                'Files': len(self._entries),
+                'Open handles': sum(entry.refs for entry in self._entries.values()),
+                'Memory (MB)': round(sum(entry.nbytes for entry in self._entries.values()) / 1e6, 1),
+            }
+
+
+workbook_store = WorkbookStore()